@@ -1,8 +1,19 @@
-from django.contrib import admin
+import uuid
+from datetime import date
+
+from django.apps import apps
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from unfold.admin import ModelAdmin
+from .duplicates import get_duplicate_groups, merge_users
 from .models import User
 
+DUPLICATE_GROUPS_SHOWN = 100
+
 @admin.register(User)
 class CustomUserAdmin(BaseUserAdmin, ModelAdmin):
     fieldsets = BaseUserAdmin.fieldsets + (
@@ -28,3 +39,76 @@ class CustomUserAdmin(BaseUserAdmin, ModelAdmin):
     search_fields = ('username', 'first_name', 'last_name', 'email', 'phone_number')
     ordering = ('-date_joined',)
     list_per_page = 25
+
+    def get_urls(self):
+        urls = [
+            path(
+                'duplicates/',
+                self.admin_site.admin_view(self.duplicates_view),
+                name='accounts_user_duplicates',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def duplicates_view(self, request):
+        """
+        Likely duplicate student accounts, best matches first. Merging a
+        group moves the other accounts' enrollments, payments and history
+        to the account kept and deletes the others.
+        """
+        if not (self.has_change_permission(request) and self.has_delete_permission(request)):
+            raise PermissionDenied
+        if request.method == 'POST':
+            keep = get_object_or_404(User, pk=request.POST.get('keep'))
+            try:
+                merge_ids = [
+                    pk for pk in map(User._meta.pk.to_python, request.POST.getlist('merge')) if pk != keep.pk
+                ]
+                if not merge_ids:
+                    raise ValidationError("Choose at least one other account to merge into the one kept.")
+                moved = merge_users(keep, merge_ids)
+            except ValidationError as exc:
+                for error in exc.messages:
+                    self.message_user(request, error, messages.ERROR)
+            else:
+                summary = ", ".join(
+                    f"{count} {apps.get_model(label)._meta.verbose_name_plural}" for label, count in sorted(moved.items())
+                ) or "no records"
+                self.message_user(
+                    request,
+                    f"Merged {len(merge_ids)} account(s) into {keep.username} ({summary} moved).",
+                    messages.SUCCESS,
+                )
+            return redirect('admin:accounts_user_duplicates')
+
+        found = get_duplicate_groups(limit=DUPLICATE_GROUPS_SHOWN)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Duplicate students",
+            'opts': self.model._meta,
+            'found': found,
+        }
+        return TemplateResponse(request, 'admin/accounts/user/duplicates.html', context)
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+
+        # The batch form's instructor autocomplete sends the batch dates so
+        # only instructors who are free for the whole range are offered.
+        if request.GET.get('model_name') == 'batch' and request.GET.get('field_name') == 'instructor':
+            try:
+                start = date.fromisoformat(request.GET.get('start_date', ''))
+                end = date.fromisoformat(request.GET.get('end_date', ''))
+            except ValueError:
+                return queryset, may_have_duplicates
+
+            from courses.scheduling import get_available_instructors
+
+            try:
+                batch_pk = uuid.UUID(request.GET['batch']) if request.GET.get('batch') else None
+            except ValueError:
+                batch_pk = None
+            available = get_available_instructors(start, end, exclude_batch_pk=batch_pk)
+            queryset = queryset.filter(pk__in=available.values('pk'))
+
+        return queryset, may_have_duplicates
@@ -0,0 +1,393 @@
+"""
+Duplicate student detection and merging.
+
+Students who register again under a slightly different name or phone
+format end up with two accounts, each holding part of their enrollments
+and payments. Comparing every pair of students is quadratic, so each
+student is instead given a few blocking keys (the last nine digits of
+their phone number, their normalized email, and a Soundex code of their
+name that ignores word order) and only students sharing a key are
+compared. A pair is scored on name similarity plus a matching contact
+detail, and pairs above the threshold are joined into groups.
+
+`merge_users` folds the other accounts of a group into the one kept,
+re-pointing every foreign key with one UPDATE per relation.
+"""
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import chain, combinations, product
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import TimeStampedModel
+from core.versioning import TRACKED_MODELS, bump_data_version, get_data_version_key
+from portal.services import invalidate_student_summaries
+
+from .models import User
+
+DUPLICATE_THRESHOLD = getattr(settings, "DUPLICATE_STUDENT_THRESHOLD", 0.7)
+# Blocks bigger than this are not compared pair by pair; their members are
+# still compared through their other keys. Name blocks are only limited
+# when the threshold is low enough for a name alone to pass.
+MAX_BLOCK_SIZE = getattr(settings, "DUPLICATE_STUDENT_MAX_BLOCK", 500)
+DUPLICATES_CACHE_ALIAS = getattr(settings, "DUPLICATE_STUDENT_CACHE_ALIAS", "shared")
+
+NAME_WEIGHT = 0.6
+CONTACT_WEIGHT = 0.4
+# Share of the contact weight given to phone numbers that differ by one
+# mistyped digit or two swapped neighbours.
+PHONE_TYPO_CREDIT = 0.75
+
+# Rows that may be dropped when the kept account already has the same one,
+# as `{model label: reason}`. A clash in any other model stops the merge.
+DISCARD_ON_CONFLICT = {
+    "notifications.ReminderDelivery": "the kept account was already reminded in that cycle",
+}
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def normalize_name(value) -> str:
+    """Lower-case ASCII words of a name, accents removed, in alphabetical order."""
+    text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode().lower()
+    words = "".join(char if char.isalpha() else " " for char in text).split()
+    return " ".join(sorted(words))
+
+
+def normalize_phone(value) -> str:
+    """The last nine digits of a phone number, which survive every local and international format, or ""."""
+    digits = "".join(char for char in str(value or "") if char.isdigit())
+    return digits[-9:] if len(digits) >= 9 else ""
+
+
+def normalize_email(value) -> str:
+    """Lower-cased email with any "+tag" removed from the local part, or ""."""
+    local, _, domain = str(value or "").strip().lower().partition("@")
+    if not local or not domain:
+        return ""
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def soundex(word: str) -> str:
+    """American Soundex code of a lower-case ASCII word, e.g. "otieno" -> "O350"."""
+    if not word:
+        return ""
+    code, previous = word[0].upper(), _SOUNDEX_CODES.get(word[0], "")
+    for char in word[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def blocking_keys(name: str, phone: str, email: str) -> list[tuple]:
+    """
+    The keys under which a student is compared with others, from
+    normalized inputs. The order matters: find_duplicates skips a pair in
+    a block when an earlier kind of key already brought it together.
+    """
+    keys = []
+    if phone:
+        keys.append(("phone", phone))
+    if email:
+        keys.append(("email", email))
+    if name:
+        keys.append(("name", " ".join(sorted({soundex(word) for word in name.split()}))))
+    return keys
+
+
+def phone_typo(first: str, second: str) -> bool:
+    """Whether two normalized phone numbers differ by one digit, or by two adjacent digits swapped."""
+    if len(first) != len(second):
+        return False
+    mismatches = [index for index, (a, b) in enumerate(zip(first, second)) if a != b]
+    if len(mismatches) == 1:
+        return True
+    return (
+        len(mismatches) == 2
+        and mismatches[1] == mismatches[0] + 1
+        and first[mismatches[0]] == second[mismatches[1]]
+        and first[mismatches[1]] == second[mismatches[0]]
+    )
+
+
+def contact_score(first: tuple, second: tuple) -> float:
+    """1 for the same email or phone number, PHONE_TYPO_CREDIT for a mistyped phone number, else 0."""
+    if first[2] and first[2] == second[2]:
+        return 1.0
+    if first[1] and second[1]:
+        if first[1] == second[1]:
+            return 1.0
+        if phone_typo(first[1], second[1]):
+            return PHONE_TYPO_CREDIT
+    return 0.0
+
+
+def score_pair(first: tuple, second: tuple, threshold: float = 0.0) -> float:
+    """
+    Similarity of two normalized `(name, phone, email)` records, from 0 to
+    1: name similarity weighted NAME_WEIGHT plus contact_score weighted
+    CONTACT_WEIGHT. A shared phone alone, as with siblings registered on a
+    parent's number, stays below the default threshold, and so does the
+    same name alone.
+
+    Returns 0 without comparing the names when the contact score already
+    rules out reaching `threshold`; most pairs in a name block end there.
+    """
+    contact = CONTACT_WEIGHT * contact_score(first, second)
+    if contact + NAME_WEIGHT < threshold or not (first[0] and second[0]):
+        return 0.0
+    return round(NAME_WEIGHT * SequenceMatcher(None, first[0], second[0]).ratio() + contact, 3)
+
+
+def _phone_typo_pairs(members: list, records: list):
+    """
+    Pairs among `members` whose phone numbers are one typo apart (see
+    phone_typo), found by indexing each number with one digit blanked out
+    and looking up its adjacent swaps, instead of comparing every pair.
+    """
+    blanked, exact = defaultdict(list), defaultdict(list)
+    for member in members:
+        phone = records[member][1]
+        if phone:
+            exact[phone].append(member)
+            for index in range(len(phone)):
+                blanked[index, phone[:index] + phone[index + 1 :]].append(member)
+    for group in blanked.values():
+        for first, second in combinations(group, 2):
+            if records[first][1] != records[second][1]:
+                yield first, second
+    for phone, group in exact.items():
+        for index in range(len(phone) - 1):
+            swapped = phone[:index] + phone[index + 1] + phone[index] + phone[index + 2 :]
+            if swapped > phone:
+                yield from product(group, exact.get(swapped, ()))
+
+
+def _shared_phone_pairs(members: list, records: list, skipped: set):
+    """Pairs among `members` sharing a phone number whose own block was too big to compare."""
+    by_phone = defaultdict(list)
+    for member in members:
+        phone = records[member][1]
+        if ("phone", phone) in skipped:
+            by_phone[phone].append(member)
+    for group in by_phone.values():
+        yield from combinations(group, 2)
+
+
+def _root(parents: dict, node):
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+    return node
+
+
+def find_duplicates(queryset=None, threshold: float = DUPLICATE_THRESHOLD, max_block_size: int = MAX_BLOCK_SIZE) -> dict:
+    """
+    Group the likely duplicates among `queryset` (default: every student).
+
+    Returns `{"groups": [...], "compared": pairs scored, "skipped_blocks":
+    blocks over max_block_size}`. Each group is `{"ids": [user ids],
+    "pairs": [(id, id, score)], "score": best pair score}`, best groups
+    first. One query; the rest happens in memory.
+    """
+    if queryset is None:
+        queryset = User.objects.filter(role=User.RoleChoices.STUDENT)
+    ids, records = [], []
+    blocks = defaultdict(list)
+    rows = queryset.values_list("pk", "username", "first_name", "last_name", "phone_number", "email")
+    for pk, username, first_name, last_name, phone, email in rows.iterator(chunk_size=5000):
+        record = (
+            normalize_name(f"{first_name} {last_name}") or normalize_name(username),
+            normalize_phone(phone),
+            normalize_email(email),
+        )
+        for key in blocking_keys(*record):
+            blocks[key].append(len(ids))
+        ids.append(pk)
+        records.append(record)
+
+    skipped = {
+        key
+        for key, members in blocks.items()
+        if len(members) > max_block_size and not (key[0] == "name" and threshold > NAME_WEIGHT)
+    }
+    pairs, compared = [], 0
+    for key, members in blocks.items():
+        kind = key[0]
+        if key in skipped:
+            continue
+        if kind == "name" and threshold > NAME_WEIGHT:
+            # Without a shared phone or email (those pairs were scored in
+            # their own blocks) only a phone typo can lift a pair with a
+            # similar name over the threshold. Pairs whose shared phone
+            # block was skipped are compared here instead.
+            candidates = chain(_phone_typo_pairs(members, records), _shared_phone_pairs(members, records, skipped))
+        else:
+            candidates = combinations(members, 2)
+        for first, second in candidates:
+            first_record, second_record = records[first], records[second]
+            # Already scored in the phone or email block they share, unless
+            # that block was skipped.
+            phone, email = first_record[1], first_record[2]
+            if kind != "phone" and phone and phone == second_record[1] and ("phone", phone) not in skipped:
+                continue
+            if kind == "name" and email and email == second_record[2] and ("email", email) not in skipped:
+                continue
+            compared += 1
+            score = score_pair(first_record, second_record, threshold)
+            if score >= threshold:
+                pairs.append((first, second, score))
+
+    parents = {}
+    for first, second, _ in pairs:
+        parents.setdefault(first, first)
+        parents.setdefault(second, second)
+        parents[_root(parents, first)] = _root(parents, second)
+    grouped = defaultdict(lambda: {"ids": set(), "pairs": [], "score": 0.0})
+    for first, second, score in pairs:
+        group = grouped[_root(parents, first)]
+        group["ids"].update((ids[first], ids[second]))
+        group["pairs"].append((ids[first], ids[second], score))
+        group["score"] = max(group["score"], score)
+    groups = sorted(grouped.values(), key=lambda group: (-group["score"], -len(group["ids"])))
+    for group in groups:
+        group["ids"] = sorted(group["ids"])
+    return {"groups": groups, "compared": compared, "skipped_blocks": len(skipped)}
+
+
+def get_duplicate_groups(limit: int | None = None) -> dict:
+    """
+    Duplicate student groups with each member's details and history sizes,
+    and the suggested account to keep (most enrollments, then the oldest).
+    Cached until any user changes; a login alone does not count.
+    """
+    cache = caches[DUPLICATES_CACHE_ALIAS]
+    key = f"accounts:duplicates:{get_data_version_key('accounts.User')}"
+    found = cache.get(key)
+    if found is None:
+        found = find_duplicates()
+        cache.set(key, found, None)
+
+    groups = found["groups"][:limit]
+    member_ids = [pk for group in groups for pk in group["ids"]]
+    members = {
+        user.pk: user
+        for user in User.objects.filter(pk__in=member_ids).annotate(
+            enrollment_count=Count("enrollments", distinct=True),
+            payment_count=Count("enrollments__payments", distinct=True),
+        )
+    }
+    details = []
+    for group in groups:
+        users = [members[pk] for pk in group["ids"] if pk in members]
+        if len(users) < 2:
+            continue  # Merged or deleted since the scan.
+        users.sort(key=lambda user: (-user.enrollment_count, user.date_joined))
+        details.append({**group, "users": users, "keep": users[0].pk})
+    return {**found, "groups": details, "total": len(found["groups"])}
+
+
+def _unique_clashes(relation, keep_id, duplicate_ids):
+    """Rows of the duplicates that would break a unique constraint once moved to the kept account."""
+    model, field = relation.related_model, relation.field
+    clashes = model._base_manager.none()
+    unique_sets = [*model._meta.unique_together, *(c.fields for c in model._meta.total_unique_constraints)]
+    if field.unique:
+        unique_sets.append((field.name,))
+    for fields in unique_sets:
+        if field.name not in fields:
+            continue
+        others = [name for name in fields if name != field.name]
+        kept = model._base_manager.filter(**{field.name: keep_id})
+        if not others:
+            if kept.exists():
+                clashes |= model._base_manager.filter(**{f"{field.name}__in": duplicate_ids})
+            continue
+        for values in kept.values_list(*others):
+            clashes |= model._base_manager.filter(
+                **{f"{field.name}__in": duplicate_ids}, **dict(zip(others, values))
+            )
+    return clashes
+
+
+@transaction.atomic
+def merge_users(keep: User, duplicate_ids) -> dict:
+    """
+    Fold the `duplicate_ids` accounts into `keep` and delete them.
+
+    Every foreign key to a duplicate (enrollments, payments received,
+    reminders, archived rows, ...) is moved to `keep` with one UPDATE per
+    relation, and blank contact details on `keep` are filled in from the
+    duplicates. Raises ValidationError, changing nothing, when the move
+    would clash with a row `keep` already has, e.g. both accounts enrolled
+    in the same batch. Returns `{model label: rows moved}`.
+    """
+    duplicate_ids = [pk for pk in duplicate_ids if pk != keep.pk]
+    duplicates = list(User.objects.select_for_update().filter(pk__in=duplicate_ids))
+    if len(duplicates) != len(duplicate_ids):
+        raise ValidationError("Some of the accounts to merge no longer exist.")
+    if any(user.is_staff or user.is_superuser for user in [keep, *duplicates]):
+        raise ValidationError("Staff accounts are not merged automatically.")
+
+    moved, errors = {}, []
+    relations = [
+        relation
+        for relation in User._meta.related_objects
+        if not relation.many_to_many and relation.field.concrete
+    ]
+    for relation in relations:
+        label = relation.related_model._meta.label
+        clashes = _unique_clashes(relation, keep.pk, duplicate_ids)
+        if not clashes.exists():
+            continue
+        if label in DISCARD_ON_CONFLICT:
+            clashes.delete()
+        else:
+            examples = ", ".join(str(row) for row in clashes[:3])
+            errors.append(
+                f"The kept account already has the same {relation.related_model._meta.verbose_name_plural}: {examples}."
+            )
+    if errors:
+        raise ValidationError(errors)
+
+    now = timezone.now()
+    for relation in relations:
+        field, model = relation.field, relation.related_model
+        changes = {field.name: keep.pk}
+        if issubclass(model, TimeStampedModel):
+            changes["updated_at"] = now
+        updated = model._base_manager.filter(**{f"{field.name}__in": duplicate_ids}).update(**changes)
+        if updated:
+            label = model._meta.label
+            moved[label] = moved.get(label, 0) + updated
+
+    for name in ("first_name", "last_name", "email", "phone_number"):
+        if not getattr(keep, name):
+            setattr(keep, name, next((getattr(user, name) for user in duplicates if getattr(user, name)), getattr(keep, name)))
+    keep.save()
+    for user in duplicates:
+        keep.groups.add(*user.groups.all())
+    User.objects.filter(pk__in=duplicate_ids).delete()
+
+    # QuerySet.update() sends no signals.
+    bump_data_version(*(label for label in TRACKED_MODELS if label in moved))
+    invalidate_student_summaries(keep.pk, *duplicate_ids)
+    return moved
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.duplicates import DUPLICATE_THRESHOLD, MAX_BLOCK_SIZE, find_duplicates
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "List groups of student accounts that look like the same person. Merge them "
+        "from the admin's Duplicate students page."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD, help="Minimum pair score, 0-1.")
+        parser.add_argument("--max-block", type=int, default=MAX_BLOCK_SIZE, help="Largest block compared pair by pair.")
+        parser.add_argument("--limit", type=int, default=50, help="Groups to print.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        found = find_duplicates(threshold=options["threshold"], max_block_size=options["max_block"])
+        elapsed = time.perf_counter() - started
+
+        groups = found["groups"][: options["limit"]]
+        names = {
+            user.pk: user
+            for user in User.objects.filter(pk__in=[pk for group in groups for pk in group["ids"]]).only(
+                "username", "first_name", "last_name", "phone_number"
+            )
+        }
+        for group in groups:
+            members = "; ".join(
+                f"{names[pk].username} ({names[pk].get_full_name() or '-'}, {names[pk].phone_number or '-'})"
+                for pk in group["ids"]
+            )
+            self.stdout.write(f"{group['score']:.2f}  {members}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(found['groups'])} group(s) from {found['compared']} pairs compared in {elapsed:.1f}s"
+                + (f"; {found['skipped_blocks']} oversized block(s) skipped." if found["skipped_blocks"] else ".")
+            )
+        )
@@ -0,0 +1,76 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+USER_CACHE_ALIAS = getattr(settings, "ACCOUNTS_USER_CACHE_ALIAS", "default")
+USER_CACHE_TIMEOUT = getattr(settings, "ACCOUNTS_USER_CACHE_TIMEOUT", 300)
+
+
+def user_cache_key(user_id) -> str:
+    return f"accounts:user:{user_id}"
+
+
+def invalidate_cached_user(user_id) -> None:
+    caches[USER_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+def get_cached_user(request):
+    """
+    Return the session's user from the cache, falling back to Django's
+    regular lookup (and filling the cache) on a miss.
+
+    The session auth hash is still verified against the cached user, so a
+    password change logs other sessions out exactly as it does without
+    caching. Anything unusual (no session, unknown backend, hash mismatch)
+    is handed to `django.contrib.auth.get_user` unchanged.
+    """
+    if hasattr(request, "_cached_user"):
+        return request._cached_user
+
+    user_id = request.session.get(SESSION_KEY)
+    backend_path = request.session.get(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        request._cached_user = auth.get_user(request)
+        return request._cached_user
+
+    cache = caches[USER_CACHE_ALIAS]
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is not None:
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(session_hash, user.get_session_auth_hash()):
+            request._cached_user = user
+            return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, USER_CACHE_TIMEOUT)
+    request._cached_user = user
+    return user
+
+
+async def aget_cached_user(request):
+    if not hasattr(request, "_acached_user"):
+        request._acached_user = await sync_to_async(get_cached_user)(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Drop-in replacement for Django's AuthenticationMiddleware that serves
+    `request.user` from the cache instead of reading accounts_user on every
+    request. Cached users are dropped whenever the User row is saved or
+    deleted (see accounts.signals), which covers password changes.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = partial(aget_cached_user, request)
@@ -20,6 +20,12 @@ class User(AbstractUser, TimeStampedModel):
         default=RoleChoices.STUDENT
     )
     phone_number = models.CharField(max_length=15, blank=True, null=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The analytics export reads rows changed since its last run
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         # Fallback to username if first/last name aren't set yet
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware import invalidate_cached_user
+from .models import User
+
+
+@receiver(post_save, sender=User, dispatch_uid="invalidate_cached_user_on_save")
+@receiver(post_delete, sender=User, dispatch_uid="invalidate_cached_user_on_delete")
+def drop_cached_user(sender, instance, **kwargs):
+    """
+    Forget the cached copy of a user whenever the row changes, including
+    password changes (set_password() is always followed by save()).
+    """
+    invalidate_cached_user(instance.pk)
@@ -1,3 +1,104 @@
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.duplicates import DUPLICATES_CACHE_ALIAS, find_duplicates, get_duplicate_groups
+from accounts.middleware import USER_CACHE_ALIAS, user_cache_key
+from accounts.models import User
+from core.testing import QueryBudgetTestCase, admin_url, create_staff, create_student
+
+
+class UserAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(User, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(User, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(13, admin_url(User, "change", self.rows[0]["student"].pk))
+
+    def test_duplicates(self):
+        self.assertQueryBudget(10, reverse("admin:accounts_user_duplicates"))
+
+
+class GroupAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(Group, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(9, admin_url(Group, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(11, admin_url(Group, "change", Group.objects.get(name="Registrar").pk))
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_staff()["admin"]
+
+    def setUp(self):
+        self.assertTrue(self.client.login(username="budget-admin", password="budget-pass"))
+        self.assertEqual(self.client.get(reverse("admin:index")).status_code, 200)
+
+    def cached_user(self):
+        return caches[USER_CACHE_ALIAS].get(user_cache_key(self.admin.pk))
+
+    def assertLoggedOut(self):
+        response = self.client.get(reverse("admin:index"))
+        self.assertRedirects(response, f"{reverse('admin:login')}?next={reverse('admin:index')}")
+
+    def test_user_is_served_from_the_cache(self):
+        self.assertEqual(self.cached_user(), self.admin)
+        with mock.patch("accounts.middleware.auth.get_user") as get_user:
+            self.assertEqual(self.client.get(reverse("admin:index")).status_code, 200)
+        get_user.assert_not_called()
+
+    def test_password_change_logs_other_sessions_out(self):
+        self.admin.set_password("budget-pass-2")
+        self.admin.save()
+        self.assertIsNone(self.cached_user())
+        self.assertLoggedOut()
+
+    def test_deactivation_logs_the_user_out(self):
+        self.admin.is_active = False
+        self.admin.save(update_fields=["is_active"])
+        self.assertIsNone(self.cached_user())
+        self.assertLoggedOut()
+
+
+class DuplicateStudentTests(TestCase):
+    def setUp(self):
+        caches[DUPLICATES_CACHE_ALIAS].clear()
+
+    def student(self, first_name, last_name, phone_number, email=""):
+        return create_student(first_name=first_name, last_name=last_name, phone_number=phone_number, email=email)
+
+    def test_pairs_sharing_an_oversized_phone_block_are_still_scored(self):
+        # A school's office number on many accounts: too many to compare pair by pair.
+        office = "0720000000"
+        first = self.student("Jane", "Wanjiru", office, "jane@example.com")
+        second = self.student("Jane", "Wanjiru", office, "jwanjiru@example.com")
+        for name in ("Peter Otieno", "Mary Akinyi", "Paul Mwangi"):
+            self.student(*name.split(), office)
+
+        found = find_duplicates(User.objects.filter(phone_number=office), max_block_size=3)
+        self.assertEqual(found["skipped_blocks"], 1)
+        self.assertEqual([group["ids"] for group in found["groups"]], [sorted([first.pk, second.pk])])
+
+    def test_login_keeps_the_cached_scan(self):
+        student = self.student("Jane", "Wanjiru", "0720000001")
+        self.student("Jane", "Wanjiru", "0720000001")
+        with mock.patch("accounts.duplicates.find_duplicates", wraps=find_duplicates) as scan:
+            self.assertEqual(get_duplicate_groups()["total"], 1)
+            self.client.force_login(student)
+            self.assertEqual(get_duplicate_groups()["total"], 1)
+            self.assertEqual(scan.call_count, 1)
 
-# Create your tests here.
+            self.student("Jane", "Wanjiru", "0720000001")
+            self.assertEqual(len(get_duplicate_groups()["groups"][0]["ids"]), 3)
+            self.assertEqual(scan.call_count, 2)
@@ -0,0 +1,295 @@
+"""
+Incremental columnar export of the main LMS tables for analysis.
+
+Analysts query these files (see analytics.reader) instead of a copy of
+the live database, so their scans never compete with the application.
+Each table is written as Arrow IPC files, compressed column by column:
+
+    exports/manifest.json           what the last completed run produced
+    exports/enrollments/000001.arrow  every row, from the first run
+    exports/enrollments/000002.arrow  rows changed since, from the second
+    exports/enrollments/000002.ids.arrow  ids alive at the second run
+
+A run only reads rows whose `updated_at` is later than the newest one
+already exported (less EXPORT_OVERLAP, so a write that committed late with
+an earlier timestamp is not missed), plus an index-only scan of the ids,
+which reveals deleted rows and rows that came back with an old timestamp
+(restored archives). Once a table has COMPACT_AFTER files they are
+compacted into one, from the export itself rather than the database.
+
+Files are only deleted after the manifest stops referencing them, and the
+manifest is replaced atomically, so a reader always sees a complete run.
+"""
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.sql.constants import MULTI
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Exported tables: name -> (model label, fields left out).
+TABLES = {
+    "users": ("accounts.User", ("password",)),
+    "courses": ("courses.Course", ()),
+    "batches": ("courses.Batch", ()),
+    "enrollments": ("enrollments.Enrollment", ()),
+    "payments": ("finance.Payment", ()),
+}
+
+EXPORT_DIR = getattr(settings, "ANALYTICS_EXPORT_DIR", settings.BASE_DIR / "exports")
+COMPRESSION = getattr(settings, "ANALYTICS_EXPORT_COMPRESSION", "zstd")
+EXPORT_OVERLAP = timedelta(seconds=getattr(settings, "ANALYTICS_EXPORT_OVERLAP", 300))
+COMPACT_AFTER = getattr(settings, "ANALYTICS_COMPACT_AFTER", 24)
+CHUNK_SIZE = 10000
+MISSING_CHUNK_SIZE = 500
+
+_STRING_TYPES = {"CharField", "TextField", "EmailField", "SlugField", "URLField", "GenericIPAddressField"}
+_INTEGER_TYPES = {
+    "AutoField",
+    "BigAutoField",
+    "SmallAutoField",
+    "IntegerField",
+    "BigIntegerField",
+    "SmallIntegerField",
+    "PositiveIntegerField",
+    "PositiveBigIntegerField",
+    "PositiveSmallIntegerField",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImproperlyConfigured(
+            "The analytics export needs pyarrow; install the analytics extra (pip install 'backend[analytics]')."
+        ) from None
+    return pyarrow
+
+
+def table_columns(model, exclude=()) -> list[tuple]:
+    """
+    `(column name, arrow type, converter)` for each exported field of
+    `model`. Foreign keys become `<name>_id` columns; UUIDs are written as
+    strings, which is what analysts join on.
+    """
+    pa = _pyarrow()
+    columns = []
+    for field in model._meta.concrete_fields:
+        if field.name in exclude:
+            continue
+        target = field.target_field if field.is_relation else field
+        internal = target.get_internal_type()
+        converter = None
+        if internal == "UUIDField":
+            arrow_type, converter = pa.string(), str
+        elif internal in _STRING_TYPES:
+            arrow_type = pa.string()
+        elif internal == "DecimalField":
+            arrow_type = pa.decimal128(target.max_digits, target.decimal_places)
+        elif internal == "DateTimeField":
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif internal == "DateField":
+            arrow_type = pa.date32()
+        elif internal == "BooleanField":
+            arrow_type = pa.bool_()
+        elif internal in _INTEGER_TYPES:
+            arrow_type = pa.int64()
+        elif internal == "FloatField":
+            arrow_type = pa.float64()
+        else:
+            arrow_type, converter = pa.string(), json.dumps if internal == "JSONField" else str
+        columns.append((field.attname, arrow_type, converter))
+    return columns
+
+
+def _write_rows(path: Path, columns: list, row_iterables) -> tuple[int, object]:
+    """
+    Write rows (tuples in `columns` order) to an Arrow IPC file in record
+    batches of CHUNK_SIZE. Returns the row count and the newest updated_at.
+    """
+    pa = _pyarrow()
+    schema = pa.schema([(name, arrow_type) for name, arrow_type, _ in columns])
+    updated_index = next(index for index, (name, *_) in enumerate(columns) if name == "updated_at")
+    count, newest = 0, None
+
+    def to_batch(rows):
+        values = list(zip(*rows))
+        return pa.record_batch(
+            [
+                pa.array(
+                    [None if value is None else converter(value) for value in column] if converter else column,
+                    type=arrow_type,
+                )
+                for column, (_, arrow_type, converter) in zip(values, columns)
+            ],
+            schema=schema,
+        )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    options = pa.ipc.IpcWriteOptions(compression=COMPRESSION or None)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        chunk = []
+        for rows in row_iterables:
+            for row in rows:
+                chunk.append(row)
+                if row[updated_index] is not None and (newest is None or row[updated_index] > newest):
+                    newest = row[updated_index]
+                if len(chunk) == CHUNK_SIZE:
+                    writer.write_batch(to_batch(chunk))
+                    count += len(chunk)
+                    chunk = []
+        if chunk:
+            writer.write_batch(to_batch(chunk))
+            count += len(chunk)
+    return count, newest
+
+
+def _live_ids(queryset):
+    """
+    Every id in the table as an Arrow string array, the same form the data
+    files use. Read without the ORM's per-row UUID conversion, which would
+    cost more than the scan itself.
+    """
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+
+    compiler = queryset.values_list("pk").query.get_compiler(queryset.db)
+    raw = [
+        value if isinstance(value, str) else value.hex
+        for chunk in compiler.execute_sql(MULTI, chunk_size=CHUNK_SIZE)
+        for (value,) in chunk
+    ]
+    hex_ids = pc.utf8_lower(pc.replace_substring(pa.array(raw, type=pa.string()), "-", ""))
+    parts = [pc.utf8_slice_codeunits(hex_ids, start, stop) for start, stop in ((0, 8), (8, 12), (12, 16), (16, 20), (20, 32))]
+    return pc.binary_join_element_wise(*parts, "-")
+
+
+def _write_ids(path: Path, ids) -> None:
+    pa = _pyarrow()
+    table = pa.table({"id": ids})
+    options = pa.ipc.IpcWriteOptions(compression=COMPRESSION or None)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+
+
+def _compact(directory: Path, state: dict, target: str) -> None:
+    """Fold a table's files into one holding the latest version of each live row."""
+    pa = _pyarrow()
+    from .reader import current_rows
+
+    rows = current_rows(directory, state)
+    options = pa.ipc.IpcWriteOptions(compression=COMPRESSION or None)
+    with pa.OSFile(str(directory / target), "wb") as sink, pa.ipc.new_file(sink, rows.schema, options=options) as writer:
+        writer.write_table(rows, max_chunksize=CHUNK_SIZE)
+
+
+def export_table(name: str, directory: Path, state: dict | None, run: int, full: bool = False) -> tuple[dict, dict]:
+    """
+    Export the rows of table `name` that changed since the run described
+    by `state` (all of them when there is none, or with `full`). Returns
+    the table's new manifest entry and counts for this run.
+    """
+    import pyarrow.compute as pc
+
+    from .reader import read_arrow
+
+    label, exclude = TABLES[name]
+    model = apps.get_model(label)
+    columns = table_columns(model, exclude)
+    queryset = model._base_manager.order_by()
+    if full:
+        state = None
+
+    # Ids first: a row inserted after this scan is either written below
+    # and shown from the next run on, or picked up next run as missing.
+    live = _live_ids(queryset)
+    values = queryset.values_list(*(column for column, *_ in columns))
+    previous, watermark, since = live.slice(0, 0), None, None
+    if state is not None:
+        previous = read_arrow(directory / state["ids"]).column("id").combine_chunks()
+        watermark = parse_datetime(state["watermark"]) if state["watermark"] else None
+        since = watermark - EXPORT_OVERLAP if watermark else None
+    row_iterables = [(values.filter(updated_at__gt=since) if since else values).iterator(chunk_size=CHUNK_SIZE)]
+    if since:
+        # Rows alive now that the last run did not see and whose timestamp
+        # is too old for the filter above, e.g. restored from the archive.
+        missing = live.filter(pc.invert(pc.is_in(live, value_set=previous))).to_pylist()
+        row_iterables += [
+            values.filter(pk__in=missing[start : start + MISSING_CHUNK_SIZE], updated_at__lte=since)
+            for start in range(0, len(missing), MISSING_CHUNK_SIZE)
+        ]
+
+    data_path, ids_path = f"{name}/{run:06d}.arrow", f"{name}/{run:06d}.ids.arrow"
+    written, newest = _write_rows(directory / data_path, columns, row_iterables)
+    _write_ids(directory / ids_path, live)
+    files = [*(state["files"] if state else []), data_path]
+    if not written and state is not None:
+        (directory / data_path).unlink()
+        files.pop()
+    if newest is not None and (watermark is None or newest > watermark):
+        watermark = newest
+
+    compacted = len(files) > COMPACT_AFTER
+    if compacted:
+        base_path = f"{name}/{run:06d}.base.arrow"
+        _compact(directory, {"files": files, "ids": ids_path}, base_path)
+        # Older files go once the new manifest is in place; this run's
+        # delta was never published.
+        if data_path in files:
+            (directory / data_path).unlink()
+        files = [base_path]
+
+    entry = {
+        "model": label,
+        "files": files,
+        "ids": ids_path,
+        "watermark": watermark.isoformat() if watermark else None,
+        "rows": len(live),
+    }
+    deleted = len(previous) - pc.sum(pc.is_in(previous, value_set=live)).as_py() if len(previous) else 0
+    counts = {"written": written, "deleted": deleted, "rows": len(live), "compacted": compacted}
+    return entry, counts
+
+
+def load_manifest(directory: Path) -> dict:
+    path = directory / "manifest.json"
+    if not path.exists():
+        return {"run": 0, "tables": {}}
+    return json.loads(path.read_text())
+
+
+def export_snapshot(directory=None, tables=None, full: bool = False) -> dict:
+    """
+    Run one incremental export of `tables` (default: all) into `directory`
+    (default: ANALYTICS_EXPORT_DIR). With `full`, every row is exported
+    again and older files are discarded. Returns `{table: counts}`.
+    """
+    directory = Path(directory or EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(directory)
+    run = manifest["run"] + 1
+    previous_files = {
+        path for entry in manifest["tables"].values() for path in [*entry["files"], entry["ids"]]
+    }
+
+    results = {}
+    for name in tables or TABLES:
+        manifest["tables"][name], results[name] = export_table(
+            name, directory, manifest["tables"].get(name), run, full=full
+        )
+    manifest.update(run=run, exported_at=timezone.now().isoformat(), compression=COMPRESSION)
+
+    temporary = directory / "manifest.json.tmp"
+    temporary.write_text(json.dumps(manifest, indent=2))
+    os.replace(temporary, directory / "manifest.json")
+
+    current = {path for entry in manifest["tables"].values() for path in [*entry["files"], entry["ids"]]}
+    for path in previous_files - current:
+        (directory / path).unlink(missing_ok=True)
+    return results
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from analytics.export import EXPORT_DIR, TABLES, export_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Export users, courses, batches, enrollments and payments to Arrow files for "
+        "analysis. Each run only reads the rows changed since the previous one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help=f"Export directory (default: {EXPORT_DIR}).")
+        parser.add_argument(
+            "--table",
+            action="append",
+            choices=list(TABLES),
+            help="Export only this table; may be repeated. Defaults to every table.",
+        )
+        parser.add_argument("--full", action="store_true", help="Export every row again and drop older files.")
+
+    def handle(self, *args, **options):
+        results = export_snapshot(options["dir"], options["table"], full=options["full"])
+        for name, counts in results.items():
+            self.stdout.write(
+                f"{name}: {counts['written']} row(s) written, {counts['deleted']} deleted, {counts['rows']} current"
+                + (" (compacted)" if counts["compacted"] else "")
+            )
+        self.stdout.write(self.style.SUCCESS(f"Export written to {options['dir'] or EXPORT_DIR}."))
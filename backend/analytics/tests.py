@@ -0,0 +1,95 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.test import TestCase
+from django.utils import timezone
+
+from courses.models import Course
+
+try:
+    import pyarrow
+except ImportError:  # The analytics extra is optional.
+    pyarrow = None
+else:
+    from analytics.export import EXPORT_OVERLAP, export_snapshot, load_manifest
+    from analytics.reader import Snapshot
+
+
+@skipUnless(pyarrow, "needs the analytics extra (pyarrow)")
+class AnalyticsExportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.long_ago = timezone.now() - timedelta(days=1)
+        self.courses = [
+            Course.objects.create(code=code, title=f"Course {code}", description="", base_fee=Decimal("20000"))
+            for code in ("A100", "B200")
+        ]
+        # The newest row sets the watermark; the other is outside the overlap.
+        Course.objects.filter(pk=self.courses[0].pk).update(updated_at=self.long_ago - timedelta(hours=1))
+        Course.objects.filter(pk=self.courses[1].pk).update(updated_at=self.long_ago)
+
+    def export(self):
+        return export_snapshot(self.directory, tables=["courses"])["courses"]
+
+    def titles(self):
+        rows = Snapshot(self.directory).table("courses", columns=["code", "title"]).to_pylist()
+        return {row["code"]: row["title"] for row in rows}
+
+    def files(self):
+        return load_manifest(self.directory)["tables"]["courses"]["files"]
+
+    def test_rows_within_the_overlap_of_the_watermark_are_exported_again(self):
+        self.assertEqual(self.export()["written"], 2)
+        self.assertEqual(self.export()["written"], 1)
+        self.assertEqual(len(self.files()), 2)
+
+        # Committed late, with a timestamp just before the last run's watermark.
+        Course.objects.filter(pk=self.courses[0].pk).update(
+            title="Late write", updated_at=self.long_ago - EXPORT_OVERLAP / 2
+        )
+        self.assertEqual(self.export()["written"], 2)
+
+        # The edit moves the watermark to now, which leaves A100 behind.
+        self.courses[1].title = "Edited"
+        self.courses[1].save()
+        self.assertEqual(self.export()["written"], 2)
+        self.assertEqual(self.export()["written"], 1)
+        self.assertEqual(self.titles(), {"A100": "Late write", "B200": "Edited"})
+
+    def test_deleted_rows_leave_the_current_rows(self):
+        self.export()
+        self.courses[1].delete()
+        counts = self.export()
+        self.assertEqual((counts["deleted"], counts["rows"]), (1, 1))
+        self.assertEqual(self.titles(), {"A100": "Course A100"})
+
+    def test_rows_restored_with_an_old_timestamp_are_picked_up(self):
+        self.export()
+        restored = Course.objects.create(code="C300", title="Restored", description="", base_fee=Decimal("20000"))
+        Course.objects.filter(pk=restored.pk).update(updated_at=self.long_ago - timedelta(days=30))
+        # The restored row, plus the row at the watermark.
+        self.assertEqual(self.export()["written"], 2)
+        self.assertEqual(self.titles()["C300"], "Restored")
+
+    @mock.patch("analytics.export.COMPACT_AFTER", 2)
+    def test_files_are_compacted(self):
+        self.export()
+        for title in ("First edit", "Second edit"):
+            self.courses[0].title = title
+            self.courses[0].save()
+            counts = self.export()
+        self.assertTrue(counts["compacted"])
+
+        files = self.files()
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith(".base.arrow"))
+        self.assertEqual(
+            sorted(path.name for path in (self.directory / "courses").iterdir()),
+            ["000003.base.arrow", "000003.ids.arrow"],
+        )
+        self.assertEqual(self.titles(), {"A100": "Second edit", "B200": "Course B200"})
@@ -0,0 +1,76 @@
+from django.contrib import admin
+from django.db.models import Count, DecimalField, Sum
+from django.db.models.functions import Coalesce
+from unfold.admin import ModelAdmin
+from .models import ArchivedBatch, ArchivedEnrollment, ArchivedPayment
+
+
+class ReadOnlyArchiveAdmin(ModelAdmin):
+    """Archived rows are history: browsable, never edited in place."""
+    list_per_page = 25
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedBatch)
+class ArchivedBatchAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('name', 'course', 'instructor', 'start_date', 'end_date', 'enrollment_count', 'archived_at')
+    list_filter = ('course', 'end_date', 'archived_at')
+    search_fields = ('name', 'course__title', 'course__code')
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('course', 'instructor').annotate(enrollment_total=Count('enrollments'))
+
+    @admin.display(description="Enrollments", ordering='enrollment_total')
+    def enrollment_count(self, obj):
+        return getattr(obj, 'enrollment_total', 0)
+
+
+@admin.register(ArchivedEnrollment)
+class ArchivedEnrollmentAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('student', 'batch', 'status', 'agreed_fee', 'paid', 'created_at')
+    list_filter = ('status', 'batch__course')
+    search_fields = ('student__username', 'student__first_name', 'student__last_name', 'batch__name')
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('student', 'batch', 'batch__course').annotate(
+            paid_amount=Coalesce(
+                Sum('payments__amount'),
+                0,
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
+    @admin.display(description="Paid", ordering='paid_amount')
+    def paid(self, obj):
+        return getattr(obj, 'paid_amount', 0)
+
+
+@admin.register(ArchivedPayment)
+class ArchivedPaymentAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('student', 'batch', 'amount', 'method', 'reference_number', 'payment_date', 'received_by')
+    list_filter = ('method', ('payment_date', admin.DateFieldListFilter))
+    search_fields = ('reference_number', 'enrollment__student__username', 'enrollment__student__first_name')
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related(
+            'enrollment__student', 'enrollment__batch__course', 'received_by'
+        )
+
+    @admin.display(description="Student", ordering='enrollment__student__username')
+    def student(self, obj):
+        return obj.enrollment.student
+
+    @admin.display(description="Batch")
+    def batch(self, obj):
+        return obj.enrollment.batch
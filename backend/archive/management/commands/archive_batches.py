@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from archive.services import archive_batches, get_archivable_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Move finished, fully paid batches with their enrollments and payments "
+        "from the live tables into the archive."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ended-before",
+            help="Archive batches that ended before this date (YYYY-MM-DD). "
+            "Defaults to ARCHIVE_AFTER_DAYS days ago.",
+        )
+        parser.add_argument("--limit", type=int, help="Archive at most this many batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Only list the batches that would move.")
+
+    def handle(self, *args, **options):
+        if options["ended_before"]:
+            try:
+                ended_before = date.fromisoformat(options["ended_before"])
+            except ValueError as exc:
+                raise CommandError("--ended-before must be YYYY-MM-DD.") from exc
+        else:
+            ended_before = timezone.localdate() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+        if options["dry_run"]:
+            batches = get_archivable_batches(ended_before)
+            if options["limit"]:
+                batches = batches[: options["limit"]]
+            count = 0
+            for batch in batches:
+                count += 1
+                self.stdout.write(f"{batch} (ended {batch.end_date})")
+            self.stdout.write(f"{count} batch(es) would be archived.")
+            return
+
+        totals = archive_batches(ended_before, limit=options["limit"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {totals['batches']} batch(es), {totals['enrollments']} enrollment(s) "
+                f"and {totals['payments']} payment(s) that ended before {ended_before}."
+            )
+        )
@@ -0,0 +1,27 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from archive.models import ArchivedBatch
+from archive.services import restore_batch
+
+
+class Command(BaseCommand):
+    help = "Move an archived batch with its enrollments and payments back into the live tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("batch_ids", nargs="+", help="Id(s) of the archived batch(es) to restore.")
+
+    def handle(self, *args, **options):
+        for batch_id in options["batch_ids"]:
+            try:
+                archived_batch = ArchivedBatch.objects.get(pk=batch_id)
+            except (ArchivedBatch.DoesNotExist, ValidationError) as exc:
+                raise CommandError(f"No archived batch with id {batch_id}.") from exc
+
+            moved = restore_batch(archived_batch)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Restored {archived_batch} with {moved['enrollments']} enrollment(s) "
+                    f"and {moved['payments']} payment(s)."
+                )
+            )
@@ -0,0 +1,84 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:13
+
+import django.db.models.deletion
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_installments(apps, schema_editor):
+    """
+    Archived enrollments are fully paid: record what they paid and give each
+    the default single installment, so a restore brings back a valid plan.
+    """
+    ArchivedEnrollment = apps.get_model('archive', 'ArchivedEnrollment')
+    ArchivedInstallment = apps.get_model('archive', 'ArchivedInstallment')
+
+    enrollments = ArchivedEnrollment.objects.annotate(
+        paid=Coalesce(
+            models.Sum('payments__amount'),
+            Decimal('0'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+    installments = []
+    updated = []
+    for enrollment in enrollments.iterator(chunk_size=500):
+        installments.append(
+            ArchivedInstallment(
+                id=uuid.uuid4(),
+                enrollment=enrollment,
+                sequence=1,
+                due_date=enrollment.created_at.date() + timedelta(days=30),
+                amount=enrollment.agreed_fee,
+                created_at=enrollment.created_at,
+                updated_at=enrollment.updated_at,
+            )
+        )
+        enrollment.amount_paid = enrollment.paid
+        updated.append(enrollment)
+
+    ArchivedInstallment.objects.bulk_create(installments, batch_size=500)
+    ArchivedEnrollment.objects.bulk_update(updated, ['amount_paid'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archive', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedenrollment',
+            name='amount_due',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='archivedenrollment',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='archivedenrollment',
+            name='next_due_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedInstallment',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('sequence', models.PositiveSmallIntegerField()),
+                ('due_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='archive.archivedenrollment')),
+            ],
+        ),
+        migrations.RunPython(backfill_installments, migrations.RunPython.noop),
+    ]
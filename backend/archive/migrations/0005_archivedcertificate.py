@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archive', '0004_archivedassessment_archivedgrade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCertificate',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('number', models.CharField(max_length=64, unique=True)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('file', models.CharField(max_length=255)),
+                ('rendered_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='certificate', to='archive.archivedenrollment')),
+            ],
+        ),
+    ]
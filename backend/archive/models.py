@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.db import models
+from assessments.models import Assessment
+from courses.models import Course
+
+# Archived rows keep the primary keys and timestamps they had in the live
+# tables, so they deliberately do not inherit TimeStampedModel (whose
+# auto_now fields would overwrite them).
+
+
+class ArchivedBatch(models.Model):
+    """A finished, fully settled batch moved out of the live courses table."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.PROTECT, related_name='archived_batches')
+    name = models.CharField(max_length=100)
+    instructor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_batches'
+    )
+    start_date = models.DateField()
+    end_date = models.DateField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'archived batches'
+
+    def __str__(self):
+        return f"{self.course.code} | {self.name}"
+
+
+class ArchivedEnrollment(models.Model):
+    """An enrollment archived together with its batch."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name='archived_enrollments'
+    )
+    batch = models.ForeignKey(ArchivedBatch, on_delete=models.CASCADE, related_name='enrollments')
+    status = models.CharField(max_length=20)
+    agreed_fee = models.DecimalField(max_digits=10, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    next_due_date = models.DateField(null=True, blank=True)
+    amount_due = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.student.username} -> {self.batch.name} ({self.status})"
+
+
+class ArchivedInstallment(models.Model):
+    """An installment of an archived enrollment's fee plan."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    enrollment = models.ForeignKey(ArchivedEnrollment, on_delete=models.CASCADE, related_name='installments')
+    sequence = models.PositiveSmallIntegerField()
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.enrollment_id} #{self.sequence}: {self.amount} due {self.due_date}"
+
+
+class ArchivedPayment(models.Model):
+    """A payment archived together with its enrollment."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    enrollment = models.ForeignKey(ArchivedEnrollment, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(max_length=20)
+    reference_number = models.CharField(max_length=100, blank=True, null=True, unique=True)
+    received_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name='archived_processed_payments'
+    )
+    payment_date = models.DateField(db_index=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.enrollment.student.username} paid {self.amount} via {self.method}"
+
+
+class ArchivedClassSession(models.Model):
+    """A session of an archived batch; `sequence` indexes the attendance bitmaps."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    batch = models.ForeignKey(ArchivedBatch, on_delete=models.CASCADE, related_name='sessions')
+    sequence = models.PositiveIntegerField()
+    date = models.DateField()
+    topic = models.CharField(max_length=255, blank=True)
+    marked_at = models.DateTimeField(null=True, blank=True)
+    marked_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.batch.name} #{self.sequence + 1} ({self.date})"
+
+
+class ArchivedAttendanceRecord(models.Model):
+    """The attendance bitmap of an archived enrollment."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    enrollment = models.OneToOneField(ArchivedEnrollment, on_delete=models.CASCADE, related_name='attendance')
+    present = models.BinaryField(default=b'')
+    first_sequence = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"Attendance of {self.enrollment_id}"
+
+
+class ArchivedAssessment(models.Model):
+    """An assessment set for an archived batch."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    batch = models.ForeignKey(ArchivedBatch, on_delete=models.CASCADE, related_name='assessments')
+    title = models.CharField(max_length=255)
+    kind = models.CharField(max_length=20, choices=Assessment.KindChoices.choices)
+    max_score = models.DecimalField(max_digits=6, decimal_places=2)
+    weight = models.DecimalField(max_digits=5, decimal_places=2)
+    due_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.batch.name}: {self.title}"
+
+
+class ArchivedGrade(models.Model):
+    """An archived enrollment's score on an archived assessment."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    assessment = models.ForeignKey(ArchivedAssessment, on_delete=models.CASCADE, related_name='grades')
+    enrollment = models.ForeignKey(ArchivedEnrollment, on_delete=models.CASCADE, related_name='grades')
+    score = models.DecimalField(max_digits=6, decimal_places=2)
+    graded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.enrollment_id} on {self.assessment_id}: {self.score}"
+
+
+class ArchivedCertificate(models.Model):
+    """The completion certificate of an archived enrollment; its PDF stays in storage."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    enrollment = models.OneToOneField(ArchivedEnrollment, on_delete=models.CASCADE, related_name='certificate')
+    number = models.CharField(max_length=64, unique=True)
+    content_hash = models.CharField(max_length=64)
+    file = models.CharField(max_length=255)
+    rendered_at = models.DateTimeField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.number
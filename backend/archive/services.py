@@ -0,0 +1,185 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from assessments.models import Assessment, Grade
+from assessments.services import invalidate_grade_stats
+from attendance.models import AttendanceRecord, ClassSession
+from certificates.models import Certificate
+from core.versioning import bump_data_version
+from courses.models import Batch
+from enrollments.history import paused_status_history
+from enrollments.installments import paused_balance_updates
+from enrollments.models import Enrollment, Installment
+from finance.cube import paused_revenue_cube
+from finance.models import Payment
+from portal.services import invalidate_student_summaries
+
+from .models import (
+    ArchivedAssessment,
+    ArchivedAttendanceRecord,
+    ArchivedBatch,
+    ArchivedCertificate,
+    ArchivedClassSession,
+    ArchivedEnrollment,
+    ArchivedGrade,
+    ArchivedInstallment,
+    ArchivedPayment,
+)
+
+# Fields that auto_now/auto_now_add would overwrite on insert; restored
+# with a follow-up bulk_update so history keeps its original timestamps.
+PRESERVED_TIMESTAMPS = {
+    Batch: ("created_at", "updated_at"),
+    Enrollment: ("created_at", "updated_at"),
+    Installment: ("created_at", "updated_at"),
+    Payment: ("created_at", "updated_at", "payment_date"),
+    ClassSession: ("created_at", "updated_at"),
+    AttendanceRecord: ("created_at", "updated_at"),
+    Assessment: ("created_at", "updated_at"),
+    Grade: ("created_at", "updated_at"),
+    Certificate: ("created_at", "updated_at"),
+}
+
+LIVE_LABELS = ("courses.Batch", "enrollments.Enrollment", "finance.Payment")
+
+
+def _copy(obj, target_model):
+    """
+    Build a `target_model` instance from the fields it shares with `obj`.
+    Live and archive models use the same field names (and FK attnames).
+    """
+    return target_model(
+        **{
+            field.attname: getattr(obj, field.attname)
+            for field in target_model._meta.concrete_fields
+            if hasattr(obj, field.attname)
+        }
+    )
+
+
+def get_archivable_batches(ended_before: date):
+    """
+    Return batches that ended before `ended_before` and whose enrollments
+    are all closed (not ACTIVE) and fully paid. Only such batches can move
+    to the archive as a whole.
+    """
+    open_enrollments = Enrollment.objects.filter(batch=OuterRef("pk")).filter(
+        Q(status=Enrollment.StatusChoices.ACTIVE) | Q(amount_paid__lt=F("agreed_fee"))
+    )
+    return (
+        Batch.objects.filter(end_date__lt=ended_before)
+        .filter(~Exists(open_enrollments))
+        .select_related("course")
+        .order_by("end_date")
+    )
+
+
+@transaction.atomic
+def archive_batch(batch: Batch) -> dict:
+    """
+    Move a batch with its enrollments, installments, payments, sessions,
+    attendance, assessments, grades and certificates into the archive
+    tables. Certificate PDFs stay in storage.
+    Revenue cube cells are left untouched, so all-time revenue totals keep
+    including the archived payments.
+    """
+    enrollments = list(Enrollment.objects.filter(batch=batch))
+    installments = list(Installment.objects.filter(enrollment__batch=batch))
+    payments = list(Payment.objects.filter(enrollment__batch=batch))
+    sessions = list(ClassSession.objects.filter(batch=batch))
+    attendance = list(AttendanceRecord.objects.filter(enrollment__batch=batch))
+    assessments = list(Assessment.objects.filter(batch=batch))
+    grades = list(Grade.objects.filter(assessment__batch=batch))
+    certificates = list(Certificate.objects.filter(enrollment__batch=batch))
+
+    _copy(batch, ArchivedBatch).save(force_insert=True)
+    ArchivedEnrollment.objects.bulk_create([_copy(obj, ArchivedEnrollment) for obj in enrollments], batch_size=500)
+    ArchivedInstallment.objects.bulk_create([_copy(obj, ArchivedInstallment) for obj in installments], batch_size=500)
+    ArchivedPayment.objects.bulk_create([_copy(obj, ArchivedPayment) for obj in payments], batch_size=500)
+    ArchivedClassSession.objects.bulk_create([_copy(obj, ArchivedClassSession) for obj in sessions], batch_size=500)
+    ArchivedAttendanceRecord.objects.bulk_create(
+        [_copy(obj, ArchivedAttendanceRecord) for obj in attendance], batch_size=500
+    )
+    ArchivedAssessment.objects.bulk_create([_copy(obj, ArchivedAssessment) for obj in assessments], batch_size=500)
+    ArchivedGrade.objects.bulk_create([_copy(obj, ArchivedGrade) for obj in grades], batch_size=500)
+    ArchivedCertificate.objects.bulk_create(
+        [_copy(obj, ArchivedCertificate) for obj in certificates], batch_size=500
+    )
+
+    with paused_revenue_cube(), paused_balance_updates(), paused_status_history():
+        Payment.objects.filter(pk__in=[payment.pk for payment in payments]).delete()
+        # Installments, attendance, grades and certificates go with their
+        # enrollments, sessions and assessments with their batch (CASCADE).
+        Enrollment.objects.filter(batch=batch).delete()
+        Batch.objects.filter(pk=batch.pk).delete()
+
+    bump_data_version(*LIVE_LABELS)
+    return {"batches": 1, "enrollments": len(enrollments), "payments": len(payments)}
+
+
+def _restore_rows(live_model, archived_rows) -> None:
+    objs = [_copy(row, live_model) for row in archived_rows]
+    preserved = PRESERVED_TIMESTAMPS[live_model]
+    originals = [tuple(getattr(obj, name) for name in preserved) for obj in objs]
+
+    live_model.objects.bulk_create(objs, batch_size=500)
+
+    # bulk_create ran auto_now/auto_now_add; put the original values back.
+    for obj, values in zip(objs, originals):
+        for name, value in zip(preserved, values):
+            setattr(obj, name, value)
+    live_model.objects.bulk_update(objs, preserved, batch_size=500)
+
+
+@transaction.atomic
+def restore_batch(archived_batch: ArchivedBatch) -> dict:
+    """
+    Move an archived batch, its enrollments, installments, payments,
+    sessions, attendance, assessments, grades and certificates back into
+    the live tables with their original ids and timestamps. The exact
+    reverse of `archive_batch`.
+    """
+    enrollments = list(ArchivedEnrollment.objects.filter(batch=archived_batch))
+    installments = list(ArchivedInstallment.objects.filter(enrollment__batch=archived_batch))
+    payments = list(ArchivedPayment.objects.filter(enrollment__batch=archived_batch))
+    sessions = list(ArchivedClassSession.objects.filter(batch=archived_batch))
+    attendance = list(ArchivedAttendanceRecord.objects.filter(enrollment__batch=archived_batch))
+    assessments = list(ArchivedAssessment.objects.filter(batch=archived_batch))
+    grades = list(ArchivedGrade.objects.filter(assessment__batch=archived_batch))
+    certificates = list(ArchivedCertificate.objects.filter(enrollment__batch=archived_batch))
+
+    _restore_rows(Batch, [archived_batch])
+    _restore_rows(Enrollment, enrollments)
+    _restore_rows(Installment, installments)
+    _restore_rows(Payment, payments)
+    _restore_rows(ClassSession, sessions)
+    _restore_rows(AttendanceRecord, attendance)
+    _restore_rows(Assessment, assessments)
+    _restore_rows(Grade, grades)
+    _restore_rows(Certificate, certificates)
+
+    ArchivedBatch.objects.filter(pk=archived_batch.pk).delete()
+
+    # bulk_create sends no signals; show the restored courses in the portal.
+    invalidate_student_summaries(*{enrollment.student_id for enrollment in enrollments})
+    invalidate_grade_stats(archived_batch.pk, archived_batch.course_id)
+    bump_data_version(*LIVE_LABELS)
+    return {"batches": 1, "enrollments": len(enrollments), "payments": len(payments)}
+
+
+def archive_batches(ended_before: date, limit: int | None = None) -> dict:
+    """
+    Archive every eligible batch, one transaction per batch so a long run
+    never holds the write lock for long. Returns total rows moved.
+    """
+    totals = {"batches": 0, "enrollments": 0, "payments": 0}
+    batches = get_archivable_batches(ended_before)
+    if limit is not None:
+        batches = batches[:limit]
+    for batch in list(batches):
+        moved = archive_batch(batch)
+        for key, count in moved.items():
+            totals[key] += count
+    return totals
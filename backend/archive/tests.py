@@ -0,0 +1,159 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from archive.models import (
+    ArchivedAssessment,
+    ArchivedAttendanceRecord,
+    ArchivedBatch,
+    ArchivedCertificate,
+    ArchivedClassSession,
+    ArchivedEnrollment,
+    ArchivedGrade,
+    ArchivedInstallment,
+    ArchivedPayment,
+)
+from archive.services import LIVE_LABELS, archive_batch, get_archivable_batches, restore_batch
+from assessments.models import Assessment, Grade
+from assessments.services import record_grades
+from attendance.models import AttendanceRecord, ClassSession
+from attendance.services import add_sessions, mark_session
+from certificates.models import Certificate
+from core.testing import QueryBudgetTestCase, admin_url, create_batch, create_student
+from core.versioning import TRACKED_MODELS, get_data_versions
+from courses.models import Batch
+from enrollments.models import Enrollment, Installment
+from finance.cube import get_revenue_cube
+from finance.models import Payment, RevenueCubeCell
+
+
+class ArchiveAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_batch_changelist(self):
+        self.assertQueryBudget(11, admin_url(ArchivedBatch, "changelist"))
+
+    def test_batch_change(self):
+        self.assertQueryBudget(9, admin_url(ArchivedBatch, "change", self.rows[0]["archived_batch_id"]))
+
+    def test_enrollment_changelist(self):
+        self.assertQueryBudget(12, admin_url(ArchivedEnrollment, "changelist"))
+
+    def test_enrollment_change(self):
+        self.assertQueryBudget(9, admin_url(ArchivedEnrollment, "change", self.rows[0]["archived_enrollment_id"]))
+
+    def test_payment_changelist(self):
+        self.assertQueryBudget(11, admin_url(ArchivedPayment, "changelist"))
+
+    def test_payment_change(self):
+        self.assertQueryBudget(9, admin_url(ArchivedPayment, "change", self.rows[0]["archived_payment_id"]))
+
+
+class ArchiveRoundTripTests(TestCase):
+    LIVE_MODELS = (
+        Batch,
+        Enrollment,
+        Installment,
+        Payment,
+        ClassSession,
+        AttendanceRecord,
+        Assessment,
+        Grade,
+        Certificate,
+    )
+    ARCHIVE_MODELS = (
+        ArchivedBatch,
+        ArchivedEnrollment,
+        ArchivedInstallment,
+        ArchivedPayment,
+        ArchivedClassSession,
+        ArchivedAttendanceRecord,
+        ArchivedAssessment,
+        ArchivedGrade,
+        ArchivedCertificate,
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.officer = create_student()
+        cls.batch = create_batch(start_date=today - timedelta(days=120), end_date=today - timedelta(days=30))
+        cls.other_batch = create_batch()
+        cls.enrollments = [
+            Enrollment.objects.create(student=create_student(), batch=cls.batch, agreed_fee=Decimal("300"))
+            for _ in range(2)
+        ]
+        for enrollment, method in zip(cls.enrollments, (Payment.PaymentMethod.CASH, Payment.PaymentMethod.MPESA)):
+            for amount in ("100", "200"):
+                Payment.objects.create(
+                    enrollment=enrollment, amount=Decimal(amount), method=method, received_by=cls.officer
+                )
+        other = Enrollment.objects.create(student=create_student(), batch=cls.other_batch, agreed_fee=Decimal("300"))
+        Payment.objects.create(
+            enrollment=other,
+            amount=Decimal("50"),
+            method=Payment.PaymentMethod.CASH,
+            received_by=cls.officer,
+        )
+        sessions = add_sessions(cls.batch, [today - timedelta(days=days) for days in (60, 50)], topic="Intro")
+        mark_session(sessions[0], [cls.enrollments[0].pk], marked_by=cls.officer)
+        mark_session(sessions[1], [enrollment.pk for enrollment in cls.enrollments], marked_by=cls.officer)
+        assessment = Assessment.objects.create(batch=cls.batch, title="Project", max_score=Decimal("100"))
+        record_grades(assessment, {cls.enrollments[0].pk: Decimal("80"), cls.enrollments[1].pk: Decimal("55")})
+        Enrollment.objects.filter(batch=cls.batch).update(status=Enrollment.StatusChoices.COMPLETED)
+        Certificate.objects.create(
+            enrollment=cls.enrollments[0],
+            number="CERT-0001",
+            content_hash="0" * 64,
+            file=f"certificates/00/{'0' * 64}.pdf",
+            rendered_at=timezone.now(),
+        )
+
+    def snapshot(self):
+        """Every row of the batch, field by field, with the revenue cube and data versions."""
+        return {
+            "rows": {
+                model._meta.label: sorted(model.objects.values(), key=lambda row: str(row["id"]))
+                for model in self.LIVE_MODELS
+            },
+            "cube": sorted(
+                RevenueCubeCell.objects.values_list("day", "batch_id", "method", "total_amount", "payment_count")
+            ),
+            "revenue": get_revenue_cube(group_by=("course",)),
+            "versions": get_data_versions(*TRACKED_MODELS),
+        }
+
+    def test_archive_and_restore_round_trip(self):
+        before = self.snapshot()
+        self.assertEqual(len(before["rows"]["attendance.AttendanceRecord"]), 2)
+        self.assertEqual(len(before["rows"]["assessments.Grade"]), 2)
+        self.assertEqual(len(before["rows"]["certificates.Certificate"]), 1)
+        self.assertIn(self.batch, get_archivable_batches(timezone.localdate()))
+
+        self.assertEqual(archive_batch(self.batch), {"batches": 1, "enrollments": 2, "payments": 4})
+        archived = self.snapshot()
+        for live, archive in zip(self.LIVE_MODELS, self.ARCHIVE_MODELS):
+            with self.subTest(model=live._meta.label):
+                ids = {row["id"] for row in before["rows"][live._meta.label]}
+                moved = set(archive.objects.values_list("id", flat=True))
+                remaining = set(live.objects.values_list("id", flat=True))
+                self.assertTrue(moved)
+                self.assertEqual((moved | remaining, moved & remaining), (ids, set()))
+        self.assertEqual(ArchivedBatch.objects.get().pk, self.batch.pk)
+        # Archived payments still count towards revenue.
+        self.assertEqual((archived["cube"], archived["revenue"]), (before["cube"], before["revenue"]))
+
+        restore_batch(ArchivedBatch.objects.get(pk=self.batch.pk))
+        after = self.snapshot()
+        self.assertEqual(after["rows"], before["rows"])
+        self.assertEqual((after["cube"], after["revenue"]), (before["cube"], before["revenue"]))
+        for model in self.ARCHIVE_MODELS:
+            self.assertFalse(model.objects.exists(), model._meta.label)
+
+        # Models the move does not touch keep their versions; the moved ones
+        # are bumped so cached dashboards see the batch leave and come back.
+        for label, version in before["versions"].items():
+            if label in LIVE_LABELS:
+                self.assertGreater(after["versions"][label], version, label)
+            else:
+                self.assertEqual(after["versions"][label], version, label)
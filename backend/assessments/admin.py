@@ -0,0 +1,162 @@
+from decimal import Decimal, InvalidOperation
+
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from unfold.admin import ModelAdmin
+from courses.models import Batch, Course
+from enrollments.models import Enrollment
+from .models import Assessment, Grade
+from .services import get_batch_stats, get_course_stats, record_grades
+
+SCORE_PREFIX = 'score-'
+
+
+@admin.register(Assessment)
+class AssessmentAdmin(ModelAdmin):
+    list_display = ('title', 'batch', 'kind', 'max_score', 'weight', 'due_date', 'grading_links')
+    list_filter = ('kind', 'batch__course', 'due_date')
+    list_select_related = ('batch', 'batch__course')
+    search_fields = ('title', 'batch__name', 'batch__course__code')
+    autocomplete_fields = ('batch',)
+    list_per_page = 25
+
+    def get_readonly_fields(self, request, obj=None):
+        # Grades belong to the batch's enrollments, so an assessment stays put.
+        return ('batch',) if obj else ()
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<uuid:object_id>/grades/',
+                self.admin_site.admin_view(self.grade_entry_view),
+                name='assessments_assessment_grades',
+            ),
+            path(
+                'batch/<uuid:batch_id>/report/',
+                self.admin_site.admin_view(self.batch_report_view),
+                name='assessments_batch_report',
+            ),
+            path(
+                'course/<uuid:course_id>/report/',
+                self.admin_site.admin_view(self.course_report_view),
+                name='assessments_course_report',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def grade_entry_view(self, request, object_id):
+        """
+        Every student of the batch on one form; the scores are saved in a
+        single upsert. Clearing a box removes that student's grade.
+        """
+        assessment = get_object_or_404(Assessment.objects.select_related('batch__course'), pk=object_id)
+        if not self.has_change_permission(request, assessment):
+            return redirect('admin:assessments_assessment_changelist')
+        enrollments = list(
+            Enrollment.objects.filter(batch_id=assessment.batch_id)
+            .exclude(status=Enrollment.StatusChoices.DROPPED)
+            .select_related('student')
+            .order_by('student__last_name', 'student__first_name', 'student__username')
+        )
+        entered = dict(assessment.grades.values_list('enrollment_id', 'score'))
+
+        if request.method == 'POST':
+            scores, errors = {}, []
+            for key, value in request.POST.items():
+                if not key.startswith(SCORE_PREFIX):
+                    continue
+                value = value.strip()
+                try:
+                    scores[key[len(SCORE_PREFIX):]] = Decimal(value) if value else None
+                except InvalidOperation:
+                    errors.append(f"“{value}” is not a number.")
+            if not errors:
+                try:
+                    # Blank boxes of students who were never graded need no write.
+                    scores = {
+                        pk: score for pk, score in scores.items()
+                        if score is not None or Enrollment._meta.pk.to_python(pk) in entered
+                    }
+                    result = record_grades(assessment, scores, graded_by=request.user)
+                except ValidationError as exc:
+                    errors = exc.messages
+            if not errors:
+                self.message_user(
+                    request,
+                    f"Saved {result['saved']} grades for {assessment.title}"
+                    + (f" and cleared {result['cleared']}." if result['cleared'] else "."),
+                    messages.SUCCESS,
+                )
+                return redirect('admin:assessments_batch_report', batch_id=assessment.batch_id)
+            for error in errors:
+                self.message_user(request, error, messages.ERROR)
+            entered = {
+                Enrollment._meta.pk.to_python(pk): request.POST.get(SCORE_PREFIX + str(pk), '')
+                for pk in (enrollment.pk for enrollment in enrollments)
+            }
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f"Grades: {assessment}",
+            'opts': self.model._meta,
+            'assessment': assessment,
+            'score_prefix': SCORE_PREFIX,
+            'students': [(enrollment, entered.get(enrollment.pk, '')) for enrollment in enrollments],
+        }
+        return TemplateResponse(request, 'admin/assessments/assessment/grade_entry.html', context)
+
+    def batch_report_view(self, request, batch_id):
+        """Per-assessment and final-mark statistics of one batch."""
+        batch = get_object_or_404(Batch.objects.select_related('course'), pk=batch_id)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f"Grade report: {batch}",
+            'opts': self.model._meta,
+            'batch': batch,
+            'stats': get_batch_stats(batch.pk),
+        }
+        return TemplateResponse(request, 'admin/assessments/assessment/batch_report.html', context)
+
+    def course_report_view(self, request, course_id):
+        """Final-mark statistics of a course across all its batches."""
+        course = get_object_or_404(Course, pk=course_id)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f"Grade report: {course}",
+            'opts': self.model._meta,
+            'course': course,
+            'stats': get_course_stats(course.pk),
+        }
+        return TemplateResponse(request, 'admin/assessments/assessment/course_report.html', context)
+
+    @admin.display(description="Grading")
+    def grading_links(self, obj):
+        return format_html(
+            '<a href="{}">Enter grades</a> &middot; <a href="{}">Batch report</a> &middot; <a href="{}">Course report</a>',
+            reverse('admin:assessments_assessment_grades', args=[obj.pk]),
+            reverse('admin:assessments_batch_report', args=[obj.batch_id]),
+            reverse('admin:assessments_course_report', args=[obj.batch.course_id]),
+        )
+
+
+@admin.register(Grade)
+class GradeAdmin(ModelAdmin):
+    """Grades are entered a batch at a time from the assessment's grade form."""
+    list_display = ('enrollment', 'assessment', 'score', 'graded_by', 'updated_at')
+    list_filter = ('assessment__kind', 'assessment__batch__course')
+    list_select_related = ('enrollment__student', 'enrollment__batch', 'assessment__batch', 'graded_by')
+    search_fields = ('enrollment__student__username', 'assessment__title')
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
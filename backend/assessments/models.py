@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.validators import MinValueValidator
+from django.db import models
+from core.models import TimeStampedModel
+from courses.models import Batch
+from enrollments.models import Enrollment
+
+
+class Assessment(TimeStampedModel):
+    """A graded piece of work set for every student in a batch."""
+    class KindChoices(models.TextChoices):
+        ASSIGNMENT = 'ASSIGNMENT', 'Assignment'
+        QUIZ = 'QUIZ', 'Quiz'
+        PROJECT = 'PROJECT', 'Project'
+        EXAM = 'EXAM', 'Exam'
+
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='assessments')
+    title = models.CharField(max_length=255)
+    kind = models.CharField(max_length=20, choices=KindChoices.choices, default=KindChoices.ASSIGNMENT)
+    max_score = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(1)])
+    # Share of the final mark; weights are relative, so they need not add up to 100.
+    weight = models.DecimalField(max_digits=5, decimal_places=2, default=1, validators=[MinValueValidator(0)])
+    due_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['batch', 'due_date', 'title']
+
+    def __str__(self):
+        return f"{self.batch.name}: {self.title}"
+
+
+class Grade(TimeStampedModel):
+    """One student's score on one assessment."""
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='grades')
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='grades')
+    score = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(0)])
+    graded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        unique_together = ('assessment', 'enrollment')
+
+    def __str__(self):
+        return f"{self.enrollment_id} on {self.assessment_id}: {self.score}"
@@ -0,0 +1,232 @@
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from courses.models import Batch
+from enrollments.models import Enrollment
+
+from .models import Assessment, Grade
+
+STATS_CACHE_ALIAS = getattr(settings, "ASSESSMENT_STATS_CACHE_ALIAS", "shared")
+STATS_CACHE_TIMEOUT = getattr(settings, "ASSESSMENT_STATS_CACHE_TIMEOUT", 24 * 3600)
+PASS_MARK = getattr(settings, "ASSESSMENT_PASS_MARK", 50)
+
+# Histogram buckets for the grade distribution: 0-9, 10-19, ... 90-100.
+DISTRIBUTION_EDGES = np.linspace(0, 100, 11)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def batch_stats_key(batch_id) -> str:
+    return f"assessments:batch:{batch_id}"
+
+
+def course_stats_key(course_id) -> str:
+    return f"assessments:course:{course_id}"
+
+
+def invalidate_grade_stats(batch_id, course_id=None) -> None:
+    """Drop the cached reports of a batch and its course once the transaction commits."""
+    if course_id is None:
+        course_id = Batch.objects.filter(pk=batch_id).values_list("course_id", flat=True).first()
+    keys = [batch_stats_key(batch_id), course_stats_key(course_id)]
+    transaction.on_commit(lambda: caches[STATS_CACHE_ALIAS].delete_many(keys))
+
+
+@transaction.atomic
+def record_grades(assessment: Assessment, scores: dict, graded_by=None) -> dict:
+    """
+    Save a whole batch's scores for `assessment` in one upsert.
+
+    `scores` maps enrollment ids to a score, or to None to clear that
+    student's grade. Raises ValidationError (nothing is saved) when a score
+    is not a finite number within 0..max_score or a student is not in the
+    assessment's batch.
+    Returns counts of saved and cleared grades.
+    """
+    enrolled = set(Enrollment.objects.filter(batch_id=assessment.batch_id).values_list("pk", flat=True))
+    to_save, to_clear, errors = [], [], []
+    now = timezone.now()
+    for enrollment_id, score in scores.items():
+        enrollment_id = Enrollment._meta.pk.to_python(enrollment_id)
+        if enrollment_id not in enrolled:
+            errors.append(f"{enrollment_id} is not enrolled in {assessment.batch}.")
+        elif score is None:
+            to_clear.append(enrollment_id)
+        elif not Decimal(score).is_finite():
+            # NaN would make the range check below raise InvalidOperation.
+            errors.append(f"“{score}” is not a score.")
+        elif not 0 <= score <= assessment.max_score:
+            errors.append(f"A score of {score} is outside 0-{assessment.max_score}.")
+        else:
+            to_save.append(
+                Grade(
+                    assessment=assessment,
+                    enrollment_id=enrollment_id,
+                    score=score,
+                    graded_by=graded_by,
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+    if errors:
+        raise ValidationError(errors)
+
+    Grade.objects.bulk_create(
+        to_save,
+        update_conflicts=True,
+        unique_fields=["assessment", "enrollment"],
+        update_fields=["score", "graded_by", "updated_at"],
+        batch_size=500,
+    )
+    if to_clear:
+        Grade.objects.filter(assessment=assessment, enrollment_id__in=to_clear).delete()
+    invalidate_grade_stats(assessment.batch_id)
+    return {"saved": len(to_save), "cleared": len(to_clear)}
+
+
+def summarize(percentages: np.ndarray, pass_mark: float = PASS_MARK) -> dict:
+    """
+    Mean, median, spread, percentiles, distribution and pass rate of an
+    array of percentage scores (NaN entries are ignored). All
+    computations are whole-array NumPy operations.
+    """
+    values = percentages[~np.isnan(percentages)]
+    if values.size == 0:
+        return {"count": 0}
+    counts, _ = np.histogram(values, bins=DISTRIBUTION_EDGES)
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 2),
+        "median": round(float(np.median(values)), 2),
+        "std": round(float(values.std()), 2),
+        "min": round(float(values.min()), 2),
+        "max": round(float(values.max()), 2),
+        "percentiles": {
+            p: round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+        "distribution": [
+            {"from": int(low), "to": int(high), "count": int(count)}
+            for low, high, count in zip(DISTRIBUTION_EDGES[:-1], DISTRIBUTION_EDGES[1:], counts)
+        ],
+        "pass_rate": round(float((values >= pass_mark).mean()), 4),
+    }
+
+
+def load_score_matrix(batch_ids) -> tuple[list, list, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read the grades of the batches' graded enrollments into a matrix.
+
+    Returns `(enrollment_ids, assessments, scores, max_scores, weights)`.
+    `scores` has one row per enrollment (DROPPED enrollments are left out)
+    and one column per assessment, NaN where no grade was recorded; the
+    other two arrays hold each column's maximum score and weight. Three
+    queries however large the cohort.
+    """
+    assessments = list(
+        Assessment.objects.filter(batch_id__in=batch_ids).values_list("pk", "batch_id", "max_score", "weight")
+    )
+    enrollment_ids = list(
+        Enrollment.objects.filter(batch_id__in=batch_ids)
+        .exclude(status=Enrollment.StatusChoices.DROPPED)
+        .values_list("pk", "batch_id")
+    )
+    row_of = {pk: index for index, (pk, _) in enumerate(enrollment_ids)}
+    column_of = {pk: index for index, (pk, *_) in enumerate(assessments)}
+
+    grades = Grade.objects.filter(assessment__batch_id__in=batch_ids).values_list("enrollment_id", "assessment_id", "score")
+    rows, columns, values = [], [], []
+    for enrollment_id, assessment_id, score in grades.iterator(chunk_size=5000):
+        row = row_of.get(enrollment_id)
+        if row is not None:
+            rows.append(row)
+            columns.append(column_of[assessment_id])
+            values.append(score)
+
+    scores = np.full((len(enrollment_ids), len(assessments)), np.nan)
+    scores[np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)] = np.array(values, dtype=float)
+    max_scores = np.array([max_score for _, _, max_score, _ in assessments], dtype=float)
+    weights = np.array([weight for *_, weight in assessments], dtype=float)
+    return enrollment_ids, assessments, scores, max_scores, weights
+
+
+def final_percentages(enrollment_ids, assessments, scores, max_scores, weights) -> np.ndarray:
+    """
+    Each enrollment's weighted final mark in percent. Missing grades
+    count as zero. Assessments belong to one batch each, so weights are
+    normalized per batch: a student is only marked on their own batch's
+    assessments.
+    """
+    if not enrollment_ids or not assessments:
+        return np.full(len(enrollment_ids), np.nan)
+    percent = np.nan_to_num(scores / max_scores * 100)
+    batch_of_row = np.array([str(batch_id) for _, batch_id in enrollment_ids])
+    batch_of_column = np.array([str(batch_id) for _, batch_id, *_ in assessments])
+    # Weight matrix: a column counts for a row only if it is the row's batch.
+    row_weights = (batch_of_row[:, None] == batch_of_column[None, :]) * weights
+    totals = row_weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(totals > 0, (percent * row_weights).sum(axis=1) / totals, np.nan)
+
+
+def compute_batch_stats(batch_id) -> dict:
+    """Statistics for each assessment of a batch and for the final marks."""
+    enrollment_ids, assessments, scores, max_scores, weights = load_score_matrix([batch_id])
+    titles = dict(Assessment.objects.filter(batch_id=batch_id).values_list("pk", "title"))
+    percent = scores / max_scores * 100 if assessments else scores
+    return {
+        "students": len(enrollment_ids),
+        "assessments": [
+            {
+                "id": pk,
+                "title": titles[pk],
+                "graded": int((~np.isnan(scores[:, column])).sum()),
+                **summarize(percent[:, column]),
+            }
+            for column, (pk, *_) in enumerate(assessments)
+        ],
+        "final": summarize(final_percentages(enrollment_ids, assessments, scores, max_scores, weights)),
+        "pass_mark": PASS_MARK,
+        "generated_at": timezone.now(),
+    }
+
+
+def compute_course_stats(course_id) -> dict:
+    """Final-mark statistics over every batch of a course, overall and per batch."""
+    batches = list(Batch.objects.filter(course_id=course_id).order_by("start_date").values_list("pk", "name"))
+    batch_ids = [pk for pk, _ in batches]
+    enrollment_ids, assessments, scores, max_scores, weights = load_score_matrix(batch_ids)
+    finals = final_percentages(enrollment_ids, assessments, scores, max_scores, weights)
+    batch_of_row = np.array([str(batch_id) for _, batch_id in enrollment_ids])
+    return {
+        "overall": summarize(finals),
+        "batches": [
+            {"id": pk, "name": name, **summarize(finals[batch_of_row == str(pk)])}
+            for pk, name in batches
+        ],
+        "pass_mark": PASS_MARK,
+        "generated_at": timezone.now(),
+    }
+
+
+def _cached(key, compute):
+    cache = caches[STATS_CACHE_ALIAS]
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute()
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def get_batch_stats(batch_id) -> dict:
+    """Batch report data, cached until a grade, assessment or enrollment of the batch changes."""
+    return _cached(batch_stats_key(batch_id), lambda: compute_batch_stats(batch_id))
+
+
+def get_course_stats(course_id) -> dict:
+    """Course report data, cached until anything in one of its batches' reports changes."""
+    return _cached(course_stats_key(course_id), lambda: compute_course_stats(course_id))
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Batch
+from enrollments.models import Enrollment
+
+from .models import Assessment
+from .services import invalidate_grade_stats
+
+# Grades are written by services.record_grades, which drops the cached
+# reports itself; deleting an assessment or enrollment cascades to its
+# grades and is caught here.
+
+
+@receiver(post_save, sender=Assessment, dispatch_uid="assessments_assessment_saved")
+@receiver(post_delete, sender=Assessment, dispatch_uid="assessments_assessment_deleted")
+def assessment_changed(sender, instance, **kwargs):
+    invalidate_grade_stats(instance.batch_id)
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid="assessments_enrollment_saved")
+@receiver(post_delete, sender=Enrollment, dispatch_uid="assessments_enrollment_deleted")
+def enrollment_changed(sender, instance, **kwargs):
+    # Status changes move students in and out of the reports (DROPPED is
+    # left out); a batch transfer affects both batches.
+    batch_ids = {instance.batch_id}
+    previous = getattr(instance, "_previous_batch_id", None)
+    if previous:
+        batch_ids.add(previous)
+    for batch_id in batch_ids:
+        invalidate_grade_stats(batch_id)
+
+
+@receiver(post_save, sender=Batch, dispatch_uid="assessments_batch_saved")
+def batch_changed(sender, instance, created, **kwargs):
+    # The course report lists the course's batches by name.
+    invalidate_grade_stats(instance.pk, instance.course_id)
@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from assessments.models import Assessment, Grade
+from assessments.services import final_percentages, record_grades
+from core.testing import QueryBudgetTestCase, admin_url, create_batch, create_staff, create_student
+from enrollments.models import Enrollment
+
+
+class AssessmentAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(11, admin_url(Assessment, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(Assessment, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(11, admin_url(Assessment, "change", self.rows[0]["assessment"].pk))
+
+    def test_batch_autocomplete(self):
+        self.assertAutocompleteBudget(3, Assessment, "batch")
+
+    def test_grade_entry(self):
+        assessment = self.rows[0]["assessment"]
+        self.assertQueryBudget(
+            10, reverse("admin:assessments_assessment_grades", args=[assessment.pk]), batch=assessment.batch
+        )
+
+    def test_batch_report(self):
+        batch = self.rows[0]["batch"]
+        self.assertQueryBudget(12, reverse("admin:assessments_batch_report", args=[batch.pk]), batch=batch)
+
+    def test_course_report(self):
+        row = self.rows[0]
+        self.assertQueryBudget(
+            12, reverse("admin:assessments_course_report", args=[row["course"].pk]), batch=row["batch"]
+        )
+
+
+class GradeAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(11, admin_url(Grade, "changelist"))
+
+    def test_change(self):
+        grade = Grade.objects.get(assessment=self.rows[0]["assessment"], enrollment=self.rows[0]["enrollment"])
+        self.assertQueryBudget(15, admin_url(Grade, "change", grade.pk))
+
+
+class RecordGradesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.batch = create_batch()
+        cls.assessment = Assessment.objects.create(batch=cls.batch, title="Project", max_score=Decimal("50"))
+        cls.first, cls.second = (
+            Enrollment.objects.create(student=create_student(), batch=cls.batch, agreed_fee=Decimal("100"))
+            for _ in range(2)
+        )
+
+    def scores(self):
+        return dict(self.assessment.grades.values_list("enrollment_id", "score"))
+
+    def test_upsert(self):
+        result = record_grades(self.assessment, {self.first.pk: Decimal("40"), str(self.second.pk): Decimal("25")})
+        self.assertEqual(result, {"saved": 2, "cleared": 0})
+        record_grades(self.assessment, {self.first.pk: Decimal("45.5")})
+        self.assertEqual(self.scores(), {self.first.pk: Decimal("45.5"), self.second.pk: Decimal("25")})
+        self.assertEqual(Grade.objects.count(), 2)
+
+    def test_clearing_a_grade(self):
+        record_grades(self.assessment, {self.first.pk: Decimal("40"), self.second.pk: Decimal("25")})
+        result = record_grades(self.assessment, {self.first.pk: None, self.second.pk: Decimal("30")})
+        self.assertEqual(result, {"saved": 1, "cleared": 1})
+        self.assertEqual(self.scores(), {self.second.pk: Decimal("30")})
+
+    def test_rejected_submissions_save_nothing(self):
+        record_grades(self.assessment, {self.first.pk: Decimal("40")})
+        outsider = Enrollment.objects.create(student=create_student(), batch=create_batch(), agreed_fee=Decimal("100"))
+        for scores in (
+            {self.first.pk: Decimal("10"), self.second.pk: Decimal("50.01")},
+            {self.first.pk: Decimal("10"), self.second.pk: Decimal("-1")},
+            {self.first.pk: Decimal("10"), self.second.pk: Decimal("NaN")},
+            {self.first.pk: Decimal("10"), self.second.pk: Decimal("Infinity")},
+            {self.first.pk: Decimal("10"), outsider.pk: Decimal("10")},
+        ):
+            with self.subTest(scores=scores), self.assertRaises(ValidationError):
+                record_grades(self.assessment, scores)
+        self.assertEqual(self.scores(), {self.first.pk: Decimal("40")})
+
+    def test_grade_entry_rejects_nan(self):
+        self.client.force_login(create_staff()["admin"])
+        response = self.client.post(
+            reverse("admin:assessments_assessment_grades", args=[self.assessment.pk]),
+            {f"score-{self.first.pk}": "nan", f"score-{self.second.pk}": "20"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Grade.objects.exists())
+
+
+class FinalPercentagesTests(SimpleTestCase):
+    def test_weighted_per_batch_with_missing_grades_as_zero(self):
+        enrollment_ids = [(1, "a"), (2, "a"), (3, "b")]
+        assessments = [(10, "a", 50, 1), (11, "a", 100, 3), (12, "b", 20, 2)]
+        scores = np.array(
+            [
+                [25, 100, np.nan],
+                [50, np.nan, np.nan],
+                [np.nan, np.nan, 15],
+            ],
+            dtype=float,
+        )
+        max_scores, weights = np.array([50, 100, 20.0]), np.array([1, 3, 2.0])
+        finals = final_percentages(enrollment_ids, assessments, scores, max_scores, weights)
+        np.testing.assert_allclose(finals, [(50 + 3 * 100) / 4, 100 / 4, 75])
+
+    def test_zero_weights_and_no_assessments(self):
+        enrollment_ids = [(1, "a")]
+        weightless = final_percentages(
+            enrollment_ids, [(10, "a", 10, 0)], np.array([[5.0]]), np.array([10.0]), np.array([0.0])
+        )
+        ungraded = final_percentages(enrollment_ids, [], np.empty((1, 0)), np.empty(0), np.empty(0))
+        self.assertTrue(np.isnan(weightless).all())
+        self.assertTrue(np.isnan(ungraded).all())
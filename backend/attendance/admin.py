@@ -0,0 +1,116 @@
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from unfold.admin import ModelAdmin
+from enrollments.models import Enrollment
+from .models import ClassSession
+from .services import add_sessions, get_at_risk_students, get_batch_attendance, get_session_register, mark_session
+
+
+@admin.register(ClassSession)
+class ClassSessionAdmin(ModelAdmin):
+    list_display = ('batch', 'session_number', 'date', 'topic', 'marked_at', 'attendance_link')
+    list_filter = ('batch__course', 'date', ('marked_at', admin.EmptyFieldListFilter))
+    list_select_related = ('batch', 'batch__course')
+    search_fields = ('batch__name', 'batch__course__code', 'topic')
+    autocomplete_fields = ('batch',)
+    fields = ('batch', 'date', 'topic')
+    list_per_page = 25
+
+    def get_readonly_fields(self, request, obj=None):
+        # A session's position in the bitmaps cannot move to another batch.
+        return ('batch',) if obj else ()
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+        created = add_sessions(obj.batch, [obj.date], topic=obj.topic)[0]
+        obj.pk, obj.sequence = created.pk, created.sequence
+
+    def get_urls(self):
+        urls = [
+            path(
+                'at-risk/',
+                self.admin_site.admin_view(self.at_risk_view),
+                name='attendance_classsession_at_risk',
+            ),
+            path(
+                '<uuid:object_id>/attendance/',
+                self.admin_site.admin_view(self.take_attendance_view),
+                name='attendance_classsession_take',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def take_attendance_view(self, request, object_id):
+        """
+        The whole class on one page: tick who was there and save the
+        register in a single write.
+        """
+        session = get_object_or_404(ClassSession.objects.select_related('batch__course'), pk=object_id)
+        if not self.has_change_permission(request, session):
+            return redirect('admin:attendance_classsession_changelist')
+        if request.method == 'POST':
+            try:
+                mark_session(session, request.POST.getlist('present'), marked_by=request.user)
+            except (ValueError, ValidationError) as exc:
+                self.message_user(request, str(exc), messages.ERROR)
+            else:
+                self.message_user(request, f"Attendance saved for {session}.", messages.SUCCESS)
+                return redirect('admin:attendance_classsession_changelist')
+
+        rates = get_batch_attendance(session.batch_id)
+        present_ids = get_session_register(session) if session.marked_at else set()
+        enrollments = (
+            Enrollment.objects.filter(batch_id=session.batch_id)
+            .exclude(status=Enrollment.StatusChoices.DROPPED)
+            .select_related('student')
+            .order_by('student__last_name', 'student__first_name', 'student__username')
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'title': f"Attendance: {session}",
+            'opts': self.model._meta,
+            'session': session,
+            'students': [
+                {
+                    'enrollment': enrollment,
+                    'present': enrollment.pk in present_ids,
+                    'rate': rates.get(enrollment.pk, (0, 0, None))[2],
+                }
+                for enrollment in enrollments
+            ],
+        }
+        return TemplateResponse(request, 'admin/attendance/classsession/take_attendance.html', context)
+
+    def at_risk_view(self, request):
+        """Active students below an attendance threshold across all running batches."""
+        try:
+            threshold = min(max(int(request.GET.get('below', 75)), 1), 100)
+        except ValueError:
+            threshold = 75
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Students at risk",
+            'opts': self.model._meta,
+            'threshold': threshold,
+            'students': get_at_risk_students(threshold / 100),
+        }
+        return TemplateResponse(request, 'admin/attendance/classsession/at_risk.html', context)
+
+    @admin.display(description="Session", ordering='sequence')
+    def session_number(self, obj):
+        return obj.sequence + 1
+
+    @admin.display(description="Attendance")
+    def attendance_link(self, obj):
+        label = "Edit register" if obj.marked_at else "Take attendance"
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse('admin:attendance_classsession_take', args=[obj.pk]),
+            label,
+        )
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import models
+from core.models import TimeStampedModel
+from courses.models import Batch
+from enrollments.models import Enrollment
+
+
+class ClassSession(TimeStampedModel):
+    """
+    One scheduled meeting of a batch. `sequence` is the session's bit
+    position in every AttendanceRecord of the batch.
+    """
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='sessions')
+    sequence = models.PositiveIntegerField(editable=False)
+    date = models.DateField()
+    topic = models.CharField(max_length=255, blank=True)
+    # Attendance is taken for the whole class at once; until then the
+    # session does not count towards anyone's attendance rate.
+    marked_at = models.DateTimeField(null=True, blank=True)
+    marked_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        ordering = ['batch', 'sequence']
+        unique_together = ('batch', 'sequence')
+
+    def __str__(self):
+        return f"{self.batch.name} #{self.sequence + 1} ({self.date})"
+
+
+class AttendanceRecord(TimeStampedModel):
+    """
+    An enrollment's attendance over its batch's sessions as a bitmap: bit
+    `n` (little-endian) is set when the student attended session `n`.
+    """
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='attendance')
+    present = models.BinaryField(default=b'')
+    # Sessions before this one were held before the student enrolled and
+    # are not counted as absences.
+    first_sequence = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Attendance of {self.enrollment_id}"
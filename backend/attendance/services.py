@@ -0,0 +1,184 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from courses.models import Batch
+from enrollments.models import Enrollment
+
+from .models import AttendanceRecord, ClassSession
+
+# Attendance bitmaps are Python ints while in memory: `&`, `|` and
+# `int.bit_count()` work a machine word at a time, so a whole term of
+# sessions is a handful of word operations per student.
+
+
+def to_bitmap(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def from_bitmap(data) -> int:
+    return int.from_bytes(bytes(data or b""), "little")
+
+
+def attendance_rate(present: int, held: int, first_sequence: int = 0) -> tuple[int, int, float | None]:
+    """
+    Given a student's bitmap, the batch's bitmap of held sessions and the
+    first session the student was enrolled for, return `(attended, counted,
+    rate)`. The rate is None while no session has been counted.
+    """
+    counted_mask = held >> first_sequence << first_sequence
+    counted = counted_mask.bit_count()
+    attended = (present & counted_mask).bit_count()
+    return attended, counted, (attended / counted if counted else None)
+
+
+@transaction.atomic
+def add_sessions(batch: Batch, dates: list[date], topic: str = "") -> list[ClassSession]:
+    """Append sessions on `dates` to the batch, numbering them after the existing ones."""
+    start = ClassSession.objects.filter(batch=batch).aggregate(last=Max("sequence"))["last"]
+    start = 0 if start is None else start + 1
+    sessions = [
+        ClassSession(batch=batch, sequence=start + offset, date=day, topic=topic)
+        for offset, day in enumerate(sorted(dates))
+    ]
+    return ClassSession.objects.bulk_create(sessions)
+
+
+@transaction.atomic
+def mark_session(session: ClassSession, present_enrollment_ids, marked_by=None) -> int:
+    """
+    Take attendance for the whole class: students in `present_enrollment_ids`
+    attended `session`, every other enrollment of the batch did not.
+    Marking the same session again replaces the earlier register.
+
+    Active enrollments (and anyone marked present) without a record get one
+    starting at this session. Every record's bitmap is then rewritten with
+    `bulk_update()`. Returns the number of students marked present.
+    """
+    # Form posts send ids as strings; invalid ones raise ValidationError.
+    present_ids = {Enrollment._meta.pk.to_python(pk) for pk in present_enrollment_ids}
+    statuses = dict(Enrollment.objects.filter(batch_id=session.batch_id).values_list("pk", "status"))
+    unknown = present_ids - statuses.keys()
+    if unknown:
+        raise ValueError(f"{len(unknown)} of the students marked present are not enrolled in {session.batch_id}.")
+
+    records = AttendanceRecord.objects.select_for_update().filter(enrollment__batch_id=session.batch_id)
+    current = {
+        enrollment_id: (pk, from_bitmap(present))
+        for pk, enrollment_id, present in records.values_list("pk", "enrollment_id", "present")
+    }
+    active_ids = {pk for pk, status in statuses.items() if status == Enrollment.StatusChoices.ACTIVE}
+    created = AttendanceRecord.objects.bulk_create(
+        [
+            AttendanceRecord(enrollment_id=enrollment_id, first_sequence=session.sequence)
+            for enrollment_id in (active_ids | present_ids) - current.keys()
+        ]
+    )
+    current.update((record.enrollment_id, (record.pk, 0)) for record in created)
+
+    bit = 1 << session.sequence
+    now = timezone.now()
+    # bulk_update() skips auto_now, so updated_at is set here.
+    AttendanceRecord.objects.bulk_update(
+        [
+            AttendanceRecord(
+                pk=pk,
+                present=to_bitmap(bits | bit if enrollment_id in present_ids else bits & ~bit),
+                updated_at=now,
+            )
+            for enrollment_id, (pk, bits) in current.items()
+        ],
+        ["present", "updated_at"],
+        batch_size=500,
+    )
+
+    session.marked_at = now
+    session.marked_by = marked_by
+    session.save(update_fields=["marked_at", "marked_by", "updated_at"])
+    return len(present_ids)
+
+
+def get_session_register(session: ClassSession) -> set:
+    """Return the enrollment ids marked present at `session`."""
+    bit = 1 << session.sequence
+    records = AttendanceRecord.objects.filter(enrollment__batch_id=session.batch_id)
+    return {
+        enrollment_id
+        for enrollment_id, present in records.values_list("enrollment_id", "present")
+        if from_bitmap(present) & bit
+    }
+
+
+def get_held_sessions(batch_ids) -> dict:
+    """Return `{batch_id: bitmap of sessions with attendance taken}`."""
+    held = {}
+    sessions = ClassSession.objects.filter(batch_id__in=batch_ids, marked_at__isnull=False)
+    for batch_id, sequence in sessions.values_list("batch_id", "sequence"):
+        held[batch_id] = held.get(batch_id, 0) | 1 << sequence
+    return held
+
+
+def get_batch_attendance(batch_id) -> dict:
+    """
+    Return `{enrollment_id: (attended, counted, rate)}` for a batch, from
+    one query for the sessions and one for the records.
+    """
+    held = get_held_sessions([batch_id]).get(batch_id, 0)
+    records = AttendanceRecord.objects.filter(enrollment__batch_id=batch_id)
+    return {
+        enrollment_id: attendance_rate(from_bitmap(present), held, first_sequence)
+        for enrollment_id, present, first_sequence in records.values_list("enrollment_id", "present", "first_sequence")
+    }
+
+
+def get_at_risk_students(threshold: float = 0.75, min_sessions: int = 3, on: date | None = None) -> list[dict]:
+    """
+    Return active students of batches running on `on` (default: today)
+    whose attendance rate is below `threshold`, lowest first. Students
+    with fewer than `min_sessions` counted sessions are left out, so a
+    single absence in week one does not raise an alarm.
+
+    Two queries whatever the number of batches: the held sessions, and
+    every active enrollment's bitmap with the details shown in the report.
+    """
+    on = on or timezone.localdate()
+    running = Batch.objects.filter(start_date__lte=on, end_date__gte=on)
+    held = get_held_sessions(running.values("pk"))
+    rows = AttendanceRecord.objects.filter(
+        enrollment__batch__in=running,
+        enrollment__status=Enrollment.StatusChoices.ACTIVE,
+    ).values_list(
+        "enrollment_id",
+        "enrollment__batch_id",
+        "present",
+        "first_sequence",
+        "enrollment__student__username",
+        "enrollment__student__first_name",
+        "enrollment__student__last_name",
+        "enrollment__student__phone_number",
+        "enrollment__batch__name",
+        "enrollment__batch__course__code",
+    )
+
+    at_risk = []
+    for enrollment_id, batch_id, present, first_sequence, username, first_name, last_name, phone, batch_name, course_code in rows:
+        attended, counted, rate = attendance_rate(from_bitmap(present), held.get(batch_id, 0), first_sequence)
+        if counted < min_sessions or rate >= threshold:
+            continue
+        at_risk.append(
+            {
+                "enrollment_id": enrollment_id,
+                "username": username,
+                "name": f"{first_name} {last_name}".strip() or username,
+                "phone_number": phone or "",
+                "course_code": course_code,
+                "batch_name": batch_name,
+                "attended": attended,
+                "counted": counted,
+                "rate": rate,
+            }
+        )
+    at_risk.sort(key=lambda row: (row["rate"], row["course_code"], row["username"]))
+    return at_risk
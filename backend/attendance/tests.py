@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, ClassSession
+from attendance.services import (
+    add_sessions,
+    attendance_rate,
+    from_bitmap,
+    get_batch_attendance,
+    get_session_register,
+    mark_session,
+)
+from core.testing import QueryBudgetTestCase, admin_url, create_batch, create_staff, enroll_students
+
+
+class ClassSessionAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(11, admin_url(ClassSession, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(ClassSession, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(11, admin_url(ClassSession, "change", self.rows[0]["session"].pk))
+
+    def test_batch_autocomplete(self):
+        self.assertAutocompleteBudget(3, ClassSession, "batch")
+
+    def test_take_attendance(self):
+        session = self.rows[0]["session"]
+        self.assertQueryBudget(
+            12, reverse("admin:attendance_classsession_take", args=[session.pk]), batch=session.batch
+        )
+
+    def test_at_risk(self):
+        self.assertQueryBudget(9, reverse("admin:attendance_classsession_at_risk"))
+
+    def test_at_risk_in_one_batch(self):
+        self.assertQueryBudget(9, reverse("admin:attendance_classsession_at_risk"), batch=self.rows[0]["batch"])
+
+
+class AttendanceRateTests(SimpleTestCase):
+    def test_counts_held_sessions(self):
+        self.assertEqual(attendance_rate(0b101, 0b111), (2, 3, 2 / 3))
+
+    def test_skips_sessions_before_enrollment(self):
+        self.assertEqual(attendance_rate(0b101, 0b111, first_sequence=1), (1, 2, 0.5))
+
+    def test_ignores_sessions_not_held(self):
+        self.assertEqual(attendance_rate(0b1001, 0b0011), (1, 2, 0.5))
+
+    def test_no_sessions_held(self):
+        self.assertEqual(attendance_rate(0b1, 0), (0, 0, None))
+
+
+class MarkSessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_staff()
+        cls.batch = create_batch()
+        cls.first, cls.second, cls.third = enroll_students(cls.batch, 3, cls.staff)
+        today = timezone.localdate()
+        cls.sessions = add_sessions(cls.batch, [today - timedelta(days=2), today - timedelta(days=1)])
+
+    def test_remarking_replaces_the_register(self):
+        session, other = self.sessions
+        mark_session(session, [self.first.pk, self.second.pk])
+        mark_session(other, [self.first.pk])
+
+        mark_session(session, [str(self.third.pk)])
+
+        self.assertEqual(get_session_register(session), {self.third.pk})
+        self.assertEqual(get_session_register(other), {self.first.pk})
+        attendance = get_batch_attendance(self.batch.pk)
+        self.assertEqual(attendance[self.first.pk], (1, 2, 0.5))
+        self.assertEqual(attendance[self.second.pk], (0, 2, 0.0))
+        self.assertEqual(attendance[self.third.pk], (1, 2, 0.5))
+
+    def test_remarking_keeps_one_record_per_student(self):
+        session = self.sessions[0]
+        mark_session(session, [self.first.pk])
+        mark_session(session, [])
+
+        records = AttendanceRecord.objects.filter(enrollment__batch=self.batch)
+        self.assertEqual(records.count(), 3)
+        self.assertEqual({from_bitmap(record.present) for record in records}, {0})
+
+    def test_rejects_students_of_another_batch(self):
+        stranger = enroll_students(create_batch(), 1, self.staff)[0]
+        with self.assertRaises(ValueError):
+            mark_session(self.sessions[0], [stranger.pk])
+        self.assertEqual(get_session_register(self.sessions[0]), set())
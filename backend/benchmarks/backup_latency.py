@@ -0,0 +1,263 @@
+"""
+Measure payment write latency while the database is being backed up.
+
+Seeds a throwaway SQLite database like load_test.py, then keeps several
+writer threads recording payments through the ORM (with the signals that
+update balances), the way finance officers do during the day, and times
+every write in three phases. Backups run in a separate process, as they
+would from cron:
+
+    idle     no backup running
+    online   core.backups.create_backup: the online backup API, page-stepped,
+             reading from a held WAL snapshot
+    locked   the usual consistent cron copy: hold the write lock
+             (BEGIN IMMEDIATE), copy the database and its WAL, release
+
+Each backup phase lasts as long as its backup; the idle phase lasts as long
+as the online one. The backup taken in the online phase is then checked
+for consistency: every payment's write also adds to its enrollment's
+amount paid, so in a true snapshot the two totals agree.
+
+Usage (from backend/):
+    python benchmarks/backup_latency.py --students 20000 --writers 4
+    python benchmarks/backup_latency.py --pages 256 --sleep 0.01 --json backup.json
+"""
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from load_test import _summary_row, seed  # noqa: E402
+
+
+def write_payments(
+    enrollment_ids: list, received_by_id, think: float, stop: threading.Event, samples: list, lock
+) -> None:
+    """
+    Record payments one transaction at a time, `think` seconds apart, until
+    `stop` is set. Keeps (start, seconds, ok) per write.
+    """
+    from finance.models import Payment
+
+    local = []
+    try:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    Payment.objects.create(
+                        enrollment_id=enrollment_ids[len(local) % len(enrollment_ids)],
+                        amount=Decimal("100"),
+                        method=Payment.PaymentMethod.CASH,
+                        reference_number=f"BK-{uuid.uuid4().hex[:16]}",
+                        received_by_id=received_by_id,
+                    )
+                ok = True
+            except Exception:
+                ok = False
+            local.append((started, time.perf_counter() - started, ok))
+            stop.wait(think)
+    finally:
+        connection.close()
+    with lock:
+        samples.extend(local)
+
+
+def locked_copy(database: Path, target: Path) -> None:
+    """A consistent plain file copy: no one may write until it is done."""
+    source = sqlite3.connect(database, timeout=20, isolation_level=None)
+    try:
+        source.execute("BEGIN IMMEDIATE")
+        shutil.copyfile(database, target)
+        wal = database.with_name(database.name + "-wal")
+        if wal.exists():
+            shutil.copyfile(wal, target.with_name(target.name + "-wal"))
+        source.execute("COMMIT")
+    finally:
+        source.close()
+
+
+def _run_child(database: str, function, args, results) -> None:
+    settings.DATABASES["default"]["NAME"] = database
+    started = time.perf_counter()
+    result = function(*args)
+    results.put((result, started, time.perf_counter()))
+
+
+def in_child_process(database: Path, function, *args) -> tuple:
+    """
+    Call `function(*args)` in a separate process, the way cron would run
+    the backup, so it does not compete with the writers for the GIL.
+    Returns its result and when it started and finished (perf_counter
+    is system-wide here, so the times compare across processes).
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_child, args=(str(database), function, args, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def idle(seconds: float) -> tuple:
+    started = time.perf_counter()
+    time.sleep(seconds)
+    return None, started, time.perf_counter()
+
+
+def run_phase(seeded: dict, writers: int, think: float, action) -> tuple[list, float, object]:
+    """
+    Call `action` while the writers write. Returns the writes in flight at
+    any time between the start and finish times it reports, as (seconds,
+    ok), the time between them, and its result.
+    """
+    stop, lock, samples = threading.Event(), threading.Lock(), []
+    threads = [
+        threading.Thread(
+            target=write_payments,
+            args=(seeded["enrollment_ids"][n::writers], seeded["received_by_id"], think, stop, samples, lock),
+        )
+        for n in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)  # let the writers warm up
+    result, started, finished = action()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    window = [(seconds, ok) for start, seconds, ok in samples if start < finished and start + seconds > started]
+    return window, finished - started, result
+
+
+def check_snapshot(path: Path, compressed: bool) -> dict:
+    """Payment count of a backup, and whether its payments add up to its enrollments' amounts paid."""
+    if compressed:
+        unpacked = path.with_suffix(".check")
+        with gzip.open(path, "rb") as source, open(unpacked, "wb") as target:
+            shutil.copyfileobj(source, target)
+        path = unpacked
+    check = sqlite3.connect(path)
+    try:
+        payments, paid = check.execute("SELECT count(*), coalesce(sum(amount), 0) FROM finance_payment").fetchone()
+        credited = check.execute("SELECT coalesce(sum(amount_paid), 0) FROM enrollments_enrollment").fetchone()[0]
+    finally:
+        check.close()
+    return {"payments": payments, "consistent": abs(paid - credited) < 0.01}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=12)
+    parser.add_argument("--payments-per-enrollment", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4, help="Threads recording payments.")
+    parser.add_argument("--think", type=float, default=0.05, help="Seconds each writer waits between payments.")
+    parser.add_argument("--pages", type=int, default=settings.BACKUP_PAGES_PER_STEP, help="Pages per backup step.")
+    parser.add_argument("--sleep", type=float, default=settings.BACKUP_STEP_SLEEP, help="Seconds between steps.")
+    parser.add_argument("--no-compress", action="store_true")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    from core.backups import create_backup
+    from enrollments.models import Enrollment
+    from finance.models import Payment
+
+    results, checks = [], {}
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(workdir / "backup.sqlite3")
+        with override_settings(DEBUG=False):
+            old_name = connection.creation.create_test_db(verbosity=0)
+            try:
+                seed(args.students, args.courses, args.payments_per_enrollment)
+                database = Path(connection.settings_dict["NAME"])
+                seeded = {
+                    "enrollment_ids": list(Enrollment.objects.values_list("pk", flat=True)[:2000]),
+                    "received_by_id": Payment.objects.values_list("received_by_id", flat=True).first(),
+                }
+                connection.close()
+                print(f"seeded {args.students} students; database is {database.stat().st_size / 1e6:.1f} MB")
+
+                backups = workdir / "backups"
+                phases = {}
+                samples, phases["online"], backup = run_phase(
+                    seeded,
+                    args.writers,
+                    args.think,
+                    lambda: in_child_process(
+                        database, create_backup, backups, not args.no_compress, args.pages, args.sleep
+                    ),
+                )
+                results.append(("online", samples))
+                samples, phases["idle"], _ = run_phase(
+                    seeded, args.writers, args.think, lambda: idle(phases["online"])
+                )
+                results.insert(0, ("idle", samples))
+                samples, phases["locked"], _ = run_phase(
+                    seeded,
+                    args.writers,
+                    args.think,
+                    lambda: in_child_process(database, locked_copy, database, workdir / "copy.sqlite3"),
+                )
+                results.append(("locked", samples))
+
+                checks.update(check_snapshot(backups / backup["file"], backup["compressed"]))
+                checks["backup_steps"] = backup["steps"]
+                checks["backup_pages"] = backup["pages"]
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    rows = []
+    for phase, samples in results:
+        row = _summary_row(phase, samples, phases[phase])
+        row.update(
+            backup_s=round(phases[phase], 3) if phase != "idle" else None,
+            max_ms=round(max((elapsed for elapsed, _ in samples), default=0) * 1e3, 2),
+        )
+        rows.append(row)
+
+    print(
+        f"{args.writers} writers, {args.think}s apart; online backup of {checks['backup_pages']} pages in "
+        f"{checks['backup_steps']} steps of {args.pages}, {args.sleep}s apart"
+    )
+    print(f"{'phase':<8} {'backup s':>8} {'writes':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>9} {'errors':>7}")
+    for row in rows:
+        backup_s = f"{row['backup_s']:.2f}" if row["backup_s"] is not None else "-"
+        print(
+            f"{row['scenario']:<8} {backup_s:>8} {row['requests']:>7} {row['p50_ms']:>8.1f} "
+            f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>9.1f} {row['error_rate']:>7.1%}"
+        )
+    print(
+        f"online backup holds {checks['payments']} payments; totals "
+        + ("agree with enrollment balances" if checks["consistent"] else "DO NOT MATCH enrollment balances")
+    )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "phases": rows, "checks": checks}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+Load-test the admin with concurrent finance officers, registrars and admins.
+
+Boots the app in-process on a threaded WSGI server over a seeded, throwaway
+SQLite database, logs in one session per virtual user, then has every user
+replay its role's scenario mix for a fixed duration. Reports throughput,
+p50/p95/p99 latency and error rate per scenario; `--json` writes the same
+numbers to a file so runs can be compared.
+
+Scenarios:
+    dashboard             GET /admin/ (role-specific KPIs and widgets)
+    payment_page          GET the payment changelist at a random page
+    payment_search        GET the payment changelist searching a student
+    enrollment_autocomplete  GET the payment form's enrollment autocomplete
+    payment_create        GET the add form, POST a new payment
+    payment_export        POST the CSV export action for one page of payments
+    enrollment_page       GET the enrollment changelist at a random page
+    enrollment_search     GET the enrollment changelist searching a student
+    student_autocomplete  GET the enrollment form's student autocomplete
+
+Usage (from backend/):
+    python benchmarks/load_test.py --users 20 --duration 30
+    python benchmarks/load_test.py --mix finance=8,registrar=4,admin=1 --json results.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from http.cookies import SimpleCookie
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+PASSWORD = "load-test-pass"
+ROLES = ("finance", "registrar", "admin")
+
+# Scenario name -> relative weight, per role.
+ROLE_SCENARIOS = {
+    "finance": {
+        "dashboard": 3,
+        "payment_page": 4,
+        "payment_search": 3,
+        "enrollment_autocomplete": 2,
+        "payment_create": 2,
+        "payment_export": 1,
+    },
+    "registrar": {
+        "dashboard": 3,
+        "enrollment_page": 4,
+        "enrollment_search": 3,
+        "student_autocomplete": 2,
+    },
+    "admin": {
+        "dashboard": 3,
+        "payment_page": 1,
+        "enrollment_page": 1,
+    },
+}
+
+# Admin permissions each role's group needs for its scenarios.
+ROLE_PERMISSIONS = {
+    "finance": [
+        ("finance", "payment", ("view", "add", "change")),
+        ("enrollments", "enrollment", ("view",)),
+    ],
+    "registrar": [
+        ("enrollments", "enrollment", ("view", "add", "change")),
+        ("accounts", "user", ("view",)),
+        ("courses", "batch", ("view",)),
+    ],
+}
+
+
+# --- seeding -----------------------------------------------------------------
+
+
+def _set_timestamps(model, objs, **fields):
+    for obj in objs:
+        for name, value in fields.items():
+            setattr(obj, name, value(obj) if callable(value) else value)
+    model.objects.bulk_update(objs, list(fields), batch_size=500)
+
+
+def seed(students: int, courses: int, payments_per_enrollment: int) -> dict:
+    """
+    Fill the database with courses, batches, students, enrollments with
+    installment plans, payments and one login per role. Bulk inserts skip
+    signals, so balances, the revenue cube and data versions are set here.
+    """
+    from django.contrib.auth.models import Group, Permission
+
+    from accounts.models import User
+    from core.versioning import TRACKED_MODELS, bump_data_version
+    from courses.models import Batch, Course
+    from enrollments.installments import compute_due_state
+    from enrollments.models import Enrollment, Installment
+    from finance.cube import rebuild_revenue_cube
+    from finance.models import Payment
+
+    rng = random.Random(42)
+    today = timezone.localdate()
+
+    staff = {
+        "finance": User.objects.create_user(
+            "load-finance", password=PASSWORD, is_staff=True, role=User.RoleChoices.FINANCE
+        ),
+        "registrar": User.objects.create_user("load-registrar", password=PASSWORD, is_staff=True),
+        "admin": User.objects.create_superuser("load-admin", "admin@example.com", PASSWORD),
+    }
+    for role, grants in ROLE_PERMISSIONS.items():
+        group = Group.objects.create(name="Finance" if role == "finance" else "Registrar")
+        for app_label, model, actions in grants:
+            group.permissions.add(
+                *Permission.objects.filter(
+                    content_type__app_label=app_label,
+                    codename__in=[f"{action}_{model}" for action in actions],
+                )
+            )
+        staff[role].groups.add(group)
+
+    instructors = User.objects.bulk_create(
+        [User(username=f"instructor{i}", role=User.RoleChoices.INSTRUCTOR) for i in range(max(1, courses // 2))]
+    )
+    course_objs = Course.objects.bulk_create(
+        [
+            Course(code=f"C{i:03d}", title=f"Course {i}", description="", base_fee=Decimal(rng.choice([15000, 25000, 40000])))
+            for i in range(courses)
+        ]
+    )
+    batches = Batch.objects.bulk_create(
+        [
+            Batch(
+                course=course,
+                name=f"{course.code} intake {n}",
+                instructor=instructors[(index + n) % len(instructors)],
+                start_date=today - timedelta(days=rng.randint(0, 300)),
+                end_date=today + timedelta(days=rng.randint(10, 200)),
+            )
+            for index, course in enumerate(course_objs)
+            for n in range(3)
+        ]
+    )
+    student_objs = User.objects.bulk_create(
+        [
+            User(
+                username=f"student{i:05d}",
+                first_name=rng.choice(["Amina", "Brian", "Cynthia", "David", "Esther", "Felix", "Grace"]),
+                last_name=rng.choice(["Otieno", "Wanjiku", "Kamau", "Achieng", "Mutua", "Njeri"]),
+                phone_number=f"07{i:08d}",
+                role=User.RoleChoices.STUDENT,
+            )
+            for i in range(students)
+        ],
+        batch_size=500,
+    )
+
+    enrollments = []
+    for student in student_objs:
+        for batch in rng.sample(batches, k=rng.choice([1, 1, 2])):
+            enrollments.append(Enrollment(student=student, batch=batch, agreed_fee=batch.course.base_fee))
+    Enrollment.objects.bulk_create(enrollments, batch_size=500)
+    _set_timestamps(
+        Enrollment, enrollments, created_at=lambda obj: timezone.now() - timedelta(days=rng.randint(0, 365))
+    )
+
+    installments, payments = [], []
+    for enrollment in enrollments:
+        first_due = timezone.localdate(enrollment.created_at) + timedelta(days=30)
+        parts = [enrollment.agreed_fee / 2, enrollment.agreed_fee / 2]
+        schedule = [(first_due, parts[0]), (first_due + timedelta(days=30), parts[1])]
+        installments.extend(
+            Installment(enrollment=enrollment, sequence=n, due_date=due, amount=amount)
+            for n, (due, amount) in enumerate(schedule, start=1)
+        )
+        paid = Decimal("0")
+        for _ in range(rng.randint(0, payments_per_enrollment)):
+            amount = Decimal(rng.choice([2000, 5000, 7500, 10000]))
+            if paid + amount > enrollment.agreed_fee:
+                break
+            paid += amount
+            payments.append(
+                Payment(
+                    enrollment=enrollment,
+                    amount=amount,
+                    method=rng.choice(Payment.PaymentMethod.values),
+                    reference_number=uuid.uuid4().hex[:10].upper(),
+                    received_by=staff["finance"],
+                )
+            )
+        enrollment.amount_paid = paid
+        enrollment.next_due_date, enrollment.amount_due = compute_due_state(schedule, paid)
+    Installment.objects.bulk_create(installments, batch_size=500)
+    Enrollment.objects.bulk_update(enrollments, ["amount_paid", "next_due_date", "amount_due"], batch_size=500)
+    Payment.objects.bulk_create(payments, batch_size=500)
+    _set_timestamps(Payment, payments, payment_date=lambda obj: today - timedelta(days=rng.randint(0, 365)))
+
+    rebuild_revenue_cube()
+    bump_data_version(*TRACKED_MODELS)
+    return {
+        "students": len(student_objs),
+        "enrollments": len(enrollments),
+        "payments": len(payments),
+        "enrollment_ids": [str(enrollment.pk) for enrollment in enrollments],
+        "payment_ids": [str(payment.pk) for payment in payments],
+        "search_terms": sorted({student.first_name for student in student_objs}),
+    }
+
+
+# --- server and virtual users ------------------------------------------------
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler, allow_reuse_address=False)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class VirtualUser:
+    """One logged-in browser session talking plain HTTP to the server."""
+
+    def __init__(self, role: str, port: int, data: dict, rng: random.Random):
+        self.role = role
+        self.port = port
+        self.data = data
+        self.rng = rng
+        self.cookies: dict[str, str] = {}
+
+    def request(self, method: str, path: str, fields: dict | list | None = None) -> tuple[int, bytes]:
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        headers = {"Cookie": "; ".join(f"{key}={value}" for key, value in self.cookies.items())}
+        body = None
+        if fields is not None:
+            body = urlencode(fields)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["X-CSRFToken"] = self.cookies.get(settings.CSRF_COOKIE_NAME, "")
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+            for header in response.msg.get_all("Set-Cookie") or []:
+                for key, morsel in SimpleCookie(header).items():
+                    self.cookies[key] = morsel.value
+            return response.status, content
+        finally:
+            connection.close()
+
+    def login(self) -> None:
+        self.request("GET", "/admin/login/")
+        status, _ = self.request(
+            "POST",
+            "/admin/login/?next=/admin/",
+            {
+                "username": f"load-{self.role}",
+                "password": PASSWORD,
+                "csrfmiddlewaretoken": self.cookies.get(settings.CSRF_COOKIE_NAME, ""),
+                "next": "/admin/",
+            },
+        )
+        if status != 302:
+            raise RuntimeError(f"Login failed for {self.role} (HTTP {status})")
+
+    # Each scenario returns the final HTTP status it considers a success.
+
+    def dashboard(self):
+        return self.request("GET", "/admin/"), 200
+
+    def _page(self, changelist: str, total: int):
+        pages = max(1, total // 25)
+        return self.request("GET", f"{changelist}?p={self.rng.randrange(pages) + 1}"), 200
+
+    def payment_page(self):
+        return self._page("/admin/finance/payment/", len(self.data["payment_ids"]))
+
+    def enrollment_page(self):
+        return self._page("/admin/enrollments/enrollment/", len(self.data["enrollment_ids"]))
+
+    def payment_search(self):
+        term = self.rng.choice(self.data["search_terms"])
+        return self.request("GET", f"/admin/finance/payment/?{urlencode({'q': term})}"), 200
+
+    def enrollment_search(self):
+        term = self.rng.choice(self.data["search_terms"])
+        return self.request("GET", f"/admin/enrollments/enrollment/?{urlencode({'q': term})}"), 200
+
+    def _autocomplete(self, app_label: str, model_name: str, field_name: str):
+        term = self.rng.choice(self.data["search_terms"])[:3]
+        query = urlencode({"app_label": app_label, "model_name": model_name, "field_name": field_name, "term": term})
+        return self.request("GET", f"/admin/autocomplete/?{query}"), 200
+
+    def enrollment_autocomplete(self):
+        return self._autocomplete("finance", "payment", "enrollment")
+
+    def student_autocomplete(self):
+        return self._autocomplete("enrollments", "enrollment", "student")
+
+    def payment_create(self):
+        status, content = self.request("GET", "/admin/finance/payment/add/")
+        if status != 200:
+            return (status, content), 302
+        fields = {
+            "csrfmiddlewaretoken": self.cookies.get(settings.CSRF_COOKIE_NAME, ""),
+            "enrollment": self.rng.choice(self.data["enrollment_ids"]),
+            "amount": "500.00",
+            "method": "CASH",
+            "reference_number": f"LOAD-{uuid.uuid4().hex[:12].upper()}",
+            "is_active": "on",
+            "_save": "Save",
+        }
+        return self.request("POST", "/admin/finance/payment/add/", fields), 302
+
+    def payment_export(self):
+        start = self.rng.randrange(max(1, len(self.data["payment_ids"]) - 25))
+        fields = [
+            ("csrfmiddlewaretoken", self.cookies.get(settings.CSRF_COOKIE_NAME, "")),
+            ("action", "export_payments_csv"),
+            ("index", "0"),
+        ]
+        fields += [("_selected_action", pk) for pk in self.data["payment_ids"][start : start + 25]]
+        return self.request("POST", "/admin/finance/payment/", fields), 200
+
+
+def run_user(user: VirtualUser, deadline: float, warmup_until: float, results, lock) -> None:
+    scenarios = ROLE_SCENARIOS[user.role]
+    names, weights = list(scenarios), list(scenarios.values())
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            return
+        name = user.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            (status, _), expected = getattr(user, name)()
+            ok = status == expected
+        except OSError:
+            ok = False
+        elapsed = time.perf_counter() - started
+        if started >= warmup_until:
+            with lock:
+                results[name].append((elapsed, ok))
+
+
+def _parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        role, _, count = part.partition("=")
+        if role not in ROLES or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"Use role=count with roles {', '.join(ROLES)}; got {part!r}.")
+        mix[role] = int(count)
+    return mix
+
+
+def _percentile(timings: list[float], fraction: float) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def summarize(results: dict, duration: float) -> list[dict]:
+    rows = []
+    everything = []
+    for name in sorted(results):
+        samples = results[name]
+        everything.extend(samples)
+        rows.append(_summary_row(name, samples, duration))
+    rows.append(_summary_row("total", everything, duration))
+    return rows
+
+
+def _summary_row(name: str, samples: list, duration: float) -> dict:
+    timings = sorted(elapsed for elapsed, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "scenario": name,
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / duration, 2) if duration else 0.0,
+        "mean_ms": round(statistics.fmean(timings) * 1e3, 2) if timings else 0.0,
+        "p50_ms": round(_percentile(timings, 0.50) * 1e3, 2) if timings else 0.0,
+        "p95_ms": round(_percentile(timings, 0.95) * 1e3, 2) if timings else 0.0,
+        "p99_ms": round(_percentile(timings, 0.99) * 1e3, 2) if timings else 0.0,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10, help="Virtual users, split evenly over the roles.")
+    parser.add_argument("--mix", type=_parse_mix, help="Users per role, e.g. finance=6,registrar=3,admin=1.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of measured load.")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of unmeasured load first.")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=12)
+    parser.add_argument("--payments-per-enrollment", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the scenario choices.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    mix = args.mix or {role: args.users // len(ROLES) + (index < args.users % len(ROLES)) for index, role in enumerate(ROLES)}
+
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as workdir:
+        # A file database (not :memory:) so every server thread sees the seed.
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(Path(workdir) / "load.sqlite3")
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["127.0.0.1"]):
+            old_name = connection.creation.create_test_db(verbosity=0)
+            try:
+                seeded = seed(args.students, args.courses, args.payments_per_enrollment)
+                connection.close()
+                print(
+                    f"seeded {seeded['students']} students, {seeded['enrollments']} enrollments, "
+                    f"{seeded['payments']} payments"
+                )
+
+                server = start_server()
+                port = server.server_address[1]
+                users = []
+                for role, count in mix.items():
+                    for n in range(count):
+                        user = VirtualUser(role, port, seeded, random.Random(f"{args.seed}-{role}-{n}"))
+                        user.login()
+                        users.append(user)
+
+                results: dict[str, list] = defaultdict(list)
+                for role, count in mix.items():
+                    if count:
+                        results.update({name: [] for name in ROLE_SCENARIOS[role]})
+                lock = threading.Lock()
+                warmup_until = time.perf_counter() + args.warmup
+                deadline = warmup_until + args.duration
+                threads = [
+                    threading.Thread(target=run_user, args=(user, deadline, warmup_until, results, lock))
+                    for user in users
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                server.shutdown()
+                server.server_close()
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    rows = summarize(results, args.duration)
+    users_label = ", ".join(f"{count} {role}" for role, count in mix.items() if count)
+    print(f"{len(users)} virtual users ({users_label}), {args.duration:g}s measured")
+    print(
+        f"{'scenario':<24} {'requests':>8} {'req/s':>8} {'mean ms':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    )
+    for row in rows:
+        print(
+            f"{row['scenario']:<24} {row['requests']:>8} {row['throughput_rps']:>8.1f} {row['mean_ms']:>8.1f} "
+            f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['error_rate']:>7.1%}"
+        )
+
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps(
+                {
+                    "users": mix,
+                    "duration_s": args.duration,
+                    "seed": {key: seeded[key] for key in ("students", "enrollments", "payments")},
+                    "scenarios": rows,
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Replay bursts of M-Pesa C2B confirmations against the callback endpoint.
+
+A local stand-in for Safaricom: boots the app in-process on a threaded WSGI
+server over a seeded, throwaway SQLite database, then posts confirmation
+callbacks from many concurrent connections at once, the way the provider
+does after an outage. A share of the callbacks are retries of a transaction
+already sent, and a share match no student, so idempotency and the suspense
+queue are exercised too. Each mode is checked afterwards: every distinct
+matched transaction must have exactly one payment.
+
+Modes:
+    group    callbacks are committed in batches by the writer thread (MPESA_GROUP_COMMIT)
+    inline   every request commits its own callback
+
+Usage (from backend/):
+    python benchmarks/mpesa_replay.py --callbacks 2000 --concurrency 50
+    python benchmarks/mpesa_replay.py --modes group --retries 0.3 --json mpesa.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from load_test import _summary_row, start_server  # noqa: E402
+
+TOKEN = "replay-token"
+MODES = ("group", "inline")
+
+
+def seed(students: int) -> list[dict]:
+    """Students with a phone number and one enrollment each, all with a balance due."""
+    from accounts.models import User
+    from core.versioning import TRACKED_MODELS, bump_data_version
+    from courses.models import Batch, Course
+    from enrollments.models import Enrollment
+
+    today = timezone.localdate()
+    course = Course.objects.create(code="MP101", title="Replay course", description="", base_fee=Decimal("40000"))
+    batch = Batch.objects.create(
+        course=course, name="MP101 intake", start_date=today, end_date=today + timedelta(days=90)
+    )
+    student_objs = User.objects.bulk_create(
+        [
+            User(username=f"mp{i:05d}", phone_number=f"07{i:08d}", role=User.RoleChoices.STUDENT)
+            for i in range(students)
+        ],
+        batch_size=500,
+    )
+    Enrollment.objects.bulk_create(
+        [
+            Enrollment(student=student, batch=batch, agreed_fee=course.base_fee, next_due_date=today)
+            for student in student_objs
+        ],
+        batch_size=500,
+    )
+    bump_data_version(*TRACKED_MODELS)
+    return [{"username": student.username, "msisdn": f"2547{i:08d}"} for i, student in enumerate(student_objs)]
+
+
+def make_callbacks(students: list[dict], count: int, prefix: str, retries: float, unmatched: float, rng) -> list[dict]:
+    """
+    `count` confirmation bodies: most pay with the student's username as
+    the account reference, some leave it blank so only the phone number
+    matches, `unmatched` of them match nobody and `retries` of them repeat
+    an earlier transaction.
+    """
+    callbacks = []
+    for n in range(count):
+        if callbacks and rng.random() < retries:
+            callbacks.append(rng.choice(callbacks))
+            continue
+        student = rng.choice(students)
+        reference, msisdn = student["username"], student["msisdn"]
+        if rng.random() < unmatched:
+            reference, msisdn = f"UNKNOWN{n}", "254799999999"
+        elif rng.random() < 0.2:
+            reference = ""
+        callbacks.append(
+            {
+                "TransactionType": "Pay Bill",
+                "TransID": f"{prefix}{n:07d}",
+                "TransTime": timezone.localtime().strftime("%Y%m%d%H%M%S"),
+                "TransAmount": str(rng.choice([500, 1000, 2500, 5000])),
+                "BusinessShortCode": "600000",
+                "BillRefNumber": reference,
+                "MSISDN": msisdn,
+                "FirstName": "Replay",
+                "LastName": "Payer",
+            }
+        )
+    return callbacks
+
+
+def post(port: int, body: dict) -> tuple[float, bool]:
+    started = time.perf_counter()
+    client = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        client.request(
+            "POST",
+            f"/api/payments/mpesa/{TOKEN}/confirmation/",
+            body=json.dumps(body),
+            headers={"Content-Type": "application/json"},
+        )
+        response = client.getresponse()
+        ok = response.status == 200 and json.loads(response.read())["ResultCode"] == 0
+    except OSError:
+        ok = False
+    finally:
+        client.close()
+    return time.perf_counter() - started, ok
+
+
+def replay(port: int, callbacks: list[dict], concurrency: int, burst: int) -> tuple[list, float]:
+    """Send the callbacks in bursts of `burst`, each fired from `concurrency` connections at once."""
+    samples = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(callbacks), burst):
+            samples.extend(pool.map(lambda body: post(port, body), callbacks[start : start + burst]))
+    return samples, time.perf_counter() - started
+
+
+def check(callbacks: list[dict], prefix: str) -> dict:
+    """Compare what was stored with what was sent."""
+    from finance.models import MpesaCallback, Payment
+
+    stored = MpesaCallback.objects.filter(trans_id__startswith=prefix)
+    matched = stored.filter(status=MpesaCallback.Status.MATCHED).count()
+    payments = Payment.objects.filter(reference_number__startswith=prefix).count()
+    return {
+        "sent": len(callbacks),
+        "distinct": len({body["TransID"] for body in callbacks}),
+        "stored": stored.count(),
+        "matched": matched,
+        "suspense": stored.filter(status=MpesaCallback.Status.SUSPENSE).count(),
+        "payments": payments,
+        "consistent": payments == matched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--callbacks", type=int, default=2000, help="Callbacks sent per mode.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Connections posting at once.")
+    parser.add_argument("--burst", type=int, default=500, help="Callbacks per burst.")
+    parser.add_argument("--retries", type=float, default=0.1, help="Share of callbacks that repeat an earlier one.")
+    parser.add_argument("--unmatched", type=float, default=0.05, help="Share of callbacks no student matches.")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated: group, inline.")
+    parser.add_argument("--max-batch", type=int, default=100, help="MPESA_MAX_COMMIT_BATCH for the group mode.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+    modes = [mode for mode in args.modes.split(",") if mode]
+    if set(modes) - set(MODES):
+        parser.error(f"--modes takes {', '.join(MODES)}.")
+
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    rng = random.Random(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # A file database (not :memory:) so every server thread sees the seed.
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(Path(workdir) / "mpesa.sqlite3")
+        with override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=["127.0.0.1"],
+            MPESA_CALLBACK_TOKEN=TOKEN,
+            MPESA_MAX_COMMIT_BATCH=args.max_batch,
+        ):
+            old_name = connection.creation.create_test_db(verbosity=0)
+            try:
+                students = seed(args.students)
+                connection.close()
+                print(f"seeded {len(students)} students with a balance due")
+                server = start_server()
+                port = server.server_address[1]
+                for mode in modes:
+                    prefix = f"{mode[0].upper()}R"
+                    callbacks = make_callbacks(students, args.callbacks, prefix, args.retries, args.unmatched, rng)
+                    with override_settings(MPESA_GROUP_COMMIT=mode == "group"):
+                        samples, elapsed = replay(port, callbacks, args.concurrency, args.burst)
+                    row = _summary_row(mode, samples, elapsed)
+                    row.update(check(callbacks, prefix), elapsed_s=round(elapsed, 2))
+                    results.append(row)
+                    connection.close()
+                server.shutdown()
+                server.server_close()
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print(f"{args.callbacks} callbacks per mode, {args.concurrency} connections, bursts of {args.burst}")
+    print(
+        f"{'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} "
+        f"{'distinct':>8} {'matched':>8} {'suspense':>8} {'payments':>8}  check"
+    )
+    for row in results:
+        print(
+            f"{row['scenario']:<8} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['error_rate']:>7.1%} {row['distinct']:>8} {row['matched']:>8} "
+            f"{row['suspense']:>8} {row['payments']:>8}  {'ok' if row['consistent'] else 'MISMATCH'}"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "modes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark the per-request cost of loading the session and authenticated user.
+
+Compares Django's database session backend plus the stock
+AuthenticationMiddleware against the configured cache-backed sessions plus
+accounts.middleware.CachedAuthenticationMiddleware. Each request goes
+through the session and auth middleware to a view that reads
+`request.user`, which is what every admin page does before its own work.
+
+Runs against a throwaway test database (which also holds the shared cache
+table).
+
+Usage (from backend/):
+    python benchmarks/request_overhead.py --requests 5000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import Client, RequestFactory, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from django.utils.module_loading import import_string  # noqa: E402
+
+SESSION_MIDDLEWARE = "django.contrib.sessions.middleware.SessionMiddleware"
+
+CONFIGURATIONS = {
+    "database sessions + default auth": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "auth_middleware": "django.contrib.auth.middleware.AuthenticationMiddleware",
+    },
+    "cached sessions + cached user": {
+        "SESSION_ENGINE": settings.SESSION_ENGINE,
+        "auth_middleware": "accounts.middleware.CachedAuthenticationMiddleware",
+    },
+}
+
+
+def _view(request):
+    return HttpResponse(request.user.get_username())
+
+
+def _build_handler(auth_middleware: str):
+    handler = _view
+    for path in reversed((SESSION_MIDDLEWARE, auth_middleware)):
+        handler = import_string(path)(handler)
+    return handler
+
+
+def _run(name: str, config: dict, user, requests: int) -> dict:
+    middleware = [
+        config["auth_middleware"] if "AuthenticationMiddleware" in path else path
+        for path in settings.MIDDLEWARE
+    ]
+    with override_settings(SESSION_ENGINE=config["SESSION_ENGINE"], MIDDLEWARE=middleware):
+        client = Client()
+        client.force_login(user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        handler = _build_handler(config["auth_middleware"])
+        factory = RequestFactory()
+
+        def request_once():
+            request = factory.get("/admin/")
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = cookie
+            response = handler(request)
+            assert response.content == user.get_username().encode()
+
+        # Warm up caches and connections before timing.
+        for _ in range(50):
+            request_once()
+
+        with CaptureQueriesContext(connection) as queries:
+            request_once()
+
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            request_once()
+            timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    return {
+        "name": name,
+        "queries": len(queries),
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p95_us": timings[int(len(timings) * 0.95)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        from accounts.models import User
+
+        user = User.objects.create_user("bench-officer", password="bench-pass", is_staff=True)
+        results = [_run(name, config, user, args.requests) for name, config in CONFIGURATIONS.items()]
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print(f"{'configuration':<36} {'queries':>7} {'mean µs':>9} {'p50 µs':>9} {'p95 µs':>9}")
+    for result in results:
+        print(
+            f"{result['name']:<36} {result['queries']:>7} {result['mean_us']:>9.1f} "
+            f"{result['p50_us']:>9.1f} {result['p95_us']:>9.1f}"
+        )
+    baseline, cached = results
+    print(f"speed-up: {baseline['mean_us'] / cached['mean_us']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
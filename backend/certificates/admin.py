@@ -0,0 +1,121 @@
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.db.models import Count, Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
+from unfold.admin import ModelAdmin
+from courses.models import Batch
+from enrollments.models import Enrollment
+from .models import Certificate
+from .services import generate_certificates, iter_certificates_zip
+
+
+@admin.register(Certificate)
+class CertificateAdmin(ModelAdmin):
+    """Certificates are generated a batch at a time from the ended batches page."""
+    list_display = ('number', 'enrollment', 'rendered_at', 'download_link')
+    list_filter = ('enrollment__batch__course', 'rendered_at')
+    list_select_related = ('enrollment__student', 'enrollment__batch')
+    search_fields = ('number', 'enrollment__student__username', 'enrollment__batch__name')
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_generate_permission(self, request):
+        """Generating is the only way certificates change, so it takes the change permission."""
+        return super().has_change_permission(request)
+
+    def get_urls(self):
+        urls = [
+            path(
+                'batches/',
+                self.admin_site.admin_view(self.batches_view),
+                name='certificates_certificate_batches',
+            ),
+            path(
+                'batches/<uuid:batch_id>/generate/',
+                self.admin_site.admin_view(require_POST(self.generate_view)),
+                name='certificates_certificate_generate',
+            ),
+            path(
+                'batches/<uuid:batch_id>/download/',
+                self.admin_site.admin_view(self.download_batch_view),
+                name='certificates_certificate_download_batch',
+            ),
+            path(
+                '<uuid:object_id>/pdf/',
+                self.admin_site.admin_view(self.pdf_view),
+                name='certificates_certificate_pdf',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def batches_view(self, request):
+        """Recently ended batches with their completed students and certificates."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        batches = (
+            Batch.objects.filter(end_date__lt=timezone.localdate())
+            .select_related('course')
+            .annotate(
+                completed=Count('enrollments', filter=Q(enrollments__status=Enrollment.StatusChoices.COMPLETED)),
+                certificates=Count('enrollments__certificate'),
+            )
+            .order_by('-end_date')[:50]
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Completion certificates",
+            'opts': self.model._meta,
+            'batches': batches,
+            'can_generate': self.has_generate_permission(request),
+        }
+        return TemplateResponse(request, 'admin/certificates/certificate/batches.html', context)
+
+    def generate_view(self, request, batch_id):
+        if not self.has_generate_permission(request):
+            raise PermissionDenied
+        batch = get_object_or_404(Batch, pk=batch_id)
+        result = generate_certificates([batch.pk], force=bool(request.POST.get('force')))
+        self.message_user(
+            request,
+            f"{batch}: {result['certificates']} certificates, {result['rendered']} rendered, "
+            f"{result['removed']} removed.",
+            messages.SUCCESS,
+        )
+        return redirect('admin:certificates_certificate_batches')
+
+    def download_batch_view(self, request, batch_id):
+        """Stream the batch's generated certificates as one zip. Read-only: generating is a POST."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        batch = get_object_or_404(Batch.objects.select_related('course'), pk=batch_id)
+        response = StreamingHttpResponse(iter_certificates_zip(batch.pk), content_type='application/zip')
+        filename = f"certificates-{batch.course.code}-{batch.start_date:%Y%m%d}.zip"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def pdf_view(self, request, object_id):
+        certificate = get_object_or_404(Certificate, pk=object_id)
+        if not self.has_view_permission(request, certificate):
+            raise PermissionDenied
+        return FileResponse(
+            default_storage.open(certificate.file),
+            as_attachment=True,
+            filename=f"{certificate.number}.pdf",
+            content_type='application/pdf',
+        )
+
+    @admin.display(description="PDF")
+    def download_link(self, obj):
+        return format_html('<a href="{}">Download</a>', reverse('admin:certificates_certificate_pdf', args=[obj.pk]))
@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from certificates.services import generate_certificates
+from courses.models import Batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Render completion certificates for the completed enrollments of ended "
+        "batches. Certificates whose details have not changed are left alone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", action="append", default=[], help="Batch id; may be repeated.")
+        parser.add_argument(
+            "--ended-after",
+            help="Include every batch that ended on or after this date (YYYY-MM-DD) and before today.",
+        )
+        parser.add_argument("--force", action="store_true", help="Render every certificate again.")
+        parser.add_argument("--workers", type=int, help="Worker processes (default: CERTIFICATE_WORKERS).")
+
+    def handle(self, *args, **options):
+        batch_ids = list(options["batch"])
+        if options["ended_after"]:
+            try:
+                ended_after = date.fromisoformat(options["ended_after"])
+            except ValueError as exc:
+                raise CommandError("--ended-after must be YYYY-MM-DD.") from exc
+            batch_ids += Batch.objects.filter(
+                end_date__gte=ended_after,
+                end_date__lt=timezone.localdate(),
+            ).values_list("pk", flat=True)
+        if not batch_ids:
+            raise CommandError("Pass --batch or --ended-after.")
+
+        totals = generate_certificates(batch_ids, force=options["force"], workers=options["workers"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{totals['certificates']} certificate(s) up to date: {totals['rendered']} rendered, "
+                f"{totals['removed']} removed."
+            )
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:43
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('enrollments', '0003_status_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Certificate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('number', models.CharField(max_length=64, unique=True)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('file', models.CharField(help_text='Path of the PDF in the default storage', max_length=255)),
+                ('rendered_at', models.DateTimeField()),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='certificate', to='enrollments.enrollment')),
+            ],
+            options={
+                'ordering': ['number'],
+            },
+        ),
+    ]
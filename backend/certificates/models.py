@@ -0,0 +1,22 @@
+from django.db import models
+from core.models import TimeStampedModel
+from enrollments.models import Enrollment
+
+
+class Certificate(TimeStampedModel):
+    """
+    The completion certificate of an enrollment. The PDF is stored under
+    its content hash, so a certificate whose inputs have not changed is
+    never rendered twice.
+    """
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='certificate')
+    number = models.CharField(max_length=64, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    file = models.CharField(max_length=255, help_text="Path of the PDF in the default storage")
+    rendered_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['number']
+
+    def __str__(self):
+        return self.number
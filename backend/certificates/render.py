@@ -0,0 +1,108 @@
+"""
+Certificate rendering.
+
+A certificate is a one-page landscape A4 PDF written directly, using the
+standard Helvetica fonts every PDF reader ships, so no PDF library is
+needed. This module deliberately imports nothing from Django: it runs in
+worker processes that only receive the plain inputs dict and return the
+PDF bytes.
+
+The output depends on nothing but the inputs (no creation date is
+written), which is what makes content-hash caching sound. Bump
+LAYOUT_VERSION whenever the layout changes so existing certificates are
+rendered again.
+"""
+
+LAYOUT_VERSION = 1
+
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595  # A4 landscape, in points
+
+# Advance widths (1/1000 em) of the printable ASCII characters 32-126, from
+# the Adobe font metrics of the standard fonts. Other characters use the
+# width of a digit, which is close enough for centring a line.
+_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+FONTS = {"F1": ("Helvetica", _HELVETICA), "F2": ("Helvetica-Bold", _HELVETICA_BOLD)}
+
+
+def text_width(text: str, font: str, size: float) -> float:
+    widths = FONTS[font][1]
+    return sum(widths[ord(char) - 32] if 32 <= ord(char) <= 126 else 556 for char in text) * size / 1000
+
+
+def _pdf_string(text: str) -> bytes:
+    # The fonts use WinAnsiEncoding (cp1252); anything outside it prints as "?".
+    encoded = text.encode("cp1252", errors="replace")
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _centred(text: str, font: str, size: float, y: float) -> bytes:
+    x = (PAGE_WIDTH - text_width(text, font, size)) / 2
+    return b"BT /%s %g Tf %.2f %.2f Td %s Tj ET\n" % (font.encode(), size, x, y, _pdf_string(text))
+
+
+def _page_content(inputs: dict) -> bytes:
+    lines = [
+        ("F2", 34, 440, "Certificate of Completion"),
+        ("F1", 15, 392, "This is to certify that"),
+        ("F2", 28, 344, inputs["student_name"]),
+        ("F1", 15, 300, "has successfully completed the course"),
+        ("F2", 20, 262, f"{inputs['course_code']} - {inputs['course_title']}"),
+        ("F1", 13, 228, f"{inputs['batch_name']}, {inputs['start_date']} to {inputs['end_date']}"),
+        ("F1", 10, 96, f"Certificate no. {inputs['number']}"),
+    ]
+    return (
+        # Double frame around the page.
+        b"0.15 0.25 0.45 RG 3 w 28 28 786 539 re S 1 w 38 38 766 519 re S\n"
+        b"0.1 0.1 0.1 rg\n"
+        + b"".join(_centred(text, font, size, y) for font, size, y, text in lines)
+        # Signature line.
+        + b"0.4 0.4 0.4 RG 321 150 m 521 150 l S\n"
+        + _centred("Registrar", "F1", 11, 134)
+    )
+
+
+def render_certificate(inputs: dict) -> bytes:
+    """Return the certificate PDF for `inputs` (see services.certificate_inputs)."""
+    content = _page_content(inputs)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> >>" % (PAGE_WIDTH, PAGE_HEIGHT),
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        *(
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % name.encode()
+            for name, _ in FONTS.values()
+        ),
+        b"<< /Title %s >>" % _pdf_string(f"Certificate {inputs['number']}"),
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        len(objects),
+        xref,
+    )
+    return bytes(out)
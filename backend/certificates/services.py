@@ -0,0 +1,188 @@
+import hashlib
+import json
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from enrollments.models import Enrollment
+
+from .models import Certificate
+from .render import LAYOUT_VERSION, render_certificate
+
+CERTIFICATE_DIR = "certificates"
+# A certificate renders in about 0.1 ms while spawning the workers takes
+# a few tenths of a second, so the pool only pays off for large runs such
+# as re-rendering every batch after a layout change.
+MIN_POOL_SIZE = 5000
+
+
+def certificate_number(course_code: str, enrollment_id) -> str:
+    return f"{course_code}-{enrollment_id.hex[:10].upper()}"
+
+
+def certificate_inputs(batch_ids) -> dict:
+    """
+    Return `{enrollment_id: inputs}` for the COMPLETED enrollments of the
+    batches: everything printed on their certificates, as plain strings.
+    """
+    rows = Enrollment.objects.filter(
+        batch_id__in=batch_ids,
+        status=Enrollment.StatusChoices.COMPLETED,
+    ).values_list(
+        "pk",
+        "student__username",
+        "student__first_name",
+        "student__last_name",
+        "batch__name",
+        "batch__start_date",
+        "batch__end_date",
+        "batch__course__code",
+        "batch__course__title",
+    )
+    return {
+        pk: {
+            "number": certificate_number(course_code, pk),
+            "student_name": f"{first_name} {last_name}".strip() or username,
+            "course_code": course_code,
+            "course_title": course_title,
+            "batch_name": batch_name,
+            "start_date": start_date.strftime("%d %B %Y"),
+            "end_date": end_date.strftime("%d %B %Y"),
+        }
+        for pk, username, first_name, last_name, batch_name, start_date, end_date, course_code, course_title in rows
+    }
+
+
+def content_hash(inputs: dict) -> str:
+    payload = json.dumps({"layout": LAYOUT_VERSION, **inputs}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def certificate_path(digest: str) -> str:
+    return f"{CERTIFICATE_DIR}/{digest[:2]}/{digest}.pdf"
+
+
+def _render_all(pending: dict, workers: int):
+    """
+    Yield `(digest, pdf)` for every `{digest: inputs}` in `pending`. Large
+    runs are spread over a pool of worker processes; rendering is pure
+    CPU work, so threads would serialize on the GIL. Workers are spawned
+    rather than forked, so they never inherit the server's threads or
+    database connections.
+    """
+    if workers <= 1 or len(pending) < MIN_POOL_SIZE:
+        for digest, inputs in pending.items():
+            yield digest, render_certificate(inputs)
+        return
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        chunksize = max(1, len(pending) // (workers * 4))
+        yield from zip(pending, pool.map(render_certificate, pending.values(), chunksize=chunksize))
+
+
+def generate_certificates(batch_ids, force: bool = False, workers: int | None = None) -> dict:
+    """
+    Bring the certificates of the batches' COMPLETED enrollments up to date.
+
+    Each certificate's inputs are hashed; only those whose PDF is not
+    already in storage under that hash are rendered (all of them with
+    `force`). Certificates of enrollments that are no longer COMPLETED are
+    removed. Returns counts of current, rendered and removed certificates.
+    """
+    workers = workers or getattr(settings, "CERTIFICATE_WORKERS", 4)
+    inputs = certificate_inputs(batch_ids)
+    digests = {pk: content_hash(values) for pk, values in inputs.items()}
+    current = {
+        enrollment_id: (digest, path)
+        for enrollment_id, digest, path in Certificate.objects.filter(enrollment__batch_id__in=batch_ids).values_list(
+            "enrollment_id", "content_hash", "file"
+        )
+    }
+
+    # A PDF is rendered once per distinct hash, even if its row was deleted
+    # while the file remained.
+    pending = {
+        digest: inputs[pk]
+        for pk, digest in digests.items()
+        if force or not default_storage.exists(certificate_path(digest))
+    }
+    for digest, pdf in _render_all(pending, workers):
+        path = certificate_path(digest)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, ContentFile(pdf))
+
+    now = timezone.now()
+    changed = [
+        Certificate(
+            enrollment_id=pk,
+            number=inputs[pk]["number"],
+            content_hash=digest,
+            file=certificate_path(digest),
+            rendered_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        for pk, digest in digests.items()
+        if force or current.get(pk, (None,))[0] != digest
+    ]
+    removed = current.keys() - digests.keys()
+    with transaction.atomic():
+        Certificate.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=["enrollment"],
+            update_fields=["content_hash", "file", "rendered_at", "updated_at"],
+            batch_size=500,
+        )
+        Certificate.objects.filter(enrollment_id__in=removed).delete()
+
+    # Files nothing points to any more: superseded versions and removed
+    # certificates.
+    stale = {current[pk][1] for pk in current if current[pk][0] != digests.get(pk)}
+    transaction.on_commit(lambda: [default_storage.delete(path) for path in stale])
+    return {"certificates": len(digests), "rendered": len(pending), "removed": len(removed)}
+
+
+class _ZipStream:
+    """Write-only file for ZipFile that hands back what has been written since the last read."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def read_written(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def iter_certificates_zip(batch_id):
+    """
+    Yield a zip archive of the batch's certificates chunk by chunk, one
+    PDF at a time, so the response starts immediately and memory stays
+    flat whatever the batch size.
+    """
+    certificates = (
+        Certificate.objects.filter(enrollment__batch_id=batch_id)
+        .order_by("enrollment__student__username")
+        .values_list("file", "number", "enrollment__student__username")
+    )
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, number, username in certificates.iterator(chunk_size=500):
+            with default_storage.open(path) as pdf:
+                archive.writestr(f"{username}-{number}.pdf", pdf.read())
+            yield stream.read_written()
+    yield stream.read_written()
@@ -0,0 +1,95 @@
+import io
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from certificates.models import Certificate
+from core.testing import QueryBudgetTestCase, admin_url, create_batch, create_student
+from enrollments.models import Enrollment
+
+
+class CertificateAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(11, admin_url(Certificate, "changelist"))
+
+    def test_change(self):
+        self.assertQueryBudget(12, admin_url(Certificate, "change", self.rows[0]["certificate"].pk))
+
+    def test_batches(self):
+        self.assertQueryBudget(8, reverse("admin:certificates_certificate_batches"))
+
+
+@override_settings(STORAGES={**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"}})
+class CertificateAdminPermissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.batch = create_batch(start_date=today - timedelta(days=90), end_date=today - timedelta(days=1))
+        cls.enrollment = Enrollment.objects.create(
+            student=create_student(),
+            batch=cls.batch,
+            agreed_fee=Decimal("100"),
+            status=Enrollment.StatusChoices.COMPLETED,
+        )
+        cls.staff = User.objects.create_user("clerk", is_staff=True, role=User.RoleChoices.INSTRUCTOR)
+        cls.viewer = User.objects.create_user("registrar", is_staff=True, role=User.RoleChoices.INSTRUCTOR)
+        cls.viewer.user_permissions.add(Permission.objects.get(codename="view_certificate"))
+        cls.issuer = User.objects.create_user("issuer", is_staff=True, role=User.RoleChoices.INSTRUCTOR)
+        cls.issuer.user_permissions.add(Permission.objects.get(codename="change_certificate"))
+
+    def setUp(self):
+        default_storage.save("certificates/test.pdf", ContentFile(b"%PDF-1.4 test"))
+        self.certificate = Certificate.objects.create(
+            enrollment=self.enrollment,
+            number="CERT-1",
+            content_hash="0" * 64,
+            file="certificates/test.pdf",
+            rendered_at=timezone.now(),
+        )
+        self.urls = {
+            "batches": reverse("admin:certificates_certificate_batches"),
+            "download": reverse("admin:certificates_certificate_download_batch", args=[self.batch.pk]),
+            "pdf": reverse("admin:certificates_certificate_pdf", args=[self.certificate.pk]),
+        }
+        self.generate_url = reverse("admin:certificates_certificate_generate", args=[self.batch.pk])
+
+    def test_staff_without_permission_is_refused(self):
+        self.client.force_login(self.staff)
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.post(self.generate_url).status_code, 403)
+
+    def test_viewer_can_download_but_not_generate(self):
+        self.client.force_login(self.viewer)
+        response = self.client.get(self.urls["batches"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, self.generate_url)
+        self.assertEqual(b"".join(self.client.get(self.urls["pdf"]).streaming_content), b"%PDF-1.4 test")
+        self.assertEqual(self.client.post(self.generate_url).status_code, 403)
+
+    def test_download_does_not_generate(self):
+        self.client.force_login(self.viewer)
+        # The enrollment's details no longer match the stored certificate.
+        response = self.client.get(self.urls["download"])
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f"{self.enrollment.student.username}-CERT-1.pdf"])
+        self.certificate.refresh_from_db()
+        self.assertEqual(self.certificate.content_hash, "0" * 64)
+        self.assertTrue(default_storage.exists("certificates/test.pdf"))
+
+    def test_issuer_can_generate(self):
+        self.client.force_login(self.issuer)
+        self.assertContains(self.client.get(self.urls["batches"]), self.generate_url)
+        self.assertRedirects(self.client.post(self.generate_url), self.urls["batches"])
+        self.certificate.refresh_from_db()
+        self.assertNotEqual(self.certificate.content_hash, "0" * 64)
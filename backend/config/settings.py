@@ -40,6 +40,8 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Let runserver serve static files through WhiteNoise too, as in production
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     
     # Baptist ICT Core Apps
@@ -48,16 +50,30 @@ INSTALLED_APPS = [
     'courses',
     'enrollments',
     'finance',
+    'archive',
+    'notifications',
+    'profiling',
+    'portal',
+    'attendance',
+    'assessments',
+    'certificates',
+    'analytics',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves hashed, precompressed static files straight from the app
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Serves request.user from the cache instead of the database on every request
+    'accounts.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, so request.user is known; costs one settings lookup unless enabled
+    'profiling.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -87,10 +103,63 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Concurrent admin writes: take the write lock when a transaction
+        # starts (a deferred read-then-write cannot wait and fails with
+        # "database is locked"), wait for it instead of erroring, and use WAL
+        # so readers are never blocked by a writer. WAL is recorded in the
+        # file itself and leaves -wal/-shm files beside it while connected;
+        # the database is local to each checkout (`manage.py migrate`), not
+        # tracked in git.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+#
+# "default" is per-process memory for fragments. "shared" holds what every
+# worker must see the same way: sessions, cached users and their
+# invalidation, portal summaries, the duplicate scan and assessment stats.
+# It is a database table (create it with `manage.py createcachetable`), so
+# a read costs one indexed query; deployments with Redis should point it at
+# django.core.cache.backends.redis.RedisCache, which makes those reads free.
+# Don't use FileBasedCache here: it lists the whole directory to cull on
+# every set() and reads a file per request for the cached user.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ict-lms-default',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+
+# Sessions are read through the shared cache but are stored in the
+# database: the shared cache culls entries once it holds MAX_ENTRIES (the
+# portal, grade and duplicate caches fill it too), and a culled session
+# must not log anyone out. Expired rows are removed by
+# `manage.py clearsessions`.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+
+# Cached request.user (accounts.middleware.CachedAuthenticationMiddleware).
+# Entries are dropped when the user is saved, so the cache must be shared
+# by every worker process for all of them to see the invalidation.
+ACCOUNTS_USER_CACHE_ALIAS = 'shared'
+ACCOUNTS_USER_CACHE_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -126,10 +195,152 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+
+# Generated files (certificates). Not served directly: downloads go through
+# views that check permissions.
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# collectstatic writes content-hashed copies of every asset plus .gz and .br
+# variants; WhiteNoise serves the hashed names with a far-future immutable
+# Cache-Control header and picks the smallest encoding the browser accepts.
+# Without a manifest (collectstatic not run) the manifest storage raises
+# instead of serving unhashed names under those headers; only DEBUG (and
+# the test runner, which loads these settings) uses the plain names.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage'
+            if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
 
 # Tell Django to use our custom role-based User model
 AUTH_USER_MODEL = 'accounts.User'
 
+# Wall-display KPI API: how long (seconds) a poller may reuse a response
+# before revalidating it with its ETag.
+KPI_API_MAX_AGE = 5
+# Kiosk tokens are sent as `Authorization: Token <key>`. Accepting
+# `?token=<key>` as well puts the key in access logs, proxy logs and
+# profile captures; enable it only for displays that cannot set headers.
+KIOSK_TOKEN_QUERY_PARAM = False
+
+# Live dashboard feed. With DASHBOARD_LIVE_EVENTS each open dashboard keeps
+# a server-sent event stream open, which needs an ASGI server (e.g.
+# `uvicorn config.asgi:application`); under WSGI (runserver, gunicorn sync
+# workers) every open tab would hold a worker thread. Events are published
+# in-process, so the stream URL must be served by a single worker process.
+# When off, the dashboard polls its KPI endpoint every
+# DASHBOARD_POLL_INTERVAL seconds (answered with 304 until the data changes)
+# and reloads its feeds when the ETag changes.
+DASHBOARD_LIVE_EVENTS = False
+DASHBOARD_POLL_INTERVAL = 30
+# Seconds between keep-alive comments on idle event streams.
+EVENT_STREAM_HEARTBEAT = 15
+
+# Upper bound (seconds) on how long a dashboard widget fragment is reused.
+# Fragments are keyed on data versions, so they refresh as soon as the
+# underlying rows change; this only limits cache growth.
+DASHBOARD_FRAGMENT_CACHE_TIMEOUT = 300
+
+# Archival: batches that ended more than this many days ago (and are fully
+# paid) are moved out of the live tables by `manage.py archive_batches`.
+ARCHIVE_AFTER_DAYS = 365
+
+# Lifecycle rules (`manage.py apply_lifecycle_rules`): an active enrollment is
+# suspended once an installment is more than ENROLLMENT_SUSPEND_GRACE_DAYS
+# overdue and at least ENROLLMENT_SUSPEND_DEBT (KES) of the fee is unpaid.
+ENROLLMENT_SUSPEND_DEBT = 10000
+ENROLLMENT_SUSPEND_GRACE_DAYS = 30
+
+# Duplicate students (admin "Duplicate students", `manage.py
+# find_duplicate_students`): pairs scoring at least the threshold (0-1) are
+# grouped; blocks of more than DUPLICATE_STUDENT_MAX_BLOCK students sharing
+# a key are not compared pair by pair. Results are cached until a user
+# changes (logins aside).
+DUPLICATE_STUDENT_THRESHOLD = 0.7
+DUPLICATE_STUDENT_MAX_BLOCK = 500
+DUPLICATE_STUDENT_CACHE_ALIAS = 'shared'
+
+# Fee reminders (`manage.py send_fee_reminders`). Point SMS at a provider
+# gateway class in production; FileGateway and ConsoleGateway never send,
+# and their reminders are recorded as LOGGED so a real gateway still sends
+# them later in the cycle. A reminder claimed by a run that died before
+# recording the outcome is retried after FEE_REMINDER_CLAIM_TIMEOUT seconds.
+NOTIFICATION_GATEWAYS = {
+    'SMS': {'BACKEND': 'notifications.gateways.ConsoleGateway'},
+    'EMAIL': {'BACKEND': 'notifications.gateways.EmailGateway'},
+}
+FEE_REMINDER_WORKERS = 4
+FEE_REMINDER_RATE_LIMIT = 20  # messages per second, across all workers
+FEE_REMINDER_CLAIM_TIMEOUT = 6 * 60 * 60
+
+# M-Pesa C2B confirmations are posted to /api/payments/mpesa/<token>/confirmation/;
+# register that URL with the real token, and leave the token empty to turn
+# the endpoint off. Callbacks are committed in batches of up to
+# MPESA_MAX_COMMIT_BATCH by one writer thread per process and acknowledged
+# once committed, or refused after MPESA_ACK_TIMEOUT seconds so the
+# provider retries. Payments are recorded as received by MPESA_SYSTEM_USERNAME.
+MPESA_CALLBACK_TOKEN = ''
+MPESA_GROUP_COMMIT = True
+MPESA_MAX_COMMIT_BATCH = 100
+MPESA_ACK_TIMEOUT = 10
+MPESA_SYSTEM_USERNAME = 'mpesa'
+
+# Student portal (/portal/): each student's page data is cached here until
+# their enrollments or payments change. Use a cache every worker shares.
+PORTAL_CACHE_ALIAS = 'shared'
+PORTAL_CACHE_TIMEOUT = 3600
+
+# Grade reports (Academics > Assessments) are computed in one pass over a
+# batch's score matrix and cached until its grades change. The pass mark
+# applies to percentages, both per assessment and for final marks.
+ASSESSMENT_PASS_MARK = 50
+ASSESSMENT_STATS_CACHE_ALIAS = 'shared'
+ASSESSMENT_STATS_CACHE_TIMEOUT = 24 * 3600
+
+# Completion certificates are rendered in this many worker processes and
+# stored under MEDIA_ROOT/certificates/, named by a hash of their content.
+CERTIFICATE_WORKERS = 4
+
+# Analytics export (`manage.py export_analytics`, needs the `analytics`
+# extra): Arrow files analysts can query instead of copying the database.
+# Each run re-reads rows updated up to ANALYTICS_EXPORT_OVERLAP seconds
+# before the newest one already exported, and a table's files are compacted
+# into one once there are more than ANALYTICS_COMPACT_AFTER of them.
+ANALYTICS_EXPORT_DIR = BASE_DIR / 'exports'
+ANALYTICS_EXPORT_COMPRESSION = 'zstd'  # 'lz4', or None for zero-copy reads
+ANALYTICS_EXPORT_OVERLAP = 300
+ANALYTICS_COMPACT_AFTER = 24
+
+# Online database backups (`manage.py backup_database` / `restore_database`).
+# The copy advances BACKUP_PAGES_PER_STEP pages at a time and sleeps
+# BACKUP_STEP_SLEEP seconds between steps, so writers are never held up.
+# After each backup the newest BACKUP_KEEP_LAST are kept, plus the newest of
+# each of the last BACKUP_KEEP_DAILY days and BACKUP_KEEP_MONTHLY months.
+BACKUP_DIR = BASE_DIR / 'backups'
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.002
+BACKUP_COMPRESS = True
+BACKUP_KEEP_LAST = 7
+BACKUP_KEEP_DAILY = 14
+BACKUP_KEEP_MONTHLY = 12
+
+# Request profiling, browsed under System > Request profiles. A superuser can
+# profile any request by adding ?_profile=1 (or an `X-Profile: 1` header).
+# Set PROFILING_SLOW_REQUEST_MS to also sample every request and keep the
+# ones slower than it; leave it None to profile only on demand.
+PROFILING_SLOW_REQUEST_MS = None
+PROFILING_SAMPLE_INTERVAL_MS = 5
+PROFILING_MAX_CAPTURES = 200
+
 from django.templatetags.static import static
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
@@ -176,6 +387,14 @@ def _sidebar_system_permission(request):
     return False
 
 
+def _sidebar_superuser_permission(request):
+    """
+    Request profiles contain raw SQL and parameters; superusers only.
+    """
+    user = request.user
+    return getattr(user, "is_authenticated", False) and user.is_superuser
+
+
 def _sidebar_registrar_permission(request):
     """
     Registrar should only see enrollment-related sections, not course/batch management.
@@ -256,6 +475,11 @@ UNFOLD = {
                         "icon": "people",
                         "link": reverse_lazy("admin:accounts_user_changelist"),
                     },
+                    {
+                        "title": _("Duplicate students"),
+                        "icon": "group_work",
+                        "link": reverse_lazy("admin:accounts_user_duplicates"),
+                    },
                 ],
             },
             {
@@ -274,6 +498,36 @@ UNFOLD = {
                         "icon": "class",
                         "link": reverse_lazy("admin:courses_batch_changelist"),
                     },
+                    {
+                        "title": _("Schedule conflicts"),
+                        "icon": "event_busy",
+                        "link": reverse_lazy("admin:courses_batch_conflicts"),
+                    },
+                    {
+                        "title": _("Class sessions"),
+                        "icon": "event_available",
+                        "link": reverse_lazy("admin:attendance_classsession_changelist"),
+                    },
+                    {
+                        "title": _("Attendance at risk"),
+                        "icon": "person_alert",
+                        "link": reverse_lazy("admin:attendance_classsession_at_risk"),
+                    },
+                    {
+                        "title": _("Assessments"),
+                        "icon": "grading",
+                        "link": reverse_lazy("admin:assessments_assessment_changelist"),
+                    },
+                    {
+                        "title": _("Grades"),
+                        "icon": "school",
+                        "link": reverse_lazy("admin:assessments_grade_changelist"),
+                    },
+                    {
+                        "title": _("Certificates"),
+                        "icon": "workspace_premium",
+                        "link": reverse_lazy("admin:certificates_certificate_batches"),
+                    },
                 ],
             },
             {
@@ -301,6 +555,47 @@ UNFOLD = {
                         "link": reverse_lazy("admin:finance_payment_changelist"),
                         "permission": _sidebar_finance_permission,
                     },
+                    {
+                        "title": _("Reconciliation"),
+                        "icon": "rule",
+                        "link": reverse_lazy("admin:finance_reconciliationrun_changelist"),
+                        "permission": _sidebar_finance_permission,
+                    },
+                    {
+                        "title": _("M-Pesa suspense"),
+                        "icon": "pending_actions",
+                        "link": lambda request: f"{reverse_lazy('admin:finance_mpesacallback_changelist')}?status__exact=SUSPENSE",
+                        "permission": _sidebar_finance_permission,
+                    },
+                    {
+                        "title": _("Fee reminders"),
+                        "icon": "sms",
+                        "link": reverse_lazy("admin:notifications_reminderdelivery_changelist"),
+                        "permission": _sidebar_finance_permission,
+                    },
+                ],
+            },
+            {
+                "title": _("Archive"),
+                "separator": False,
+                "collapsible": True,
+                "permission": _sidebar_finance_permission,
+                "items": [
+                    {
+                        "title": _("Archived batches"),
+                        "icon": "inventory_2",
+                        "link": reverse_lazy("admin:archive_archivedbatch_changelist"),
+                    },
+                    {
+                        "title": _("Archived enrollments"),
+                        "icon": "inventory_2",
+                        "link": reverse_lazy("admin:archive_archivedenrollment_changelist"),
+                    },
+                    {
+                        "title": _("Archived payments"),
+                        "icon": "inventory_2",
+                        "link": reverse_lazy("admin:archive_archivedpayment_changelist"),
+                    },
                 ],
             },
             {
@@ -314,6 +609,18 @@ UNFOLD = {
                         "link": reverse_lazy("admin:auth_group_changelist"),
                         "permission": _sidebar_system_permission,
                     },
+                    {
+                        "title": _("Kiosk tokens"),
+                        "icon": "tv",
+                        "link": reverse_lazy("admin:core_kiosktoken_changelist"),
+                        "permission": _sidebar_system_permission,
+                    },
+                    {
+                        "title": _("Request profiles"),
+                        "icon": "speed",
+                        "link": reverse_lazy("admin:profiling_profilecapture_changelist"),
+                        "permission": _sidebar_superuser_permission,
+                    },
                 ],
             },
             {
@@ -1,3 +1,12 @@
 from django.contrib import admin
+from unfold.admin import ModelAdmin
+from .models import KioskToken
 
-# Register your models here.
+@admin.register(KioskToken)
+class KioskTokenAdmin(ModelAdmin):
+    list_display = ('name', 'scope', 'is_active', 'last_used_at', 'created_at')
+    list_filter = ('scope', 'is_active')
+    search_fields = ('name',)
+    readonly_fields = ('key', 'last_used_at', 'created_at')
+    fields = ('name', 'scope', 'is_active', 'key', 'last_used_at', 'created_at')
+    list_per_page = 25
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .signals import connect_data_version_signals, connect_event_signals
+
+        connect_data_version_signals()
+        connect_event_signals()
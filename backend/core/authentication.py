@@ -0,0 +1,77 @@
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import KioskToken
+
+# Avoid a write on every poll: only record usage once per interval.
+LAST_USED_RESOLUTION = timedelta(minutes=1)
+
+# Keys in the URL end up in access logs, proxy logs and profile captures,
+# so the `?token=` form is off unless a display cannot send headers.
+KIOSK_TOKEN_QUERY_PARAM = getattr(settings, "KIOSK_TOKEN_QUERY_PARAM", False)
+
+
+def _get_request_token_key(request) -> str | None:
+    """
+    Read a kiosk key from `Authorization: Token <key>`, or, when
+    KIOSK_TOKEN_QUERY_PARAM is set, from a `?token=` query parameter for
+    display browsers that cannot set headers.
+    """
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Token "):
+        return header[len("Token "):].strip() or None
+    if KIOSK_TOKEN_QUERY_PARAM:
+        return request.GET.get("token") or None
+    return None
+
+
+def authenticate_kiosk_token(request) -> KioskToken | None:
+    """
+    Return the active kiosk token presented with the request, if any.
+    """
+    key = _get_request_token_key(request)
+    if not key:
+        return None
+
+    token = KioskToken.objects.filter(key=key, is_active=True).first()
+    if token is None:
+        return None
+
+    now = timezone.now()
+    if token.last_used_at is None or now - token.last_used_at > LAST_USED_RESOLUTION:
+        KioskToken.objects.filter(pk=token.pk).update(last_used_at=now)
+    return token
+
+
+def kiosk_token_required(scope: str, staff_check=None):
+    """
+    Allow a view to be called with a kiosk token that covers `scope`.
+    Logged-in staff passing `staff_check(user)` are let through as well,
+    so the same endpoints can be opened from a browser session.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            token = authenticate_kiosk_token(request)
+            if token is not None:
+                if not token.allows(scope):
+                    return JsonResponse({"detail": "Token not valid for this endpoint."}, status=403)
+                return view_func(request, *args, **kwargs)
+
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated and user.is_staff:
+                if staff_check is None or staff_check(user):
+                    return view_func(request, *args, **kwargs)
+                return JsonResponse({"detail": "You do not have access to these KPIs."}, status=403)
+
+            response = JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            response["WWW-Authenticate"] = "Token"
+            return response
+
+        return _wrapped_view
+
+    return decorator
@@ -0,0 +1,228 @@
+"""
+Online backups of the SQLite database.
+
+Copying db.sqlite3 while the app runs either has to stop writers for the
+whole copy or risks a torn file. Backups here go through SQLite's online
+backup API instead, a few pages per step. The source connection holds one
+read transaction for the whole copy: in WAL mode that pins a consistent
+snapshot without blocking writers, and stops the backup from restarting
+each time someone commits (without it, a busy database may never finish).
+
+Each backup is checked with `PRAGMA integrity_check`, optionally gzipped,
+and described by a JSON sidecar holding its SHA-256, which is verified
+again before anything is restored. `prune_backups` applies the retention
+policy: the newest BACKUP_KEEP_LAST, plus the newest of each of the last
+BACKUP_KEEP_DAILY days and BACKUP_KEEP_MONTHLY months.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+BACKUP_DIR = getattr(settings, "BACKUP_DIR", settings.BASE_DIR / "backups")
+PAGES_PER_STEP = getattr(settings, "BACKUP_PAGES_PER_STEP", 1024)
+STEP_SLEEP = getattr(settings, "BACKUP_STEP_SLEEP", 0.002)
+COMPRESS = getattr(settings, "BACKUP_COMPRESS", True)
+KEEP_LAST = getattr(settings, "BACKUP_KEEP_LAST", 7)
+KEEP_DAILY = getattr(settings, "BACKUP_KEEP_DAILY", 14)
+KEEP_MONTHLY = getattr(settings, "BACKUP_KEEP_MONTHLY", 12)
+
+LOCK_TIMEOUT = 20
+_READ_CHUNK = 1024 * 1024
+
+
+class BackupError(Exception):
+    """A backup is missing, corrupt or does not match its checksum."""
+
+
+def database_path(alias: str = "default") -> Path:
+    database = settings.DATABASES[alias]
+    if database["ENGINE"] != "django.db.backends.sqlite3":
+        raise ImproperlyConfigured("Online backups are only implemented for SQLite.")
+    return Path(database["NAME"])
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        while chunk := source.read(_READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _check_integrity(connection: sqlite3.Connection) -> None:
+    problems = [row[0] for row in connection.execute("PRAGMA integrity_check")]
+    if problems != ["ok"]:
+        raise BackupError(f"Integrity check failed: {'; '.join(problems[:5])}")
+
+
+def copy_database(source_path, target_path, pages: int = PAGES_PER_STEP, step_sleep: float = STEP_SLEEP) -> dict:
+    """
+    Copy a live SQLite database to `target_path` with the online backup
+    API, `pages` pages per step, sleeping `step_sleep` seconds between
+    steps so the copy's I/O does not crowd out the application's. Returns
+    the page count and the number of steps.
+    """
+    source = sqlite3.connect(source_path, timeout=LOCK_TIMEOUT, isolation_level=None)
+    target = sqlite3.connect(target_path, isolation_level=None)
+    steps = 0
+
+    def pause(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    try:
+        # Read something so the snapshot is taken now, not at the first step.
+        source.execute("BEGIN")
+        source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=pages, progress=pause)
+        source.execute("COMMIT")
+        # The copy is a single self-contained file, not a WAL database.
+        target.execute("PRAGMA journal_mode=DELETE")
+        _check_integrity(target)
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    return {"pages": page_count, "steps": steps}
+
+
+def _sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".json")
+
+
+def create_backup(directory=None, compress: bool = COMPRESS, pages: int = PAGES_PER_STEP, step_sleep: float = STEP_SLEEP) -> dict:
+    """
+    Back up the default database into `directory` (default: BACKUP_DIR)
+    and return the backup's metadata, as also written to its sidecar.
+    Nothing is left behind if the copy or its integrity check fails.
+    """
+    directory = Path(directory or BACKUP_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    started = timezone.now()
+    name = f"db-{started.astimezone(dt_timezone.utc):%Y%m%dT%H%M%S%fZ}.sqlite3" + (".gz" if compress else "")
+    path = directory / name
+    partial = directory / f".{name}.partial"
+    compressed = directory / f".{name}.gz.partial"
+
+    clock = time.perf_counter()
+    try:
+        copied = copy_database(database_path(), partial, pages=pages, step_sleep=step_sleep)
+        size = partial.stat().st_size
+        if compress:
+            with open(partial, "rb") as source, gzip.open(compressed, "wb", compresslevel=6) as target:
+                shutil.copyfileobj(source, target, _READ_CHUNK)
+            os.replace(compressed, partial)
+        metadata = {
+            "file": name,
+            "created_at": started.isoformat(),
+            "compressed": compress,
+            "size": partial.stat().st_size,
+            "database_size": size,
+            "pages": copied["pages"],
+            "steps": copied["steps"],
+            "sha256": file_sha256(partial),
+            "seconds": round(time.perf_counter() - clock, 3),
+        }
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+        compressed.unlink(missing_ok=True)
+    _sidecar(path).write_text(json.dumps(metadata, indent=2))
+    return metadata
+
+
+def list_backups(directory=None) -> list[dict]:
+    """Metadata of every backup in `directory`, newest first. Backups without a sidecar are ignored."""
+    directory = Path(directory or BACKUP_DIR)
+    if not directory.exists():
+        return []
+    backups = [json.loads(sidecar.read_text()) for sidecar in directory.glob("db-*.json")]
+    return sorted(backups, key=lambda backup: backup["created_at"], reverse=True)
+
+
+def verify_backup(path) -> dict:
+    """Check a backup file against the checksum in its sidecar; return its metadata or raise BackupError."""
+    path = Path(path)
+    if not path.exists() or not _sidecar(path).exists():
+        raise BackupError(f"{path} or its .json sidecar is missing.")
+    metadata = json.loads(_sidecar(path).read_text())
+    if file_sha256(path) != metadata["sha256"]:
+        raise BackupError(f"{path.name} does not match its checksum; it is damaged or incomplete.")
+    return metadata
+
+
+def select_retained(backups: list[dict], keep_last: int = KEEP_LAST, keep_daily: int = KEEP_DAILY, keep_monthly: int = KEEP_MONTHLY) -> set:
+    """
+    File names to keep out of `backups` (newest first): the newest
+    `keep_last`, and the newest backup of each of the most recent
+    `keep_daily` days and `keep_monthly` months that have one.
+    """
+    keep = {backup["file"] for backup in backups[:keep_last]}
+    for count, period in ((keep_daily, "%Y-%m-%d"), (keep_monthly, "%Y-%m")):
+        seen = []
+        for backup in backups:
+            key = timezone.localtime(datetime.fromisoformat(backup["created_at"])).strftime(period)
+            if key not in seen:
+                if len(seen) == count:
+                    break
+                seen.append(key)
+                keep.add(backup["file"])
+    return keep
+
+
+def prune_backups(directory=None, **policy) -> list[str]:
+    """Delete the backups the retention policy does not keep; return their names."""
+    directory = Path(directory or BACKUP_DIR)
+    backups = list_backups(directory)
+    keep = select_retained(backups, **policy)
+    removed = []
+    for backup in backups:
+        if backup["file"] not in keep:
+            path = directory / backup["file"]
+            path.unlink(missing_ok=True)
+            _sidecar(path).unlink(missing_ok=True)
+            removed.append(backup["file"])
+    return removed
+
+
+def restore_backup(path) -> dict:
+    """
+    Replace the contents of the default database with a backup, after
+    verifying its checksum and integrity. The copy goes through the backup
+    API into the live database, so it takes SQLite's write lock and never
+    leaves a half-written file, and connections of running processes see
+    the restored data on their next transaction.
+    """
+    path = Path(path)
+    metadata = verify_backup(path)
+    target_path = database_path()
+    unpacked = target_path.with_name(f".{target_path.name}.restore")
+    try:
+        if metadata["compressed"]:
+            with gzip.open(path, "rb") as source, open(unpacked, "wb") as target:
+                shutil.copyfileobj(source, target, _READ_CHUNK)
+        else:
+            shutil.copyfile(path, unpacked)
+        source = sqlite3.connect(unpacked, isolation_level=None)
+        target = sqlite3.connect(target_path, timeout=LOCK_TIMEOUT, isolation_level=None)
+        try:
+            _check_integrity(source)
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        unpacked.unlink(missing_ok=True)
+    return metadata
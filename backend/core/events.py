@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.defaultfilters import date as date_filter
+from django.utils import timezone
+
+from .templatetags.core_filters import format_date_short, format_ksh
+
+# How many past events a reconnecting client can catch up on via Last-Event-ID.
+EVENT_HISTORY_SIZE = 100
+
+# Events a slow client may fall behind by before it is disconnected.
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class DashboardEvent:
+    """A single event, pre-encoded once and shared by every subscriber."""
+
+    __slots__ = ("id", "type", "encoded")
+
+    def __init__(self, event_id: int, event_type: str, data: dict):
+        self.id = event_id
+        self.type = event_type
+        payload = json.dumps(data, cls=DjangoJSONEncoder)
+        self.encoded = f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """One connected client: an asyncio queue bound to the client's event loop."""
+
+    def __init__(self, event_types: frozenset[str]):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.event_types = event_types
+        self.closed = False
+
+    def deliver(self, event: DashboardEvent | None) -> None:
+        # Runs on the subscriber's loop. `None` tells the stream to end.
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client is not keeping up; drop it and let it reconnect.
+            self.closed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventBroker:
+    """
+    In-process publisher that fans dashboard events out to every connected
+    stream. Publishing is thread-safe, so model signals fired from sync
+    views can publish directly. Idle subscribers cost one queue each and
+    never touch the database.
+
+    The broker lives in one process and is not shared: with several server
+    workers, a payment saved in one worker never reaches streams held open by
+    another. Run the ASGI server that serves the dashboard stream with a
+    single worker, or route that URL to one process.
+    """
+
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history: deque[DashboardEvent] = deque(maxlen=history_size)
+        self._subscribers: set[Subscription] = set()
+
+    def publish(self, event_type: str, data: dict) -> None:
+        with self._lock:
+            event = DashboardEvent(next(self._ids), event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            if event_type not in subscription.event_types:
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down.
+                self.unsubscribe(subscription)
+
+    def subscribe(self, event_types, last_event_id: int | None = None) -> Subscription:
+        """
+        Register a subscriber on the running event loop. If `last_event_id`
+        is given, events published after it are replayed first.
+        """
+        subscription = Subscription(frozenset(event_types))
+        with self._lock:
+            self._subscribers.add(subscription)
+            missed = [
+                event
+                for event in self._history
+                if last_event_id is not None and event.id > last_event_id
+            ]
+        for event in missed:
+            if event.type in subscription.event_types:
+                subscription.deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broker = EventBroker()
+
+
+def serialize_payment_event(payment) -> dict:
+    """
+    Shape a payment the way the recent-payments widget renders it, so the
+    dashboard can insert the row without formatting anything itself.
+    """
+    enrollment = payment.enrollment
+    batch = enrollment.batch
+    return {
+        "id": payment.pk,
+        "student": str(enrollment.student),
+        "batch": f"{batch.course.code} — {batch.name}",
+        "amount": payment.amount,
+        "amount_display": format_ksh(payment.amount),
+        "method": payment.get_method_display(),
+        "payment_date": format_date_short(payment.payment_date),
+    }
+
+
+def serialize_enrollment_event(enrollment) -> dict:
+    """
+    Shape an enrollment the way the recent-enrollments widget renders it.
+    """
+    batch = enrollment.batch
+    return {
+        "id": enrollment.pk,
+        "student": str(enrollment.student),
+        "batch": f"{batch.course.code} — {batch.name}",
+        "status": enrollment.status,
+        "status_display": enrollment.get_status_display(),
+        "created_at": date_filter(timezone.localtime(enrollment.created_at), "b d, Y"),
+    }
+
+
+def publish_payment_created(payment_id) -> None:
+    from finance.models import Payment
+
+    if not broker.subscriber_count:
+        return
+    payment = (
+        Payment.objects.select_related(
+            "enrollment",
+            "enrollment__student",
+            "enrollment__batch",
+            "enrollment__batch__course",
+        )
+        .filter(pk=payment_id)
+        .first()
+    )
+    if payment is not None:
+        broker.publish("payment", serialize_payment_event(payment))
+
+
+def publish_enrollment_created(enrollment_id) -> None:
+    from enrollments.models import Enrollment
+
+    if not broker.subscriber_count:
+        return
+    enrollment = (
+        Enrollment.objects.select_related("student", "batch", "batch__course")
+        .filter(pk=enrollment_id)
+        .first()
+    )
+    if enrollment is not None:
+        broker.publish("enrollment", serialize_enrollment_event(enrollment))
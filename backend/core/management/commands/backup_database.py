@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.backups import BACKUP_DIR, PAGES_PER_STEP, STEP_SLEEP, create_backup, prune_backups
+
+
+class Command(BaseCommand):
+    help = (
+        "Back up the database while the site stays in use, then delete backups the "
+        "retention policy no longer keeps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help=f"Backup directory (default: {BACKUP_DIR}).")
+        parser.add_argument("--no-compress", action="store_true", help="Store the database file without gzip.")
+        parser.add_argument("--pages", type=int, default=PAGES_PER_STEP, help="Pages copied per step.")
+        parser.add_argument("--sleep", type=float, default=STEP_SLEEP, help="Seconds to wait between steps.")
+        parser.add_argument("--no-prune", action="store_true", help="Keep every existing backup.")
+
+    def handle(self, *args, **options):
+        backup = create_backup(
+            options["dir"],
+            compress=not options["no_compress"],
+            pages=options["pages"],
+            step_sleep=options["sleep"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backed up {backup['pages']} page(s) in {backup['steps']} step(s) and {backup['seconds']}s "
+                f"to {backup['file']} ({backup['size'] / 1e6:.1f} MB, sha256 {backup['sha256'][:12]})."
+            )
+        )
+        if not options["no_prune"]:
+            removed = prune_backups(options["dir"])
+            if removed:
+                self.stdout.write(f"Removed {len(removed)} old backup(s): {', '.join(removed)}")
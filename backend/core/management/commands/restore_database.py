@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.backups import BACKUP_DIR, BackupError, create_backup, list_backups, restore_backup, verify_backup
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace the database with a backup made by backup_database. The current data "
+        "is backed up first, and the backup's checksum and integrity are checked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("backup", nargs="?", help='Backup file name or path, or "latest".')
+        parser.add_argument("--dir", help=f"Backup directory (default: {BACKUP_DIR}).")
+        parser.add_argument("--list", action="store_true", help="List the available backups and exit.")
+        parser.add_argument("--verify", action="store_true", help="Only check the backup's checksum.")
+        parser.add_argument(
+            "--no-safety-backup", action="store_true", help="Do not back up the current data before restoring."
+        )
+        parser.add_argument("--noinput", action="store_true", help="Do not ask for confirmation.")
+
+    def handle(self, *args, **options):
+        directory = Path(options["dir"] or BACKUP_DIR)
+        backups = list_backups(directory)
+        if options["list"]:
+            for backup in backups:
+                self.stdout.write(
+                    f"{backup['file']}  {backup['created_at']}  {backup['size'] / 1e6:.1f} MB  sha256 {backup['sha256'][:12]}"
+                )
+            return
+        if not options["backup"]:
+            raise CommandError('Name the backup to restore, or "latest"; --list shows them.')
+        if options["backup"] == "latest":
+            if not backups:
+                raise CommandError(f"There are no backups in {directory}.")
+            path = directory / backups[0]["file"]
+        else:
+            path = Path(options["backup"])
+            if not path.exists():
+                path = directory / options["backup"]
+
+        try:
+            backup = verify_backup(path)
+        except BackupError as exc:
+            raise CommandError(str(exc)) from exc
+        if options["verify"]:
+            self.stdout.write(self.style.SUCCESS(f"{path.name} matches its checksum."))
+            return
+
+        if not options["noinput"]:
+            answer = input(f"Replace all current data with the backup from {backup['created_at']}? [y/N] ")
+            if answer.strip().lower() not in ("y", "yes"):
+                raise CommandError("Restore cancelled.")
+        if not options["no_safety_backup"]:
+            safety = create_backup(directory)
+            self.stdout.write(f"Current data backed up to {safety['file']}.")
+
+        connections.close_all()
+        try:
+            restore_backup(path)
+        except BackupError as exc:
+            raise CommandError(str(exc)) from exc
+        for cache in caches.all(initialized_only=False):
+            cache.clear()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Restored the backup from {backup['created_at']}. Restart the application servers "
+                "so no process keeps data cached from before the restore."
+            )
+        )
@@ -0,0 +1,39 @@
+# Generated by Django 6.1.2 on 2026-10-19 13:58
+
+import core.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('label', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='KioskToken',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(default=core.models._generate_kiosk_key, editable=False, max_length=64, unique=True)),
+                ('scope', models.CharField(choices=[('ENROLLMENT', 'Enrollment KPIs'), ('FINANCE', 'Finance KPIs'), ('ALL', 'All KPIs')], default='ENROLLMENT', max_length=20)),
+                ('last_used_at', models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+import secrets
 import uuid
 from django.db import models
 
@@ -13,3 +14,43 @@ class TimeStampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class DataVersion(models.Model):
+    """
+    A monotonically increasing counter per tracked model.
+    Bumped whenever rows of that model change, so caches and ETags can be
+    keyed on "has anything changed?" without re-running the aggregates.
+    """
+    label = models.CharField(max_length=100, primary_key=True)  # e.g., finance.Payment
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+def _generate_kiosk_key():
+    return secrets.token_urlsafe(32)
+
+
+class KioskToken(TimeStampedModel):
+    """A read-only API token for wall displays that poll the KPI endpoints."""
+    class ScopeChoices(models.TextChoices):
+        ENROLLMENT = 'ENROLLMENT', 'Enrollment KPIs'
+        FINANCE = 'FINANCE', 'Finance KPIs'
+        ALL = 'ALL', 'All KPIs'
+
+    name = models.CharField(max_length=100)  # e.g., "Finance office screen"
+    key = models.CharField(max_length=64, unique=True, default=_generate_kiosk_key, editable=False)
+    scope = models.CharField(
+        max_length=20,
+        choices=ScopeChoices.choices,
+        default=ScopeChoices.ENROLLMENT
+    )
+    last_used_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def allows(self, scope: str) -> bool:
+        return self.scope in (self.ScopeChoices.ALL, scope)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_scope_display()})"
@@ -0,0 +1,52 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .events import publish_enrollment_created, publish_payment_created
+from .versioning import TRACKED_MODELS, bump_data_version
+
+
+# Saves limited to these fields change nothing a cached page shows; every
+# login saves `last_login`, and must not invalidate every dashboard.
+UNVERSIONED_FIELDS = frozenset({"last_login"})
+
+
+def _bump_sender_version(sender, update_fields=None, **kwargs):
+    if update_fields and UNVERSIONED_FIELDS.issuperset(update_fields):
+        return
+    bump_data_version(sender._meta.label)
+
+
+def connect_data_version_signals():
+    """
+    Bump a model's data version whenever one of its rows is saved or deleted.
+    Senders are given as lazy "app_label.ModelName" strings so core does not
+    need to import the other apps.
+    """
+    for label in TRACKED_MODELS:
+        post_save.connect(
+            _bump_sender_version, sender=label, dispatch_uid=f"data_version_save_{label}"
+        )
+        post_delete.connect(
+            _bump_sender_version, sender=label, dispatch_uid=f"data_version_delete_{label}"
+        )
+
+
+def _publish_payment(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(publish_payment_created, instance.pk))
+
+
+def _publish_enrollment(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(publish_enrollment_created, instance.pk))
+
+
+def connect_event_signals():
+    """
+    Publish new payments and enrollments to live dashboard streams once the
+    surrounding transaction commits.
+    """
+    post_save.connect(_publish_payment, sender="finance.Payment", dispatch_uid="publish_payment")
+    post_save.connect(_publish_enrollment, sender="enrollments.Enrollment", dispatch_uid="publish_enrollment")
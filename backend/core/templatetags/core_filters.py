@@ -16,7 +16,8 @@ def format_ksh(value):
         return "KES 0.00"
     
     try:
-        amount = Decimal(str(value))
+        # Aggregates and model fields already hand us Decimals.
+        amount = value if isinstance(value, Decimal) else Decimal(str(value))
         # Format with 2 decimal places and thousands separator
         formatted = f"{amount:,.2f}"
         return f"KES {formatted}"
@@ -0,0 +1,343 @@
+"""
+Helpers for the tests in each app's tests.py: factories for students and
+batches, and the seeding and assertions behind the query-budget tests.
+
+Admin pages and the dashboard must run the same number of queries however
+many rows they show: an N+1 (a `__str__` walking a foreign key, a list
+column reading a relation) shows up as a count that grows with the data.
+`QueryBudgetTestCase.assertQueryBudget` renders a page over the seeded
+rows, adds more rows that land on the same page, renders it again, and
+checks that both renders ran exactly the budget recorded in the test.
+
+Budgets are exact on purpose: when a change saves queries, lower the
+budget in the same commit so the saving cannot quietly be lost again.
+"""
+import itertools
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+# Sessions and cached users live in the shared cache; tests must not touch
+# the file-based one the application uses.
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "query-budget-default"},
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "query-budget-shared"},
+}
+
+_sequence = itertools.count(1)
+
+
+def admin_url(model, view: str, *args) -> str:
+    """URL of a model admin view: "changelist", "add" or "change" (with the object's pk)."""
+    return reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_{view}", args=args)
+
+
+def create_staff() -> dict:
+    """One staff account per dashboard role flag, keyed by role."""
+    from accounts.models import User
+
+    admin = User.objects.create_superuser("budget-admin", "admin@example.com", "budget-pass")
+    finance = User.objects.create_user("budget-finance", is_staff=True, role=User.RoleChoices.FINANCE)
+    registrar = User.objects.create_user("budget-registrar", is_staff=True)
+    registrar.groups.add(Group.objects.get_or_create(name="Registrar")[0])
+    it_admin = User.objects.create_user("budget-it", is_staff=True, role=User.RoleChoices.IT_ADMIN)
+    staff = User.objects.create_user("budget-staff", is_staff=True, role=User.RoleChoices.INSTRUCTOR)
+    return {"admin": admin, "finance": finance, "registrar": registrar, "it_admin": it_admin, "staff": staff}
+
+
+def create_student(**fields):
+    """A student account with a unique username and phone number."""
+    from accounts.models import User
+
+    n = next(_sequence)
+    fields.setdefault("phone_number", f"07{n:08d}")
+    fields.setdefault("first_name", "Sam")
+    fields.setdefault("last_name", f"Student {n}")
+    return User.objects.create_user(f"student{n}", **fields)
+
+
+def create_batch(**fields):
+    """A batch of a new course, running from 30 days ago to 60 days from now unless given."""
+    from courses.models import Batch, Course
+
+    n = next(_sequence)
+    today = timezone.localdate()
+    course = Course.objects.create(code=f"T{n:03d}", title=f"Course {n}", description="", base_fee=Decimal("20000"))
+    fields.setdefault("name", f"Intake {n}")
+    fields.setdefault("start_date", today - timedelta(days=30))
+    fields.setdefault("end_date", today + timedelta(days=60))
+    return Batch.objects.create(course=course, **fields)
+
+
+def enroll_students(batch, count: int, staff: dict, student=None) -> list:
+    """
+    Enroll `count` new students (or just `student`) in `batch`, each with
+    a payment, a grade on every assessment of the batch and attendance on
+    every session: present at the first only, so they are at risk once
+    three sessions have been held. Returns the enrollments.
+    """
+    from assessments.services import record_grades
+    from attendance.services import get_session_register, mark_session
+    from enrollments.models import Enrollment
+    from finance.models import Payment
+
+    students = [student] if student else []
+    students += [create_student() for _ in range(count - len(students))]
+    enrollments = []
+    for enrolled in students:
+        enrollment = Enrollment.objects.create(student=enrolled, batch=batch, agreed_fee=batch.course.base_fee)
+        Payment.objects.create(
+            enrollment=enrollment,
+            amount=Decimal("5000"),
+            method=Payment.PaymentMethod.MPESA,
+            reference_number=f"REF-{enrollment.pk.hex[:12]}",
+            received_by=staff["finance"],
+        )
+        enrollments.append(enrollment)
+    ids = [enrollment.pk for enrollment in enrollments]
+    for assessment in batch.assessments.all():
+        record_grades(assessment, dict.fromkeys(ids, Decimal("75")), graded_by=batch.instructor)
+    for number, session in enumerate(batch.sessions.order_by("sequence")):
+        present = get_session_register(session) | (set(ids) if number == 0 else set())
+        mark_session(session, present, marked_by=batch.instructor)
+    return enrollments
+
+
+def seed_rows(count: int, staff: dict) -> list[dict]:
+    """
+    Add `count` rows of everything the admin lists and the dashboard shows.
+    Each row is a course with a running batch and an upcoming one taught by
+    the same (so double-booked) instructor; a student enrolled in the
+    running batch as in `enroll_students`, plus a duplicate account; an
+    assessment, three class sessions, a batch that has just ended with a
+    certificate for the student, a fee reminder, M-Pesa
+    callbacks (one matched, one in suspense), a reconciliation run with a
+    discrepancy, a profile capture, a kiosk token and an archived batch.
+    Returns the objects created for each row.
+    """
+    from accounts.models import User
+    from archive.services import archive_batch
+    from assessments.models import Assessment
+    from attendance.services import add_sessions
+    from certificates.models import Certificate
+    from core.models import KioskToken
+    from courses.models import Batch, Course
+    from enrollments.models import Enrollment
+    from finance.models import MpesaCallback, Payment, ReconciliationDiscrepancy, ReconciliationRun
+    from notifications.models import ReminderDelivery
+    from profiling.models import ProfileCapture
+
+    today = timezone.localdate()
+    rows = []
+    for _ in range(count):
+        n = next(_sequence)
+        instructor = User.objects.create_user(
+            f"instructor{n}", first_name="Ian", last_name=f"Instructor {n}", role=User.RoleChoices.INSTRUCTOR
+        )
+        student = User.objects.create_user(
+            f"student{n}",
+            first_name="Sara",
+            last_name=f"Student {n}",
+            email=f"student{n}@example.com",
+            phone_number=f"07{n:08d}",
+        )
+        # A second account for the same person, for the duplicates page
+        User.objects.create_user(f"student{n}x", first_name="Sara", last_name=f"Student {n}", phone_number=student.phone_number)
+        course = Course.objects.create(code=f"C{n:03d}", title=f"Course {n}", description="", base_fee=Decimal("20000"))
+        batch = Batch.objects.create(
+            course=course,
+            name=f"Intake {n}",
+            instructor=instructor,
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=10),
+        )
+        # Starts before `batch` ends, so the instructor is double-booked
+        upcoming = Batch.objects.create(
+            course=course,
+            name=f"Next intake {n}",
+            instructor=instructor,
+            start_date=today + timedelta(days=5),
+            end_date=today + timedelta(days=90),
+        )
+        assessment = Assessment.objects.create(batch=batch, title=f"Project {n}", max_score=Decimal("100"))
+        sessions = add_sessions(batch, [today - timedelta(days=days) for days in (3, 2, 1)], topic="Introduction")
+        (enrollment,) = enroll_students(batch, 1, staff, student=student)
+        payment = enrollment.payments.get()
+
+        finished = Batch.objects.create(
+            course=course,
+            name=f"Last intake {n}",
+            instructor=instructor,
+            start_date=today - timedelta(days=120),
+            end_date=today - timedelta(days=5),
+        )
+        completed = Enrollment.objects.create(
+            student=student, batch=finished, agreed_fee=course.base_fee, status=Enrollment.StatusChoices.COMPLETED
+        )
+        certificate = Certificate.objects.create(
+            enrollment=completed, number=f"CERT-{n:06d}", content_hash=f"{n:064x}", rendered_at=timezone.now()
+        )
+        reminder = ReminderDelivery.objects.create(
+            student=student,
+            cycle=today.strftime("%Y-%m"),
+            channel=ReminderDelivery.Channel.SMS,
+            recipient=student.phone_number,
+            message="Your fee balance is due.",
+            amount_due=Decimal("15000"),
+            status=ReminderDelivery.Status.SENT,
+            attempts=1,
+            sent_at=timezone.now(),
+        )
+        MpesaCallback.objects.create(
+            trans_id=f"QK{n:08d}",
+            amount=payment.amount,
+            bill_ref_number=student.username,
+            msisdn=f"2547{n:08d}",
+            payer_name="Sara Student",
+            status=MpesaCallback.Status.MATCHED,
+            payment=payment,
+        )
+        suspense = MpesaCallback.objects.create(
+            trans_id=f"QS{n:08d}",
+            amount=Decimal("1000"),
+            bill_ref_number=f"UNKNOWN{n}",
+            msisdn="254799999999",
+            status=MpesaCallback.Status.SUSPENSE,
+            suspense_reason="No enrollment matches the account reference or phone number.",
+        )
+        run = ReconciliationRun.objects.create(
+            provider=Payment.PaymentMethod.MPESA,
+            statement_name=f"statement-{n}.csv",
+            period_start=today - timedelta(days=30),
+            period_end=today,
+            run_by=staff["finance"],
+        )
+        discrepancy = ReconciliationDiscrepancy.objects.create(
+            run=run,
+            kind=ReconciliationDiscrepancy.Kind.AMOUNT_MISMATCH,
+            reference_number=payment.reference_number,
+            statement_amount=Decimal("4000"),
+            ledger_amount=payment.amount,
+            statement_line=n,
+            payment=payment,
+        )
+        capture = ProfileCapture.objects.create(
+            method="GET",
+            path=f"/admin/page-{n}/",
+            status_code=200,
+            user=staff["admin"],
+            trigger=ProfileCapture.Trigger.REQUESTED,
+            duration_ms=120.0,
+            sample_interval_ms=1.0,
+        )
+        token = KioskToken.objects.create(name=f"Office screen {n}")
+
+        ended = Batch.objects.create(
+            course=course,
+            name=f"Old intake {n}",
+            instructor=instructor,
+            start_date=today - timedelta(days=400),
+            end_date=today - timedelta(days=300),
+        )
+        archived = Enrollment.objects.create(student=student, batch=ended, agreed_fee=course.base_fee)
+        archived_payment = Payment.objects.create(
+            enrollment=archived,
+            amount=course.base_fee,
+            method=Payment.PaymentMethod.CASH,
+            reference_number=f"OLD{n:06d}",
+            received_by=staff["finance"],
+        )
+        # The archive tables keep the original primary keys
+        archive_batch(ended)
+
+        rows.append(
+            {
+                "student": student,
+                "instructor": instructor,
+                "course": course,
+                "batch": batch,
+                "upcoming_batch": upcoming,
+                "enrollment": enrollment,
+                "payment": payment,
+                "assessment": assessment,
+                "session": sessions[0],
+                "certificate": certificate,
+                "reminder": reminder,
+                "suspense_callback": suspense,
+                "run": run,
+                "discrepancy": discrepancy,
+                "capture": capture,
+                "token": token,
+                "archived_batch_id": ended.pk,
+                "archived_enrollment_id": archived.pk,
+                "archived_payment_id": archived_payment.pk,
+            }
+        )
+    return rows
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryBudgetTestCase(TestCase):
+    """
+    Seeds SEED_ROWS rows once per test case; each budget check adds
+    ADDED_ROWS more. Both stay under the admin's smallest page size (25)
+    and the autocomplete page size (20), so every row added is rendered.
+    """
+
+    SEED_ROWS = 2
+    ADDED_ROWS = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_staff()
+        cls.rows = seed_rows(cls.SEED_ROWS, cls.staff)
+
+    def render(self, url: str, user=None, data=None) -> list[dict]:
+        """GET `url` as `user` (default: the superuser) with cold caches; return the queries it ran."""
+        for cache in caches.all():
+            cache.clear()
+        ContentType.objects.clear_cache()
+        self.client.force_login(user or self.staff["admin"])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200, f"GET {url} returned {response.status_code}")
+        # Copy them now: the connection's query log is bounded, so seeding
+        # more rows can push them out of it.
+        return list(queries.captured_queries)
+
+    def assertQueryBudget(self, budget: int, url: str, user=None, data=None, batch=None) -> None:
+        """
+        Render `url` before and after adding ADDED_ROWS rows; both renders
+        must run exactly `budget` queries. For a page about one `batch`,
+        the rows added are students enrolled in it.
+        """
+        before = self.render(url, user, data)
+        if batch is None:
+            seed_rows(self.ADDED_ROWS, self.staff)
+        else:
+            enroll_students(batch, self.ADDED_ROWS, self.staff)
+        after = self.render(url, user, data)
+        counts = (len(before), len(after))
+        if counts != (budget, budget):
+            queries = "\n".join(f"{n}. {query['sql']}" for n, query in enumerate(after, start=1))
+            self.fail(
+                f"GET {url} ran {counts[0]} queries, then {counts[1]} after adding {self.ADDED_ROWS} rows; "
+                f"the budget is {budget}.\n{queries}"
+            )
+
+    def assertAutocompleteBudget(self, budget: int, model, field_name: str, term: str = "") -> None:
+        """Check the autocomplete endpoint behind `model.field_name` (as on `model`'s admin form)."""
+        opts = model._meta
+        self.assertQueryBudget(
+            budget,
+            reverse("admin:autocomplete"),
+            data={"app_label": opts.app_label, "model_name": opts.model_name, "field_name": field_name, "term": term},
+        )
@@ -1,3 +1,279 @@
-from django.test import TestCase
+import asyncio
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.backups import BackupError, create_backup, prune_backups, restore_backup, select_retained, verify_backup
+from core.events import broker
+from core.models import KioskToken
+from core.testing import TEST_CACHES, QueryBudgetTestCase, admin_url, create_batch, create_staff
+from core.versioning import TRACKED_MODELS, get_data_versions
+from core.views import PAYMENT_WIDGET_MODELS, _build_widget_cache_keys
+
+
+class DashboardQueryBudgetTests(QueryBudgetTestCase):
+    """The admin index runs `dashboard_callback`, whose widgets differ by role."""
+
+    def test_super_admin(self):
+        self.assertQueryBudget(19, reverse("admin:index"), self.staff["admin"])
+
+    def test_finance(self):
+        self.assertQueryBudget(21, reverse("admin:index"), self.staff["finance"])
+
+    def test_registrar(self):
+        self.assertQueryBudget(23, reverse("admin:index"), self.staff["registrar"])
+
+    def test_it_admin(self):
+        self.assertQueryBudget(23, reverse("admin:index"), self.staff["it_admin"])
+
+    def test_other_staff(self):
+        self.assertQueryBudget(21, reverse("admin:index"), self.staff["staff"])
+
+
+class KioskTokenAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(KioskToken, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(KioskToken, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(9, admin_url(KioskToken, "change", self.rows[0]["token"].pk))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KioskTokenApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.token = KioskToken.objects.create(name="Registry screen")
+        cls.finance_token = KioskToken.objects.create(name="Finance screen", scope=KioskToken.ScopeChoices.FINANCE)
+
+    def get(self, name="core:enrollment_kpis_api", key=None, **headers):
+        return self.client.get(reverse(name), headers={"Authorization": f"Token {key or self.token.key}", **headers})
+
+    def test_unchanged_data_revalidates_with_304(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.get(**{"If-None-Match": etag}).status_code, 304)
+
+        create_batch()
+        response = self.get(**{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unknown_and_inactive_tokens_are_refused(self):
+        self.assertEqual(self.get(key="not-a-token").status_code, 401)
+        KioskToken.objects.filter(pk=self.token.pk).update(is_active=False)
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.client.get(reverse("core:enrollment_kpis_api")).status_code, 401)
+
+    def test_token_must_cover_the_endpoint(self):
+        self.assertEqual(self.get("core:finance_kpis_api").status_code, 403)
+        self.assertEqual(self.get("core:finance_kpis_api", key=self.finance_token.key).status_code, 200)
+        self.assertEqual(self.get(key=self.finance_token.key).status_code, 403)
+
+    def test_query_parameter_is_off_by_default(self):
+        url = f"{reverse('core:enrollment_kpis_api')}?token={self.token.key}"
+        self.assertEqual(self.client.get(url).status_code, 401)
+        with mock.patch("core.authentication.KIOSK_TOKEN_QUERY_PARAM", True):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_last_used_at_is_written_once_a_minute(self):
+        self.get()
+        self.token.refresh_from_db()
+        first_use = self.token.last_used_at
+        self.assertIsNotNone(first_use)
+
+        self.get()
+        self.token.refresh_from_db()
+        self.assertEqual(self.token.last_used_at, first_use)
+
+        KioskToken.objects.filter(pk=self.token.pk).update(last_used_at=first_use - timedelta(minutes=2))
+        self.get()
+        self.token.refresh_from_db()
+        self.assertGreaterEqual(self.token.last_used_at, first_use)
+        self.assertLessEqual(self.token.last_used_at, timezone.now())
+
+
+@override_settings(CACHES=TEST_CACHES)
+@mock.patch("core.views.DASHBOARD_LIVE_EVENTS", True)
+class DashboardEventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_staff()
+
+    async def test_subscribes_only_while_streaming(self):
+        await self.async_client.aforce_login(self.staff["finance"])
+        response = await self.async_client.get(reverse("core:dashboard_events"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(broker.subscriber_count, 0)
+
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        self.assertEqual(broker.subscriber_count, 1)
+
+        broker.publish("payment", {"id": 1})
+        self.assertIn(b"event: payment", await anext(stream))
+
+        # A client disconnecting cancels the task waiting on the stream.
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(broker.subscriber_count, 0)
+
+    async def test_it_admin_gets_no_stream(self):
+        await self.async_client.aforce_login(self.staff["it_admin"])
+        response = await self.async_client.get(reverse("core:dashboard_events"))
+        self.assertEqual(response.status_code, 204)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DashboardLiveFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_staff()
+
+    def live_feed(self, role):
+        self.client.force_login(self.staff[role])
+        return self.client.get(reverse("admin:index")).context["live_feed"]
+
+    def test_dashboard_polls_the_kpi_endpoints(self):
+        self.assertEqual(
+            self.live_feed("finance"),
+            {"events": False, "poll_url": reverse("core:finance_kpis_api"), "poll_interval": 30000},
+        )
+        self.assertEqual(self.live_feed("registrar")["poll_url"], reverse("core:enrollment_kpis_api"))
+        self.assertEqual(self.live_feed("it_admin")["poll_url"], "")
+
+    async def test_event_stream_is_off_by_default(self):
+        await self.async_client.aforce_login(self.staff["finance"])
+        response = await self.async_client.get(reverse("core:dashboard_events"))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(broker.subscriber_count, 0)
+
+
+class DataVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_staff()
+
+    def widget_keys(self):
+        return _build_widget_cache_keys("finance", PAYMENT_WIDGET_MODELS, PAYMENT_WIDGET_MODELS)
+
+    def test_login_keeps_the_widget_cache_key(self):
+        keys = self.widget_keys()
+        self.assertTrue(self.client.login(username="budget-admin", password="budget-pass"))
+        self.staff["admin"].refresh_from_db()
+        self.assertIsNotNone(self.staff["admin"].last_login)
+        self.assertEqual(self.widget_keys(), keys)
+
+    def test_user_change_invalidates_the_widget_cache_key(self):
+        keys = self.widget_keys()
+        versions = get_data_versions(*TRACKED_MODELS)
+        user = self.staff["finance"]
+        user.first_name = "Renamed"
+        user.save(update_fields=["first_name"])
+        self.assertNotEqual(self.widget_keys(), keys)
+        self.assertEqual(get_data_versions("accounts.User")["accounts.User"], versions["accounts.User"] + 1)
+
+
+class BackupTests(SimpleTestCase):
+    """Backups of a scratch SQLite file standing in for the default database."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.database = self.directory / "live.sqlite3"
+        with sqlite3.connect(self.database) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE payment (id INTEGER PRIMARY KEY, amount TEXT)")
+            connection.executemany("INSERT INTO payment (amount) VALUES (?)", [(str(n),) for n in range(2000)])
+        connection.close()
+        patcher = mock.patch("core.backups.database_path", return_value=self.database)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def amounts(self):
+        connection = sqlite3.connect(self.database)
+        try:
+            return [amount for (amount,) in connection.execute("SELECT amount FROM payment ORDER BY id")]
+        finally:
+            connection.close()
+
+    def backup(self, compress=True):
+        metadata = create_backup(self.directory / "backups", compress=compress, pages=4, step_sleep=0)
+        return self.directory / "backups" / metadata["file"], metadata
+
+    def test_backup_and_restore_round_trip(self):
+        original = self.amounts()
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                path, metadata = self.backup(compress)
+                self.assertEqual(metadata["compressed"], compress)
+                self.assertGreater(metadata["steps"], 1)
+                self.assertEqual(verify_backup(path), metadata)
+
+                with sqlite3.connect(self.database) as connection:
+                    connection.execute("DELETE FROM payment WHERE id > 10")
+                connection.close()
+                self.assertEqual(len(self.amounts()), 10)
+
+                self.assertEqual(restore_backup(path), metadata)
+                self.assertEqual(self.amounts(), original)
+
+    def test_damaged_backup_is_refused(self):
+        path, _ = self.backup()
+        with open(path, "ab") as backup:
+            backup.write(b"\0")
+        with sqlite3.connect(self.database) as connection:
+            connection.execute("DELETE FROM payment")
+        connection.close()
+
+        with self.assertRaisesMessage(BackupError, "does not match its checksum"):
+            restore_backup(path)
+        self.assertEqual(self.amounts(), [])
+
+        path.with_name(path.name + ".json").unlink()
+        with self.assertRaises(BackupError):
+            verify_backup(path)
+
+    def test_retention_policy(self):
+        def backup(name, *moment):
+            return {"file": name, "created_at": timezone.make_aware(datetime(2026, *moment)).isoformat()}
+
+        backups = [
+            backup("mar-10-evening", 3, 10, 18),
+            backup("mar-10-morning", 3, 10, 6),
+            backup("mar-09-evening", 3, 9, 18),
+            backup("mar-09-morning", 3, 9, 6),
+            backup("mar-08", 3, 8, 12),
+            backup("mar-07", 3, 7, 12),
+            backup("feb-20", 2, 20, 12),
+            backup("feb-10", 2, 10, 12),
+            backup("jan-05", 1, 5, 12),
+        ]
+        self.assertEqual(
+            select_retained(backups, keep_last=2, keep_daily=3, keep_monthly=2),
+            # The newest two; the newest of the last three days; the newest of the last two months.
+            {"mar-10-evening", "mar-10-morning", "mar-09-evening", "mar-08", "feb-20"},
+        )
+        self.assertEqual(select_retained(backups, keep_last=0, keep_daily=0, keep_monthly=0), set())
+
+    def test_prune_deletes_backups_and_sidecars(self):
+        paths = [self.backup()[0] for _ in range(3)]
+        removed = prune_backups(self.directory / "backups", keep_last=1, keep_daily=0, keep_monthly=0)
+        self.assertEqual(sorted(removed), sorted(path.name for path in paths[:2]))
+        self.assertEqual(
+            sorted(path.name for path in (self.directory / "backups").iterdir()),
+            [paths[2].name, paths[2].name + ".json"],
+        )
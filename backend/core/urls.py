@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = "core"
+
+urlpatterns = [
+    path("kpis/enrollment/", views.enrollment_kpis_api, name="enrollment_kpis_api"),
+    path("kpis/enrollment/trend/", views.enrollment_trend_api, name="enrollment_trend_api"),
+    path("kpis/finance/", views.finance_kpis_api, name="finance_kpis_api"),
+    path("events/dashboard/", views.dashboard_events_stream, name="dashboard_events"),
+]
@@ -0,0 +1,54 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import DataVersion
+
+# Models whose changes invalidate dashboard numbers. Each one gets its own
+# counter so a new payment does not invalidate, say, the upcoming batches widget.
+TRACKED_MODELS = (
+    "accounts.User",
+    "courses.Course",
+    "courses.Batch",
+    "enrollments.Enrollment",
+    "finance.Payment",
+)
+
+
+def bump_data_version(*labels: str) -> None:
+    """
+    Increment the data version of each given model label.
+    Called from model signals; code that writes with `QuerySet.update()`
+    or `bulk_create()` must call this itself because no signals fire.
+    """
+    for label in labels:
+        updated = DataVersion.objects.filter(label=label).update(
+            version=F("version") + 1
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(label=label, version=1)
+        except IntegrityError:
+            # Another writer created the row first; just bump it.
+            DataVersion.objects.filter(label=label).update(version=F("version") + 1)
+
+
+def get_data_versions(*labels: str) -> dict[str, int]:
+    """
+    Return the current version for each label in a single query.
+    Labels that have never been bumped report version 0.
+    """
+    versions = dict(
+        DataVersion.objects.filter(label__in=labels).values_list("label", "version")
+    )
+    return {label: versions.get(label, 0) for label in labels}
+
+
+def get_data_version_key(*labels: str) -> str:
+    """
+    Return a compact string combining the versions of the given labels,
+    suitable for use in cache keys and ETags.
+    """
+    versions = get_data_versions(*labels)
+    return "-".join(str(versions[label]) for label in labels)
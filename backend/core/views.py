@@ -1,6 +1,21 @@
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+from django.views.decorators.vary import vary_on_headers
 
 from accounts.models import User
+from .authentication import kiosk_token_required
+from .events import broker
+from .models import KioskToken
+from .versioning import TRACKED_MODELS, get_data_version_key, get_data_versions
 from enrollments.services import (
     get_enrollment_dashboard_stats,
     get_recent_enrollments,
@@ -8,6 +23,20 @@ from enrollments.services import (
 from finance.services import get_finance_dashboard_stats, get_recent_payments
 
 
+DASHBOARD_FRAGMENT_CACHE_TIMEOUT = getattr(settings, "DASHBOARD_FRAGMENT_CACHE_TIMEOUT", 300)
+
+# Server-sent events hold a connection open per dashboard tab, which only an
+# ASGI server can afford; otherwise the dashboard polls (see settings).
+DASHBOARD_LIVE_EVENTS = getattr(settings, "DASHBOARD_LIVE_EVENTS", False)
+DASHBOARD_POLL_INTERVAL = getattr(settings, "DASHBOARD_POLL_INTERVAL", 30)
+
+# Models whose changes invalidate each kind of dashboard widget. Student and
+# instructor names (accounts.User) and course codes appear in every widget.
+BATCH_WIDGET_MODELS = ("courses.Batch", "courses.Course", "accounts.User")
+ENROLLMENT_WIDGET_MODELS = ("enrollments.Enrollment", *BATCH_WIDGET_MODELS)
+PAYMENT_WIDGET_MODELS = ("finance.Payment", *ENROLLMENT_WIDGET_MODELS)
+
+
 def _get_role_flags(user: User) -> dict:
     """
     Derive high-level role flags from both the custom `role` field
@@ -115,6 +144,41 @@ def _build_quick_actions(user: User) -> list[dict]:
     return actions
 
 
+def _build_widget_cache_keys(role: str, primary_models, secondary_models) -> dict:
+    """
+    Build fragment cache keys for the dashboard widgets from the role and the
+    data versions of the models each widget displays. The date is included
+    because "upcoming", "approaching" and "overdue" shift every day.
+    """
+    versions = get_data_versions(*TRACKED_MODELS)
+    today = timezone.localdate().isoformat()
+
+    def key(labels):
+        return ":".join([role, today, *(str(versions[label]) for label in labels)])
+
+    return {"primary": key(primary_models), "secondary": key(secondary_models)}
+
+
+def _live_feed_options(flags: dict) -> dict:
+    """
+    How the dashboard keeps its recent payments/enrollments current: the
+    event stream when enabled, or else polling the KPI endpoint whose ETag
+    covers the feed. Staff without finance access poll the enrollment KPIs,
+    so their payments feed refreshes with the next enrollment change.
+    """
+    if flags["is_finance"] or flags["is_super_admin"]:
+        poll_url = reverse("core:finance_kpis_api")
+    elif flags["is_it_admin"]:
+        poll_url = ""
+    else:
+        poll_url = reverse("core:enrollment_kpis_api")
+    return {
+        "events": DASHBOARD_LIVE_EVENTS,
+        "poll_url": poll_url,
+        "poll_interval": DASHBOARD_POLL_INTERVAL * 1000,
+    }
+
+
 def dashboard_callback(request, context: dict) -> dict:
     """
     Prepare custom variables for the Unfold-powered admin dashboard.
@@ -180,6 +244,11 @@ def dashboard_callback(request, context: dict) -> dict:
                     "value": finance_stats["outstanding_total"],
                     "description": "Sum of unpaid balances across all enrollments.",
                 },
+                {
+                    "label": "Overdue accounts",
+                    "value": finance_stats["overdue_count"],
+                    "description": "Active enrollments with an unpaid installment past its due date.",
+                },
             ]
         )
 
@@ -258,21 +327,28 @@ def dashboard_callback(request, context: dict) -> dict:
         "role_flags": flags,
     }
 
-    # Widget content varies by role
+    # Widget content varies by role. Widget data is passed lazily so a cached
+    # fragment (see templates/admin/index.html) never runs its queries.
     if flags["is_finance"]:
         # Finance Officer gets recent payments and top debtors
+        widget_role = "finance"
+        widget_models = (PAYMENT_WIDGET_MODELS, PAYMENT_WIDGET_MODELS)
         context_data["recent_payments"] = get_recent_payments()
-        context_data["top_debtors"] = get_top_debtors()
+        context_data["top_debtors"] = SimpleLazyObject(get_top_debtors)
         context_data["widget_title"] = "Recent Payments"
         context_data["secondary_widget_title"] = "Top Debtors"
     elif flags["is_registrar"]:
         # Registrar gets recent and approaching-completion enrollments
+        widget_role = "registrar"
+        widget_models = (ENROLLMENT_WIDGET_MODELS, ENROLLMENT_WIDGET_MODELS)
         context_data["recent_enrollments"] = get_recent_enrollments()
         context_data["approaching_enrollments"] = get_approaching_completion_enrollments()
         context_data["widget_title"] = "Recent Enrollments"
         context_data["secondary_widget_title"] = "Approaching Completion"
     elif flags["is_it_admin"]:
         # IT Admin gets upcoming batches and recently created staff
+        widget_role = "it_admin"
+        widget_models = (BATCH_WIDGET_MODELS, BATCH_WIDGET_MODELS)
         context_data["upcoming_batches"] = get_upcoming_batches()
         context_data["recent_staff"] = get_recently_created_staff()
         context_data["instructor_load"] = get_instructor_load()
@@ -280,17 +356,224 @@ def dashboard_callback(request, context: dict) -> dict:
         context_data["secondary_widget_title"] = "Recently Created Staff"
     elif flags["is_super_admin"]:
         # Super Admin gets finance overview with revenue breakdown
+        widget_role = "super_admin"
+        widget_models = (PAYMENT_WIDGET_MODELS, PAYMENT_WIDGET_MODELS)
         context_data["recent_payments"] = get_recent_payments()
-        context_data["revenue_by_course"] = get_revenue_by_course()
+        context_data["revenue_by_course"] = SimpleLazyObject(get_revenue_by_course)
         context_data["widget_title"] = "Recent Payments"
         context_data["secondary_widget_title"] = "Revenue by Course"
     else:
         # Default for other staff without specific role
+        widget_role = "staff"
+        widget_models = (ENROLLMENT_WIDGET_MODELS, PAYMENT_WIDGET_MODELS)
         context_data["recent_enrollments"] = get_recent_enrollments()
         context_data["recent_payments"] = get_recent_payments()
         context_data["widget_title"] = "Recent Enrollments"
         context_data["secondary_widget_title"] = "Recent Payments"
 
+    context_data["widget_cache_keys"] = _build_widget_cache_keys(widget_role, *widget_models)
+    context_data["widget_cache_timeout"] = DASHBOARD_FRAGMENT_CACHE_TIMEOUT
+    context_data["live_feed"] = _live_feed_options(flags)
+
     context.update(context_data)
     return context
 
+
+KPI_API_MAX_AGE = getattr(settings, "KPI_API_MAX_AGE", 5)
+
+ENROLLMENT_KPI_MODELS = ("enrollments.Enrollment", "courses.Batch")
+FINANCE_KPI_MODELS = ("finance.Payment", "enrollments.Enrollment")
+
+
+def _kpi_etag(scope: str, labels: tuple[str, ...]):
+    """
+    Build an ETag function for a KPI endpoint.
+    The tag changes when any of the underlying models change, and at
+    midnight because "today" and "this week" figures roll over.
+    """
+    def etag_func(request, *args, **kwargs):
+        today = timezone.localdate().isoformat()
+        return f"{scope}-{today}-{get_data_version_key(*labels)}"
+
+    return etag_func
+
+
+def _can_view_finance_kpis(user: User) -> bool:
+    flags = _get_role_flags(user)
+    return flags["is_finance"] or flags["is_super_admin"]
+
+
+@require_safe
+@kiosk_token_required(KioskToken.ScopeChoices.ENROLLMENT)
+@vary_on_headers("Authorization", "Cookie")
+@cache_control(private=True, max_age=KPI_API_MAX_AGE, must_revalidate=True)
+@condition(etag_func=_kpi_etag("enrollment", ENROLLMENT_KPI_MODELS))
+def enrollment_kpis_api(request):
+    """
+    Read-only JSON KPIs for registrar wall displays.
+    Unchanged polls are answered with 304 before any aggregate runs.
+    """
+    from enrollments.services import (
+        get_new_enrollments_today,
+        get_new_enrollments_this_week,
+    )
+
+    stats = get_enrollment_dashboard_stats()
+    return JsonResponse(
+        {
+            "scope": "enrollment",
+            "generated_at": timezone.now(),
+            "kpis": {
+                **stats,
+                "new_enrollments_today": get_new_enrollments_today(),
+                "new_enrollments_this_week": get_new_enrollments_this_week(),
+            },
+        }
+    )
+
+
+# Longest history the trend endpoint returns in one response.
+TREND_MAX_DAYS = 366
+
+
+def _trend_etag(request, *args, **kwargs):
+    # Same rule as the KPI endpoints, plus the query: each chart has its own tag.
+    today = timezone.localdate().isoformat()
+    query = request.GET.urlencode()
+    return f"enrollment-trend-{today}-{get_data_version_key(*ENROLLMENT_KPI_MODELS)}-{query}"
+
+
+@require_safe
+@kiosk_token_required(KioskToken.ScopeChoices.ENROLLMENT)
+@vary_on_headers("Authorization", "Cookie")
+@cache_control(private=True, max_age=KPI_API_MAX_AGE, must_revalidate=True)
+@condition(etag_func=_trend_etag)
+def enrollment_trend_api(request):
+    """
+    Daily enrollment counts for registrar trend charts, read from the
+    per-course status snapshots rather than by scanning enrollments.
+    Query: `days` (default 30), `status` (default ACTIVE) and any number
+    of `course` codes (default: all courses).
+    """
+    from courses.models import Course
+    from enrollments.history import get_status_trend
+    from enrollments.models import Enrollment
+
+    try:
+        days = int(request.GET.get("days", 30))
+    except ValueError:
+        days = 0
+    status = request.GET.get("status", Enrollment.StatusChoices.ACTIVE)
+    if not 1 <= days <= TREND_MAX_DAYS or status not in Enrollment.StatusChoices.values:
+        return JsonResponse(
+            {"error": f"days must be 1-{TREND_MAX_DAYS} and status one of {', '.join(Enrollment.StatusChoices.values)}."},
+            status=400,
+        )
+
+    codes = request.GET.getlist("course")
+    course_ids = list(Course.objects.filter(code__in=codes).values_list("pk", flat=True)) if codes else None
+    end = timezone.localdate()
+    return JsonResponse(
+        {
+            "scope": "enrollment",
+            "generated_at": timezone.now(),
+            "status": status,
+            "courses": codes,
+            "series": get_status_trend(end - timedelta(days=days - 1), end, status, course_ids),
+        }
+    )
+
+
+@require_safe
+@kiosk_token_required(KioskToken.ScopeChoices.FINANCE, staff_check=_can_view_finance_kpis)
+@vary_on_headers("Authorization", "Cookie")
+@cache_control(private=True, max_age=KPI_API_MAX_AGE, must_revalidate=True)
+@condition(etag_func=_kpi_etag("finance", FINANCE_KPI_MODELS))
+def finance_kpis_api(request):
+    """
+    Read-only JSON KPIs for finance office wall displays.
+    Amounts are serialized as decimal strings to avoid float rounding.
+    """
+    return JsonResponse(
+        {
+            "scope": "finance",
+            "generated_at": timezone.now(),
+            "kpis": get_finance_dashboard_stats(),
+        }
+    )
+
+
+# Seconds between keep-alive comments on idle event streams, so proxies
+# do not close connections that have had no events for a while.
+EVENT_STREAM_HEARTBEAT = getattr(settings, "EVENT_STREAM_HEARTBEAT", 15)
+
+
+def _dashboard_event_types(user: User) -> set[str]:
+    """
+    Work out which live events a user's dashboard displays, mirroring the
+    widgets chosen in `dashboard_callback`.
+    """
+    flags = _get_role_flags(user)
+    if flags["is_finance"]:
+        return {"payment"}
+    if flags["is_registrar"]:
+        return {"enrollment"}
+    if flags["is_it_admin"]:
+        return set()
+    if flags["is_super_admin"]:
+        return {"payment"}
+    return {"payment", "enrollment"}
+
+
+async def _event_stream(event_types, last_event_id):
+    # Subscribe on first iteration, on the server's event loop, so a response
+    # that is never streamed leaves nothing registered with the broker.
+    subscription = broker.subscribe(event_types, last_event_id=last_event_id)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=EVENT_STREAM_HEARTBEAT
+                )
+            except TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield event.encoded
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def dashboard_events_stream(request):
+    """
+    Server-sent events feed of new payments and enrollments for the admin
+    dashboard. Events come from the in-process broker, so an idle connection
+    costs a queue and never queries the database. Needs an ASGI server
+    (config/asgi.py); under WSGI the stream would tie up a worker, so it is
+    off (404) unless DASHBOARD_LIVE_EVENTS is set. Only saves made in the
+    process serving the stream are seen, so serve this URL from a single
+    worker process.
+    """
+    if not DASHBOARD_LIVE_EVENTS:
+        return HttpResponse(status=404)
+    user = await request.auser()
+    if not user.is_authenticated or not user.is_staff:
+        return HttpResponse(status=403)
+
+    event_types = await sync_to_async(_dashboard_event_types)(user)
+    if not event_types:
+        return HttpResponse(status=204)
+
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(
+        _event_stream(event_types, last_event_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.db.models import Count
+from django.template.response import TemplateResponse
+from django.urls import path
 from unfold.admin import ModelAdmin
 from .models import Course, Batch
+from .scheduling import get_schedule_conflicts
 
 @admin.register(Course)
 class CourseAdmin(ModelAdmin): # Changed here
@@ -34,12 +37,39 @@ class BatchAdmin(ModelAdmin): # Changed here
     autocomplete_fields = ('course', 'instructor')
     list_per_page = 25
 
+    class Media:
+        # Passes the chosen dates to the instructor autocomplete so it only
+        # offers instructors who are free for the whole batch.
+        js = ('courses/js/instructor_availability.js',)
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         return qs.select_related('course', 'instructor').annotate(
             enrollment_total=Count('enrollments')
         )
 
+    def get_urls(self):
+        urls = [
+            path(
+                'conflicts/',
+                self.admin_site.admin_view(self.conflicts_view),
+                name='courses_batch_conflicts',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def conflicts_view(self, request):
+        """
+        Report every instructor double-booking among batches that have not ended.
+        """
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Instructor schedule conflicts",
+            'opts': self.model._meta,
+            'conflicts': get_schedule_conflicts(),
+        }
+        return TemplateResponse(request, 'admin/courses/batch/conflicts.html', context)
+
     @admin.display(description="Enrollments", ordering='enrollment_total')
     def enrollment_count(self, obj):
         return getattr(obj, 'enrollment_total', 0)
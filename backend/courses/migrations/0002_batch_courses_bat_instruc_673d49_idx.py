@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['instructor', 'start_date', 'end_date'], name='courses_bat_instruc_673d49_idx'),
+        ),
+    ]
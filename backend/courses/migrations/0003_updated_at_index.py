@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_batch_courses_bat_instruc_673d49_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['updated_at'], name='courses_bat_updated_84bd75_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['updated_at'], name='courses_cou_updated_7a0525_idx'),
+        ),
+    ]
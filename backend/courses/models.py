@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from core.models import TimeStampedModel
 from django.conf import settings
@@ -9,6 +10,12 @@ class Course(TimeStampedModel):
     description = models.TextField()
     base_fee = models.DecimalField(max_digits=10, decimal_places=2, help_text="Default cost in KES")
 
+    class Meta:
+        indexes = [
+            # The analytics export reads rows changed since its last run
+            models.Index(fields=['updated_at']),
+        ]
+
     def __str__(self):
         return f"{self.code} - {self.title}"
 
@@ -29,5 +36,33 @@ class Batch(TimeStampedModel):
     start_date = models.DateField()
     end_date = models.DateField()
 
+    class Meta:
+        indexes = [
+            # Backs instructor double-booking checks and availability lookups
+            models.Index(fields=['instructor', 'start_date', 'end_date']),
+            # The analytics export reads rows changed since its last run
+            models.Index(fields=['updated_at']),
+        ]
+
+    def clean(self):
+        super().clean()
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': "End date cannot be before the start date."})
+
+        if self.instructor_id and self.start_date and self.end_date and self.is_active:
+            from .scheduling import get_conflicting_batches
+
+            clashes = list(
+                get_conflicting_batches(self.instructor_id, self.start_date, self.end_date, exclude_pk=self.pk)
+            )
+            if clashes:
+                details = ", ".join(
+                    f"{batch.course.code} | {batch.name} ({batch.start_date} to {batch.end_date})"
+                    for batch in clashes
+                )
+                raise ValidationError(
+                    {'instructor': f"This instructor is already teaching during these dates: {details}."}
+                )
+
     def __str__(self):
         return f"{self.course.code} | {self.name}"
@@ -0,0 +1,111 @@
+import heapq
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Batch
+
+
+class InstructorScheduleIndex:
+    """
+    Per-instructor interval index over batch date ranges, with each
+    instructor's batches sorted by start date once (O(n log n)). Date ranges
+    are inclusive on both ends.
+    """
+
+    def __init__(self, batches):
+        grouped: dict = defaultdict(list)
+        for batch in batches:
+            if batch.instructor_id is not None:
+                grouped[batch.instructor_id].append(batch)
+
+        self._batches: dict = {}
+        for instructor_id, items in grouped.items():
+            items.sort(key=lambda batch: (batch.start_date, batch.end_date))
+            self._batches[instructor_id] = items
+
+    @classmethod
+    def from_database(cls, active_from: date | None = None):
+        """
+        Build the index from active, assigned batches. With `active_from`,
+        batches that ended before that day are left out.
+        """
+        batches = Batch.objects.filter(instructor__isnull=False, is_active=True).select_related(
+            "course", "instructor"
+        )
+        if active_from is not None:
+            batches = batches.filter(end_date__gte=active_from)
+        return cls(batches)
+
+    def conflicts(self) -> list[tuple[Batch, Batch]]:
+        """
+        Return every pair of overlapping batches for the same instructor.
+        A sweep over start-sorted batches keeps a min-heap of end dates, so
+        the cost is O(n log n) plus the number of conflicting pairs.
+        """
+        pairs: list[tuple[Batch, Batch]] = []
+        for items in self._batches.values():
+            running: list = []
+            for position, batch in enumerate(items):
+                while running and running[0][0] < batch.start_date:
+                    heapq.heappop(running)
+                pairs.extend((items[other], batch) for _, other in running)
+                heapq.heappush(running, (batch.end_date, position))
+        return pairs
+
+
+def get_conflicting_batches(instructor, start: date, end: date, exclude_pk=None):
+    """
+    Return active batches of `instructor` whose dates overlap start..end.
+    Used when validating a single batch, where one indexed query is cheaper
+    than building the full index.
+    """
+    batches = Batch.objects.filter(
+        instructor=instructor,
+        is_active=True,
+        start_date__lte=end,
+        end_date__gte=start,
+    ).select_related("course")
+    if exclude_pk is not None:
+        batches = batches.exclude(pk=exclude_pk)
+    return batches
+
+
+def get_schedule_conflicts() -> list[dict]:
+    """
+    Return all current instructor double-bookings (batches that have not
+    ended yet), ordered by instructor and start date.
+    """
+    index = InstructorScheduleIndex.from_database(active_from=timezone.localdate())
+    conflicts = []
+    for first, second in index.conflicts():
+        conflicts.append(
+            {
+                "instructor": first.instructor,
+                "first": first,
+                "second": second,
+                "overlap_start": max(first.start_date, second.start_date),
+                "overlap_end": min(first.end_date, second.end_date),
+            }
+        )
+    conflicts.sort(key=lambda conflict: (str(conflict["instructor"]), conflict["overlap_start"]))
+    return conflicts
+
+
+def get_available_instructors(start: date, end: date, exclude_batch_pk=None):
+    """
+    Return instructors with no active batch overlapping start..end.
+    """
+    from accounts.models import User
+
+    busy = Batch.objects.filter(
+        instructor=OuterRef("pk"),
+        is_active=True,
+        start_date__lte=end,
+        end_date__gte=start,
+    )
+    if exclude_batch_pk is not None:
+        busy = busy.exclude(pk=exclude_batch_pk)
+    return User.objects.filter(role=User.RoleChoices.INSTRUCTOR).filter(~Exists(busy))
@@ -0,0 +1,28 @@
+"use strict";
+{
+    // Append the batch dates to instructor autocomplete requests on the
+    // batch form, so the dropdown only lists instructors free for those dates.
+    const $ = django.jQuery;
+
+    function batchPk() {
+        const match = window.location.pathname.match(/\/batch\/([^/]+)\/change\/$/);
+        return match ? match[1] : "";
+    }
+
+    $.ajaxPrefilter(function (options) {
+        // For GET requests the query string is still in `options.data` here.
+        const data = typeof options.data === "string" ? options.data : "";
+        if (!options.url || options.url.indexOf("/autocomplete/") === -1) {
+            return;
+        }
+        if (data.indexOf("field_name=instructor") === -1 || data.indexOf("model_name=batch") === -1) {
+            return;
+        }
+        const start = $("#id_start_date").val();
+        const end = $("#id_end_date").val();
+        if (!start || !end) {
+            return;
+        }
+        options.data = data + "&" + $.param({start_date: start, end_date: end, batch: batchPk()});
+    });
+}
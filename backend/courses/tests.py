@@ -1,3 +1,67 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetTestCase, admin_url
+from courses.models import Batch, Course
+from courses.scheduling import InstructorScheduleIndex
+
+
+class CourseAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(Course, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(Course, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(9, admin_url(Course, "change", self.rows[0]["course"].pk))
+
+
+class BatchAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(Batch, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(Batch, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(11, admin_url(Batch, "change", self.rows[0]["batch"].pk))
+
+    def test_course_autocomplete(self):
+        self.assertAutocompleteBudget(3, Batch, "course")
+
+    def test_instructor_autocomplete(self):
+        self.assertAutocompleteBudget(3, Batch, "instructor")
+
+    def test_conflicts(self):
+        self.assertQueryBudget(8, reverse("admin:courses_batch_conflicts"))
+
+
+class ScheduleConflictTests(SimpleTestCase):
+    def batch(self, name, start_day, end_day, instructor_id=1):
+        return Batch(
+            name=name,
+            instructor_id=instructor_id,
+            start_date=date(2026, 1, start_day),
+            end_date=date(2026, 1, end_day),
+        )
+
+    def conflicts(self, *batches):
+        return {(first.name, second.name) for first, second in InstructorScheduleIndex(batches).conflicts()}
+
+    def test_touching_batches_conflict(self):
+        # Ranges are inclusive: a batch ending on the day another starts overlaps it.
+        self.assertEqual(self.conflicts(self.batch("A", 1, 10), self.batch("B", 10, 20)), {("A", "B")})
+
+    def test_back_to_back_batches_do_not_conflict(self):
+        self.assertEqual(self.conflicts(self.batch("A", 1, 10), self.batch("B", 11, 20)), set())
+
+    def test_nested_batches(self):
+        batches = [self.batch("Outer", 1, 30), self.batch("First", 5, 10), self.batch("Second", 12, 15)]
+        self.assertEqual(self.conflicts(*batches), {("Outer", "First"), ("Outer", "Second")})
+
+    def test_other_instructors_and_unassigned_batches_are_ignored(self):
+        batches = [self.batch("A", 1, 10), self.batch("B", 5, 15, instructor_id=2), self.batch("C", 5, 15, None)]
+        self.assertEqual(self.conflicts(*batches), set())
@@ -1,8 +1,70 @@
-from django.contrib import admin
-from django.db.models import DecimalField, Sum
-from django.db.models.functions import Coalesce
-from unfold.admin import ModelAdmin
-from .models import Enrollment
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
+from django.template.response import TemplateResponse
+from unfold.admin import ModelAdmin, TabularInline
+from .installments import overdue_q, refresh_due_state
+from .lifecycle import RULES, apply_rules, get_rules, preview_rules
+from .models import Enrollment, EnrollmentStatusChange, Installment
+
+
+class InstallmentFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+        total = sum(
+            form.cleaned_data['amount']
+            for form in self.forms
+            if form.cleaned_data and not form.cleaned_data.get('DELETE')
+        )
+        if total != self.instance.agreed_fee:
+            raise ValidationError(
+                f"Installments add up to {total}, but the agreed fee is {self.instance.agreed_fee}."
+            )
+
+
+class InstallmentInline(TabularInline):
+    model = Installment
+    formset = InstallmentFormSet
+    fields = ('sequence', 'due_date', 'amount')
+    ordering = ('sequence',)
+    extra = 0
+
+
+class StatusChangeInline(TabularInline):
+    model = EnrollmentStatusChange
+    fields = ('changed_at', 'from_status', 'to_status', 'changed_by', 'reason')
+    readonly_fields = fields
+    ordering = ('-changed_at',)
+    extra = 0
+    verbose_name_plural = 'status history'
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class OverdueListFilter(admin.SimpleListFilter):
+    title = 'installments'
+    parameter_name = 'overdue'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'Overdue'), ('no', 'Up to date'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(overdue_q())
+        if self.value() == 'no':
+            return queryset.exclude(overdue_q())
+        return queryset
+
 
 @admin.register(Enrollment)
 class EnrollmentAdmin(ModelAdmin): # Changed here
@@ -12,24 +74,88 @@ class EnrollmentAdmin(ModelAdmin): # Changed here
         'status',
         'agreed_fee',
         'balance',
+        'next_due_date',
+        'amount_due',
         'created_at',
     )
-    list_filter = ('status', 'batch__course', 'is_active', 'created_at')
+    list_filter = ('status', OverdueListFilter, 'batch__course', 'is_active', 'created_at')
     search_fields = ('student__username', 'student__first_name', 'student__last_name', 'batch__name')
     autocomplete_fields = ('student', 'batch')
+    readonly_fields = ('amount_paid', 'next_due_date', 'amount_due')
+    actions = ('apply_lifecycle_rules',)
     list_per_page = 25
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related('student', 'batch', 'batch__course').annotate(
-            paid_amount=Coalesce(
-                Sum('payments__amount'),
-                0,
-                output_field=DecimalField(max_digits=10, decimal_places=2),
-            )
-        )
+        return qs.select_related('student', 'batch', 'batch__course')
+
+    def get_inlines(self, request, obj):
+        # New enrollments get the default plan when saved; adjust it afterwards.
+        return [InstallmentInline, StatusChangeInline] if obj else []
+
+    def save_model(self, request, obj, form, change):
+        obj._status_changed_by = request.user
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            refresh_due_state(form.instance.pk)
 
     @admin.display(description="Balance")
     def balance(self, obj):
-        paid = getattr(obj, 'paid_amount', 0)
-        return obj.agreed_fee - paid
+        return obj.agreed_fee - obj.amount_paid
+
+    @admin.action(description="Apply lifecycle rules to selected enrollments", permissions=['change'])
+    def apply_lifecycle_rules(self, request, queryset):
+        """
+        Show how many of the selected enrollments each rule would move; on
+        confirmation apply the chosen rules, one UPDATE per rule.
+        """
+        if request.POST.get('confirm'):
+            try:
+                rules = get_rules(request.POST.getlist('rule'))
+            except KeyError:
+                rules = []
+            if not rules:
+                self.message_user(request, "No lifecycle rule was chosen.", messages.WARNING)
+                return None
+            results = apply_rules(rules, queryset=queryset, changed_by=request.user)
+            summary = ", ".join(f"{name}: {count}" for name, count in results.items())
+            self.message_user(request, f"Lifecycle rules applied ({summary}).", messages.SUCCESS)
+            return None
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Apply lifecycle rules",
+            'opts': self.model._meta,
+            'preview': preview_rules(RULES, queryset=queryset),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/enrollments/enrollment/apply_lifecycle_rules.html', context)
+
+
+@admin.register(EnrollmentStatusChange)
+class EnrollmentStatusChangeAdmin(ModelAdmin):
+    """The transition log is append-only; it is written by enrollments.history."""
+    list_display = ('changed_at', 'enrollment_label', 'course', 'from_status', 'to_status', 'changed_by', 'reason')
+    list_filter = ('to_status', 'from_status', 'reason', 'course', 'changed_at')
+    list_select_related = ('enrollment__student', 'enrollment__batch', 'course', 'changed_by')
+    search_fields = ('enrollment__student__username', 'course__code')
+    date_hierarchy = 'changed_at'
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Enrollment", ordering='enrollment')
+    def enrollment_label(self, obj):
+        return obj.enrollment or f"{obj.enrollment_id} (archived)"
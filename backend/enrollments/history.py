@@ -0,0 +1,172 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from courses.models import Course
+
+from .models import CourseStatusSnapshot, Enrollment, EnrollmentStatusChange
+
+_maintenance = threading.local()
+
+
+@contextmanager
+def paused_status_history():
+    """
+    Keep deleted enrollments in the status counts inside this block. Used
+    when enrollments move to the archive: they still happened.
+    """
+    previous = getattr(_maintenance, "paused", False)
+    _maintenance.paused = True
+    try:
+        yield
+    finally:
+        _maintenance.paused = previous
+
+
+def status_history_paused() -> bool:
+    return getattr(_maintenance, "paused", False)
+
+
+def _apply_deltas(day: date, deltas: dict) -> None:
+    """
+    Add each `(course_id, status) -> delta` to the snapshot for `day` and
+    to every later snapshot, creating the day's row from the latest earlier
+    count when there is none yet. A handful of indexed statements per key.
+    """
+    for (course_id, status), delta in deltas.items():
+        if not delta:
+            continue
+        rows = CourseStatusSnapshot.objects.filter(course_id=course_id, status=status)
+        # Only a backdated change finds rows after `day`.
+        rows.filter(date__gt=day).update(count=F("count") + delta)
+        if rows.filter(date=day).update(count=F("count") + delta):
+            continue
+        previous = rows.filter(date__lt=day).order_by("-date").values_list("count", flat=True).first() or 0
+        try:
+            with transaction.atomic():
+                CourseStatusSnapshot.objects.create(course_id=course_id, status=status, date=day, count=previous + delta)
+        except IntegrityError:
+            # Another writer created the day's row first; add to it.
+            rows.filter(date=day).update(count=F("count") + delta)
+
+
+@transaction.atomic
+def record_transitions(changes, changed_by=None, at=None, reason: str = "") -> int:
+    """
+    Log status transitions and fold them into the daily snapshots.
+
+    `changes` yields `(enrollment_id, course_id, from_status, to_status)`;
+    a blank `from_status` records a new enrollment. Transitions to the same
+    status are ignored. `reason` labels automatic transitions in the log.
+    Returns the number of transitions recorded.
+
+    Saving an Enrollment calls this through a signal. Code that changes
+    statuses with `QuerySet.update()` must call it itself, with every row
+    it changed, as well as bumping the enrollment data version.
+    """
+    at = at or timezone.now()
+    changed_by_id = changed_by.pk if changed_by is not None else None
+    entries = []
+    deltas = Counter()
+    for enrollment_id, course_id, from_status, to_status in changes:
+        if from_status == to_status:
+            continue
+        entries.append(
+            EnrollmentStatusChange(
+                enrollment_id=enrollment_id,
+                course_id=course_id,
+                from_status=from_status or "",
+                to_status=to_status,
+                changed_at=at,
+                changed_by_id=changed_by_id,
+                reason=reason,
+            )
+        )
+        if from_status:
+            deltas[(course_id, from_status)] -= 1
+        deltas[(course_id, to_status)] += 1
+    EnrollmentStatusChange.objects.bulk_create(entries, batch_size=500)
+    _apply_deltas(timezone.localdate(at), deltas)
+    return len(entries)
+
+
+@transaction.atomic
+def move_between_courses(status: str, from_course_id, to_course_id, at=None) -> None:
+    """
+    Move one enrollment's count to another course's snapshots, for an
+    enrollment transferred to a batch of a different course. Its status did
+    not change, so nothing is logged.
+    """
+    day = timezone.localdate(at or timezone.now())
+    _apply_deltas(day, {(from_course_id, status): -1, (to_course_id, status): 1})
+
+
+@transaction.atomic
+def remove_from_counts(status: str, course_id, at=None) -> None:
+    """Take a deleted enrollment out of its course's counts from the day it was deleted."""
+    _apply_deltas(timezone.localdate(at or timezone.now()), {(course_id, status): -1})
+
+
+def get_status_counts(on: date | None = None, course_ids=None) -> dict:
+    """
+    Return `{course_id: {status: count}}` as they stood at the end of `on`
+    (default: today). One query over courses, with an indexed "latest
+    snapshot on or before `on`" lookup per status.
+    """
+    on = on or timezone.localdate()
+    latest = CourseStatusSnapshot.objects.filter(course=OuterRef("pk"), date__lte=on).order_by("-date")
+    courses = Course.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    rows = courses.values("pk").annotate(
+        **{
+            f"count_{status}": Subquery(latest.filter(status=status).values("count")[:1])
+            for status in Enrollment.StatusChoices.values
+        }
+    )
+    return {
+        row["pk"]: {status: row[f"count_{status}"] or 0 for status in Enrollment.StatusChoices.values}
+        for row in rows
+    }
+
+
+def get_headcount(on: date | None = None, status: str = Enrollment.StatusChoices.ACTIVE, course_ids=None) -> int:
+    """Number of enrollments in `status` at the end of `on`, across the given courses (default: all)."""
+    return sum(counts[status] for counts in get_status_counts(on, course_ids).values())
+
+
+def get_status_trend(
+    start: date,
+    end: date,
+    status: str = Enrollment.StatusChoices.ACTIVE,
+    course_ids=None,
+) -> list[dict]:
+    """
+    Return `[{"date", "count"}]` for every day from `start` to `end`: the
+    number of enrollments in `status` at the end of each day. Reads the
+    counts before `start` plus the snapshot rows inside the range.
+    """
+    current = {
+        course_id: counts[status]
+        for course_id, counts in get_status_counts(start - timedelta(days=1), course_ids).items()
+    }
+    rows = CourseStatusSnapshot.objects.filter(status=status, date__range=(start, end))
+    if course_ids is not None:
+        rows = rows.filter(course_id__in=course_ids)
+    changes = {}
+    for day, course_id, count in rows.values_list("date", "course_id", "count"):
+        changes.setdefault(day, []).append((course_id, count))
+
+    trend = []
+    day = start
+    while day <= end:
+        for course_id, count in changes.get(day, ()):
+            current[course_id] = count
+        trend.append({"date": day, "count": sum(current.values())})
+        day += timedelta(days=1)
+    return trend
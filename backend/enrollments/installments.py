@@ -0,0 +1,164 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.versioning import bump_data_version
+
+from .models import Enrollment, Installment
+
+# Without an explicit plan the whole fee is due this many days after
+# enrolling, which is the rule the dashboard used to guess with.
+DEFAULT_FIRST_DUE_DAYS = 30
+DEFAULT_INTERVAL_DAYS = 30
+
+CENT = Decimal("0.01")
+
+_maintenance = threading.local()
+
+
+@contextmanager
+def paused_balance_updates():
+    """
+    Stop Payment signals from changing enrollment balances inside this
+    block. Used when payments move between tables (archival) without any
+    money changing hands.
+    """
+    previous = getattr(_maintenance, "paused", False)
+    _maintenance.paused = True
+    try:
+        yield
+    finally:
+        _maintenance.paused = previous
+
+
+def balance_updates_paused() -> bool:
+    return getattr(_maintenance, "paused", False)
+
+
+def split_fee(agreed_fee: Decimal, count: int) -> list[Decimal]:
+    """
+    Split `agreed_fee` into `count` parts of whole cents. Parts are equal
+    except the last, which takes the rounding remainder.
+    """
+    if count < 1:
+        raise ValueError("An installment plan needs at least one installment.")
+    part = (agreed_fee / count).quantize(CENT, rounding=ROUND_DOWN)
+    return [part] * (count - 1) + [agreed_fee - part * (count - 1)]
+
+
+def build_schedule(
+    enrollment: Enrollment,
+    count: int = 1,
+    first_due: date | None = None,
+    interval_days: int = DEFAULT_INTERVAL_DAYS,
+) -> list[Installment]:
+    """
+    Return unsaved installments splitting the enrollment's agreed fee into
+    `count` payments, `interval_days` apart from `first_due`.
+    """
+    if first_due is None:
+        enrolled_on = timezone.localdate(enrollment.created_at) if enrollment.created_at else timezone.localdate()
+        first_due = enrolled_on + timedelta(days=DEFAULT_FIRST_DUE_DAYS)
+    return [
+        Installment(
+            enrollment=enrollment,
+            sequence=position,
+            due_date=first_due + timedelta(days=interval_days * (position - 1)),
+            amount=amount,
+        )
+        for position, amount in enumerate(split_fee(enrollment.agreed_fee, count), start=1)
+    ]
+
+
+def compute_due_state(schedule, amount_paid: Decimal) -> tuple[date | None, Decimal]:
+    """
+    Given `(due_date, amount)` pairs in due order and the total paid so far,
+    return the due date of the first installment the payments do not cover
+    and the part of it still unpaid. `(None, 0)` once everything is paid.
+    """
+    covered = Decimal("0")
+    for due_date, amount in schedule:
+        covered += amount
+        if covered > amount_paid:
+            return due_date, covered - amount_paid
+    return None, Decimal("0")
+
+
+def refresh_due_state(enrollment_id) -> None:
+    """
+    Recompute `next_due_date` and `amount_due` from the stored amount paid
+    and the enrollment's installments (a handful of rows).
+    """
+    amount_paid = Enrollment.objects.filter(pk=enrollment_id).values_list("amount_paid", flat=True).first()
+    if amount_paid is None:
+        return
+    schedule = Installment.objects.filter(enrollment_id=enrollment_id).order_by("due_date", "sequence")
+    next_due_date, amount_due = compute_due_state(schedule.values_list("due_date", "amount"), amount_paid)
+    Enrollment.objects.filter(pk=enrollment_id).update(
+        next_due_date=next_due_date, amount_due=amount_due, updated_at=timezone.now()
+    )
+    bump_data_version("enrollments.Enrollment")
+
+
+def apply_payment(enrollment_id, amount: Decimal) -> None:
+    """
+    Add `amount` (negative when a payment is removed or reduced) to the
+    enrollment's amount paid and move its next due date accordingly.
+    """
+    Enrollment.objects.filter(pk=enrollment_id).update(
+        amount_paid=F("amount_paid") + amount, updated_at=timezone.now()
+    )
+    refresh_due_state(enrollment_id)
+
+
+@transaction.atomic
+def create_installment_plan(
+    enrollment: Enrollment,
+    count: int = 1,
+    first_due: date | None = None,
+    interval_days: int = DEFAULT_INTERVAL_DAYS,
+) -> list[Installment]:
+    """
+    Replace the enrollment's installments with an even plan of `count`
+    payments and refresh its due state.
+    """
+    installments = build_schedule(enrollment, count, first_due, interval_days)
+    Installment.objects.filter(enrollment=enrollment).delete()
+    Installment.objects.bulk_create(installments)
+    refresh_due_state(enrollment.pk)
+    return installments
+
+
+@transaction.atomic
+def reschedule_fee(enrollment: Enrollment) -> None:
+    """
+    Spread a changed agreed fee over the existing installment dates. An
+    enrollment without installments gets the default plan.
+    """
+    installments = list(Installment.objects.filter(enrollment=enrollment).order_by("sequence"))
+    if not installments:
+        create_installment_plan(enrollment)
+        return
+    for installment, amount in zip(installments, split_fee(enrollment.agreed_fee, len(installments))):
+        installment.amount = amount
+    Installment.objects.bulk_update(installments, ["amount"])
+    refresh_due_state(enrollment.pk)
+
+
+def overdue_q(on: date | None = None) -> Q:
+    """
+    The one definition of an overdue enrollment, for filters and
+    annotations alike: active, with an installment due before `on`
+    (default: today) that is not fully paid.
+    """
+    return Q(status=Enrollment.StatusChoices.ACTIVE, next_due_date__lt=on or timezone.localdate())
+
+
+def get_overdue_enrollments(on: date | None = None):
+    """Return the overdue enrollments. A single range scan on `next_due_date`."""
+    return Enrollment.objects.filter(overdue_q(on))
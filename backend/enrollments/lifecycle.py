@@ -0,0 +1,138 @@
+"""
+Scheduled enrollment lifecycle transitions.
+
+Each rule picks the enrollments that should move to a new status as a
+queryset, and is applied with one set-based UPDATE inside its own
+transaction. The rows it changes are captured in the same transaction
+(SQLite's IMMEDIATE transactions hold the write lock from BEGIN), so the
+status log, the daily snapshots and the audit reason match the UPDATE
+exactly. Run them from `apply_lifecycle_rules` (cron) or the enrollment
+admin action; both preview the counts first.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, QuerySet
+from django.utils import timezone
+
+from core.versioning import bump_data_version
+from portal.services import invalidate_student_summaries
+
+from .history import record_transitions
+from .models import Enrollment
+
+Status = Enrollment.StatusChoices
+
+
+@dataclass(frozen=True)
+class LifecycleRule:
+    name: str
+    description: str
+    to_status: str
+    candidates: Callable[[date], QuerySet]  # Enrollments the rule moves as of a given day
+
+    @property
+    def reason(self) -> str:
+        return f"lifecycle:{self.name}"
+
+
+def _ended_batches(on: date) -> QuerySet:
+    return Enrollment.objects.filter(status=Status.ACTIVE, batch__end_date__lt=on)
+
+
+def _in_arrears(on: date) -> QuerySet:
+    threshold = getattr(settings, "ENROLLMENT_SUSPEND_DEBT", 10000)
+    grace_days = getattr(settings, "ENROLLMENT_SUSPEND_GRACE_DAYS", 30)
+    return Enrollment.objects.filter(
+        status=Status.ACTIVE,
+        next_due_date__lt=on - timedelta(days=grace_days),
+        agreed_fee__gte=F("amount_paid") + threshold,
+    )
+
+
+RULES = (
+    LifecycleRule(
+        name="complete-ended-batches",
+        description="Complete active enrollments of batches that have ended.",
+        to_status=Status.COMPLETED,
+        candidates=_ended_batches,
+    ),
+    LifecycleRule(
+        name="suspend-arrears",
+        description=(
+            "Suspend active enrollments with an installment overdue by more than "
+            "ENROLLMENT_SUSPEND_GRACE_DAYS and an outstanding balance of at least "
+            "ENROLLMENT_SUSPEND_DEBT."
+        ),
+        to_status=Status.SUSPENDED,
+        candidates=_in_arrears,
+    ),
+)
+
+
+def get_rules(names=None) -> list[LifecycleRule]:
+    """Return the rules called `names` (default: all), in order. Unknown names raise KeyError."""
+    if not names:
+        return list(RULES)
+    by_name = {rule.name: rule for rule in RULES}
+    return [by_name[name] for name in names]
+
+
+def _scope(rule: LifecycleRule, on: date, queryset=None) -> QuerySet:
+    candidates = rule.candidates(on)
+    if queryset is not None:
+        candidates = candidates.filter(pk__in=queryset.values("pk"))
+    return candidates
+
+
+def preview_rules(rules=None, on: date | None = None, queryset=None) -> list[dict]:
+    """
+    Dry run: for each rule, how many enrollments it would move and in which
+    courses. One grouped COUNT per rule; nothing is written. `queryset`
+    restricts the rules to those enrollments.
+    """
+    on = on or timezone.localdate()
+    preview = []
+    for rule in rules or RULES:
+        by_course = dict(
+            _scope(rule, on, queryset)
+            .order_by("batch__course__code")
+            .values_list("batch__course__code")
+            .annotate(count=Count("pk"))
+        )
+        preview.append({"rule": rule, "count": sum(by_course.values()), "by_course": by_course})
+    return preview
+
+
+def apply_rule(rule: LifecycleRule, on: date | None = None, queryset=None, changed_by=None) -> int:
+    """
+    Move every enrollment selected by `rule` to its target status with one
+    UPDATE, logging each transition with the rule as its reason. Returns
+    the number of enrollments changed.
+    """
+    on = on or timezone.localdate()
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = _scope(rule, on, queryset)
+        changed = list(candidates.values_list("pk", "batch__course_id", "status", "student_id"))
+        if not changed:
+            return 0
+        updated = candidates.update(status=rule.to_status, updated_at=now)
+        record_transitions(
+            ((pk, course_id, status, rule.to_status) for pk, course_id, status, _ in changed),
+            changed_by=changed_by,
+            at=now,
+            reason=rule.reason,
+        )
+        # QuerySet.update() sends no signals.
+        bump_data_version("enrollments.Enrollment")
+        invalidate_student_summaries(*{student_id for *_, student_id in changed})
+    return updated
+
+
+def apply_rules(rules=None, on: date | None = None, queryset=None, changed_by=None) -> dict:
+    """Apply each rule in its own transaction; return `{rule name: enrollments changed}`."""
+    return {rule.name: apply_rule(rule, on, queryset, changed_by) for rule in rules or RULES}
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from enrollments.lifecycle import RULES, apply_rules, get_rules, preview_rules
+
+
+class Command(BaseCommand):
+    help = (
+        "Move enrollments along their lifecycle (complete ended batches, suspend "
+        "arrears) with one UPDATE per rule. Run with --dry-run to see the counts first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rule",
+            action="append",
+            choices=[rule.name for rule in RULES],
+            help="Apply only this rule; may be repeated. Defaults to every rule.",
+        )
+        parser.add_argument("--on", help="Evaluate the rules as of this date (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the enrollments each rule would move.")
+
+    def handle(self, *args, **options):
+        on = None
+        if options["on"]:
+            try:
+                on = date.fromisoformat(options["on"])
+            except ValueError as exc:
+                raise CommandError("--on must be YYYY-MM-DD.") from exc
+        rules = get_rules(options["rule"])
+
+        if options["dry_run"]:
+            for row in preview_rules(rules, on):
+                courses = ", ".join(f"{code}: {count}" for code, count in row["by_course"].items())
+                self.stdout.write(f"{row['rule'].name}: {row['count']} enrollment(s){f' ({courses})' if courses else ''}")
+            return
+
+        for name, count in apply_rules(rules, on).items():
+            self.stdout.write(self.style.SUCCESS(f"{name}: {count} enrollment(s) changed."))
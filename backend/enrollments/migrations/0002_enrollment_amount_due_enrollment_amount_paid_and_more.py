@@ -0,0 +1,85 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:13
+
+import django.db.models.deletion
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_installments(apps, schema_editor):
+    """
+    Give every existing enrollment the default plan (whole fee due 30 days
+    after enrolling) and fill in its amount paid and due state.
+    """
+    Enrollment = apps.get_model('enrollments', 'Enrollment')
+    Installment = apps.get_model('enrollments', 'Installment')
+
+    enrollments = Enrollment.objects.annotate(
+        paid=Coalesce(
+            models.Sum('payments__amount'),
+            Decimal('0'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+    installments = []
+    updated = []
+    for enrollment in enrollments.iterator(chunk_size=500):
+        due_date = enrollment.created_at.date() + timedelta(days=30)
+        installments.append(
+            Installment(enrollment=enrollment, sequence=1, due_date=due_date, amount=enrollment.agreed_fee)
+        )
+        enrollment.amount_paid = enrollment.paid
+        if enrollment.paid < enrollment.agreed_fee:
+            enrollment.next_due_date = due_date
+            enrollment.amount_due = enrollment.agreed_fee - enrollment.paid
+        updated.append(enrollment)
+
+    Installment.objects.bulk_create(installments, batch_size=500)
+    Enrollment.objects.bulk_update(updated, ['amount_paid', 'next_due_date', 'amount_due'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enrollments', '0001_initial'),
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='amount_due',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Unpaid part of the installment due on the next due date', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='next_due_date',
+            field=models.DateField(blank=True, db_index=True, help_text='Due date of the earliest installment not yet fully paid', null=True),
+        ),
+        migrations.CreateModel(
+            name='Installment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('sequence', models.PositiveSmallIntegerField()),
+                ('due_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='enrollments.enrollment')),
+            ],
+            options={
+                'ordering': ['enrollment', 'sequence'],
+                'unique_together': {('enrollment', 'sequence')},
+            },
+        ),
+        migrations.RunPython(backfill_installments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:26
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from collections import Counter
+from itertools import groupby
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_status_history(apps, schema_editor):
+    """
+    Earlier transitions were never recorded, so treat every existing
+    enrollment as having had its current status since it was created, and
+    build the daily snapshots from that.
+    """
+    Enrollment = apps.get_model('enrollments', 'Enrollment')
+    EnrollmentStatusChange = apps.get_model('enrollments', 'EnrollmentStatusChange')
+    CourseStatusSnapshot = apps.get_model('enrollments', 'CourseStatusSnapshot')
+
+    changes = []
+    per_day = Counter()
+    rows = Enrollment.objects.values_list('pk', 'batch__course_id', 'status', 'created_at')
+    for pk, course_id, status, created_at in rows.iterator(chunk_size=2000):
+        changes.append(
+            EnrollmentStatusChange(
+                enrollment_id=pk,
+                course_id=course_id,
+                from_status='',
+                to_status=status,
+                changed_at=created_at,
+            )
+        )
+        per_day[(course_id, status, timezone.localdate(created_at))] += 1
+    EnrollmentStatusChange.objects.bulk_create(changes, batch_size=500)
+
+    snapshots = []
+    for (course_id, status), days in groupby(sorted(per_day.items()), key=lambda item: item[0][:2]):
+        running = 0
+        for (_, _, day), added in days:
+            running += added
+            snapshots.append(CourseStatusSnapshot(course_id=course_id, status=status, date=day, count=running))
+    CourseStatusSnapshot.objects.bulk_create(snapshots, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_batch_courses_bat_instruc_673d49_idx'),
+        ('enrollments', '0002_enrollment_amount_due_enrollment_amount_paid_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStatusSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('COMPLETED', 'Completed'), ('DROPPED', 'Dropped'), ('SUSPENDED', 'Suspended')], max_length=20)),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_snapshots', to='courses.course')),
+            ],
+            options={
+                'ordering': ['course', 'status', 'date'],
+                'unique_together': {('course', 'status', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EnrollmentStatusChange',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('from_status', models.CharField(blank=True, choices=[('ACTIVE', 'Active'), ('COMPLETED', 'Completed'), ('DROPPED', 'Dropped'), ('SUSPENDED', 'Suspended')], max_length=20)),
+                ('to_status', models.CharField(choices=[('ACTIVE', 'Active'), ('COMPLETED', 'Completed'), ('DROPPED', 'Dropped'), ('SUSPENDED', 'Suspended')], max_length=20)),
+                ('changed_at', models.DateTimeField(db_index=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollment_status_changes', to='courses.course')),
+                ('enrollment', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_changes', to='enrollments.enrollment')),
+            ],
+            options={
+                'ordering': ['-changed_at'],
+                'indexes': [models.Index(fields=['enrollment', 'changed_at'], name='enrollments_enrollm_a7c8d5_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_status_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enrollments', '0003_status_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollmentstatuschange',
+            name='reason',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+    ]
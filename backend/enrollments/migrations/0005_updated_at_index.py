@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_updated_at_index'),
+        ('enrollments', '0004_status_change_reason'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['updated_at'], name='enrollments_updated_5c3ff7_idx'),
+        ),
+    ]
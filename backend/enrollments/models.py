@@ -27,10 +27,116 @@ class Enrollment(TimeStampedModel):
     # Why duplicate the fee here? If the Course base_fee increases next year,
     # this student's agreed fee remains unchanged.
     agreed_fee = models.DecimalField(max_digits=10, decimal_places=2)
-    
+
+    # Kept in step with Payment and Installment rows by enrollments.installments,
+    # so balances and "who is overdue" never need a per-row calculation.
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    next_due_date = models.DateField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Due date of the earliest installment not yet fully paid"
+    )
+    amount_due = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Unpaid part of the installment due on the next due date"
+    )
+    BALANCE_FIELDS = ('amount_paid', 'next_due_date', 'amount_due')
+
     class Meta:
         # A student cannot enroll in the exact same batch twice
         unique_together = ('student', 'batch')
+        indexes = [
+            # The analytics export reads rows changed since its last run
+            models.Index(fields=['updated_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The balance fields are maintained with UPDATE queries as payments
+        # arrive; never write a stale in-memory copy of them back.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.BALANCE_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.student.username} -> {self.batch.name} ({self.status})"
+
+
+class Installment(TimeStampedModel):
+    """One scheduled part of an enrollment's agreed fee."""
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='installments')
+    sequence = models.PositiveSmallIntegerField()
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ['enrollment', 'sequence']
+        unique_together = ('enrollment', 'sequence')
+
+    def __str__(self):
+        return f"{self.enrollment_id} #{self.sequence}: {self.amount} due {self.due_date}"
+
+
+class EnrollmentStatusChange(TimeStampedModel):
+    """
+    Append-only record of one enrollment status transition. A blank
+    `from_status` marks the enrollment being created.
+    """
+    # No database constraint: the log outlives enrollments that are moved to
+    # the archive (and keeps pointing at them when they are restored).
+    # Always set; nullable only so joins to an archived enrollment are outer.
+    enrollment = models.ForeignKey(
+        Enrollment,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='status_changes'
+    )
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='enrollment_status_changes')
+    from_status = models.CharField(max_length=20, choices=Enrollment.StatusChoices.choices, blank=True)
+    to_status = models.CharField(max_length=20, choices=Enrollment.StatusChoices.choices)
+    changed_at = models.DateTimeField(db_index=True)
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    # Set for automatic transitions, e.g. "lifecycle:complete-ended-batches".
+    reason = models.CharField(max_length=100, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['enrollment', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.enrollment_id}: {self.from_status or 'new'} -> {self.to_status}"
+
+
+class CourseStatusSnapshot(TimeStampedModel):
+    """
+    Number of a course's enrollments in `status` at the end of `date`.
+    Written only for days on which the count changed; the count on any
+    other day is that of the latest earlier row.
+    """
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='status_snapshots')
+    status = models.CharField(max_length=20, choices=Enrollment.StatusChoices.choices)
+    date = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['course', 'status', 'date']
+        # Also the index behind "latest row on or before a date" lookups
+        unique_together = ('course', 'status', 'date')
+
+    def __str__(self):
+        return f"{self.course_id} {self.status} on {self.date}: {self.count}"
@@ -0,0 +1,83 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .history import move_between_courses, record_transitions, remove_from_counts, status_history_paused
+from .installments import create_installment_plan, reschedule_fee
+from .models import Enrollment
+
+
+@receiver(pre_save, sender=Enrollment, dispatch_uid="enrollments_remember_previous")
+def remember_previous_values(sender, instance, raw=False, **kwargs):
+    instance._previous_agreed_fee = None
+    instance._previous_status = None
+    instance._previous_course_id = None
+    instance._previous_batch_id = None
+    instance._previous_student_id = None
+    if raw or instance._state.adding:
+        return
+    previous = (
+        Enrollment.objects.filter(pk=instance.pk)
+        .values_list("agreed_fee", "status", "batch__course_id", "batch_id", "student_id")
+        .first()
+    )
+    if previous is not None:
+        (
+            instance._previous_agreed_fee,
+            instance._previous_status,
+            instance._previous_course_id,
+            instance._previous_batch_id,
+            instance._previous_student_id,
+        ) = previous
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid="installments_enrollment_saved")
+def keep_installment_plan(sender, instance, created, raw=False, **kwargs):
+    """
+    Give new enrollments the default single-installment plan, and spread a
+    changed agreed fee over the existing installment dates.
+    """
+    if raw:
+        return
+    if created:
+        create_installment_plan(instance)
+        instance.refresh_from_db(fields=["next_due_date", "amount_due"])
+        return
+    previous = getattr(instance, "_previous_agreed_fee", None)
+    if previous is not None and previous != instance.agreed_fee:
+        reschedule_fee(instance)
+        instance.refresh_from_db(fields=["next_due_date", "amount_due"])
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid="history_enrollment_saved")
+def log_status_change(sender, instance, created, raw=False, **kwargs):
+    """
+    Log new enrollments and status changes, keeping the daily per-course
+    snapshots current. Admin saves set `_status_changed_by`.
+    """
+    if raw:
+        return
+    course_id = instance.batch.course_id
+    changed_by = getattr(instance, "_status_changed_by", None)
+    if created:
+        record_transitions([(instance.pk, course_id, "", instance.status)], changed_by=changed_by)
+        return
+    previous_status = getattr(instance, "_previous_status", None)
+    previous_course_id = getattr(instance, "_previous_course_id", None)
+    if previous_status is None:
+        return
+    if previous_course_id != course_id:
+        # Count the old status against the new course before it changes.
+        move_between_courses(previous_status, previous_course_id, course_id)
+    if previous_status != instance.status:
+        record_transitions(
+            [(instance.pk, course_id, previous_status, instance.status)],
+            changed_by=changed_by,
+        )
+
+
+@receiver(post_delete, sender=Enrollment, dispatch_uid="history_enrollment_deleted")
+def remove_deleted_from_counts(sender, instance, **kwargs):
+    """Deleted enrollments leave the daily per-course snapshots (archival excepted)."""
+    if status_history_paused():
+        return
+    remove_from_counts(instance.status, instance.batch.course_id)
@@ -1,3 +1,254 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.testing import QueryBudgetTestCase, admin_url, create_batch, create_student
+from archive.services import archive_batch
+from enrollments.history import _apply_deltas, get_status_counts, get_status_trend, record_transitions
+from enrollments.installments import (
+    apply_payment,
+    compute_due_state,
+    create_installment_plan,
+    get_overdue_enrollments,
+    reschedule_fee,
+    split_fee,
+)
+from enrollments.models import CourseStatusSnapshot, Enrollment, EnrollmentStatusChange, Installment
+from finance.cube import paused_revenue_cube
+from finance.models import Payment
+from finance.services import get_top_debtors
+
+
+class EnrollmentAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(11, admin_url(Enrollment, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(Enrollment, "add"))
+
+    def test_change(self):
+        enrollment = self.rows[0]["enrollment"]
+        self.assertQueryBudget(14, admin_url(Enrollment, "change", enrollment.pk), batch=enrollment.batch)
+
+    def test_student_autocomplete(self):
+        self.assertAutocompleteBudget(3, Enrollment, "student")
+
+    def test_batch_autocomplete(self):
+        self.assertAutocompleteBudget(3, Enrollment, "batch")
+
+
+class EnrollmentStatusChangeAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(14, admin_url(EnrollmentStatusChange, "changelist"))
+
+    def test_change(self):
+        change = EnrollmentStatusChange.objects.filter(enrollment=self.rows[0]["enrollment"]).get()
+        self.assertQueryBudget(13, admin_url(EnrollmentStatusChange, "change", change.pk))
+
+
+class SplitFeeTests(SimpleTestCase):
+    def test_remainder_goes_to_the_last_installment(self):
+        self.assertEqual(split_fee(Decimal("100"), 3), [Decimal("33.33"), Decimal("33.33"), Decimal("33.34")])
+        self.assertEqual(split_fee(Decimal("0.05"), 3), [Decimal("0.01"), Decimal("0.01"), Decimal("0.03")])
+
+    def test_parts_add_up_to_the_fee(self):
+        for fee in (Decimal("20000"), Decimal("12345.67"), Decimal("0.01")):
+            for count in range(1, 8):
+                parts = split_fee(fee, count)
+                self.assertEqual((len(parts), sum(parts)), (count, fee))
+
+    def test_needs_at_least_one_installment(self):
+        with self.assertRaises(ValueError):
+            split_fee(Decimal("100"), 0)
+
+
+class ComputeDueStateTests(SimpleTestCase):
+    schedule = [(date(2026, 1, 1), Decimal("100")), (date(2026, 2, 1), Decimal("100"))]
+
+    def test_nothing_paid(self):
+        self.assertEqual(compute_due_state(self.schedule, Decimal("0")), (date(2026, 1, 1), Decimal("100")))
+
+    def test_partly_paid_installment(self):
+        self.assertEqual(compute_due_state(self.schedule, Decimal("40")), (date(2026, 1, 1), Decimal("60")))
+
+    def test_exactly_paid_installment_moves_to_the_next(self):
+        self.assertEqual(compute_due_state(self.schedule, Decimal("100")), (date(2026, 2, 1), Decimal("100")))
+
+    def test_fully_paid_and_overpaid(self):
+        self.assertEqual(compute_due_state(self.schedule, Decimal("200")), (None, Decimal("0")))
+        self.assertEqual(compute_due_state(self.schedule, Decimal("250")), (None, Decimal("0")))
+
+    def test_no_installments(self):
+        self.assertEqual(compute_due_state([], Decimal("0")), (None, Decimal("0")))
+
+
+class InstallmentBalanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.officer = create_student()
+        cls.first_due = timezone.localdate() + timedelta(days=10)
+
+    def setUp(self):
+        self.enrollment = Enrollment.objects.create(
+            student=create_student(), batch=create_batch(), agreed_fee=Decimal("300")
+        )
+        create_installment_plan(self.enrollment, count=3, first_due=self.first_due)
+
+    def pay(self, amount):
+        return Payment.objects.create(
+            enrollment=self.enrollment,
+            amount=Decimal(amount),
+            method=Payment.PaymentMethod.CASH,
+            received_by=self.officer,
+        )
+
+    def assertBalance(self, amount_paid, next_due_date, amount_due):
+        self.enrollment.refresh_from_db()
+        self.assertEqual(
+            (self.enrollment.amount_paid, self.enrollment.next_due_date, self.enrollment.amount_due),
+            (Decimal(amount_paid), next_due_date, Decimal(amount_due)),
+        )
+
+    def test_partial_payment(self):
+        self.pay("150")
+        self.assertBalance("150", self.first_due + timedelta(days=30), "50")
+
+    def test_overpayment(self):
+        self.pay("350")
+        self.assertBalance("350", None, "0")
+
+    def test_edited_and_deleted_payments(self):
+        payment = self.pay("100")
+        payment.amount = Decimal("50")
+        payment.save()
+        self.assertBalance("50", self.first_due, "50")
+        payment.delete()
+        self.assertBalance("0", self.first_due, "100")
+
+    def test_payment_moved_to_another_enrollment(self):
+        payment = self.pay("100")
+        other = Enrollment.objects.create(student=create_student(), batch=create_batch(), agreed_fee=Decimal("300"))
+        payment.enrollment = other
+        payment.save()
+        self.assertBalance("0", self.first_due, "100")
+        other.refresh_from_db()
+        self.assertEqual(other.amount_paid, Decimal("100"))
+
+    def test_balances_follow_payments_while_the_revenue_cube_is_paused(self):
+        with paused_revenue_cube():
+            payment = self.pay("100")
+            payment.amount = Decimal("150")
+            payment.save()
+        self.assertBalance("150", self.first_due + timedelta(days=30), "50")
+
+    def test_apply_payment_with_a_negative_amount(self):
+        apply_payment(self.enrollment.pk, Decimal("250"))
+        apply_payment(self.enrollment.pk, Decimal("-200"))
+        self.assertBalance("50", self.first_due, "50")
+
+    def test_reschedule_fee_keeps_dates_and_payments(self):
+        self.pay("100")
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(agreed_fee=Decimal("100"))
+        self.enrollment.refresh_from_db()
+        reschedule_fee(self.enrollment)
+        installments = Installment.objects.filter(enrollment=self.enrollment).order_by("sequence")
+        self.assertEqual(
+            list(installments.values_list("due_date", "amount")),
+            [
+                (self.first_due, Decimal("33.33")),
+                (self.first_due + timedelta(days=30), Decimal("33.33")),
+                (self.first_due + timedelta(days=60), Decimal("33.34")),
+            ],
+        )
+        self.assertBalance("100", None, "0")
+
+    def test_changed_agreed_fee_is_rescheduled_on_save(self):
+        self.enrollment.agreed_fee = Decimal("600")
+        self.enrollment.save()
+        self.assertEqual(
+            list(Installment.objects.filter(enrollment=self.enrollment).values_list("amount", flat=True)),
+            [Decimal("200")] * 3,
+        )
+        self.assertBalance("0", self.first_due, "200")
+
+
+class OverdueTests(TestCase):
+    def test_dashboard_and_reminders_agree_on_overdue(self):
+        batch = create_batch()
+        past = timezone.localdate() - timedelta(days=1)
+        active, suspended = (
+            Enrollment.objects.create(student=create_student(), batch=batch, agreed_fee=Decimal("100"), status=status)
+            for status in (Enrollment.StatusChoices.ACTIVE, Enrollment.StatusChoices.SUSPENDED)
+        )
+        Enrollment.objects.update(next_due_date=past)
+        self.assertEqual(list(get_overdue_enrollments()), [active])
+        self.assertEqual(
+            {debtor.pk: debtor.is_overdue for debtor in get_top_debtors()},
+            {active.pk: True, suspended.pk: False},
+        )
+
+
+class StatusHistoryTests(TestCase):
+    ACTIVE, COMPLETED = Enrollment.StatusChoices.ACTIVE, Enrollment.StatusChoices.COMPLETED
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.batch = create_batch()
+        cls.course_id = cls.batch.course_id
+        cls.today = timezone.localdate()
+
+    def counts(self, status=Enrollment.StatusChoices.ACTIVE):
+        rows = CourseStatusSnapshot.objects.filter(course_id=self.course_id, status=status).order_by("date")
+        return list(rows.values_list("date", "count"))
+
+    def test_apply_deltas(self):
+        day = self.today - timedelta(days=10)
+        _apply_deltas(day, {(self.course_id, self.ACTIVE): 3})
+        # A later day starts from the latest earlier count.
+        _apply_deltas(day + timedelta(days=5), {(self.course_id, self.ACTIVE): -1})
+        self.assertEqual(self.counts(), [(day, 3), (day + timedelta(days=5), 2)])
+        # A backdated change also moves every later snapshot.
+        _apply_deltas(day + timedelta(days=2), {(self.course_id, self.ACTIVE): 2, (self.course_id, self.COMPLETED): 0})
+        self.assertEqual(self.counts(), [(day, 3), (day + timedelta(days=2), 5), (day + timedelta(days=5), 4)])
+        self.assertEqual(self.counts(self.COMPLETED), [])
+
+    def test_status_trend(self):
+        start = self.today - timedelta(days=4)
+        record_transitions([(None, self.course_id, "", self.ACTIVE)] * 2, at=timezone.now() - timedelta(days=6))
+        record_transitions([(None, self.course_id, self.ACTIVE, self.COMPLETED)], at=timezone.now() - timedelta(days=2))
+        # Same-status transitions are ignored.
+        self.assertEqual(record_transitions([(None, self.course_id, self.ACTIVE, self.ACTIVE)]), 0)
+        trend = get_status_trend(start, self.today, course_ids=[self.course_id])
+        self.assertEqual([point["count"] for point in trend], [2, 2, 1, 1, 1])
+        self.assertEqual([point["date"] for point in trend], [start + timedelta(days=n) for n in range(5)])
+        completed = get_status_trend(start, self.today, status=self.COMPLETED, course_ids=[self.course_id])
+        self.assertEqual([point["count"] for point in completed], [0, 0, 1, 1, 1])
+
+    def test_transitions_are_logged(self):
+        enrollment = Enrollment.objects.create(student=create_student(), batch=self.batch, agreed_fee=Decimal("100"))
+        at = timezone.now() - timedelta(days=1)
+        record_transitions([(enrollment.pk, self.course_id, self.ACTIVE, self.COMPLETED)], at=at, reason="Batch ended")
+        change = EnrollmentStatusChange.objects.filter(enrollment=enrollment, from_status=self.ACTIVE).get()
+        self.assertEqual(
+            (change.course_id, change.to_status, change.changed_at, change.changed_by, change.reason),
+            (self.course_id, self.COMPLETED, at, None, "Batch ended"),
+        )
+
+    def test_enrollment_lifecycle_is_counted(self):
+        enrollment = Enrollment.objects.create(student=create_student(), batch=self.batch, agreed_fee=Decimal("100"))
+        self.assertEqual(get_status_counts(course_ids=[self.course_id])[self.course_id][self.ACTIVE], 1)
+        enrollment.status = self.COMPLETED
+        enrollment.save()
+        counts = get_status_counts(course_ids=[self.course_id])[self.course_id]
+        self.assertEqual((counts[self.ACTIVE], counts[self.COMPLETED]), (0, 1))
+        enrollment.delete()
+        counts = get_status_counts(course_ids=[self.course_id])[self.course_id]
+        self.assertEqual((counts[self.ACTIVE], counts[self.COMPLETED]), (0, 0))
+
+    def test_archived_enrollments_stay_counted(self):
+        ended = create_batch(start_date=self.today - timedelta(days=90), end_date=self.today - timedelta(days=30))
+        Enrollment.objects.create(student=create_student(), batch=ended, agreed_fee=Decimal("0"), status=self.COMPLETED)
+        archive_batch(ended)
+        self.assertEqual(get_status_counts(course_ids=[ended.course_id])[ended.course_id][self.COMPLETED], 1)
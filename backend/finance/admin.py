@@ -1,10 +1,18 @@
 import csv
+import io
 
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.http import HttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.html import format_html
 from unfold.admin import ModelAdmin
-from .models import Payment
+from enrollments.models import Enrollment
+from .models import MpesaCallback, Payment, ReconciliationDiscrepancy, ReconciliationRun
+from .mpesa import resolve_suspense
+from .reconciliation import StatementError, check_statement_columns, reconcile
 
 @admin.register(Payment)
 class PaymentAdmin(ModelAdmin): # Changed here
@@ -21,13 +29,14 @@ class PaymentAdmin(ModelAdmin): # Changed here
         ('payment_date', admin.DateFieldListFilter),
     )
     search_fields = ('reference_number', 'enrollment__student__username', 'enrollment__student__first_name')
+    list_select_related = ('enrollment__student', 'enrollment__batch', 'received_by')
     autocomplete_fields = ('enrollment',)
     readonly_fields = ('payment_date', 'received_by')
     list_per_page = 25
     actions = ['export_payments_csv']
 
     def save_model(self, request, obj, form, change):
-        if not obj.pk:
+        if not change:  # obj.pk is already set: UUID primary keys default on creation
             obj.received_by = request.user
         super().save_model(request, obj, form, change)
 
@@ -84,3 +93,197 @@ class PaymentAdmin(ModelAdmin): # Changed here
             )
 
         return response
+
+
+class ReconciliationRunForm(forms.ModelForm):
+    statement = forms.FileField(help_text="CSV statement exported from M-Pesa or the bank.")
+
+    class Meta:
+        model = ReconciliationRun
+        fields = ('provider', 'period_start', 'period_end')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('period_start'), cleaned_data.get('period_end')
+        if start and end and end < start:
+            raise forms.ValidationError("Period end cannot be before period start.")
+
+        upload, provider = cleaned_data.get('statement'), cleaned_data.get('provider')
+        if upload and provider:
+            header = upload.readline().decode('utf-8-sig', errors='replace')
+            upload.seek(0)
+            try:
+                check_statement_columns(next(csv.reader([header]), []), provider)
+            except StatementError as exc:
+                self.add_error('statement', str(exc))
+        return cleaned_data
+
+
+@admin.register(ReconciliationRun)
+class ReconciliationRunAdmin(ModelAdmin):
+    list_display = (
+        'created_at',
+        'provider',
+        'period_start',
+        'period_end',
+        'statement_lines',
+        'matched',
+        'missing_in_ledger',
+        'missing_in_statement',
+        'amount_mismatches',
+        'duplicates',
+        'run_by',
+    )
+    list_filter = ('provider',)
+    list_select_related = ('run_by',)
+    readonly_fields = (
+        'provider',
+        'statement_name',
+        'period_start',
+        'period_end',
+        'run_by',
+        'statement_lines',
+        'payments_checked',
+        'matched',
+        'missing_in_ledger',
+        'missing_in_statement',
+        'amount_mismatches',
+        'duplicates',
+        'discrepancies_link',
+    )
+    list_per_page = 25
+
+    def get_form(self, request, obj=None, **kwargs):
+        if obj is None:
+            kwargs['form'] = ReconciliationRunForm
+        return super().get_form(request, obj, **kwargs)
+
+    def get_readonly_fields(self, request, obj=None):
+        return self.readonly_fields if obj else ()
+
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ('provider', 'period_start', 'period_end', 'statement')
+        return self.readonly_fields
+
+    def has_change_permission(self, request, obj=None):
+        # Runs are a snapshot of one comparison; start a new run instead.
+        return False
+
+    def save_model(self, request, obj, form, change):
+        upload = form.cleaned_data['statement']
+        obj.run_by = request.user
+        obj.statement_name = upload.name
+        upload.seek(0)
+        reconcile(obj, io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+
+    @admin.display(description="Discrepancies")
+    def discrepancies_link(self, obj):
+        url = reverse('admin:finance_reconciliationdiscrepancy_changelist')
+        return format_html(
+            '<a href="{}?run__id__exact={}">View {} discrepancies</a>',
+            url,
+            obj.pk,
+            obj.discrepancies.count(),
+        )
+
+
+@admin.register(ReconciliationDiscrepancy)
+class ReconciliationDiscrepancyAdmin(ModelAdmin):
+    list_display = (
+        'kind',
+        'reference_number',
+        'statement_amount',
+        'ledger_amount',
+        'statement_line',
+        'payment',
+        'run',
+    )
+    list_filter = ('kind', 'run')
+    list_select_related = ('run', 'payment', 'payment__enrollment__student')
+    search_fields = ('reference_number',)
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class SuspenseResolutionForm(forms.ModelForm):
+    enrollment = forms.ModelChoiceField(
+        queryset=Enrollment.objects.all(),
+        required=False,
+        widget=AutocompleteSelect(Payment._meta.get_field('enrollment'), admin.site),
+        help_text="Record this transaction as a payment on the chosen enrollment.",
+    )
+
+    class Meta:
+        model = MpesaCallback
+        fields = ()
+
+
+@admin.register(MpesaCallback)
+class MpesaCallbackAdmin(ModelAdmin):
+    """
+    Every M-Pesa confirmation received. Those in suspense matched no
+    enrollment; open one and pick the enrollment to record the payment.
+    """
+    form = SuspenseResolutionForm
+    list_display = (
+        'created_at',
+        'trans_id',
+        'amount',
+        'bill_ref_number',
+        'msisdn',
+        'payer_name',
+        'status',
+        'suspense_reason',
+        'payment',
+    )
+    list_filter = ('status', ('created_at', admin.DateFieldListFilter))
+    list_select_related = ('payment__enrollment__student',)
+    search_fields = ('trans_id', 'bill_ref_number', 'msisdn', 'payer_name')
+    readonly_fields = (
+        'trans_id',
+        'trans_time',
+        'amount',
+        'bill_ref_number',
+        'msisdn',
+        'payer_name',
+        'status',
+        'suspense_reason',
+        'payment',
+        'resolved_by',
+        'resolved_at',
+        'created_at',
+        'payload',
+    )
+    list_per_page = 50
+
+    def get_fields(self, request, obj=None):
+        if obj is not None and obj.status == MpesaCallback.Status.SUSPENSE:
+            return ('enrollment',) + self.readonly_fields
+        return self.readonly_fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        if obj is not None and obj.status != MpesaCallback.Status.SUSPENSE:
+            return False
+        return super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        # The row is what makes a retried callback a duplicate.
+        return False
+
+    def save_model(self, request, obj, form, change):
+        enrollment = form.cleaned_data.get('enrollment')
+        if enrollment is None:
+            return
+        try:
+            resolve_suspense(obj, enrollment, request.user)
+        except ValueError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
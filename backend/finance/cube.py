@@ -0,0 +1,285 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Payment, RevenueCubeCell
+
+GRANULARITIES = ("day", "week", "month")
+
+# Dimension name -> the cube columns it groups by.
+DIMENSIONS = {
+    "course": ("course_id", "course__code", "course__title"),
+    "batch": ("batch_id", "batch__name", "course__code"),
+    "method": ("method",),
+}
+
+
+_maintenance = threading.local()
+
+
+@contextmanager
+def paused_revenue_cube():
+    """
+    Stop Payment signals from touching the cube inside this block. Used when payments move between tables (archival)
+    without any money changing hands.
+    """
+    previous = getattr(_maintenance, "paused", False)
+    _maintenance.paused = True
+    try:
+        yield
+    finally:
+        _maintenance.paused = previous
+
+
+def revenue_cube_paused() -> bool:
+    return getattr(_maintenance, "paused", False)
+
+
+def _cell_key(day, batch_id, method) -> dict:
+    return {"day": day, "batch_id": batch_id, "method": method}
+
+
+def apply_payment_delta(day, batch_id, course_id, method, amount, count) -> None:
+    """
+    Add `amount` and `count` (either may be negative) to a single cube cell.
+    Cells that drop back to zero payments are removed.
+    """
+    key = _cell_key(day, batch_id, method)
+    updated = RevenueCubeCell.objects.filter(**key).update(
+        total_amount=F("total_amount") + amount,
+        payment_count=F("payment_count") + count,
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                RevenueCubeCell.objects.create(
+                    course_id=course_id,
+                    total_amount=amount,
+                    payment_count=count,
+                    **key,
+                )
+        except IntegrityError:
+            # A concurrent writer created the cell first; add to it instead.
+            RevenueCubeCell.objects.filter(**key).update(
+                total_amount=F("total_amount") + amount,
+                payment_count=F("payment_count") + count,
+            )
+    elif count < 0:
+        RevenueCubeCell.objects.filter(payment_count__lte=0, **key).delete()
+
+
+def move_enrollment_payments(enrollment_id, from_cell: tuple, to_cell: tuple) -> None:
+    """
+    Move an enrollment's payments from one `(batch_id, course_id)` to
+    another, for an enrollment transferred to a different batch.
+    """
+    rows = (
+        Payment.objects.filter(enrollment_id=enrollment_id)
+        .values("payment_date", "method")
+        .annotate(total_amount=Sum("amount"), payment_count=Count("id"))
+        .order_by()
+    )
+    for row in rows:
+        day, method = row["payment_date"], row["method"]
+        apply_payment_delta(day, *from_cell, method, -row["total_amount"], -row["payment_count"])
+        apply_payment_delta(day, *to_cell, method, row["total_amount"], row["payment_count"])
+
+
+def _payment_cell_rows(payments):
+    return (
+        payments.values(
+            day=F("payment_date"),
+            batch_id=F("enrollment__batch_id"),
+            course_id=F("enrollment__batch__course_id"),
+            cell_method=F("method"),
+        )
+        .annotate(total_amount=Sum("amount"), payment_count=Count("id"))
+        .order_by()
+    )
+
+
+def _payment_sources():
+    """
+    Querysets whose payments make up all-time revenue: the live table plus,
+    when the archive app is installed, payments of archived batches.
+    """
+    sources = [Payment.objects.all()]
+    if apps.is_installed("archive"):
+        ArchivedPayment = apps.get_model("archive", "ArchivedPayment")
+        sources.append(ArchivedPayment.objects.all())
+    return sources
+
+
+def rebuild_revenue_cube(start: date | None = None, end: date | None = None) -> int:
+    """
+    Recompute cube cells from payments (live and archived) for the inclusive
+    date range, or the whole history when no bounds are given. Returns the
+    number of cells written.
+    """
+    cells = RevenueCubeCell.objects.all()
+    if start is not None:
+        cells = cells.filter(day__gte=start)
+    if end is not None:
+        cells = cells.filter(day__lte=end)
+
+    # Read and replace in one transaction, so a payment committed in between
+    # is neither lost nor counted twice.
+    with transaction.atomic():
+        new_cells = []
+        for payments in _payment_sources():
+            if start is not None:
+                payments = payments.filter(payment_date__gte=start)
+            if end is not None:
+                payments = payments.filter(payment_date__lte=end)
+            new_cells.extend(
+                RevenueCubeCell(
+                    day=row["day"],
+                    batch_id=row["batch_id"],
+                    course_id=row["course_id"],
+                    method=row["cell_method"],
+                    total_amount=row["total_amount"],
+                    payment_count=row["payment_count"],
+                )
+                for row in _payment_cell_rows(payments)
+            )
+        cells.delete()
+        RevenueCubeCell.objects.bulk_create(new_cells, batch_size=500)
+    return len(new_cells)
+
+
+def get_period_bounds(granularity: str, day: date) -> tuple[date, date]:
+    """
+    Return the first and last day of the day/week/month containing `day`.
+    Weeks start on Monday.
+    """
+    if granularity == "day":
+        return day, day
+    if granularity == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if granularity == "month":
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    raise ValueError(f"Unknown granularity {granularity!r}; expected one of {GRANULARITIES}")
+
+
+def _previous_period_start(granularity: str, start: date) -> date:
+    if granularity == "month":
+        return (start - timedelta(days=1)).replace(day=1)
+    return start - timedelta(days=1 if granularity == "day" else 7)
+
+
+def _group_columns(group_by) -> list[str]:
+    columns: list[str] = []
+    for dimension in group_by:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension {dimension!r}; expected one of {tuple(DIMENSIONS)}")
+        for column in DIMENSIONS[dimension]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def get_revenue_cube(
+    granularity: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    group_by=("course",),
+    course=None,
+    batch=None,
+    method: str | None = None,
+) -> list[dict]:
+    """
+    Slice the revenue cube.
+
+    `granularity` buckets rows into a `period` column ("day", "week" or
+    "month"); leave it as None for totals over the whole range. `group_by`
+    picks any of "course", "batch" and "method". Each row carries
+    `total_revenue` and `payment_count`.
+    """
+    cells = RevenueCubeCell.objects.all()
+    if start is not None:
+        cells = cells.filter(day__gte=start)
+    if end is not None:
+        cells = cells.filter(day__lte=end)
+    if course is not None:
+        cells = cells.filter(course=course)
+    if batch is not None:
+        cells = cells.filter(batch=batch)
+    if method is not None:
+        cells = cells.filter(method=method)
+
+    columns = _group_columns(group_by)
+    ordering = ["-total_revenue"]
+    if granularity is not None:
+        if granularity == "day":
+            cells = cells.annotate(period=F("day"))
+        elif granularity == "week":
+            cells = cells.annotate(period=TruncWeek("day"))
+        elif granularity == "month":
+            cells = cells.annotate(period=TruncMonth("day"))
+        else:
+            raise ValueError(f"Unknown granularity {granularity!r}; expected one of {GRANULARITIES}")
+        columns = ["period", *columns]
+        ordering = ["period", *ordering]
+
+    return list(
+        cells.values(*columns)
+        .annotate(
+            total_revenue=Coalesce(Sum("total_amount"), Decimal("0")),
+            payment_count=Coalesce(Sum("payment_count"), 0),
+        )
+        .order_by(*ordering)
+    )
+
+
+def compare_revenue_periods(granularity: str, day: date | None = None, group_by=("course",)) -> list[dict]:
+    """
+    Compare revenue for the period containing `day` (default: today) with the
+    period before it, per `group_by` slice. Each row has `current`,
+    `previous`, `change` and `change_percent` (None when there was no
+    revenue in the previous period).
+    """
+    day = day or timezone.localdate()
+    current_start, current_end = get_period_bounds(granularity, day)
+    previous_start, previous_end = get_period_bounds(
+        granularity, _previous_period_start(granularity, current_start)
+    )
+
+    columns = _group_columns(group_by)
+    current = get_revenue_cube(start=current_start, end=current_end, group_by=group_by)
+    previous = get_revenue_cube(start=previous_start, end=previous_end, group_by=group_by)
+
+    def key(row):
+        return tuple(row[column] for column in columns)
+
+    rows: dict[tuple, dict] = {}
+    for label, source in (("current", current), ("previous", previous)):
+        for row in source:
+            entry = rows.setdefault(
+                key(row),
+                {**{column: row[column] for column in columns}, "current": Decimal("0"), "previous": Decimal("0")},
+            )
+            entry[label] = row["total_revenue"]
+
+    comparison = []
+    for entry in rows.values():
+        entry["change"] = entry["current"] - entry["previous"]
+        entry["change_percent"] = (
+            (entry["change"] / entry["previous"] * 100).quantize(Decimal("0.1"))
+            if entry["previous"]
+            else None
+        )
+        entry["period_start"] = current_start
+        entry["previous_period_start"] = previous_start
+        comparison.append(entry)
+
+    return sorted(comparison, key=lambda entry: entry["current"], reverse=True)
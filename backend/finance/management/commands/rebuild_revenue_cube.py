@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.cube import GRANULARITIES, get_period_bounds, rebuild_revenue_cube
+
+
+def _parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise CommandError(f"Invalid date {value!r}; use YYYY-MM-DD.") from exc
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-aggregated revenue cube from the Payment table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="end", help="Last day to rebuild (YYYY-MM-DD).")
+        parser.add_argument(
+            "--period",
+            choices=GRANULARITIES,
+            help="Rebuild the whole day/week/month containing --date.",
+        )
+        parser.add_argument("--date", help="Day inside the period to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        start = _parse_date(options["start"]) if options["start"] else None
+        end = _parse_date(options["end"]) if options["end"] else None
+
+        if options["period"]:
+            if start or end:
+                raise CommandError("Use either --period/--date or --from/--to, not both.")
+            if not options["date"]:
+                raise CommandError("--period requires --date.")
+            start, end = get_period_bounds(options["period"], _parse_date(options["date"]))
+
+        cells = rebuild_revenue_cube(start=start, end=end)
+        scope = f"{start or 'beginning'} to {end or 'today'}"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {cells} revenue cells ({scope})."))
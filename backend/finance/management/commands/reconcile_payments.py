@@ -0,0 +1,63 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.models import Payment, ReconciliationRun
+from finance.reconciliation import StatementError, reconcile
+
+
+def _parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise CommandError(f"Invalid date {value!r}; use YYYY-MM-DD.") from exc
+
+
+class Command(BaseCommand):
+    help = "Reconcile recorded payments against an M-Pesa or bank CSV statement."
+
+    def add_arguments(self, parser):
+        parser.add_argument("statement", help="Path to the CSV statement.")
+        parser.add_argument(
+            "--provider",
+            choices=[Payment.PaymentMethod.MPESA, Payment.PaymentMethod.BANK],
+            default=Payment.PaymentMethod.MPESA,
+        )
+        parser.add_argument("--from", dest="start", required=True, help="First day of the statement (YYYY-MM-DD).")
+        parser.add_argument("--to", dest="end", required=True, help="Last day of the statement (YYYY-MM-DD).")
+        parser.add_argument("--reference-column", help="Override the reference column name.")
+        parser.add_argument("--amount-column", help="Override the amount column name.")
+
+    def handle(self, *args, **options):
+        start, end = _parse_date(options["start"]), _parse_date(options["end"])
+        if end < start:
+            raise CommandError("--to cannot be before --from.")
+
+        columns = {}
+        if options["reference_column"]:
+            columns["reference"] = options["reference_column"]
+        if options["amount_column"]:
+            columns["amount"] = options["amount_column"]
+
+        run = ReconciliationRun(
+            provider=options["provider"],
+            statement_name=options["statement"],
+            period_start=start,
+            period_end=end,
+        )
+        try:
+            with open(options["statement"], encoding="utf-8-sig", newline="") as statement:
+                reconcile(run, statement, columns)
+        except OSError as exc:
+            raise CommandError(f"Cannot open statement: {exc}") from exc
+        except StatementError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {run.statement_lines} statement lines against {run.payments_checked} payments: "
+                f"{run.matched} matched, {run.missing_in_ledger} missing from our records, "
+                f"{run.missing_in_statement} missing from the statement, "
+                f"{run.amount_mismatches} amount mismatches, {run.duplicates} duplicates."
+            )
+        )
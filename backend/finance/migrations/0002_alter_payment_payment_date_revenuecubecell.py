@@ -0,0 +1,67 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_revenue_cube(apps, schema_editor):
+    Payment = apps.get_model('finance', 'Payment')
+    RevenueCubeCell = apps.get_model('finance', 'RevenueCubeCell')
+
+    rows = (
+        Payment.objects.values(
+            day=models.F('payment_date'),
+            cell_batch=models.F('enrollment__batch_id'),
+            cell_course=models.F('enrollment__batch__course_id'),
+            cell_method=models.F('method'),
+        )
+        .annotate(total=models.Sum('amount'), count=models.Count('id'))
+        .order_by()
+    )
+    RevenueCubeCell.objects.bulk_create(
+        [
+            RevenueCubeCell(
+                day=row['day'],
+                batch_id=row['cell_batch'],
+                course_id=row['cell_course'],
+                method=row['cell_method'],
+                total_amount=row['total'],
+                payment_count=row['count'],
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_date',
+            field=models.DateField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='RevenueCubeCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('method', models.CharField(choices=[('CASH', 'Cash'), ('MPESA', 'M-Pesa'), ('BANK', 'Bank Transfer')], max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_cells', to='courses.batch')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_cells', to='courses.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'day'], name='finance_rev_course__456d11_idx'), models.Index(fields=['method', 'day'], name='finance_rev_method_cbe770_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'batch', 'method'), name='unique_revenue_cell')],
+            },
+        ),
+        migrations.RunPython(build_revenue_cube, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_batch_courses_bat_instruc_673d49_idx'),
+        ('finance', '0002_alter_payment_payment_date_revenuecubecell'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='revenuecubecell',
+            name='batch',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='revenue_cells', to='courses.batch'),
+        ),
+    ]
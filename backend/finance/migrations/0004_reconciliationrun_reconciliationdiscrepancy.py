@@ -0,0 +1,58 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:08
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_alter_revenuecubecell_batch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('provider', models.CharField(choices=[('MPESA', 'M-Pesa'), ('BANK', 'Bank Transfer')], max_length=20)),
+                ('statement_name', models.CharField(max_length=255)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('statement_lines', models.PositiveIntegerField(default=0)),
+                ('payments_checked', models.PositiveIntegerField(default=0)),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('missing_in_ledger', models.PositiveIntegerField(default=0, help_text='On the statement, not recorded by us')),
+                ('missing_in_statement', models.PositiveIntegerField(default=0, help_text='Recorded by us, not on the statement')),
+                ('amount_mismatches', models.PositiveIntegerField(default=0)),
+                ('duplicates', models.PositiveIntegerField(default=0)),
+                ('run_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationDiscrepancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('MISSING_IN_LEDGER', 'Missing from our records'), ('MISSING_IN_STATEMENT', 'Missing from statement'), ('AMOUNT_MISMATCH', 'Amount mismatch'), ('DUPLICATE_IN_STATEMENT', 'Duplicate on statement'), ('DUPLICATE_IN_LEDGER', 'Duplicate in our records'), ('NO_REFERENCE', 'Payment has no reference')], max_length=30)),
+                ('reference_number', models.CharField(blank=True, max_length=100)),
+                ('statement_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('ledger_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('statement_line', models.PositiveIntegerField(blank=True, null=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_discrepancies', to='finance.payment')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discrepancies', to='finance.reconciliationrun')),
+            ],
+            options={
+                'verbose_name_plural': 'reconciliation discrepancies',
+                'indexes': [models.Index(fields=['run', 'kind'], name='finance_rec_run_id_ca0515_idx')],
+            },
+        ),
+    ]
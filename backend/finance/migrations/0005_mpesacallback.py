@@ -0,0 +1,41 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:50
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_reconciliationrun_reconciliationdiscrepancy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MpesaCallback',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('trans_id', models.CharField(max_length=40, unique=True)),
+                ('trans_time', models.DateTimeField(blank=True, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('bill_ref_number', models.CharField(blank=True, help_text='Account reference typed by the payer', max_length=100)),
+                ('msisdn', models.CharField(blank=True, max_length=64)),
+                ('payer_name', models.CharField(blank=True, max_length=255)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('MATCHED', 'Matched'), ('SUSPENSE', 'In suspense'), ('RESOLVED', 'Resolved by hand')], db_index=True, max_length=20)),
+                ('suspense_reason', models.CharField(blank=True, max_length=255)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='mpesa_callback', to='finance.payment')),
+                ('resolved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
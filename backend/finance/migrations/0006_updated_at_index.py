@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enrollments', '0005_updated_at_index'),
+        ('finance', '0005_mpesacallback'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['updated_at'], name='finance_pay_updated_fe7461_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reconciliationdiscrepancy',
+            name='kind',
+            field=models.CharField(choices=[('MISSING_IN_LEDGER', 'Missing from our records'), ('MISSING_IN_STATEMENT', 'Missing from statement'), ('AMOUNT_MISMATCH', 'Amount mismatch'), ('DUPLICATE_IN_STATEMENT', 'Duplicate on statement'), ('DUPLICATE_IN_LEDGER', 'Duplicate in our records'), ('NO_REFERENCE', 'Payment has no reference'), ('STATEMENT_NO_REFERENCE', 'Statement line has no reference')], max_length=30),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from core.models import TimeStampedModel
 from django.conf import settings
+from courses.models import Batch, Course
 from enrollments.models import Enrollment
 
 class Payment(TimeStampedModel):
@@ -27,7 +28,159 @@ class Payment(TimeStampedModel):
         on_delete=models.PROTECT,
         related_name='processed_payments'
     )
-    payment_date = models.DateField(auto_now_add=True)
+    payment_date = models.DateField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # The analytics export reads rows changed since its last run
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"{self.enrollment.student.username} paid {self.amount} via {self.method}"
+
+
+class RevenueCubeCell(models.Model):
+    """
+    Pre-aggregated revenue for one day, batch and payment method.
+    Kept in step with Payment by finance.signals; weekly and monthly views
+    are rolled up from these daily cells instead of rescanning payments.
+    """
+    day = models.DateField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='revenue_cells')
+    # No database constraint: revenue must outlive batches moved to the archive.
+    batch = models.ForeignKey(
+        Batch,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='revenue_cells'
+    )
+    method = models.CharField(max_length=20, choices=Payment.PaymentMethod.choices)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'batch', 'method'], name='unique_revenue_cell'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'day']),
+            models.Index(fields=['method', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.batch_id} {self.method}: {self.total_amount}"
+
+
+class ReconciliationRun(TimeStampedModel):
+    """One comparison of our payments against a provider statement."""
+    provider = models.CharField(
+        max_length=20,
+        choices=[
+            (Payment.PaymentMethod.MPESA, 'M-Pesa'),
+            (Payment.PaymentMethod.BANK, 'Bank Transfer'),
+        ]
+    )
+    statement_name = models.CharField(max_length=255)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    run_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reconciliation_runs'
+    )
+
+    # Summary counts, filled in when the run completes
+    statement_lines = models.PositiveIntegerField(default=0)
+    payments_checked = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    missing_in_ledger = models.PositiveIntegerField(default=0, help_text="On the statement, not recorded by us")
+    missing_in_statement = models.PositiveIntegerField(default=0, help_text="Recorded by us, not on the statement")
+    amount_mismatches = models.PositiveIntegerField(default=0)
+    duplicates = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.period_start} to {self.period_end}"
+
+
+class ReconciliationDiscrepancy(models.Model):
+    """A single difference found by a reconciliation run."""
+    class Kind(models.TextChoices):
+        MISSING_IN_LEDGER = 'MISSING_IN_LEDGER', 'Missing from our records'
+        MISSING_IN_STATEMENT = 'MISSING_IN_STATEMENT', 'Missing from statement'
+        AMOUNT_MISMATCH = 'AMOUNT_MISMATCH', 'Amount mismatch'
+        DUPLICATE_IN_STATEMENT = 'DUPLICATE_IN_STATEMENT', 'Duplicate on statement'
+        DUPLICATE_IN_LEDGER = 'DUPLICATE_IN_LEDGER', 'Duplicate in our records'
+        NO_REFERENCE = 'NO_REFERENCE', 'Payment has no reference'
+        STATEMENT_NO_REFERENCE = 'STATEMENT_NO_REFERENCE', 'Statement line has no reference'
+
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='discrepancies')
+    kind = models.CharField(max_length=30, choices=Kind.choices)
+    reference_number = models.CharField(max_length=100, blank=True)
+    statement_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    ledger_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    statement_line = models.PositiveIntegerField(null=True, blank=True)
+    payment = models.ForeignKey(
+        Payment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reconciliation_discrepancies'
+    )
+
+    class Meta:
+        verbose_name_plural = 'reconciliation discrepancies'
+        indexes = [
+            models.Index(fields=['run', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.reference_number or '-'}"
+
+
+class MpesaCallback(TimeStampedModel):
+    """
+    A C2B confirmation received from M-Pesa. One row per transaction id,
+    which makes retried callbacks harmless; callbacks that could not be
+    matched to an enrollment wait here in suspense for a finance officer.
+    """
+    class Status(models.TextChoices):
+        MATCHED = 'MATCHED', 'Matched'
+        SUSPENSE = 'SUSPENSE', 'In suspense'
+        RESOLVED = 'RESOLVED', 'Resolved by hand'
+
+    trans_id = models.CharField(max_length=40, unique=True)
+    trans_time = models.DateTimeField(null=True, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    bill_ref_number = models.CharField(max_length=100, blank=True, help_text="Account reference typed by the payer")
+    msisdn = models.CharField(max_length=64, blank=True)
+    payer_name = models.CharField(max_length=255, blank=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=Status.choices, db_index=True)
+    suspense_reason = models.CharField(max_length=255, blank=True)
+    # No database constraint: archiving a batch moves its payments out of
+    # the live table, and restoring brings them back with the same ids.
+    payment = models.OneToOneField(
+        Payment,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='mpesa_callback'
+    )
+    resolved_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.trans_id}: {self.amount} ({self.get_status_display()})"
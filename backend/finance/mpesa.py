@@ -0,0 +1,328 @@
+"""
+M-Pesa C2B confirmation ingestion.
+
+Safaricom posts a confirmation for every payment to the paybill and
+retries it until it gets an answer, often several times during an
+outage. Each confirmation is stored once, keyed by its transaction id
+(which becomes the payment's reference number), so retries are
+acknowledged without creating a second payment.
+
+Under a burst, committing every callback in its own transaction makes
+the database's commit (an fsync on SQLite) the bottleneck. The
+GroupCommitter below lets request threads hand their callback to one
+writer thread, which commits whatever has queued up while the previous
+commit ran as a single transaction, and only then lets the requests
+acknowledge. An idle server commits each callback immediately; a busy
+one commits many per fsync.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from accounts.models import User
+from enrollments.models import Enrollment
+
+from .models import MpesaCallback, Payment
+from .reconciliation import normalize_reference
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+
+
+def normalize_msisdn(value) -> str:
+    """The 9-digit subscriber number of a Kenyan phone number in any common format, or ""."""
+    digits = "".join(char for char in str(value or "") if char.isdigit())
+    if len(digits) == 12 and digits.startswith("254"):
+        digits = digits[3:]
+    elif len(digits) == 10 and digits.startswith("0"):
+        digits = digits[1:]
+    return digits if len(digits) == 9 and digits[0] in "17" else ""
+
+
+def phone_variants(subscriber: str) -> list[str]:
+    """Ways a subscriber number may have been typed into User.phone_number."""
+    return [f"0{subscriber}", f"254{subscriber}", f"+254{subscriber}", subscriber]
+
+
+def parse_confirmation(payload: dict) -> dict:
+    """
+    Pull the fields we use out of a C2B confirmation body. Raises
+    ValueError when the transaction id or amount is missing or invalid.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("The confirmation is not a JSON object.")
+    trans_id = normalize_reference(payload.get("TransID"))
+    if not trans_id:
+        raise ValueError("TransID is missing.")
+    try:
+        amount = Decimal(str(payload.get("TransAmount", "")).replace(",", ""))
+    except InvalidOperation:
+        raise ValueError("TransAmount is not a number.") from None
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError("TransAmount must be positive.")
+    try:
+        trans_time = timezone.make_aware(datetime.strptime(str(payload.get("TransTime")), "%Y%m%d%H%M%S"))
+    except ValueError:
+        trans_time = None
+    payer_name = " ".join(
+        str(payload.get(key) or "").strip() for key in ("FirstName", "MiddleName", "LastName")
+    ).strip()
+    return {
+        "trans_id": trans_id,
+        "trans_time": trans_time,
+        "amount": amount.quantize(Decimal("0.01")),
+        "bill_ref_number": str(payload.get("BillRefNumber") or "").strip()[:100],
+        "msisdn": str(payload.get("MSISDN") or "").strip()[:64],
+        "payer_name": payer_name[:255],
+        "payload": payload,
+    }
+
+
+def get_system_user_id():
+    """The inactive account recorded as `received_by` on M-Pesa payments."""
+    user, created = User.objects.get_or_create(
+        username=getattr(settings, "MPESA_SYSTEM_USERNAME", "mpesa"),
+        defaults={"role": User.RoleChoices.FINANCE, "is_active": False},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=["password"])
+    return user.pk
+
+
+def match_enrollments(callbacks: list[dict]) -> dict:
+    """
+    Return `{trans_id: (enrollment_id, suspense_reason)}`; exactly one of
+    the two is set.
+
+    The account reference is tried first, as a username or as a phone
+    number, then the paying phone number. A payment goes to the student's
+    enrollment with an outstanding balance that falls due soonest. Three
+    queries for the whole batch.
+    """
+    usernames = {callback["bill_ref_number"].lower() for callback in callbacks if callback["bill_ref_number"]}
+    subscribers = {
+        normalize_msisdn(value)
+        for callback in callbacks
+        for value in (callback["bill_ref_number"], callback["msisdn"])
+    } - {""}
+
+    by_username, by_phone = {}, {}
+    students = User.objects.annotate(username_lower=Lower("username")).filter(
+        role=User.RoleChoices.STUDENT,
+    )
+    for pk, username in students.filter(username_lower__in=usernames).values_list("pk", "username_lower"):
+        by_username[username] = pk
+    variants = [variant for subscriber in subscribers for variant in phone_variants(subscriber)]
+    for pk, phone in students.filter(phone_number__in=variants).values_list("pk", "phone_number"):
+        by_phone.setdefault(normalize_msisdn(phone), set()).add(pk)
+
+    student_ids = set(by_username.values()) | {pk for pks in by_phone.values() for pk in pks}
+    outstanding = {}
+    rows = (
+        Enrollment.objects.filter(student_id__in=student_ids, amount_paid__lt=F("agreed_fee"))
+        .exclude(status=Enrollment.StatusChoices.DROPPED)
+        .order_by("student_id", F("next_due_date").asc(nulls_last=True), "created_at")
+        .values_list("student_id", "pk")
+    )
+    for student_id, enrollment_id in rows:
+        outstanding.setdefault(student_id, enrollment_id)
+
+    matches = {}
+    for callback in callbacks:
+        reference = callback["bill_ref_number"]
+        if reference.lower() in by_username:
+            candidates = {by_username[reference.lower()]}
+        else:
+            candidates = by_phone.get(normalize_msisdn(reference)) or by_phone.get(normalize_msisdn(callback["msisdn"]))
+        if not candidates:
+            matches[callback["trans_id"]] = (None, "No student matches the account reference or phone number.")
+        elif len(candidates) > 1:
+            matches[callback["trans_id"]] = (None, "The phone number belongs to several students.")
+        elif (student_id := next(iter(candidates))) not in outstanding:
+            matches[callback["trans_id"]] = (None, "The student has no enrollment with a balance due.")
+        else:
+            matches[callback["trans_id"]] = (outstanding[student_id], "")
+    return matches
+
+
+def ingest_callbacks(callbacks: list[dict]) -> dict:
+    """
+    Store parsed confirmations and create their payments, all in one
+    transaction. Returns `{trans_id: ACCEPTED | DUPLICATE}`.
+
+    Transactions already stored (or already keyed in by hand as a payment
+    reference) are duplicates. If another process stores one of the same
+    transactions concurrently, the batch is retried one callback at a time.
+    A callback that still fails, and is not stored by anyone else, raises:
+    it must not be acknowledged, or Safaricom would stop retrying it.
+    """
+    try:
+        with transaction.atomic():
+            return _ingest(callbacks)
+    except IntegrityError:
+        if len(callbacks) > 1:
+            results = {}
+            for callback in callbacks:
+                results.update(ingest_callbacks([callback]))
+            return results
+        trans_id = callbacks[0]["trans_id"]
+        if MpesaCallback.objects.filter(trans_id=trans_id).exists():
+            return {trans_id: DUPLICATE}
+        if not Payment.objects.filter(reference_number=trans_id).exists():
+            raise
+    # An officer keyed the transaction in while it was being ingested; this
+    # time it is found and the callback is stored against their payment.
+    with transaction.atomic():
+        return _ingest(callbacks)
+
+
+def _ingest(callbacks: list[dict]) -> dict:
+    trans_ids = [callback["trans_id"] for callback in callbacks]
+    results = dict.fromkeys(
+        MpesaCallback.objects.filter(trans_id__in=trans_ids).values_list("trans_id", flat=True),
+        DUPLICATE,
+    )
+    new = []
+    for callback in callbacks:
+        if callback["trans_id"] not in results:
+            results[callback["trans_id"]] = ACCEPTED
+            new.append(callback)
+    if not new:
+        return results
+
+    keyed_in = dict(
+        Payment.objects.filter(reference_number__in=[callback["trans_id"] for callback in new]).values_list(
+            "reference_number", "pk"
+        )
+    )
+    matches = match_enrollments([callback for callback in new if callback["trans_id"] not in keyed_in])
+    if any(enrollment_id for enrollment_id, _ in matches.values()):
+        system_user_id = get_system_user_id()
+    rows = []
+    for callback in new:
+        row = MpesaCallback(**callback)
+        if callback["trans_id"] in keyed_in:
+            # An officer recorded this transaction before the callback came in.
+            row.status, row.payment_id = MpesaCallback.Status.MATCHED, keyed_in[callback["trans_id"]]
+            results[callback["trans_id"]] = DUPLICATE
+        else:
+            enrollment_id, reason = matches[callback["trans_id"]]
+            if enrollment_id is None:
+                row.status, row.suspense_reason = MpesaCallback.Status.SUSPENSE, reason
+            else:
+                # Saved one by one so the revenue cube, balances and caches
+                # follow through the usual Payment signals.
+                payment = Payment.objects.create(
+                    enrollment_id=enrollment_id,
+                    amount=callback["amount"],
+                    method=Payment.PaymentMethod.MPESA,
+                    reference_number=callback["trans_id"],
+                    received_by_id=system_user_id,
+                )
+                # payment_date is set on insert; book the payment on the day
+                # it was made, not the day a retry finally got through.
+                if callback["trans_time"] and timezone.localdate(callback["trans_time"]) != payment.payment_date:
+                    payment.payment_date = timezone.localdate(callback["trans_time"])
+                    payment.save(update_fields=["payment_date", "updated_at"])
+                row.status, row.payment_id = MpesaCallback.Status.MATCHED, payment.pk
+        rows.append(row)
+    MpesaCallback.objects.bulk_create(rows)
+    return results
+
+
+@transaction.atomic
+def resolve_suspense(callback: MpesaCallback, enrollment: Enrollment, resolved_by) -> Payment:
+    """Record a suspended callback as a payment on `enrollment`, chosen by a finance officer."""
+    callback = MpesaCallback.objects.select_for_update().get(pk=callback.pk)
+    if callback.status != MpesaCallback.Status.SUSPENSE:
+        raise ValueError(f"{callback.trans_id} is not in suspense.")
+    payment = Payment.objects.create(
+        enrollment=enrollment,
+        amount=callback.amount,
+        method=Payment.PaymentMethod.MPESA,
+        reference_number=callback.trans_id,
+        received_by=resolved_by,
+    )
+    callback.status = MpesaCallback.Status.RESOLVED
+    callback.payment = payment
+    callback.resolved_by = resolved_by
+    callback.resolved_at = timezone.now()
+    callback.save(update_fields=["status", "payment", "resolved_by", "resolved_at", "updated_at"])
+    return payment
+
+
+class GroupCommitter:
+    """
+    A writer thread that commits queued callbacks in batches of up to
+    `max_batch`. `submit()` returns a Future resolved with ACCEPTED or
+    DUPLICATE once the callback's batch has committed.
+    """
+
+    def __init__(self, max_batch: int = 100):
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, callback: dict) -> Future:
+        future = Future()
+        self._queue.put((callback, future))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="mpesa-group-commit", daemon=True)
+                    self._thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        close_old_connections()
+        # A transaction retried within the burst may be queued twice.
+        unique = {callback["trans_id"]: callback for callback, _ in batch}
+        try:
+            results = ingest_callbacks(list(unique.values()))
+        except Exception:
+            # Fail only the callbacks that cannot be stored; any committed
+            # before the failure come back as duplicates.
+            results = {}
+            for trans_id, callback in unique.items():
+                try:
+                    results.update(ingest_callbacks([callback]))
+                except Exception as exc:
+                    results[trans_id] = exc
+        for callback, future in batch:
+            result = results[callback["trans_id"]]
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_committer = None
+_committer_lock = threading.Lock()
+
+
+def get_committer() -> GroupCommitter:
+    global _committer
+    with _committer_lock:
+        if _committer is None:
+            _committer = GroupCommitter(getattr(settings, "MPESA_MAX_COMMIT_BATCH", 100))
+        return _committer
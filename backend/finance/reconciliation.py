@@ -0,0 +1,188 @@
+import csv
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Payment, ReconciliationDiscrepancy, ReconciliationRun
+
+# Statement column names per provider. M-Pesa matches the Safaricom org
+# portal CSV export; the bank layout is a plain reference/date/amount file.
+STATEMENT_FORMATS = {
+    Payment.PaymentMethod.MPESA: {
+        "reference": "Receipt No.",
+        "amount": "Paid In",
+        "status": "Transaction Status",
+        "completed_status": "Completed",
+    },
+    Payment.PaymentMethod.BANK: {
+        "reference": "Reference",
+        "amount": "Amount",
+        "status": None,
+        "completed_status": None,
+    },
+}
+
+DISCREPANCY_BATCH_SIZE = 1000
+
+
+class StatementError(ValueError):
+    """The statement file could not be read with the expected columns."""
+
+
+def normalize_reference(value) -> str:
+    return (value or "").strip().upper()
+
+
+def _parse_amount(value: str) -> Decimal | None:
+    value = (value or "").replace(",", "").strip()
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def check_statement_columns(fieldnames, provider: str, columns: dict | None = None) -> None:
+    """Raise StatementError unless the header has the columns we match on."""
+    layout = {**STATEMENT_FORMATS[provider], **(columns or {})}
+    required = [layout["reference"], layout["amount"]]
+    missing = [column for column in required if column not in (fieldnames or [])]
+    if missing:
+        raise StatementError(f"Statement is missing column(s): {', '.join(missing)}")
+
+
+def iter_statement_lines(statement, provider: str, columns: dict | None = None):
+    """
+    Yield `(line_number, reference, amount)` for each incoming-money line of
+    a provider CSV statement. `columns` overrides the default column names.
+    Lines that are not completed credits are skipped.
+    """
+    layout = {**STATEMENT_FORMATS[provider], **(columns or {})}
+    reader = csv.DictReader(statement)
+    check_statement_columns(reader.fieldnames, provider, columns)
+
+    for line_number, row in enumerate(reader, start=2):
+        if layout["status"] and row.get(layout["status"], "").strip() != layout["completed_status"]:
+            continue
+        amount = _parse_amount(row[layout["amount"]])
+        if amount is None or amount <= 0:
+            continue
+        yield line_number, normalize_reference(row[layout["reference"]]), amount
+
+
+def _load_ledger(provider: str, period_start: date, period_end: date):
+    """
+    Build the hash side of the join: normalized reference -> (payment id,
+    amount) for our payments by `provider` in the period, streamed in chunks.
+    Also returns references that appear more than once and payments that
+    have no reference at all.
+    """
+    ledger: dict[str, tuple] = {}
+    duplicates: list[tuple] = []
+    unreferenced: list[tuple] = []
+    payments = (
+        Payment.objects.filter(
+            method=provider,
+            payment_date__gte=period_start,
+            payment_date__lte=period_end,
+        )
+        .values_list("pk", "reference_number", "amount")
+        .order_by()
+    )
+    for pk, reference, amount in payments.iterator(chunk_size=5000):
+        reference = normalize_reference(reference)
+        if not reference:
+            unreferenced.append((pk, amount))
+        elif reference in ledger:
+            duplicates.append((reference, pk, amount))
+        else:
+            ledger[reference] = (pk, amount)
+    return ledger, duplicates, unreferenced
+
+
+def reconcile(run: ReconciliationRun, statement, columns: dict | None = None) -> ReconciliationRun:
+    """
+    Compare a provider statement (an open text file of CSV) with our
+    payments for `run.provider` between `run.period_start` and
+    `run.period_end`, and save the run with its discrepancies.
+
+    Our payments are loaded once into a dict keyed on the normalized
+    reference, then the statement is streamed through it: one pass over
+    each side, so the cost grows linearly with the number of lines.
+    """
+    ledger, ledger_duplicates, unreferenced = _load_ledger(
+        run.provider, run.period_start, run.period_end
+    )
+    run.payments_checked = len(ledger) + len(ledger_duplicates) + len(unreferenced)
+
+    Kind = ReconciliationDiscrepancy.Kind
+    found: list[ReconciliationDiscrepancy] = []
+    seen: set[str] = set()
+    counts = {kind: 0 for kind in Kind.values}
+    lines = 0
+    matched = 0
+
+    def record(kind, **fields):
+        counts[kind] += 1
+        found.append(ReconciliationDiscrepancy(kind=kind, **fields))
+
+    for reference, pk, amount in ledger_duplicates:
+        record(Kind.DUPLICATE_IN_LEDGER, reference_number=reference, ledger_amount=amount, payment_id=pk)
+    for pk, amount in unreferenced:
+        record(Kind.NO_REFERENCE, ledger_amount=amount, payment_id=pk)
+
+    for line_number, reference, amount in iter_statement_lines(statement, run.provider, columns):
+        lines += 1
+        if not reference:
+            # Cannot be matched to anything, and is no duplicate of another blank line.
+            record(Kind.STATEMENT_NO_REFERENCE, statement_amount=amount, statement_line=line_number)
+            continue
+        if reference in seen:
+            record(
+                Kind.DUPLICATE_IN_STATEMENT,
+                reference_number=reference,
+                statement_amount=amount,
+                statement_line=line_number,
+            )
+            continue
+        seen.add(reference)
+
+        entry = ledger.get(reference)
+        if entry is None:
+            record(
+                Kind.MISSING_IN_LEDGER,
+                reference_number=reference,
+                statement_amount=amount,
+                statement_line=line_number,
+            )
+        elif entry[1] != amount:
+            record(
+                Kind.AMOUNT_MISMATCH,
+                reference_number=reference,
+                statement_amount=amount,
+                ledger_amount=entry[1],
+                statement_line=line_number,
+                payment_id=entry[0],
+            )
+        else:
+            matched += 1
+
+    for reference, (pk, amount) in ledger.items():
+        if reference not in seen:
+            record(Kind.MISSING_IN_STATEMENT, reference_number=reference, ledger_amount=amount, payment_id=pk)
+
+    run.statement_lines = lines
+    run.matched = matched
+    run.missing_in_ledger = counts[Kind.MISSING_IN_LEDGER] + counts[Kind.STATEMENT_NO_REFERENCE]
+    run.missing_in_statement = counts[Kind.MISSING_IN_STATEMENT] + counts[Kind.NO_REFERENCE]
+    run.amount_mismatches = counts[Kind.AMOUNT_MISMATCH]
+    run.duplicates = counts[Kind.DUPLICATE_IN_STATEMENT] + counts[Kind.DUPLICATE_IN_LEDGER]
+
+    with transaction.atomic():
+        run.save()
+        for discrepancy in found:
+            discrepancy.run = run
+        ReconciliationDiscrepancy.objects.bulk_create(found, batch_size=DISCREPANCY_BATCH_SIZE)
+    return run
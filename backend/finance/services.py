@@ -1,11 +1,11 @@
 from decimal import Decimal
-from datetime import timedelta
 
-from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from .models import Payment
+from enrollments.installments import get_overdue_enrollments, overdue_q
 from enrollments.models import Enrollment
 
 
@@ -30,12 +30,10 @@ def get_finance_dashboard_stats() -> dict:
     )
 
     outstanding = (
-        Enrollment.objects.annotate(
-            paid_amount=Coalesce(Sum("payments__amount"), Decimal("0"))
-        ).aggregate(
+        Enrollment.objects.aggregate(
             outstanding_total=Sum(
                 ExpressionWrapper(
-                    F("agreed_fee") - F("paid_amount"),
+                    F("agreed_fee") - F("amount_paid"),
                     output_field=DecimalField(max_digits=10, decimal_places=2),
                 )
             )
@@ -43,10 +41,17 @@ def get_finance_dashboard_stats() -> dict:
         or Decimal("0")
     )
 
+    overdue = get_overdue_enrollments().aggregate(
+        count=Count("id"),
+        amount_due=Coalesce(Sum("amount_due"), Decimal("0")),
+    )
+
     return {
         "payments_today": payments_today,
         "payments_this_month": payments_this_month,
         "outstanding_total": outstanding,
+        "overdue_count": overdue["count"],
+        "overdue_amount_due": overdue["amount_due"],
     }
 
 
@@ -68,45 +73,29 @@ def get_recent_payments(limit: int = 5):
 def get_top_debtors(limit: int = 5):
     """
     Return enrollments with the highest outstanding balances.
-    Includes 'is_overdue' flag if balance unpaid for more than 30 days.
-    Useful for Finance Officer to prioritize collection efforts.
+    Includes 'is_overdue' flag for enrollments counted as overdue (see
+    `overdue_q`). Useful for Finance Officer to prioritize collection efforts.
     """
-    today = timezone.localdate()
-    
-    debtors = (
+    return (
         Enrollment.objects.annotate(
-            paid_amount=Coalesce(Sum("payments__amount"), Decimal("0")),
             outstanding=ExpressionWrapper(
-                F("agreed_fee") - F("paid_amount"),
+                F("agreed_fee") - F("amount_paid"),
                 output_field=DecimalField(max_digits=10, decimal_places=2),
-            )
+            ),
+            is_overdue=overdue_q(),
         )
         .filter(outstanding__gt=Decimal("0"))
         .select_related("student", "batch", "batch__course")
         .order_by("-outstanding")[:limit]
     )
-    
-    # Add overdue flag to each debtor (unpaid for >30 days)
-    for debtor in debtors:
-        days_since_enrollment = (today - debtor.created_at.date()).days
-        debtor.is_overdue = days_since_enrollment > 30
-    
-    return debtors
 
 
 def get_revenue_by_course() -> list[dict]:
     """
     Return total revenue collected per course.
     Useful for Super Admin to see which courses generate the most revenue.
+    Read from the pre-aggregated revenue cube rather than the Payment table.
     """
-    return (
-        Payment.objects.select_related(
-            "enrollment",
-            "enrollment__batch",
-            "enrollment__batch__course",
-        )
-        .values("enrollment__batch__course__code", "enrollment__batch__course__title")
-        .annotate(total_revenue=Sum("amount"))
-        .order_by("-total_revenue")
-    )
+    from .cube import get_revenue_cube
 
+    return get_revenue_cube(group_by=("course",))
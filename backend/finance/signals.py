@@ -0,0 +1,106 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from enrollments.installments import apply_payment, balance_updates_paused
+
+from enrollments.models import Enrollment
+
+from .cube import apply_payment_delta, move_enrollment_payments, revenue_cube_paused
+from .models import Payment
+
+
+def _payment_cell(payment_date, enrollment_id, method):
+    batch_id, course_id = Enrollment.objects.filter(pk=enrollment_id).values_list(
+        "batch_id", "batch__course_id"
+    ).get()
+    return payment_date, batch_id, course_id, method
+
+
+@receiver(pre_save, sender=Payment, dispatch_uid="revenue_cube_remember_previous")
+def remember_previous_payment(sender, instance, raw=False, **kwargs):
+    """
+    Keep the pre-edit amount and cell of an existing payment, so the
+    post_save handler can move it out of the cell that holds it.
+    """
+    instance._revenue_cube_previous = None
+    if raw or instance._state.adding or revenue_cube_paused():
+        return
+    instance._revenue_cube_previous = (
+        Payment.objects.filter(pk=instance.pk)
+        .values_list("payment_date", "enrollment__batch_id", "enrollment__batch__course_id", "method", "amount")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Payment, dispatch_uid="revenue_cube_payment_saved")
+def add_payment_to_revenue_cube(sender, instance, raw=False, **kwargs):
+    if raw or revenue_cube_paused():
+        return
+    previous = getattr(instance, "_revenue_cube_previous", None)
+    if previous is not None:
+        payment_date, batch_id, course_id, method, amount = previous
+        apply_payment_delta(payment_date, batch_id, course_id, method, -amount, -1)
+    apply_payment_delta(
+        *_payment_cell(instance.payment_date, instance.enrollment_id, instance.method),
+        instance.amount,
+        1,
+    )
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid="revenue_cube_payment_deleted")
+def remove_payment_from_revenue_cube(sender, instance, **kwargs):
+    if revenue_cube_paused():
+        return
+    apply_payment_delta(
+        *_payment_cell(instance.payment_date, instance.enrollment_id, instance.method),
+        -instance.amount,
+        -1,
+    )
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid="revenue_cube_enrollment_moved")
+def move_payments_with_enrollment(sender, instance, created, raw=False, **kwargs):
+    """
+    Take an enrollment's payments with it when it moves to another batch.
+    The previous batch and course are recorded by the enrollments app's
+    pre_save handler.
+    """
+    if raw or created or revenue_cube_paused():
+        return
+    previous_batch_id = getattr(instance, "_previous_batch_id", None)
+    if previous_batch_id is None or previous_batch_id == instance.batch_id:
+        return
+    move_enrollment_payments(
+        instance.pk,
+        (previous_batch_id, instance._previous_course_id),
+        (instance.batch_id, instance.batch.course_id),
+    )
+
+
+@receiver(pre_save, sender=Payment, dispatch_uid="installments_remember_previous")
+def remember_previous_balance(sender, instance, raw=False, **kwargs):
+    """Keep the pre-edit enrollment and amount, to take them off that enrollment's balance."""
+    instance._installments_previous = None
+    if raw or instance._state.adding or balance_updates_paused():
+        return
+    instance._installments_previous = (
+        Payment.objects.filter(pk=instance.pk).values_list("enrollment_id", "amount").first()
+    )
+
+
+@receiver(post_save, sender=Payment, dispatch_uid="installments_payment_saved")
+def add_payment_to_enrollment(sender, instance, raw=False, **kwargs):
+    if raw or balance_updates_paused():
+        return
+    previous = getattr(instance, "_installments_previous", None)
+    if previous is not None:
+        enrollment_id, amount = previous
+        apply_payment(enrollment_id, -amount)
+    apply_payment(instance.enrollment_id, instance.amount)
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid="installments_payment_deleted")
+def remove_payment_from_enrollment(sender, instance, **kwargs):
+    if balance_updates_paused():
+        return
+    apply_payment(instance.enrollment_id, -instance.amount)
@@ -1,3 +1,403 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import finance.mpesa
+from core.testing import QueryBudgetTestCase, admin_url, create_batch, create_student
+from enrollments.models import Enrollment
+from finance.models import MpesaCallback, Payment, ReconciliationDiscrepancy, ReconciliationRun, RevenueCubeCell
+from finance.mpesa import ACCEPTED, DUPLICATE, ingest_callbacks, match_enrollments, parse_confirmation
+from finance.cube import rebuild_revenue_cube
+from finance.reconciliation import StatementError, reconcile
+from finance.services import get_revenue_by_course
+
+
+class PaymentAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(Payment, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(Payment, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(15, admin_url(Payment, "change", self.rows[0]["payment"].pk))
+
+    def test_enrollment_autocomplete(self):
+        self.assertAutocompleteBudget(3, Payment, "enrollment")
+
+
+class ReconciliationRunAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(ReconciliationRun, "changelist"))
+
+    def test_add(self):
+        self.assertQueryBudget(8, admin_url(ReconciliationRun, "add"))
+
+    def test_change(self):
+        self.assertQueryBudget(11, admin_url(ReconciliationRun, "change", self.rows[0]["run"].pk))
+
+
+class ReconciliationDiscrepancyAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(11, admin_url(ReconciliationDiscrepancy, "changelist"))
+
+    def test_change(self):
+        self.assertQueryBudget(13, admin_url(ReconciliationDiscrepancy, "change", self.rows[0]["discrepancy"].pk))
+
+
+class MpesaCallbackAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(10, admin_url(MpesaCallback, "changelist"))
+
+    def test_change(self):
+        # Callbacks in suspense get the form for matching them to an enrollment
+        self.assertQueryBudget(9, admin_url(MpesaCallback, "change", self.rows[0]["suspense_callback"].pk))
+
+
+class MpesaIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = create_student(phone_number="0712345678")
+        cls.batch = create_batch()
+        cls.enrollment = Enrollment.objects.create(student=cls.student, batch=cls.batch, agreed_fee=Decimal("20000"))
+
+    def confirmation(self, trans_id="QK12345678", **fields):
+        payload = {
+            "TransID": trans_id,
+            "TransTime": timezone.localtime().strftime("%Y%m%d%H%M%S"),
+            "TransAmount": "5000.00",
+            "BillRefNumber": self.student.username,
+            "MSISDN": "254700000001",
+            "FirstName": "Sam",
+            **fields,
+        }
+        return parse_confirmation(payload)
+
+    def test_retried_confirmation_is_stored_once(self):
+        callback = self.confirmation()
+        self.assertEqual(ingest_callbacks([callback]), {"QK12345678": ACCEPTED})
+        self.assertEqual(ingest_callbacks([callback]), {"QK12345678": DUPLICATE})
+        self.assertEqual(ingest_callbacks([callback, callback]), {"QK12345678": DUPLICATE})
+        self.assertEqual(Payment.objects.filter(reference_number="QK12345678").count(), 1)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.amount_paid, Decimal("5000"))
+
+    def test_duplicates_in_one_batch_are_stored_once(self):
+        results = ingest_callbacks([self.confirmation("QK1"), self.confirmation("QK2"), self.confirmation("QK1")])
+        self.assertEqual(results, {"QK1": ACCEPTED, "QK2": ACCEPTED})
+        self.assertEqual(MpesaCallback.objects.count(), 2)
+
+    def test_transaction_keyed_in_by_an_officer_is_a_duplicate(self):
+        payment = Payment.objects.create(
+            enrollment=self.enrollment,
+            amount=Decimal("5000"),
+            method=Payment.PaymentMethod.MPESA,
+            reference_number="QK12345678",
+            received_by=create_student(),
+        )
+        self.assertEqual(ingest_callbacks([self.confirmation()]), {"QK12345678": DUPLICATE})
+        callback = MpesaCallback.objects.get()
+        self.assertEqual((callback.status, callback.payment_id), (MpesaCallback.Status.MATCHED, payment.pk))
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_concurrently_stored_transaction_is_a_duplicate(self):
+        callback = self.confirmation()
+        ingest_callbacks([callback])
+        with mock.patch("finance.mpesa._ingest", side_effect=IntegrityError):
+            self.assertEqual(ingest_callbacks([callback]), {"QK12345678": DUPLICATE})
+
+    def test_transaction_keyed_in_during_ingest_is_stored_against_it(self):
+        payment = Payment.objects.create(
+            enrollment=self.enrollment,
+            amount=Decimal("5000"),
+            method=Payment.PaymentMethod.CASH,
+            reference_number="QK12345678",
+            received_by=create_student(),
+        )
+        # The first attempt clashes with the officer's payment; the retry finds it
+        ingest = finance.mpesa._ingest
+        attempts = []
+
+        def clash_once(callbacks):
+            attempts.append(callbacks)
+            if len(attempts) == 1:
+                raise IntegrityError
+            return ingest(callbacks)
+
+        with mock.patch("finance.mpesa._ingest", side_effect=clash_once):
+            self.assertEqual(ingest_callbacks([self.confirmation()]), {"QK12345678": DUPLICATE})
+        self.assertEqual(MpesaCallback.objects.get().payment_id, payment.pk)
+
+    def test_failure_that_stored_nothing_is_raised(self):
+        with mock.patch("finance.mpesa._ingest", side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                ingest_callbacks([self.confirmation()])
+        self.assertFalse(MpesaCallback.objects.exists())
+
+    def test_payment_is_booked_on_the_transaction_day(self):
+        paid_at = timezone.now() - timedelta(days=2)
+        ingest_callbacks([self.confirmation(TransTime=timezone.localtime(paid_at).strftime("%Y%m%d%H%M%S"))])
+        payment = Payment.objects.get()
+        self.assertEqual(payment.payment_date, timezone.localdate(paid_at))
+        cells = RevenueCubeCell.objects.filter(batch=self.batch, payment_count__gt=0)
+        self.assertEqual(list(cells.values_list("day", "total_amount")), [(payment.payment_date, Decimal("5000"))])
+
+    def test_matches_username_then_phone_numbers(self):
+        callbacks = [
+            self.confirmation("QK1", BillRefNumber=self.student.username.upper()),
+            self.confirmation("QK2", BillRefNumber="+254712345678"),
+            self.confirmation("QK3", BillRefNumber="unknown", MSISDN="254712345678"),
+        ]
+        matches = match_enrollments(callbacks)
+        self.assertEqual(
+            {trans_id: enrollment_id for trans_id, (enrollment_id, _) in matches.items()},
+            dict.fromkeys(["QK1", "QK2", "QK3"], self.enrollment.pk),
+        )
+
+    def test_unmatched_confirmations_go_to_suspense(self):
+        shared_phone = create_student(phone_number="0799999999")
+        create_student(phone_number="254799999999")
+        Enrollment.objects.create(student=shared_phone, batch=self.batch, agreed_fee=Decimal("20000"))
+        paid_up = create_student()
+        Enrollment.objects.create(student=paid_up, batch=create_batch(), agreed_fee=Decimal("0"))
+        matches = match_enrollments(
+            [
+                self.confirmation("QK1", BillRefNumber="nobody", MSISDN="254788888888"),
+                self.confirmation("QK2", BillRefNumber="0799999999"),
+                self.confirmation("QK3", BillRefNumber=paid_up.username),
+            ]
+        )
+        self.assertEqual(
+            {trans_id: reason for trans_id, (enrollment_id, reason) in matches.items()},
+            {
+                "QK1": "No student matches the account reference or phone number.",
+                "QK2": "The phone number belongs to several students.",
+                "QK3": "The student has no enrollment with a balance due.",
+            },
+        )
+        ingest_callbacks([self.confirmation("QK1", BillRefNumber="nobody", MSISDN="254788888888")])
+        self.assertEqual(MpesaCallback.objects.get().status, MpesaCallback.Status.SUSPENSE)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_payment_goes_to_the_enrollment_due_soonest(self):
+        later = Enrollment.objects.create(student=self.student, batch=create_batch(), agreed_fee=Decimal("20000"))
+        Enrollment.objects.filter(pk=later.pk).update(next_due_date=timezone.localdate() + timedelta(days=90))
+        (enrollment_id, _) = match_enrollments([self.confirmation()])["QK12345678"]
+        self.assertEqual(enrollment_id, self.enrollment.pk)
+
+
+@override_settings(MPESA_CALLBACK_TOKEN="secret", MPESA_GROUP_COMMIT=False)
+class MpesaConfirmationViewTests(TestCase):
+    def post(self, payload, token="secret"):
+        return self.client.post(
+            reverse("finance:mpesa_confirmation", args=[token]), json.dumps(payload), content_type="application/json"
+        )
+
+    def test_wrong_token_is_not_found(self):
+        self.assertEqual(self.post({}, token="wrong").status_code, 404)
+
+    def test_invalid_confirmation_is_rejected(self):
+        response = self.post({"TransID": "QK1", "TransAmount": "-5"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["ResultCode"], 1)
+
+    def test_confirmation_and_retry_are_acknowledged(self):
+        payload = {"TransID": "QK1", "TransAmount": "100", "BillRefNumber": "nobody"}
+        for _ in range(2):
+            response = self.post(payload)
+            self.assertEqual((response.status_code, response.json()["ResultCode"]), (200, 0))
+        self.assertEqual(MpesaCallback.objects.count(), 1)
+
+    def test_confirmation_not_stored_is_not_acknowledged(self):
+        with mock.patch("finance.mpesa._ingest", side_effect=IntegrityError), self.assertLogs("finance.views"):
+            response = self.post({"TransID": "QK1", "TransAmount": "100"})
+        self.assertEqual((response.status_code, response.json()["ResultCode"]), (503, 1))
+
+
+class ReconcileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.officer = create_student()
+        cls.enrollment = Enrollment.objects.create(
+            student=create_student(), batch=create_batch(), agreed_fee=Decimal("100000")
+        )
+
+    def pay(self, reference, amount="1000", method=Payment.PaymentMethod.MPESA):
+        return Payment.objects.create(
+            enrollment=self.enrollment,
+            amount=Decimal(amount),
+            method=method,
+            reference_number=reference,
+            received_by=self.officer,
+        )
+
+    def reconcile(self, *lines):
+        """Reconcile an M-Pesa statement of `(receipt, paid in)` lines, optionally with a status."""
+        statement = io.StringIO()
+        writer = csv.writer(statement)
+        writer.writerow(["Receipt No.", "Paid In", "Transaction Status"])
+        writer.writerows((*line, "Completed")[:3] for line in lines)
+        statement.seek(0)
+        today = timezone.localdate()
+        run = ReconciliationRun(
+            provider=Payment.PaymentMethod.MPESA,
+            statement_name="statement.csv",
+            period_start=today - timedelta(days=1),
+            period_end=today,
+        )
+        reconcile(run, statement)
+        return run
+
+    def discrepancies(self, run):
+        return sorted(
+            run.discrepancies.values_list("kind", "reference_number", "statement_amount", "ledger_amount")
+        )
+
+    def test_matching_lines(self):
+        self.pay("QK1")
+        self.pay("QK2", "250.50")
+        run = self.reconcile(("qk1 ", "1,000.00"), ("QK2", "250.5"))
+        self.assertEqual((run.statement_lines, run.payments_checked, run.matched), (2, 2, 2))
+        self.assertFalse(run.discrepancies.exists())
+
+    def test_amount_mismatch(self):
+        payment = self.pay("QK1")
+        run = self.reconcile(("QK1", "900"))
+        discrepancy = run.discrepancies.get()
+        self.assertEqual(
+            (discrepancy.kind, discrepancy.statement_amount, discrepancy.ledger_amount, discrepancy.payment_id),
+            (ReconciliationDiscrepancy.Kind.AMOUNT_MISMATCH, Decimal("900"), Decimal("1000"), payment.pk),
+        )
+        self.assertEqual((run.matched, run.amount_mismatches), (0, 1))
+
+    def test_missing_on_each_side(self):
+        self.pay("QK1")
+        self.pay("CASH1", method=Payment.PaymentMethod.CASH)
+        run = self.reconcile(("QK2", "500"))
+        Kind = ReconciliationDiscrepancy.Kind
+        self.assertEqual(
+            self.discrepancies(run),
+            [
+                (Kind.MISSING_IN_LEDGER, "QK2", Decimal("500"), None),
+                (Kind.MISSING_IN_STATEMENT, "QK1", None, Decimal("1000")),
+            ],
+        )
+        self.assertEqual((run.missing_in_ledger, run.missing_in_statement), (1, 1))
+
+    def test_duplicates_on_each_side(self):
+        self.pay("QK1")
+        self.pay("qk1")
+        run = self.reconcile(("QK1", "1000"), ("QK1", "1000"))
+        Kind = ReconciliationDiscrepancy.Kind
+        self.assertEqual(
+            self.discrepancies(run),
+            [
+                (Kind.DUPLICATE_IN_LEDGER, "QK1", None, Decimal("1000")),
+                (Kind.DUPLICATE_IN_STATEMENT, "QK1", Decimal("1000"), None),
+            ],
+        )
+        self.assertEqual((run.matched, run.duplicates), (1, 2))
+
+    def test_lines_without_reference(self):
+        self.pay(None)
+        run = self.reconcile(("", "100"), (" ", "200"), ("QK9", "300", "Failed"), ("QK8", "0"))
+        Kind = ReconciliationDiscrepancy.Kind
+        self.assertEqual(
+            self.discrepancies(run),
+            [
+                (Kind.NO_REFERENCE, "", None, Decimal("1000")),
+                (Kind.STATEMENT_NO_REFERENCE, "", Decimal("100"), None),
+                (Kind.STATEMENT_NO_REFERENCE, "", Decimal("200"), None),
+            ],
+        )
+        self.assertEqual(
+            (run.statement_lines, run.missing_in_ledger, run.missing_in_statement, run.duplicates), (2, 2, 1, 0)
+        )
+
+    def test_statement_without_the_expected_columns(self):
+        today = timezone.localdate()
+        run = ReconciliationRun(provider=Payment.PaymentMethod.MPESA, period_start=today, period_end=today)
+        with self.assertRaises(StatementError):
+            reconcile(run, io.StringIO("Reference,Amount\nQK1,100"))
+
+
+class RevenueCubeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.officer = create_student()
+        cls.batch = create_batch()
+        cls.other_batch = create_batch()
+        cls.enrollment = Enrollment.objects.create(
+            student=create_student(), batch=cls.batch, agreed_fee=Decimal("20000")
+        )
+
+    def setUp(self):
+        self.payment = Payment.objects.create(
+            enrollment=self.enrollment,
+            amount=Decimal("5000"),
+            method=Payment.PaymentMethod.MPESA,
+            reference_number="CUBE-1",
+            received_by=self.officer,
+        )
+
+    def cells(self):
+        return sorted(
+            RevenueCubeCell.objects.values_list("batch_id", "course_id", "method", "total_amount", "payment_count"),
+            key=str,
+        )
+
+    def move_enrollment(self):
+        self.enrollment.batch = self.other_batch
+        self.enrollment.save()
+
+    def test_edited_payment_moves_between_cells(self):
+        self.payment.amount = Decimal("7000")
+        self.payment.method = Payment.PaymentMethod.CASH
+        self.payment.save()
+        self.assertEqual(
+            self.cells(), [(self.batch.pk, self.batch.course_id, Payment.PaymentMethod.CASH, Decimal("7000"), 1)]
+        )
+
+    def test_payments_move_with_the_enrollment(self):
+        self.move_enrollment()
+        self.assertEqual(
+            self.cells(),
+            [(self.other_batch.pk, self.other_batch.course_id, Payment.PaymentMethod.MPESA, Decimal("5000"), 1)],
+        )
+        self.assertEqual(
+            [(row["course_id"], row["total_revenue"]) for row in get_revenue_by_course()],
+            [(self.other_batch.course_id, Decimal("5000"))],
+        )
+
+    def test_payment_edited_after_a_move_leaves_the_new_cell(self):
+        self.move_enrollment()
+        self.payment.amount = Decimal("6000")
+        self.payment.save()
+        self.assertEqual(
+            self.cells(),
+            [(self.other_batch.pk, self.other_batch.course_id, Payment.PaymentMethod.MPESA, Decimal("6000"), 1)],
+        )
+        self.payment.delete()
+        self.assertEqual(self.cells(), [])
+
+    def test_rebuild_matches_the_incremental_cube(self):
+        Payment.objects.create(
+            enrollment=self.enrollment,
+            amount=Decimal("2500"),
+            method=Payment.PaymentMethod.CASH,
+            reference_number="CUBE-2",
+            received_by=self.officer,
+        )
+        self.move_enrollment()
+        incremental = self.cells()
+        RevenueCubeCell.objects.all().delete()
+        self.assertEqual(rebuild_revenue_cube(), 2)
+        self.assertEqual(self.cells(), incremental)
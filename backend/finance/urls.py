@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = "finance"
+
+urlpatterns = [
+    path("mpesa/<str:token>/confirmation/", views.mpesa_confirmation, name="mpesa_confirmation"),
+]
@@ -1,3 +1,50 @@
-from django.shortcuts import render
+import json
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-# Create your views here.
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .mpesa import get_committer, ingest_callbacks, parse_confirmation
+
+logger = logging.getLogger(__name__)
+
+
+def _result(code, description, status=200):
+    return JsonResponse({"ResultCode": code, "ResultDesc": description}, status=status)
+
+
+@csrf_exempt
+@require_POST
+def mpesa_confirmation(request, token):
+    """
+    C2B confirmation URL registered with Safaricom. The secret `token` in
+    the path is the only credential the callbacks carry.
+
+    The callback is acknowledged once it is committed. Retries of a
+    transaction already stored are acknowledged too, without a new payment.
+    When the commit fails, or does not finish within MPESA_ACK_TIMEOUT
+    seconds, the request fails and Safaricom retries it later.
+    """
+    expected = getattr(settings, "MPESA_CALLBACK_TOKEN", "")
+    if not expected or not constant_time_compare(token, expected):
+        raise Http404
+    try:
+        callback = parse_confirmation(json.loads(request.body))
+    except (ValueError, UnicodeDecodeError) as exc:
+        return _result(1, f"Rejected: {exc}", status=400)
+
+    try:
+        if getattr(settings, "MPESA_GROUP_COMMIT", True):
+            get_committer().submit(callback).result(timeout=getattr(settings, "MPESA_ACK_TIMEOUT", 10))
+        else:
+            ingest_callbacks([callback])
+    except FutureTimeoutError:
+        return _result(1, "Busy, retry later.", status=503)
+    except Exception:
+        logger.exception("Could not store M-Pesa confirmation %s", callback["trans_id"])
+        return _result(1, "Not stored, retry later.", status=503)
+    return _result(0, "Accepted")
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+from .models import ReminderDelivery
+
+
+@admin.register(ReminderDelivery)
+class ReminderDeliveryAdmin(ModelAdmin):
+    list_display = ('student', 'channel', 'recipient', 'cycle', 'amount_due', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'channel', 'cycle')
+    list_select_related = ('student',)
+    search_fields = ('recipient', 'student__username', 'student__first_name', 'student__last_name')
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
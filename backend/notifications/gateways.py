@@ -0,0 +1,136 @@
+import json
+import sys
+import threading
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class OutgoingMessage:
+    key: object  # Caller's id for the message (the student's pk), echoed in results
+    recipient: str
+    body: str
+    subject: str = ""
+
+
+@dataclass
+class SendResult:
+    key: object
+    ok: bool
+    provider_reference: str = ""
+    error: str = ""
+
+
+class GatewayError(Exception):
+    """
+    A temporary failure (timeout, throttling, provider outage). Nothing in
+    the batch is known to have been sent, so the whole batch may be retried.
+    """
+
+
+class BaseGateway:
+    """
+    Sends batches of messages through one provider.
+
+    Subclasses implement `send_batch()`, returning one SendResult per message
+    for messages the provider accepted or permanently rejected, and raising
+    GatewayError when the batch should be retried. Gateways are shared by
+    worker threads, so `send_batch()` must be thread-safe. Gateways that
+    only record messages set `delivers` to False.
+    """
+    max_batch_size = 100
+    delivers = True
+
+    def __init__(self, **options):
+        self.options = options
+        self.max_batch_size = options.get("max_batch_size", self.max_batch_size)
+
+    def send_batch(self, messages: list[OutgoingMessage]) -> list[SendResult]:
+        raise NotImplementedError
+
+
+class ConsoleGateway(BaseGateway):
+    """Print messages instead of sending them. For development."""
+    delivers = False
+
+    def __init__(self, stream=None, **options):
+        super().__init__(**options)
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self._lock:
+            for message in messages:
+                self.stream.write(f"To: {message.recipient}\n{message.body}\n{'-' * 40}\n")
+            self.stream.flush()
+        return [SendResult(message.key, True) for message in messages]
+
+
+class FileGateway(BaseGateway):
+    """
+    Append each message as a JSON line to `path`. For testing and for
+    inspecting a run before a real provider is configured.
+    """
+    max_batch_size = 500
+    delivers = False
+
+    def __init__(self, path=None, **options):
+        super().__init__(**options)
+        self.path = path or settings.BASE_DIR / "sent_messages.jsonl"
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages):
+        sent_at = timezone.now().isoformat()
+        results = []
+        lines = []
+        for message in messages:
+            reference = uuid.uuid4().hex
+            lines.append(
+                json.dumps(
+                    {
+                        "id": reference,
+                        "to": message.recipient,
+                        "subject": message.subject,
+                        "body": message.body,
+                        "sent_at": sent_at,
+                    }
+                )
+            )
+            results.append(SendResult(message.key, True, provider_reference=reference))
+        with self._lock, open(self.path, "a", encoding="utf-8") as output:
+            output.write("\n".join(lines) + "\n")
+        return results
+
+
+class EmailGateway(BaseGateway):
+    """Send through Django's configured email backend, one connection per batch."""
+    max_batch_size = 50
+
+    def send_batch(self, messages):
+        emails = [
+            EmailMessage(subject=message.subject, body=message.body, to=[message.recipient])
+            for message in messages
+        ]
+        try:
+            with get_connection(fail_silently=False) as connection:
+                connection.send_messages(emails)
+        except OSError as exc:
+            raise GatewayError(str(exc)) from exc
+        return [SendResult(message.key, True) for message in messages]
+
+
+def get_gateway(channel: str, backend: str | None = None, **options) -> BaseGateway:
+    """
+    Build the gateway configured for `channel` in NOTIFICATION_GATEWAYS, or
+    the `backend` dotted path given explicitly.
+    """
+    config = getattr(settings, "NOTIFICATION_GATEWAYS", {}).get(channel, {})
+    backend = backend or config.get("BACKEND")
+    if not backend:
+        raise ValueError(f"No notification gateway configured for {channel!r}.")
+    return import_string(backend)(**{**config.get("OPTIONS", {}), **options})
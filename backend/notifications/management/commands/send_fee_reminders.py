@@ -0,0 +1,67 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.gateways import get_gateway
+from notifications.models import ReminderDelivery
+from notifications.services import send_fee_reminders
+
+
+class Command(BaseCommand):
+    help = "Send fee balance reminders to students with an overdue installment."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--channel",
+            choices=ReminderDelivery.Channel.values,
+            default=ReminderDelivery.Channel.SMS,
+        )
+        parser.add_argument("--cycle", help="Reminder cycle label (default: the current month, e.g. 2026-10).")
+        parser.add_argument("--date", help="Treat installments due before this day as overdue (YYYY-MM-DD).")
+        parser.add_argument(
+            "--gateway",
+            help="Dotted path of a gateway class to use instead of NOTIFICATION_GATEWAYS, "
+            "e.g. notifications.gateways.FileGateway.",
+        )
+        parser.add_argument("--output", help="File for FileGateway to write messages to.")
+        parser.add_argument("--workers", type=int, help="Concurrent sending threads.")
+        parser.add_argument("--rate", type=float, help="Maximum messages per second.")
+        parser.add_argument("--limit", type=int, help="Remind at most this many students.")
+        parser.add_argument("--dry-run", action="store_true", help="Select and render, but send nothing.")
+
+    def handle(self, *args, **options):
+        on = None
+        if options["date"]:
+            try:
+                on = date.fromisoformat(options["date"])
+            except ValueError as exc:
+                raise CommandError("--date must be YYYY-MM-DD.") from exc
+
+        gateway_options = {"path": options["output"]} if options["output"] else {}
+        gateway = None
+        if options["gateway"] or gateway_options:
+            try:
+                gateway = get_gateway(options["channel"], backend=options["gateway"], **gateway_options)
+            except (ImportError, ValueError) as exc:
+                raise CommandError(str(exc)) from exc
+
+        summary = send_fee_reminders(
+            channel=options["channel"],
+            cycle=options["cycle"],
+            on=on,
+            gateway=gateway,
+            workers=options["workers"],
+            rate_limit=options["rate"],
+            limit=options["limit"],
+            dry_run=options["dry_run"],
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"{summary['selected']} students would be reminded in cycle {summary['cycle']}.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Cycle {summary['cycle']}: {summary['sent']} sent, {summary['logged']} logged (not delivered), "
+                f"{summary['failed']} failed of {summary['selected']} selected; "
+                f"{summary['skipped']} left to another run."
+            )
+        )
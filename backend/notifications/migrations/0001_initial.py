@@ -0,0 +1,43 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:16
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDelivery',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('cycle', models.CharField(help_text='e.g. 2026-10 for monthly reminders', max_length=20)),
+                ('channel', models.CharField(choices=[('SMS', 'SMS'), ('EMAIL', 'Email')], max_length=10)),
+                ('recipient', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('amount_due', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('SENT', 'Sent'), ('FAILED', 'Failed')], max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('provider_reference', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fee_reminders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'reminder deliveries',
+                'indexes': [models.Index(fields=['cycle', 'channel', 'status'], name='notificatio_cycle_4f7601_idx')],
+                'unique_together': {('student', 'cycle', 'channel')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderdelivery',
+            name='run',
+            field=models.UUIDField(blank=True, editable=False, help_text='The run that claimed this reminder', null=True),
+        ),
+        migrations.AlterField(
+            model_name='reminderdelivery',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('LOGGED', 'Logged, not delivered'), ('FAILED', 'Failed')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.db import models
+from core.models import TimeStampedModel
+
+
+class ReminderDelivery(TimeStampedModel):
+    """
+    The outcome of one fee reminder to one student, in one cycle, on one
+    channel. A run claims the row (PENDING, tagged with its `run`) before
+    sending; the unique constraint means only one run can claim a student
+    in a cycle, so two overlapping runs never both message them.
+    """
+    class Channel(models.TextChoices):
+        SMS = 'SMS', 'SMS'
+        EMAIL = 'EMAIL', 'Email'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        # Accepted by a gateway that never delivers (console or file);
+        # does not stop a real send later in the cycle.
+        LOGGED = 'LOGGED', 'Logged, not delivered'
+        FAILED = 'FAILED', 'Failed'
+
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='fee_reminders'
+    )
+    cycle = models.CharField(max_length=20, help_text="e.g. 2026-10 for monthly reminders")
+    channel = models.CharField(max_length=10, choices=Channel.choices)
+    recipient = models.CharField(max_length=255)
+    message = models.TextField()
+    amount_due = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=10, choices=Status.choices)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    provider_reference = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    run = models.UUIDField(null=True, blank=True, editable=False, help_text="The run that claimed this reminder")
+
+    class Meta:
+        verbose_name_plural = 'reminder deliveries'
+        unique_together = ('student', 'cycle', 'channel')
+        indexes = [
+            models.Index(fields=['cycle', 'channel', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.cycle}): {self.status}"
@@ -0,0 +1,296 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, Min, OuterRef, Q, StringAgg, Sum, Value
+from django.template.loader import get_template
+from django.utils import timezone
+
+from enrollments.installments import overdue_q
+from enrollments.models import Enrollment
+
+from .gateways import BaseGateway, GatewayError, OutgoingMessage, SendResult, get_gateway
+from .models import ReminderDelivery
+
+REMINDER_TEMPLATE = "notifications/fee_reminder.txt"
+REMINDER_SUBJECT = "Fee balance reminder"
+
+# Where each channel finds the student's address.
+CONTACT_FIELDS = {
+    ReminderDelivery.Channel.SMS: "student__phone_number",
+    ReminderDelivery.Channel.EMAIL: "student__email",
+}
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the worker threads: on average no more than
+    `rate` messages per second leave, whatever the number of workers.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count: int = 1) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the tokens now (possibly going into debt) and wait off the
+            # debt outside the lock, so later callers queue up behind us.
+            self._tokens -= count
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def get_reminder_cycle(on: date) -> str:
+    """Reminders are monthly: a student hears from us at most once a month."""
+    return on.strftime("%Y-%m")
+
+
+def _claimable() -> Q:
+    """
+    Reminders a run may (re)claim: failed ones, ones a non-delivering
+    gateway only logged, and claims abandoned by a run that died before
+    recording the outcome.
+    """
+    timeout = getattr(settings, "FEE_REMINDER_CLAIM_TIMEOUT", 6 * 60 * 60)
+    return Q(status__in=[ReminderDelivery.Status.FAILED, ReminderDelivery.Status.LOGGED]) | Q(
+        status=ReminderDelivery.Status.PENDING, updated_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+
+
+def get_reminder_recipients(channel: str, cycle: str, on: date | None = None):
+    """
+    Return one row per student with an overdue installment on `on` (default:
+    today) who has an address for `channel` and has not been reminded (or
+    claimed by a running send) in `cycle`. A single grouped query over the
+    indexed next_due_date.
+    """
+    on = on or timezone.localdate()
+    contact_field = CONTACT_FIELDS[channel]
+    already_sent = ReminderDelivery.objects.filter(student=OuterRef("student"), cycle=cycle, channel=channel).exclude(
+        _claimable()
+    )
+    return (
+        Enrollment.objects.filter(overdue_q(on))
+        .exclude(**{f"{contact_field}__isnull": True})
+        .exclude(**{contact_field: ""})
+        .filter(~Exists(already_sent))
+        .values("student_id", "student__username", "student__first_name", contact=F(contact_field))
+        .annotate(
+            total_due=Sum("amount_due"),
+            total_outstanding=Sum(
+                ExpressionWrapper(
+                    F("agreed_fee") - F("amount_paid"),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                )
+            ),
+            earliest_due=Min("next_due_date"),
+            courses=StringAgg("batch__course__code", delimiter=Value(", ")),
+        )
+        .order_by("student_id")
+    )
+
+
+def render_reminders(rows) -> list[OutgoingMessage]:
+    """Render every reminder from one compiled template."""
+    template = get_template(REMINDER_TEMPLATE)
+    return [
+        OutgoingMessage(
+            key=row["student_id"],
+            recipient=row["contact"],
+            subject=REMINDER_SUBJECT,
+            body=template.render(
+                {
+                    "username": row["student__username"],
+                    "first_name": row["student__first_name"],
+                    "courses": row["courses"],
+                    "outstanding": row["total_outstanding"],
+                    "amount_due": row["total_due"],
+                    "next_due_date": row["earliest_due"],
+                }
+            ).strip(),
+        )
+        for row in rows
+    ]
+
+
+def _send_with_retry(
+    gateway: BaseGateway,
+    batch: list[OutgoingMessage],
+    limiter: RateLimiter,
+    max_attempts: int,
+    retry_delay: float,
+) -> tuple[int, list[SendResult]]:
+    """
+    Send one batch, retrying temporary gateway failures with exponential
+    backoff. Returns the number of attempts and one result per message.
+    Runs in a worker thread, so it must not touch the database.
+    """
+    for attempt in range(1, max_attempts + 1):
+        limiter.acquire(len(batch))
+        try:
+            results = gateway.send_batch(batch)
+        except GatewayError as exc:
+            if attempt == max_attempts:
+                return attempt, [SendResult(message.key, False, error=str(exc)) for message in batch]
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+            continue
+        except Exception as exc:
+            # Unknown outcome; record it rather than lose the whole run.
+            return attempt, [SendResult(message.key, False, error=repr(exc)) for message in batch]
+
+        answered = {result.key for result in results}
+        results.extend(
+            SendResult(message.key, False, error="No result from gateway")
+            for message in batch
+            if message.key not in answered
+        )
+        return attempt, results
+
+
+def _claim_reminders(rows, messages: list[OutgoingMessage], channel: str, cycle: str, run) -> set:
+    """
+    Mark the selected students' reminders PENDING under `run` before any is
+    sent, and return the students this run now owns. New rows are inserted
+    with ignore_conflicts, so of two overlapping runs only one gets each
+    student; existing claimable rows are taken over by a conditional update.
+    """
+    amounts = {row["student_id"]: row["total_due"] for row in rows}
+    ReminderDelivery.objects.bulk_create(
+        [
+            ReminderDelivery(
+                student_id=message.key,
+                cycle=cycle,
+                channel=channel,
+                recipient=message.recipient,
+                message=message.body,
+                amount_due=amounts[message.key],
+                status=ReminderDelivery.Status.PENDING,
+                run=run,
+            )
+            for message in messages
+        ],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+    selected = set(amounts)
+    existing = ReminderDelivery.objects.filter(cycle=cycle, channel=channel).filter(_claimable())
+    reclaim = [pk for pk, student_id in existing.values_list("pk", "student_id") if student_id in selected]
+    for start in range(0, len(reclaim), 500):
+        # Re-check the status in the UPDATE: another run may have taken the row since.
+        existing.filter(pk__in=reclaim[start : start + 500]).update(
+            status=ReminderDelivery.Status.PENDING, run=run, updated_at=timezone.now()
+        )
+    return set(ReminderDelivery.objects.filter(run=run).values_list("student_id", flat=True))
+
+
+def _record_deliveries(deliveries: list[ReminderDelivery]) -> None:
+    # Overwrites this run's PENDING claim with the outcome.
+    ReminderDelivery.objects.bulk_create(
+        deliveries,
+        update_conflicts=True,
+        unique_fields=["student", "cycle", "channel"],
+        update_fields=[
+            "recipient",
+            "message",
+            "amount_due",
+            "status",
+            "attempts",
+            "provider_reference",
+            "error",
+            "sent_at",
+            "updated_at",
+        ],
+    )
+
+
+def send_fee_reminders(
+    channel: str = ReminderDelivery.Channel.SMS,
+    cycle: str | None = None,
+    on: date | None = None,
+    gateway: BaseGateway | None = None,
+    workers: int | None = None,
+    rate_limit: float | None = None,
+    max_attempts: int = 3,
+    retry_delay: float = 1.0,
+    limit: int | None = None,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Remind every overdue student once per cycle.
+
+    Recipients are selected and their messages rendered up front, then
+    claimed as PENDING rows so an overlapping run skips them. The claimed
+    ones are sent in gateway-sized batches by a pool of `workers` threads,
+    throttled to `rate_limit` messages per second. Each batch's outcome is
+    recorded as soon as it completes. A run that dies mid-send leaves its
+    unsent claims PENDING; they are retried once older than
+    FEE_REMINDER_CLAIM_TIMEOUT. Returns counts of selected, skipped
+    (claimed by another run), sent, logged (by a gateway that does not
+    deliver) and failed reminders.
+    """
+    on = on or timezone.localdate()
+    cycle = cycle or get_reminder_cycle(on)
+    workers = workers or getattr(settings, "FEE_REMINDER_WORKERS", 4)
+    rate_limit = rate_limit or getattr(settings, "FEE_REMINDER_RATE_LIMIT", 20)
+
+    rows = get_reminder_recipients(channel, cycle, on)
+    if limit is not None:
+        rows = rows[:limit]
+    rows = list(rows)
+    messages = render_reminders(rows)
+    summary = {"cycle": cycle, "selected": len(messages), "skipped": 0, "sent": 0, "logged": 0, "failed": 0}
+    if dry_run or not messages:
+        return summary
+
+    gateway = gateway or get_gateway(channel)
+    claimed = _claim_reminders(rows, messages, channel, cycle, run=uuid.uuid4())
+    summary["skipped"] = len(messages) - len(claimed)
+    messages = [message for message in messages if message.key in claimed]
+    delivered = ReminderDelivery.Status.SENT if gateway.delivers else ReminderDelivery.Status.LOGGED
+    limiter = RateLimiter(rate_limit)
+    amounts = {row["student_id"]: row["total_due"] for row in rows}
+    by_key = {message.key: message for message in messages}
+    batches = [
+        messages[start : start + gateway.max_batch_size]
+        for start in range(0, len(messages), gateway.max_batch_size)
+    ]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_send_with_retry, gateway, batch, limiter, max_attempts, retry_delay)
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            attempts, results = future.result()
+            now = timezone.now()
+            deliveries = []
+            for result in results:
+                message = by_key[result.key]
+                deliveries.append(
+                    ReminderDelivery(
+                        student_id=result.key,
+                        cycle=cycle,
+                        channel=channel,
+                        recipient=message.recipient,
+                        message=message.body,
+                        amount_due=amounts[result.key],
+                        status=delivered if result.ok else ReminderDelivery.Status.FAILED,
+                        attempts=attempts,
+                        provider_reference=result.provider_reference,
+                        error=result.error,
+                        sent_at=now if result.ok and gateway.delivers else None,
+                    )
+                )
+                summary[("sent" if gateway.delivers else "logged") if result.ok else "failed"] += 1
+            _record_deliveries(deliveries)
+    return summary
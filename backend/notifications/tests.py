@@ -0,0 +1,127 @@
+import io
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+import notifications.services
+from core.testing import QueryBudgetTestCase, admin_url, create_batch, create_student
+from enrollments.models import Enrollment
+from notifications.gateways import BaseGateway, ConsoleGateway, GatewayError, SendResult
+from notifications.models import ReminderDelivery
+from notifications.services import get_reminder_cycle, send_fee_reminders
+
+
+class ReminderDeliveryAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(11, admin_url(ReminderDelivery, "changelist"))
+
+    def test_change(self):
+        self.assertQueryBudget(10, admin_url(ReminderDelivery, "change", self.rows[0]["reminder"].pk))
+
+
+class RecordingGateway(BaseGateway):
+    """Accepts every message except those to `rejected` recipients, remembering what it sent."""
+
+    def __init__(self, rejected=(), error=None, **options):
+        super().__init__(**options)
+        self.rejected = set(rejected)
+        self.error = error
+        self.sent = []
+
+    def send_batch(self, messages):
+        if self.error:
+            raise self.error
+        self.sent.extend(message.recipient for message in messages)
+        return [SendResult(message.key, message.recipient not in self.rejected) for message in messages]
+
+
+class FeeReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        batch = create_batch()
+        cls.students = [create_student(phone_number=f"07111111{n:02d}") for n in range(3)]
+        for student in cls.students:
+            Enrollment.objects.create(student=student, batch=batch, agreed_fee=Decimal("20000"))
+        Enrollment.objects.update(next_due_date=timezone.localdate() - timedelta(days=3), amount_due=Decimal("5000"))
+        cls.cycle = get_reminder_cycle(timezone.localdate())
+
+    def send(self, gateway, **options):
+        return send_fee_reminders(gateway=gateway, workers=1, retry_delay=0, **options)
+
+    def statuses(self):
+        return dict(ReminderDelivery.objects.values_list("student__phone_number", "status"))
+
+    def test_students_are_reminded_once_per_cycle(self):
+        gateway = RecordingGateway()
+        summary = self.send(gateway)
+        self.assertEqual((summary["selected"], summary["sent"], summary["failed"]), (3, 3, 0))
+        self.assertEqual(self.send(gateway)["selected"], 0)
+        self.assertEqual(sorted(gateway.sent), sorted(student.phone_number for student in self.students))
+        self.assertEqual(set(self.statuses().values()), {ReminderDelivery.Status.SENT})
+
+    def test_failed_reminders_are_retried_next_run(self):
+        rejected = self.students[0].phone_number
+        summary = self.send(RecordingGateway(rejected=[rejected]))
+        self.assertEqual((summary["sent"], summary["failed"]), (2, 1))
+        self.assertEqual(self.statuses()[rejected], ReminderDelivery.Status.FAILED)
+
+        gateway = RecordingGateway()
+        self.assertEqual(self.send(gateway)["sent"], 1)
+        self.assertEqual(gateway.sent, [rejected])
+        self.assertEqual(self.statuses()[rejected], ReminderDelivery.Status.SENT)
+
+    def test_gateway_errors_are_retried_then_recorded(self):
+        summary = self.send(RecordingGateway(error=GatewayError("Provider down")), max_attempts=2)
+        self.assertEqual((summary["sent"], summary["failed"]), (0, 3))
+        self.assertEqual(
+            set(ReminderDelivery.objects.values_list("status", "attempts", "error")),
+            {(ReminderDelivery.Status.FAILED, 2, "Provider down")},
+        )
+
+    def test_console_reminders_do_not_block_a_real_send(self):
+        output = io.StringIO()
+        summary = self.send(ConsoleGateway(stream=output))
+        self.assertEqual((summary["sent"], summary["logged"]), (0, 3))
+        self.assertIn(self.students[0].phone_number, output.getvalue())
+        self.assertEqual(set(self.statuses().values()), {ReminderDelivery.Status.LOGGED})
+
+        self.assertEqual(self.send(RecordingGateway())["sent"], 3)
+        self.assertEqual(set(self.statuses().values()), {ReminderDelivery.Status.SENT})
+
+    def test_students_claimed_by_an_overlapping_run_are_skipped(self):
+        taken = self.students[0]
+        render = notifications.services.render_reminders
+
+        def claimed_meanwhile(rows):
+            # Another run claims a student between our selection and our claim.
+            ReminderDelivery.objects.create(
+                student=taken,
+                cycle=self.cycle,
+                channel=ReminderDelivery.Channel.SMS,
+                recipient=taken.phone_number,
+                message="",
+                amount_due=Decimal("5000"),
+                status=ReminderDelivery.Status.PENDING,
+                run=uuid.uuid4(),
+            )
+            return render(rows)
+
+        gateway = RecordingGateway()
+        with mock.patch("notifications.services.render_reminders", side_effect=claimed_meanwhile):
+            summary = self.send(gateway)
+        self.assertEqual((summary["selected"], summary["skipped"], summary["sent"]), (3, 1, 2))
+        self.assertNotIn(taken.phone_number, gateway.sent)
+        self.assertEqual(self.statuses()[taken.phone_number], ReminderDelivery.Status.PENDING)
+        # A live claim keeps the student out of the next run too.
+        self.assertEqual(self.send(gateway)["selected"], 0)
+
+    def test_abandoned_claims_are_retried(self):
+        self.send(RecordingGateway(error=GatewayError("Provider down")), max_attempts=1)
+        ReminderDelivery.objects.update(
+            status=ReminderDelivery.Status.PENDING, updated_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(self.send(RecordingGateway())["sent"], 3)
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+from courses.models import Batch
+from enrollments.models import Enrollment
+from finance.models import Payment
+
+PORTAL_CACHE_ALIAS = getattr(settings, "PORTAL_CACHE_ALIAS", "shared")
+PORTAL_CACHE_TIMEOUT = getattr(settings, "PORTAL_CACHE_TIMEOUT", 3600)
+
+
+def student_summary_key(student_id) -> str:
+    return f"portal:student:{student_id}"
+
+
+def invalidate_student_summaries(*student_ids) -> None:
+    """
+    Drop the cached portal pages of these students once the current
+    transaction commits, so a request racing the write cannot cache the
+    old data after we have deleted it.
+    """
+    keys = [student_summary_key(student_id) for student_id in student_ids if student_id is not None]
+    if keys:
+        transaction.on_commit(lambda: caches[PORTAL_CACHE_ALIAS].delete_many(keys))
+
+
+def build_student_summary(student_id) -> dict:
+    """
+    Everything the portal shows a student, as plain data that can be cached:
+    each enrollment with its course, fee, balance and payments, plus totals.
+    One enrollment query and one prefetch of payments.
+    """
+    enrollments = (
+        Enrollment.objects.filter(student_id=student_id)
+        .select_related("batch__course", "batch__instructor")
+        .prefetch_related(
+            Prefetch(
+                "payments",
+                queryset=Payment.objects.order_by("-payment_date", "-created_at").only(
+                    "enrollment_id", "amount", "method", "reference_number", "payment_date"
+                ),
+            )
+        )
+        .order_by("-batch__start_date")
+    )
+    rows = []
+    for enrollment in enrollments:
+        batch = enrollment.batch
+        rows.append(
+            {
+                "course_code": batch.course.code,
+                "course_title": batch.course.title,
+                "batch_name": batch.name,
+                "start_date": batch.start_date,
+                "end_date": batch.end_date,
+                "instructor": batch.instructor.get_full_name() if batch.instructor else "",
+                "status": enrollment.get_status_display(),
+                "is_active": enrollment.status == Enrollment.StatusChoices.ACTIVE,
+                "agreed_fee": enrollment.agreed_fee,
+                "amount_paid": enrollment.amount_paid,
+                "balance": enrollment.agreed_fee - enrollment.amount_paid,
+                "next_due_date": enrollment.next_due_date,
+                "amount_due": enrollment.amount_due,
+                "payments": [
+                    {
+                        "date": payment.payment_date,
+                        "amount": payment.amount,
+                        "method": payment.get_method_display(),
+                        "reference": payment.reference_number or "",
+                    }
+                    for payment in enrollment.payments.all()
+                ],
+            }
+        )
+    return {
+        "enrollments": rows,
+        "total_fee": sum((row["agreed_fee"] for row in rows), 0),
+        "total_paid": sum((row["amount_paid"] for row in rows), 0),
+        "total_balance": sum((row["balance"] for row in rows), 0),
+        "generated_at": timezone.now(),
+    }
+
+
+def get_student_summary(student_id) -> dict:
+    """The student's portal data, from the shared cache when it is there."""
+    cache = caches[PORTAL_CACHE_ALIAS]
+    key = student_summary_key(student_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_student_summary(student_id)
+        cache.set(key, summary, PORTAL_CACHE_TIMEOUT)
+    return summary
+
+
+# Roster export columns, in order, with the Enrollment field each comes from.
+ROSTER_COLUMNS = (
+    ("Course code", "batch__course__code"),
+    ("Batch", "batch__name"),
+    ("Username", "student__username"),
+    ("First name", "student__first_name"),
+    ("Last name", "student__last_name"),
+    ("Email", "student__email"),
+    ("Phone", "student__phone_number"),
+    ("Status", "status"),
+    ("Enrolled on", "created_at"),
+)
+
+
+def get_instructor_batches(instructor_id):
+    """
+    The instructor's batches, newest first, with enrollment counts per
+    status. A single grouped query however many batches there are.
+    """
+    return (
+        Batch.objects.filter(instructor_id=instructor_id)
+        .select_related("course")
+        .annotate(
+            enrolled_total=Count("enrollments"),
+            **{
+                f"{status.lower()}_total": Count("enrollments", filter=Q(enrollments__status=status))
+                for status in Enrollment.StatusChoices.values
+            },
+        )
+        .order_by("-start_date", "name")
+    )
+
+
+def get_batch_roster(instructor_id, batch_id):
+    """
+    One of the instructor's batches with its enrollments and students
+    loaded: one query for the batch and one for the roster. Returns None
+    when the batch is not theirs.
+    """
+    return (
+        Batch.objects.filter(pk=batch_id, instructor_id=instructor_id)
+        .select_related("course")
+        .prefetch_related(
+            Prefetch(
+                "enrollments",
+                queryset=Enrollment.objects.select_related("student").order_by(
+                    "student__last_name", "student__first_name", "student__username"
+                ),
+            )
+        )
+        .first()
+    )
+
+
+def iter_roster_rows(instructor_id, batch_id=None):
+    """
+    Yield the roster export header and then one row per enrollment in the
+    instructor's batches (or just `batch_id`), read with a single streamed
+    query so large exports never sit in memory.
+    """
+    yield [header for header, _ in ROSTER_COLUMNS]
+    enrollments = Enrollment.objects.filter(batch__instructor_id=instructor_id)
+    if batch_id is not None:
+        enrollments = enrollments.filter(batch_id=batch_id)
+    rows = enrollments.order_by("-batch__start_date", "batch__name", "student__last_name", "student__first_name")
+    status_labels = dict(Enrollment.StatusChoices.choices)
+    for row in rows.values_list(*(field for _, field in ROSTER_COLUMNS)).iterator(chunk_size=2000):
+        *contact, status, enrolled_at = row
+        yield [*contact, status_labels.get(status, status), timezone.localdate(enrolled_at).isoformat()]
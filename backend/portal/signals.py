@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from core.signals import UNVERSIONED_FIELDS
+from courses.models import Batch, Course
+from enrollments.models import Enrollment
+from finance.models import Payment
+
+from .services import invalidate_student_summaries
+
+
+def _student_of(enrollment_id):
+    return Enrollment.objects.filter(pk=enrollment_id).values_list("student_id", flat=True).first()
+
+
+@receiver(post_save, sender=Enrollment, dispatch_uid="portal_enrollment_saved")
+@receiver(post_delete, sender=Enrollment, dispatch_uid="portal_enrollment_deleted")
+def enrollment_changed(sender, instance, **kwargs):
+    # Installment plans and due dates change inside the same transaction
+    # as the enrollment (or payment) save, so they are covered too. An
+    # enrollment moved to another student leaves the old one's page too.
+    invalidate_student_summaries(instance.student_id, getattr(instance, "_previous_student_id", None))
+
+
+@receiver(post_save, sender=Payment, dispatch_uid="portal_payment_saved")
+@receiver(post_delete, sender=Payment, dispatch_uid="portal_payment_deleted")
+def payment_changed(sender, instance, **kwargs):
+    student_ids = {_student_of(instance.enrollment_id)}
+    previous = getattr(instance, "_revenue_cube_previous", None)
+    if previous is not None and previous[1] != instance.enrollment_id:
+        # The payment moved to another enrollment (maybe another student).
+        student_ids.add(_student_of(previous[1]))
+    invalidate_student_summaries(*student_ids)
+
+
+def _invalidate_enrolled(**filters):
+    student_ids = Enrollment.objects.filter(**filters).values_list("student_id", flat=True).distinct()
+    invalidate_student_summaries(*student_ids)
+
+
+# Summaries also show course titles, batch names and dates, and instructor
+# names. Deletes need no handler: the enrollments go with them.
+@receiver(post_save, sender=Course, dispatch_uid="portal_course_saved")
+def course_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_enrolled(batch__course=instance)
+
+
+@receiver(post_save, sender=Batch, dispatch_uid="portal_batch_saved")
+def batch_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_enrolled(batch=instance)
+
+
+@receiver(post_save, sender=User, dispatch_uid="portal_instructor_saved")
+def instructor_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and UNVERSIONED_FIELDS.issuperset(update_fields)):
+        return
+    _invalidate_enrolled(batch__instructor=instance)
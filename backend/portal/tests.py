@@ -0,0 +1,232 @@
+import csv
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from core.testing import TEST_CACHES, create_batch, create_staff, create_student
+from attendance.services import add_sessions, get_session_register
+from enrollments.models import Enrollment
+from portal.services import (
+    PORTAL_CACHE_ALIAS,
+    ROSTER_COLUMNS,
+    build_student_summary,
+    get_student_summary,
+)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PortalAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = create_student()
+        cls.instructor = create_student(role=User.RoleChoices.INSTRUCTOR)
+        cls.staff = create_staff()
+
+    def test_anonymous_users_are_sent_to_the_login_page(self):
+        for name in ("portal:home", "portal:batches"):
+            with self.subTest(name):
+                response = self.client.get(reverse(name))
+                self.assertRedirects(response, f"{reverse('portal:login')}?next={reverse(name)}")
+
+    def test_students_see_their_page_and_not_the_instructor_pages(self):
+        self.client.force_login(self.student)
+        self.assertTemplateUsed(self.client.get(reverse("portal:home")), "portal/home.html")
+        self.assertEqual(self.client.get(reverse("portal:batches")).status_code, 403)
+
+    def test_instructors_are_sent_to_their_batches(self):
+        self.client.force_login(self.instructor)
+        self.assertRedirects(self.client.get(reverse("portal:home")), reverse("portal:batches"))
+        self.assertEqual(self.client.get(reverse("portal:batches")).status_code, 200)
+
+    def test_staff_are_sent_to_the_admin(self):
+        self.client.force_login(self.staff["finance"])
+        for name in ("portal:home", "portal:batches"):
+            with self.subTest(name):
+                self.assertRedirects(self.client.get(reverse(name)), reverse("admin:index"))
+
+    def test_other_roles_are_refused(self):
+        self.client.force_login(create_student(role=User.RoleChoices.FINANCE))
+        self.assertEqual(self.client.get(reverse("portal:home")).status_code, 403)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class StudentSummaryCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = create_student()
+        cls.instructor = create_student(role=User.RoleChoices.INSTRUCTOR, first_name="Ida", last_name="Njeri")
+        cls.batch = create_batch(instructor=cls.instructor)
+        cls.enrollment = Enrollment.objects.create(student=cls.student, batch=cls.batch, agreed_fee=Decimal("20000"))
+
+    def setUp(self):
+        caches[PORTAL_CACHE_ALIAS].clear()
+
+    def summary(self, student=None):
+        """The student's summary, and whether building it needed the database."""
+        with mock.patch("portal.services.build_student_summary", wraps=build_student_summary) as build:
+            summary = get_student_summary((student or self.student).pk)
+        return summary, build.called
+
+    def test_summary_is_cached(self):
+        self.assertTrue(self.summary()[1])
+        with self.assertNumQueries(0):
+            summary, built = self.summary()
+        self.assertFalse(built)
+        self.assertEqual(summary["enrollments"][0]["course_code"], self.batch.course.code)
+
+    def test_course_batch_and_instructor_edits_invalidate(self):
+        self.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.course.title = "Renamed course"
+            self.batch.course.save()
+        self.assertEqual(self.summary()[0]["enrollments"][0]["course_title"], "Renamed course")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.batch.name = "Renamed batch"
+            self.batch.save()
+        self.assertEqual(self.summary()[0]["enrollments"][0]["batch_name"], "Renamed batch")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.last_name = "Wambui"
+            self.instructor.save()
+        self.assertEqual(self.summary()[0]["enrollments"][0]["instructor"], "Ida Wambui")
+
+    def test_login_keeps_the_cache(self):
+        self.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.instructor)
+        self.assertFalse(self.summary()[1])
+
+    def test_enrollment_moved_to_another_student_invalidates_both(self):
+        other = create_student()
+        self.summary()
+        self.summary(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enrollment.student = other
+            self.enrollment.save()
+        self.assertEqual(self.summary()[0]["enrollments"], [])
+        self.assertEqual(len(self.summary(other)[0]["enrollments"]), 1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class InstructorPortalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = create_student(role=User.RoleChoices.INSTRUCTOR)
+        cls.batch = create_batch(instructor=cls.instructor)
+        cls.later_batch = create_batch(instructor=cls.instructor, start_date=timezone.localdate())
+        cls.enrollments = [
+            Enrollment.objects.create(
+                student=create_student(last_name=last_name), batch=cls.batch, agreed_fee=Decimal("20000")
+            )
+            for last_name in ("Achieng", "Barasa", "Chebet")
+        ]
+        Enrollment.objects.create(student=create_student(), batch=cls.later_batch, agreed_fee=Decimal("20000"))
+        cls.session = add_sessions(cls.batch, [timezone.localdate() - timedelta(days=1)])[0]
+
+        cls.other_batch = create_batch(instructor=create_student(role=User.RoleChoices.INSTRUCTOR))
+        cls.other_enrollment = Enrollment.objects.create(
+            student=create_student(), batch=cls.other_batch, agreed_fee=Decimal("20000")
+        )
+        cls.other_session = add_sessions(cls.other_batch, [timezone.localdate() - timedelta(days=1)])[0]
+
+    def setUp(self):
+        self.client.force_login(self.instructor)
+
+    def attendance_url(self, session):
+        return reverse("portal:take_attendance", args=[session.batch_id, session.pk])
+
+    def read_csv(self, response):
+        return list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+
+    def test_another_instructors_batch_is_not_found(self):
+        self.assertEqual(self.client.get(reverse("portal:batch_roster", args=[self.other_batch.pk])).status_code, 404)
+        self.assertEqual(self.client.get(self.attendance_url(self.other_session)).status_code, 404)
+        response = self.client.post(self.attendance_url(self.other_session), {"present": [self.other_enrollment.pk]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(get_session_register(self.other_session), set())
+        # The session must belong to the batch in the URL as well.
+        url = reverse("portal:take_attendance", args=[self.batch.pk, self.other_session.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_take_attendance(self):
+        present = self.enrollments[0].pk
+        response = self.client.post(self.attendance_url(self.session), {"present": [present]})
+        self.assertRedirects(response, reverse("portal:batch_roster", args=[self.batch.pk]))
+        self.assertEqual(get_session_register(self.session), {present})
+
+        response = self.client.post(self.attendance_url(self.session), {"present": [self.other_enrollment.pk]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_session_register(self.session), {present})
+
+    def test_export_one_batch(self):
+        response = self.client.get(reverse("portal:export_roster", args=[self.batch.pk]))
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertRegex(
+            response["Content-Disposition"], rf'^attachment; filename="roster-{self.batch.pk}-\d{{8}}-\d{{6}}\.csv"$'
+        )
+        header, *rows = self.read_csv(response)
+        self.assertEqual(header, [header for header, _ in ROSTER_COLUMNS])
+        self.assertEqual([row[4] for row in rows], ["Achieng", "Barasa", "Chebet"])
+        student = self.enrollments[0].student
+        self.assertEqual(
+            rows[0],
+            [
+                self.batch.course.code,
+                self.batch.name,
+                student.username,
+                student.first_name,
+                student.last_name,
+                student.email,
+                student.phone_number,
+                "Active",
+                timezone.localdate(self.enrollments[0].created_at).isoformat(),
+            ],
+        )
+
+    def test_export_all_batches(self):
+        response = self.client.get(reverse("portal:export_rosters"))
+        self.assertIn('filename="roster-all-', response["Content-Disposition"])
+        header, *rows = self.read_csv(response)
+        # Newest batch first; nothing from other instructors' batches.
+        self.assertEqual([row[1] for row in rows], [self.later_batch.name] + [self.batch.name] * 3)
+
+    def test_another_instructors_batch_exports_nothing(self):
+        response = self.client.get(reverse("portal:export_roster", args=[self.other_batch.pk]))
+        self.assertEqual(len(self.read_csv(response)), 1)
+
+    def test_query_counts_do_not_grow_with_the_class(self):
+        urls = [
+            reverse("portal:batch_roster", args=[self.batch.pk]),
+            self.attendance_url(self.session),
+            reverse("portal:export_roster", args=[self.batch.pk]),
+            reverse("portal:export_rosters"),
+        ]
+
+        def query_counts():
+            counts = []
+            for url in urls:
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                counts.append(len(queries))
+            return counts
+
+        self.client.post(self.attendance_url(self.session), {"present": [self.enrollments[0].pk]})
+        query_counts()  # Warm the session cache.
+        before = query_counts()
+        self.assertEqual(before, [5, 3, 1, 1])
+        for _ in range(5):
+            Enrollment.objects.create(student=create_student(), batch=self.batch, agreed_fee=Decimal("20000"))
+        self.assertEqual(query_counts(), before)
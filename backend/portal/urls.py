@@ -0,0 +1,16 @@
+from django.urls import path
+
+from . import views
+
+app_name = "portal"
+
+urlpatterns = [
+    path("", views.home, name="home"),
+    path("login/", views.LoginView.as_view(), name="login"),
+    path("logout/", views.LogoutView.as_view(), name="logout"),
+    path("batches/", views.batches, name="batches"),
+    path("batches/roster.csv", views.export_roster, name="export_rosters"),
+    path("batches/<uuid:batch_id>/", views.batch_roster, name="batch_roster"),
+    path("batches/<uuid:batch_id>/sessions/<uuid:session_id>/", views.take_attendance, name="take_attendance"),
+    path("batches/<uuid:batch_id>/roster.csv", views.export_roster, name="export_roster"),
+]
@@ -0,0 +1,147 @@
+import csv
+from functools import wraps
+
+from django.contrib.auth import views as auth_views
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse_lazy
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_http_methods, require_safe
+
+from accounts.models import User
+from attendance.models import ClassSession
+from attendance.services import get_batch_attendance, get_session_register, mark_session
+from enrollments.models import Enrollment
+from .services import get_batch_roster, get_instructor_batches, get_student_summary, iter_roster_rows
+
+portal_login_required = login_required(login_url=reverse_lazy("portal:login"))
+
+
+def role_required(role: str):
+    """
+    Let logged-in users with `role` through; send staff to the admin and
+    refuse everyone else.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        @portal_login_required
+        def _wrapped_view(request, *args, **kwargs):
+            if request.user.role != role:
+                if request.user.is_staff:
+                    return redirect("admin:index")
+                raise PermissionDenied
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
+
+
+student_required = role_required(User.RoleChoices.STUDENT)
+instructor_required = role_required(User.RoleChoices.INSTRUCTOR)
+
+
+@portal_login_required
+def home(request):
+    """Send each user to their own part of the portal."""
+    if request.user.role == User.RoleChoices.INSTRUCTOR:
+        return redirect("portal:batches")
+    return student_home(request)
+
+
+@student_required
+@cache_control(private=True, no_cache=True)
+def student_home(request):
+    """
+    The student's enrollments, fees, payments and balance. Served from a
+    per-student cache entry that is dropped whenever their enrollments,
+    payments, or the courses, batches and instructors shown change.
+    """
+    summary = get_student_summary(request.user.pk)
+    return render(request, "portal/home.html", {"summary": summary})
+
+
+@instructor_required
+@require_safe
+def batches(request):
+    """The instructor's batches with headcounts by status, in one query."""
+    return render(request, "portal/batches.html", {"batches": get_instructor_batches(request.user.pk)})
+
+
+@instructor_required
+@require_safe
+def batch_roster(request, batch_id):
+    """
+    One batch's students with status, contact details and attendance, plus
+    its sessions. Five queries whatever the class size.
+    """
+    batch = get_batch_roster(request.user.pk, batch_id)
+    if batch is None:
+        raise Http404("No such batch.")
+    rates = get_batch_attendance(batch.pk)
+    roster = [(enrollment, rates.get(enrollment.pk, (0, 0, None))) for enrollment in batch.enrollments.all()]
+    context = {"batch": batch, "roster": roster, "sessions": ClassSession.objects.filter(batch=batch)}
+    return render(request, "portal/batch_roster.html", context)
+
+
+@instructor_required
+@require_http_methods(["GET", "HEAD", "POST"])
+def take_attendance(request, batch_id, session_id):
+    """Tick who attended a session; the whole class is saved in one write."""
+    session = get_object_or_404(
+        ClassSession.objects.select_related("batch__course"),
+        pk=session_id,
+        batch_id=batch_id,
+        batch__instructor=request.user,
+    )
+    if request.method == "POST":
+        try:
+            mark_session(session, request.POST.getlist("present"), marked_by=request.user)
+        except (ValueError, ValidationError):
+            return HttpResponseBadRequest("Unknown student in the register.")
+        return redirect("portal:batch_roster", batch_id=batch_id)
+
+    present_ids = get_session_register(session) if session.marked_at else set()
+    enrollments = (
+        session.batch.enrollments.exclude(status=Enrollment.StatusChoices.DROPPED)
+        .select_related("student")
+        .order_by("student__last_name", "student__first_name", "student__username")
+    )
+    register = [(enrollment, enrollment.pk in present_ids) for enrollment in enrollments]
+    return render(request, "portal/take_attendance.html", {"session": session, "register": register})
+
+
+class Echo:
+    """A file-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+@instructor_required
+@require_safe
+def export_roster(request, batch_id=None):
+    """
+    Stream the roster of one batch, or of all the instructor's batches,
+    as CSV. Rows are written as they are read from the database.
+    """
+    writer = csv.writer(Echo())
+    rows = iter_roster_rows(request.user.pk, batch_id)
+    timestamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+    filename = f"roster-{batch_id or 'all'}-{timestamp}.csv"
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+class LoginView(auth_views.LoginView):
+    template_name = "portal/login.html"
+    redirect_authenticated_user = True
+    next_page = reverse_lazy("portal:home")
+
+
+class LogoutView(auth_views.LogoutView):
+    next_page = reverse_lazy("portal:login")
@@ -0,0 +1,143 @@
+from django.contrib import admin
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from unfold.admin import ModelAdmin
+from .models import ProfileCapture
+
+
+def _table(headers, rows):
+    return format_html(
+        '<table><thead><tr>{}</tr></thead><tbody>{}</tbody></table>',
+        format_html_join('', '<th>{}</th>', ((header,) for header in headers)),
+        format_html_join('', '<tr>' + '<td>{}</td>' * len(headers) + '</tr>', rows),
+    )
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(ModelAdmin):
+    """Browse and download profiles. Superusers only: captures include raw SQL."""
+    list_display = (
+        'created_at',
+        'method',
+        'path',
+        'status_code',
+        'duration_ms',
+        'sql_count',
+        'sql_ms',
+        'template_ms',
+        'trigger',
+        'user',
+    )
+    list_filter = ('trigger', 'method', 'status_code')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    readonly_fields = (
+        'created_at',
+        'method',
+        'path',
+        'query_string',
+        'status_code',
+        'user',
+        'trigger',
+        'duration_ms',
+        'sql_count',
+        'sql_ms',
+        'template_ms',
+        'sample_count',
+        'sample_interval_ms',
+        'downloads',
+        'function_table',
+        'template_table',
+        'query_table',
+    )
+    fields = readonly_fields
+    list_per_page = 50
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<uuid:object_id>/stacks/',
+                self.admin_site.admin_view(self.stacks_view),
+                name='profiling_profilecapture_stacks',
+            ),
+            path(
+                '<uuid:object_id>/json/',
+                self.admin_site.admin_view(self.json_view),
+                name='profiling_profilecapture_json',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def _get_capture(self, request, object_id):
+        if not self.has_view_permission(request):
+            raise Http404
+        return get_object_or_404(ProfileCapture, pk=object_id)
+
+    def stacks_view(self, request, object_id):
+        """Collapsed stacks, ready for flamegraph.pl or speedscope.app."""
+        capture = self._get_capture(request, object_id)
+        response = HttpResponse(capture.collapsed_stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{capture.pk}.txt"'
+        return response
+
+    def json_view(self, request, object_id):
+        """The whole capture as JSON, for sharing or diffing two runs."""
+        capture = self._get_capture(request, object_id)
+        data = {
+            field.name: field.value_from_object(capture)
+            for field in ProfileCapture._meta.concrete_fields
+            if field.name != 'user'
+        }
+        data['user'] = str(capture.user) if capture.user_id else None
+        response = JsonResponse(data, json_dumps_params={'indent': 2})
+        response['Content-Disposition'] = f'attachment; filename="profile-{capture.pk}.json"'
+        return response
+
+    @admin.display(description="Download")
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">Collapsed stacks</a> (flamegraph.pl, speedscope) &middot; <a href="{}">JSON</a>',
+            reverse('admin:profiling_profilecapture_stacks', args=[obj.pk]),
+            reverse('admin:profiling_profilecapture_json', args=[obj.pk]),
+        )
+
+    @admin.display(description="Python functions (samples)")
+    def function_table(self, obj):
+        return _table(
+            ("Function", "Own", "Total", "Share of samples"),
+            (
+                (row['function'], row['self'], row['total'], f"{row['total'] / max(obj.sample_count, 1):.0%}")
+                for row in obj.functions
+            ),
+        )
+
+    @admin.display(description="Templates")
+    def template_table(self, obj):
+        return _table(
+            ("Template", "Renders", "Time (ms)"),
+            ((row['template'], row['renders'], row['total_ms']) for row in obj.templates),
+        )
+
+    @admin.display(description="Slowest queries")
+    def query_table(self, obj):
+        return _table(
+            ("Time (ms)", "SQL"),
+            ((row['ms'], row['sql']) for row in obj.queries),
+        )
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ProfilingConfig(AppConfig):
+    name = 'profiling'
+
+    def ready(self):
+        from .capture import instrument_template_rendering
+
+        instrument_template_rendering()
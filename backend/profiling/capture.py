@@ -0,0 +1,231 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.template import base as template_base
+
+# Slowest statements kept per capture.
+MAX_QUERIES = 20
+# Functions listed per capture; the collapsed stacks keep everything.
+MAX_FUNCTIONS = 50
+
+# The ProfileSession of the request running on this thread, if any. The
+# template hook reads this on every render, so with profiling off the cost
+# is a single attribute lookup.
+_active = threading.local()
+
+
+class ProfileSession:
+    """Everything recorded while one request is being profiled."""
+
+    def __init__(self, root_frame, interval: float):
+        self.root_code = root_frame.f_code
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks = Counter()
+        self.templates = {}
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.queries = []
+        self.sql_seconds = 0.0
+        self.sql_count = 0
+
+    def add_sample(self, frame) -> None:
+        # Walk from the sampled frame up to the middleware that started the
+        # session, so stacks begin at the request rather than the server loop.
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            if frame is self.root_frame:
+                break
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+
+    def add_template(self, name: str, seconds: float, outermost: bool) -> None:
+        renders, total = self.templates.get(name, (0, 0.0))
+        self.templates[name] = (renders + 1, total + seconds)
+        if outermost:
+            self.template_seconds += seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute wrapper for the session's lifetime.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_seconds += elapsed
+            self.queries.append((elapsed, sql))
+
+    def summary(self) -> dict:
+        """Return the session's results in the shape ProfileCapture stores."""
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for code in set(stack):
+                total_counts[code] += count
+        functions = [
+            {"function": describe_code(code), "self": self_counts[code], "total": total}
+            for code, total in total_counts.most_common(MAX_FUNCTIONS)
+        ]
+        templates = sorted(
+            (
+                {"template": name, "renders": renders, "total_ms": round(seconds * 1000, 2)}
+                for name, (renders, seconds) in self.templates.items()
+            ),
+            key=lambda row: row["total_ms"],
+            reverse=True,
+        )
+        queries = [
+            {"sql": sql, "ms": round(seconds * 1000, 2)}
+            for seconds, sql in sorted(self.queries, key=lambda query: query[0], reverse=True)[:MAX_QUERIES]
+        ]
+        collapsed = "\n".join(
+            f"{';'.join(describe_code(code) for code in stack)} {count}"
+            for stack, count in sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        )
+        return {
+            "sql_ms": self.sql_seconds * 1000,
+            "sql_count": self.sql_count,
+            "template_ms": self.template_seconds * 1000,
+            "sample_count": sum(self.stacks.values()),
+            "sample_interval_ms": self.interval * 1000,
+            "functions": functions,
+            "templates": templates,
+            "queries": queries,
+            "collapsed_stacks": collapsed,
+        }
+
+
+@lru_cache(maxsize=4096)
+def describe_code(code) -> str:
+    """`qualname (path:line)`, with paths relative to the project or site-packages."""
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir + os.sep):
+        filename = filename[len(base_dir) + 1:]
+    elif "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """
+    One background thread samples the stacks of every thread with an open
+    session. It sleeps on an event while no request is being profiled, so
+    it costs nothing until the first session starts.
+    """
+
+    def __init__(self):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def add(self, thread_id: int, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions[thread_id] = session
+        self._wake.set()
+
+    def remove(self, thread_id: int) -> None:
+        with self._lock:
+            self._sessions.pop(thread_id, None)
+            if not self._sessions:
+                self._wake.clear()
+
+    def run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                sessions = list(self._sessions.items())
+            if not sessions:
+                continue
+            time.sleep(min(session.interval for _, session in sessions))
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, session in sessions:
+                    # Skip a session that ended while we slept.
+                    if self._sessions.get(thread_id) is session and thread_id in frames:
+                        session.add_sample(frames[thread_id])
+            del frames
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> StackSampler:
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler()
+            _sampler.start()
+    return _sampler
+
+
+class profile_request:
+    """
+    Context manager that profiles the code it wraps on the current thread:
+    sampled Python stacks, template render times and SQL. The finished
+    ProfileSession is available as `.session` afterwards.
+    """
+
+    def __init__(self, interval_ms: float | None = None):
+        if interval_ms is None:
+            interval_ms = getattr(settings, "PROFILING_SAMPLE_INTERVAL_MS", 5)
+        self.interval = interval_ms / 1000
+        self.session = None
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        self.session = ProfileSession(sys._getframe(1), self.interval)
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self.session))
+        _active.session = self.session
+        get_sampler().add(threading.get_ident(), self.session)
+        return self.session
+
+    def __exit__(self, *exc_info):
+        get_sampler().remove(threading.get_ident())
+        _active.session = None
+        self._stack.close()
+        self.session.root_frame = None
+        return False
+
+
+def instrument_template_rendering() -> None:
+    """
+    Time every Django template render made while a session is active.
+    Installed once from ProfilingConfig.ready().
+    """
+    original_render = template_base.Template.render
+    if getattr(original_render, "_profiled", False):
+        return
+
+    def render(self, context):
+        session = getattr(_active, "session", None)
+        if session is None:
+            return original_render(self, context)
+        session.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            session.template_depth -= 1
+            session.add_template(
+                self.origin.template_name or self.name or "<string>",
+                time.perf_counter() - start,
+                outermost=session.template_depth == 0,
+            )
+
+    render._profiled = True
+    template_base.Template.render = render
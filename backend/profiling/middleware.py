@@ -0,0 +1,90 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .capture import profile_request
+from .models import ProfileCapture
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "HTTP_X_PROFILE"
+
+
+def _profile_requested(request) -> bool:
+    """
+    True when a superuser asked for this request to be profiled, with
+    `?_profile=1` or an `X-Profile: 1` header. The query parameter is
+    removed so views that validate their query string (admin changelists)
+    never see it.
+    """
+    if PROFILE_PARAM in request.GET:
+        request.GET = request.GET.copy()
+        request.GET.pop(PROFILE_PARAM)
+    elif request.META.get(PROFILE_HEADER) != "1":
+        return False
+    user = getattr(request, "user", None)
+    return bool(user and user.is_superuser)
+
+
+def save_capture(request, response, session, duration_ms: float, trigger: str) -> ProfileCapture:
+    """Store a finished session and drop the oldest captures beyond the limit."""
+    user = getattr(request, "user", None)
+    capture = ProfileCapture.objects.create(
+        method=request.method,
+        path=request.path[:500],
+        query_string=request.GET.urlencode(),
+        status_code=response.status_code,
+        user=user if user is not None and user.is_authenticated else None,
+        trigger=trigger,
+        duration_ms=duration_ms,
+        **session.summary(),
+    )
+    keep = getattr(settings, "PROFILING_MAX_CAPTURES", 200)
+    stale = list(ProfileCapture.objects.values_list("pk", flat=True)[keep:])
+    if stale:
+        ProfileCapture.objects.filter(pk__in=stale).delete()
+    return capture
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request when a superuser asks for it, or every request when
+    PROFILING_SLOW_REQUEST_MS is set, keeping only those slower than it.
+    Anything else passes straight through. Async requests and streamed
+    responses are never profiled: the sampler follows one thread per request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.get_response(request)
+
+        requested = _profile_requested(request)
+        slow_ms = getattr(settings, "PROFILING_SLOW_REQUEST_MS", None)
+        if not requested and slow_ms is None:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with profile_request() as session:
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if response.streaming:
+            return response
+        if requested:
+            trigger = ProfileCapture.Trigger.REQUESTED
+        elif duration_ms >= slow_ms:
+            trigger = ProfileCapture.Trigger.SLOW
+        else:
+            return response
+        capture = save_capture(request, response, session, duration_ms, trigger)
+        response["X-Profile-Id"] = str(capture.pk)
+        return response
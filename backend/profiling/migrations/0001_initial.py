@@ -0,0 +1,46 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:24
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Used for soft deletions')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(db_index=True, max_length=500)),
+                ('query_string', models.TextField(blank=True)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('trigger', models.CharField(choices=[('REQUESTED', 'Requested by superuser'), ('SLOW', 'Slow request')], max_length=10)),
+                ('duration_ms', models.FloatField()),
+                ('sql_ms', models.FloatField(default=0)),
+                ('sql_count', models.PositiveIntegerField(default=0)),
+                ('template_ms', models.FloatField(default=0, help_text='Outermost template renders; includes SQL run while rendering')),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('sample_interval_ms', models.FloatField()),
+                ('functions', models.JSONField(default=list)),
+                ('templates', models.JSONField(default=list)),
+                ('queries', models.JSONField(default=list)),
+                ('collapsed_stacks', models.TextField(blank=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_captures', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import models
+from core.models import TimeStampedModel
+
+
+class ProfileCapture(TimeStampedModel):
+    """A sampled profile of one request: Python stacks, templates and SQL."""
+    class Trigger(models.TextChoices):
+        REQUESTED = 'REQUESTED', 'Requested by superuser'
+        SLOW = 'SLOW', 'Slow request'
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500, db_index=True)
+    query_string = models.TextField(blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='profile_captures'
+    )
+    trigger = models.CharField(max_length=10, choices=Trigger.choices)
+
+    duration_ms = models.FloatField()
+    sql_ms = models.FloatField(default=0)
+    sql_count = models.PositiveIntegerField(default=0)
+    template_ms = models.FloatField(default=0, help_text="Outermost template renders; includes SQL run while rendering")
+    sample_count = models.PositiveIntegerField(default=0)
+    sample_interval_ms = models.FloatField()
+
+    # [{"function", "self", "total"}], busiest first
+    functions = models.JSONField(default=list)
+    # [{"template", "renders", "total_ms"}], slowest first
+    templates = models.JSONField(default=list)
+    # [{"sql", "ms"}], slowest first
+    queries = models.JSONField(default=list)
+    # "root;caller;callee count" lines, as read by flamegraph.pl and speedscope
+    collapsed_stacks = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,58 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import TEST_CACHES, QueryBudgetTestCase, admin_url, create_staff
+from profiling.models import ProfileCapture
+
+
+class ProfileCaptureAdminQueryBudgetTests(QueryBudgetTestCase):
+    def test_changelist(self):
+        self.assertQueryBudget(12, admin_url(ProfileCapture, "changelist"))
+
+    def test_change(self):
+        self.assertQueryBudget(10, admin_url(ProfileCapture, "change", self.rows[0]["capture"].pk))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_staff()
+
+    def test_only_superusers_can_request_a_profile(self):
+        self.client.force_login(self.staff["finance"])
+        response = self.client.get(reverse("admin:index"), {"_profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        response = self.client.get(reverse("admin:index"), headers={"X-Profile": "1"})
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_superuser_request_is_captured(self):
+        self.client.force_login(self.staff["admin"])
+        url = admin_url(ProfileCapture, "changelist")
+        response = self.client.get(url, {"_profile": "1", "trigger": ProfileCapture.Trigger.SLOW})
+        # The changelist never sees the parameter, so it doesn't reject it.
+        self.assertEqual(response.status_code, 200)
+        capture = ProfileCapture.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(capture.trigger, ProfileCapture.Trigger.REQUESTED)
+        self.assertEqual((capture.path, capture.query_string), (url, "trigger=SLOW"))
+        self.assertEqual(capture.user, self.staff["admin"])
+        self.assertGreater(capture.sql_count, 0)
+
+    def test_slow_requests_are_captured(self):
+        with override_settings(PROFILING_SLOW_REQUEST_MS=60_000):
+            self.assertNotIn("X-Profile-Id", self.client.get(reverse("admin:login")))
+        self.assertFalse(ProfileCapture.objects.exists())
+
+        with override_settings(PROFILING_SLOW_REQUEST_MS=0):
+            response = self.client.get(reverse("admin:login"))
+        capture = ProfileCapture.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(capture.trigger, ProfileCapture.Trigger.SLOW)
+        self.assertIsNone(capture.user)
+
+    @override_settings(PROFILING_SLOW_REQUEST_MS=0, PROFILING_MAX_CAPTURES=2)
+    def test_only_the_newest_captures_are_kept(self):
+        ids = [self.client.get(reverse("admin:login"))["X-Profile-Id"] for _ in range(4)]
+        # Newest first, the model's ordering.
+        self.assertEqual([str(pk) for pk in ProfileCapture.objects.values_list("pk", flat=True)], [ids[3], ids[2]])